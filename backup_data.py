@@ -13,7 +13,7 @@ from datetime import datetime
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'vermiculita_system.settings')
 django.setup()
 
-from django.core.management import execute_from_command_line
+from django.core.management import call_command, execute_from_command_line
 from django.core import serializers
 from quality_control.models import Product, Property, AnalysisType, AnalysisTypeProperty, SpotAnalysis, CompositeSample, CompositeSampleResult
 from core.models import Plant, ProductionLine, Shift
@@ -251,13 +251,17 @@ if __name__ == '__main__':
             restore_data(timestamp)
         elif command == 'list':
             list_backups()
+        elif command == 'incremental':
+            # Apenas as linhas alteradas desde o último backup (core.backup)
+            call_command('backup_incremental', *sys.argv[2:])
         else:
-            print("Comandos disponíveis: backup, restore [timestamp], list")
+            print("Comandos disponíveis: backup, restore [timestamp], list, incremental [--full]")
     else:
         print("Comandos disponíveis:")
         print("  python backup_data.py backup")
         print("  python backup_data.py restore [timestamp]")
         print("  python backup_data.py list")
+        print("  python backup_data.py incremental [--full]")
 
 
 
@@ -0,0 +1,262 @@
+#!/usr/bin/env python
+"""
+Benchmark dos índices das tabelas de qualidade
+
+Cria um banco de testes temporário, popula com um volume sintético de
+amostras e análises e mede as consultas usadas pelos dashboards, relatórios
+e APIs duas vezes: sem os índices de Meta.indexes e com eles. Para cada
+consulta imprime o tempo mediano e o plano (EXPLAIN) nas duas situações.
+
+Uso:
+    python benchmark_indexes.py [--samples 20000] [--repeat 5] [--json resultado.json]
+
+O banco de desenvolvimento não é alterado.
+"""
+
+import argparse
+import json
+import os
+import random
+import statistics
+import sys
+import time
+from datetime import date, datetime, time as dt_time, timedelta
+from decimal import Decimal
+
+import django
+
+# Configurar Django
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'vermiculita_system.settings')
+django.setup()
+
+from django.db import connection
+from django.db.models import Avg, Count, Max
+from django.utils import timezone
+
+from core.models import Plant, ProductionLine, Shift
+from quality_control.models import (
+    AnalysisType, Product, Property, Specification, SpotSample, SpotAnalysis,
+    CompositeSample, CompositeSampleResult, STATUS_COUNTS
+)
+
+
+INDEXED_MODELS = [SpotSample, SpotAnalysis, CompositeSample]
+
+START_DATE = date(2024, 1, 1)
+DAYS = 365
+
+
+def seed(samples, properties=8, lines=6, products=4, days=DAYS):
+    """Popula o banco de testes com dados sintéticos (bulk_create, sem sinais)"""
+    rng = random.Random(42)
+
+    plant = Plant.objects.create(name='Planta Benchmark', code='PB')
+    shifts = [
+        Shift.objects.create(name='A', start_time=dt_time(6, 0), end_time=dt_time(18, 0)),
+        Shift.objects.create(name='B', start_time=dt_time(18, 0), end_time=dt_time(6, 0)),
+    ]
+    line_objs = [
+        ProductionLine.objects.create(plant=plant, name=f'Linha {i}', code=f'LB{i}') for i in range(lines)
+    ]
+    product_objs = [
+        Product.objects.create(name=f'Produto {i}', code=f'PB{i}', display_order=i) for i in range(products)
+    ]
+    property_objs = [
+        Property.objects.create(identifier=f'PB{i}', name=f'Propriedade {i}', category='FISICA', display_order=i)
+        for i in range(properties)
+    ]
+    Specification.objects.bulk_create([
+        Specification(product=product, property=prop, lsl=Decimal('1'), usl=Decimal('10'))
+        for product in product_objs for prop in property_objs
+    ])
+    analysis_type = AnalysisType.objects.get(code='PONTUAL')
+
+    spot_samples = []
+    for i in range(samples):
+        day = START_DATE + timedelta(days=rng.randrange(days))
+        spot_samples.append(SpotSample(
+            analysis_type=analysis_type,
+            date=day,
+            shift=rng.choice(shifts),
+            production_line=rng.choice(line_objs),
+            product=rng.choice(product_objs),
+            sample_sequence=i + 1,
+            sample_time=timezone.make_aware(datetime.combine(day, dt_time(rng.randrange(24), rng.randrange(60)))),
+            status='APPROVED',
+        ))
+    spot_samples = SpotSample.objects.bulk_create(spot_samples, batch_size=2000)
+
+    analyses = []
+    for sample in spot_samples:
+        for prop in property_objs:
+            # Cerca de 3% das análises reprovadas e 5% em alerta, como na operação
+            roll = rng.random()
+            status = 'REJECTED' if roll < 0.03 else 'ALERT' if roll < 0.08 else 'APPROVED'
+            analyses.append(SpotAnalysis(
+                spot_sample=sample, property=prop, value=Decimal(rng.randint(100, 900)) / 100,
+                unit='%', status=status
+            ))
+        if len(analyses) >= 20000:
+            SpotAnalysis.objects.bulk_create(analyses, batch_size=5000)
+            analyses = []
+    SpotAnalysis.objects.bulk_create(analyses, batch_size=5000)
+
+    composites = []
+    for i in range(samples // 4):
+        day = START_DATE + timedelta(days=rng.randrange(days))
+        composites.append(CompositeSample(
+            date=day,
+            shift=rng.choice(shifts),
+            production_line=rng.choice(line_objs),
+            product=rng.choice(product_objs),
+            collection_time=timezone.make_aware(datetime.combine(day, dt_time(12, 0))),
+            status='REJECTED' if rng.random() < 0.05 else 'APPROVED',
+        ))
+    composites = CompositeSample.objects.bulk_create(composites, batch_size=2000)
+    CompositeSampleResult.objects.bulk_create([
+        CompositeSampleResult(composite_sample=composite, property=prop, value=Decimal('5'), unit='%',
+                              status=composite.status)
+        for composite in composites for prop in property_objs[:4]
+    ], batch_size=5000)
+
+    return {
+        'shift': shifts[0],
+        'line': line_objs[0],
+        'product': product_objs[0],
+        'property': property_objs[0],
+        'sample_ids': [sample.id for sample in rng.sample(spot_samples, min(50, len(spot_samples)))],
+        'composite_ids': [composite.id for composite in composites[:50]],
+    }
+
+
+def benchmark_queries(ctx):
+    """Consultas com o mesmo formato das usadas nos dashboards, relatórios e APIs"""
+    # Como em produção, as janelas de "últimos 30 dias" terminam no dia mais recente
+    day = START_DATE + timedelta(days=DAYS - 1)
+    window_start = timezone.make_aware(datetime.combine(day - timedelta(days=30), dt_time(0, 0)))
+    key = dict(date=day, shift=ctx['shift'], production_line=ctx['line'], product=ctx['product'])
+
+    return {
+        # dashboard_data.get_shift_samples
+        'amostras_do_turno': lambda: SpotSample.objects.filter(date=day, shift=ctx['shift'])
+            .order_by('production_line', 'product', '-sample_sequence'),
+        # SpotSample.next_sample_sequence (semente do contador)
+        'sequencia_da_chave': lambda: SpotSample.objects.filter(**key)
+            .values('product').annotate(last=Max('sample_sequence')),
+        # rollups.compute_rollups(key=...)
+        'consolidado_da_chave': lambda: SpotAnalysis.objects.filter(
+            spot_sample__date=day, spot_sample__shift=ctx['shift'],
+            spot_sample__production_line=ctx['line'], spot_sample__product=ctx['product']
+        ).values('spot_sample__date').annotate(**STATUS_COUNTS).order_by(),
+        # SpotSample.update_statuses / calculate_overall_status
+        'status_das_amostras': lambda: SpotAnalysis.objects.filter(spot_sample_id__in=ctx['sample_ids'])
+            .values('spot_sample_id').annotate(**STATUS_COUNTS).order_by(),
+        # dashboard_data_api: motivos de reprovação
+        'motivos_de_reprovacao': lambda: SpotAnalysis.objects.filter(
+            spot_sample__sample_time__gte=window_start, status='REJECTED'
+        ).values('property__name').annotate(count=Count('id')).order_by('-count')[:5],
+        # dashboard_data_api: médias das aprovadas
+        'medias_aprovadas': lambda: SpotAnalysis.objects.filter(
+            spot_sample__sample_time__gte=window_start, status='APPROVED'
+        ).values('property__name').annotate(avg_value=Avg('value')).order_by('-avg_value')[:5],
+        # DashboardDataAPIView distribution: valores de uma propriedade
+        'distribuicao_da_propriedade': lambda: SpotAnalysis.objects.filter(
+            property=ctx['property'], status='APPROVED', spot_sample__date__gte=day - timedelta(days=30)
+        ).values_list('value', flat=True),
+        # dashboard_data_api: compostas reprovadas
+        'compostas_reprovadas': lambda: CompositeSample.objects.filter(
+            date__gte=day - timedelta(days=30), status='REJECTED'
+        ).values('product__name').annotate(count=Count('id')).order_by('-count')[:5],
+        # rollups.compute_rollups(key=...) e sequência da amostra composta
+        'compostas_da_chave': lambda: CompositeSample.objects.filter(**key)
+            .values('status').annotate(count=Count('id')).order_by(),
+        # CompositeSample.update_statuses
+        'status_das_compostas': lambda: CompositeSampleResult.objects.filter(
+            composite_sample_id__in=ctx['composite_ids']
+        ).values('composite_sample_id').annotate(**STATUS_COUNTS).order_by(),
+    }
+
+
+def measure(queries, repeat):
+    """Tempo mediano (ms) e plano de cada consulta"""
+    results = {}
+    for name, build in queries.items():
+        list(build())  # aquecimento do cache de páginas
+        timings = []
+        for _ in range(repeat):
+            started = time.perf_counter()
+            list(build())
+            timings.append((time.perf_counter() - started) * 1000)
+        results[name] = {
+            'median_ms': round(statistics.median(timings), 3),
+            'explain': build().explain(),
+        }
+    return results
+
+
+def set_indexes(enabled):
+    """Remove ou recria os índices declarados em Meta.indexes"""
+    with connection.schema_editor() as editor:
+        for model in INDEXED_MODELS:
+            for index in model._meta.indexes:
+                if enabled:
+                    editor.add_index(model, index)
+                else:
+                    editor.remove_index(model, index)
+    with connection.cursor() as cursor:
+        cursor.execute('ANALYZE')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--samples', type=int, default=20000, help='Amostras pontuais sintéticas')
+    parser.add_argument('--repeat', type=int, default=5, help='Execuções medidas por consulta')
+    parser.add_argument('--json', help='Grava os resultados neste arquivo')
+    args = parser.parse_args()
+
+    print(f"🔧 Criando banco de testes e {args.samples} amostras sintéticas...")
+    old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True)
+    try:
+        started = time.perf_counter()
+        ctx = seed(args.samples)
+        print(f"   {SpotAnalysis.objects.count()} análises em {time.perf_counter() - started:.1f}s")
+
+        queries = benchmark_queries(ctx)
+
+        set_indexes(False)
+        print("⏱️  Medindo sem índices...")
+        without = measure(queries, args.repeat)
+
+        set_indexes(True)
+        print("⏱️  Medindo com índices...")
+        with_indexes = measure(queries, args.repeat)
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=0)
+
+    print(f"\n{'Consulta':<30} {'Sem índices (ms)':>18} {'Com índices (ms)':>18} {'Ganho':>8}")
+    for name in queries:
+        before = without[name]['median_ms']
+        after = with_indexes[name]['median_ms']
+        speedup = before / after if after else float('inf')
+        print(f"{name:<30} {before:>18.3f} {after:>18.3f} {speedup:>7.1f}x")
+
+    print("\n📋 Planos de execução")
+    for name in queries:
+        print(f"\n== {name}")
+        print(f"-- sem índices:\n{without[name]['explain']}")
+        print(f"-- com índices:\n{with_indexes[name]['explain']}")
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump({
+                'vendor': connection.vendor,
+                'samples': args.samples,
+                'repeat': args.repeat,
+                'without_indexes': without,
+                'with_indexes': with_indexes,
+            }, f, indent=2, ensure_ascii=False)
+        print(f"\n💾 Resultados gravados em {args.json}")
+
+
+if __name__ == '__main__':
+    sys.exit(main())
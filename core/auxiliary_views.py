@@ -2,6 +2,7 @@
 Views para funcionalidades auxiliares
 """
 
+from django.conf import settings
 from django.shortcuts import render, get_object_or_404, redirect
 from django.contrib.auth.mixins import LoginRequiredMixin
 from django.contrib.auth.decorators import login_required
@@ -10,15 +11,20 @@ from django.contrib import messages
 from django.http import HttpResponse, JsonResponse, Http404
 from django.urls import reverse_lazy
 from django.utils import timezone
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.decorators import method_decorator
 from django.db.models import Q, Count, Avg
 from django.core.files.storage import default_storage
-from django.core.files.base import ContentFile
 from datetime import datetime, timedelta
+from functools import partial
 import json
+import os
 
+from .backup import latest_snapshot, sqlite_database_path
 from .models import ProductionLine, Shift
-from .utils import QRCodeGenerator, DataExporter, DataImporter, AuditLogger
-from quality_control.models import SpotAnalysis, QualityReport, CompositeSample
+from .utils import QR_CONTENT_TYPES, QRCodeGenerator, DataExporter, DataImporter, AuditLogger
+from quality_control.models import SpotAnalysis, QualityReport, CompositeSample, CompositeSampleResult
+from quality_control.api_cache import cached_api_response
 
 
 class QRCodeView(LoginRequiredMixin, TemplateView):
@@ -202,6 +208,7 @@ class DataExportView(LoginRequiredMixin, TemplateView):
             'export_types': [
                 ('spot_analyses', 'Análises Pontuais'),
                 ('composite_samples', 'Amostras Compostas'),
+                ('all_analyses', 'Análises Pontuais e Compostas (Parquet/Arrow)'),
                 ('quality_reports', 'Laudos de Qualidade'),
             ]
         })
@@ -209,6 +216,17 @@ class DataExportView(LoginRequiredMixin, TemplateView):
         return context
 
 
+def _filter_by_sample(queryset, sample, start_date, end_date, line_id):
+    """Filtros de período e linha aplicados pela amostra da análise"""
+    if start_date:
+        queryset = queryset.filter(**{f'{sample}__date__gte': start_date})
+    if end_date:
+        queryset = queryset.filter(**{f'{sample}__date__lte': end_date})
+    if line_id:
+        queryset = queryset.filter(**{f'{sample}__production_line_id': line_id})
+    return queryset
+
+
 @login_required
 def export_data(request):
     """
@@ -230,58 +248,85 @@ def export_data(request):
         if end_date:
             end_date = datetime.strptime(end_date, '%Y-%m-%d').date()
         
+        # Tabela fato das análises (Parquet/Arrow) para a equipe de dados
+        if format_type in DataExporter.COLUMNAR_FORMATS and export_type in (
+                'spot_analyses', 'composite_samples', 'all_analyses'):
+            spot = composite = None
+            if export_type in ('spot_analyses', 'all_analyses'):
+                spot = _filter_by_sample(SpotAnalysis.objects.all(), 'spot_sample', start_date, end_date, line_id)
+            if export_type in ('composite_samples', 'all_analyses'):
+                composite = _filter_by_sample(
+                    CompositeSampleResult.objects.all(), 'composite_sample', start_date, end_date, line_id
+                )
+            
+            # O número de linhas é registrado no log quando o arquivo termina de ser enviado
+            return DataExporter.export_analyses_columnar(
+                spot, composite, file_format=format_type,
+                partition_by_month=bool(request.POST.get('partition_by_month')),
+                on_complete=partial(AuditLogger.log_data_export, request.user, 'AnalysisFacts')
+            )
+        
         # Filtrar dados baseado no tipo
         if export_type == 'spot_analyses':
-            queryset = SpotAnalysis.objects.select_related(
-                'product', 'property', 'production_line', 'shift', 'operator'
-            )
+            queryset = SpotAnalysis.objects.all()
             
             if start_date:
-                queryset = queryset.filter(date__gte=start_date)
+                queryset = queryset.filter(spot_sample__date__gte=start_date)
             if end_date:
-                queryset = queryset.filter(date__lte=end_date)
+                queryset = queryset.filter(spot_sample__date__lte=end_date)
             if line_id:
-                queryset = queryset.filter(production_line_id=line_id)
+                queryset = queryset.filter(spot_sample__production_line_id=line_id)
+            
+            queryset = queryset.order_by('-spot_sample__date', '-spot_sample__sample_time')
             
-            queryset = queryset.order_by('-date', '-sample_time')
+            # Log da exportação com o número de linhas, registrado depois da última linha
+            log_export = partial(AuditLogger.log_data_export, request.user, 'SpotAnalysis')
+            
+            if format_type == 'csv':
+                # Resposta em fluxo: o download começa antes de a consulta terminar
+                return DataExporter.export_spot_analyses_to_csv(queryset, on_complete=log_export)
             
             if format_type == 'excel':
-                buffer, filename = DataExporter.export_spot_analyses_to_excel(queryset)
+                buffer, filename = DataExporter.export_spot_analyses_to_excel(queryset, on_complete=log_export)
                 response = HttpResponse(
                     buffer.getvalue(),
                     content_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
                 )
                 response['Content-Disposition'] = f'attachment; filename="{filename}"'
                 
-                # Log da exportação
-                AuditLogger.log_data_export(request.user, 'SpotAnalysis', queryset.count())
-                
                 return response
             
         elif export_type == 'quality_reports':
-            queryset = QualityReport.objects.select_related(
-                'product', 'production_line', 'created_by', 'approved_by'
-            )
+            queryset = QualityReport.objects.all()
             
+            # O laudo é emitido por planta; a linha filtra pela planta dela
             if start_date:
-                queryset = queryset.filter(start_date__gte=start_date)
+                queryset = queryset.filter(date__gte=start_date)
             if end_date:
-                queryset = queryset.filter(end_date__lte=end_date)
+                queryset = queryset.filter(date__lte=end_date)
             if line_id:
-                queryset = queryset.filter(production_line_id=line_id)
+                queryset = queryset.filter(plant__productionline__id=line_id)
             
             queryset = queryset.order_by('-created_at')
             
+            log_export = partial(AuditLogger.log_data_export, request.user, 'QualityReport')
+            
+            if format_type == 'csv':
+                return DataExporter.stream_csv(
+                    DataExporter.QUALITY_REPORT_HEADERS,
+                    DataExporter.quality_report_rows(queryset),
+                    f"laudos_qualidade_{timezone.now().strftime('%Y%m%d_%H%M%S')}.csv",
+                    on_complete=log_export
+                )
+            
             if format_type == 'excel':
-                buffer, filename = DataExporter.export_quality_reports_to_excel(queryset)
+                buffer, filename = DataExporter.export_quality_reports_to_excel(queryset, on_complete=log_export)
                 response = HttpResponse(
                     buffer.getvalue(),
                     content_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
                 )
                 response['Content-Disposition'] = f'attachment; filename="{filename}"'
                 
-                AuditLogger.log_data_export(request.user, 'QualityReport', queryset.count())
-                
                 return response
         
         messages.error(request, 'Tipo de exportação não suportado.')
@@ -307,24 +352,26 @@ class DataImportView(LoginRequiredMixin, TemplateView):
         import_type = request.POST.get('import_type', 'spot_analyses')
         
         try:
-            # Salvar arquivo temporariamente
-            file_path = default_storage.save(
-                f'temp_imports/{import_file.name}',
-                ContentFile(import_file.read())
-            )
+            # Salvar arquivo temporariamente (gravado em partes, sem lê-lo inteiro)
+            file_path = default_storage.save(f'temp_imports/{import_file.name}', import_file)
             
             full_path = default_storage.path(file_path)
             
             # Importar dados
             if import_type == 'spot_analyses':
-                df, error = DataImporter.import_from_excel(full_path)
+                batches, error = DataImporter.import_from_excel_batches(full_path)
                 
                 if error:
                     messages.error(request, f'Erro ao ler arquivo: {error}')
                 else:
-                    imported_count, errors = DataImporter.import_spot_analyses_from_dataframe(
-                        df, request.user
-                    )
+                    # A planilha é lida e importada bloco a bloco
+                    imported_count, errors = 0, []
+                    for df in batches:
+                        count, batch_errors = DataImporter.import_spot_analyses_from_dataframe(
+                            df, request.user
+                        )
+                        imported_count += count
+                        errors.extend(batch_errors)
                     
                     if imported_count > 0:
                         messages.success(request, f'{imported_count} análises importadas com sucesso!')
@@ -361,6 +408,7 @@ class SystemStatsAPIView(LoginRequiredMixin, TemplateView):
     API para estatísticas do sistema
     """
     
+    @method_decorator(cached_api_response('system_stats'))
     def get(self, request, *args, **kwargs):
         # Estatísticas gerais
         total_analyses = SpotAnalysis.objects.count()
@@ -370,8 +418,8 @@ class SystemStatsAPIView(LoginRequiredMixin, TemplateView):
         # Estatísticas dos últimos 30 dias
         last_30_days = timezone.now().date() - timedelta(days=30)
         
-        recent_analyses = SpotAnalysis.objects.filter(date__gte=last_30_days)
-        recent_reports = QualityReport.objects.filter(created_at__gte=last_30_days)
+        recent_analyses = SpotAnalysis.objects.filter(spot_sample__date__gte=last_30_days)
+        recent_reports = QualityReport.objects.filter(created_at__date__gte=last_30_days)
         
         # Taxa de aprovação
         approved_analyses = recent_analyses.filter(status='APPROVED').count()
@@ -379,7 +427,7 @@ class SystemStatsAPIView(LoginRequiredMixin, TemplateView):
         
         # Análises por linha
         lines_data = list(
-            recent_analyses.values('production_line__name')
+            recent_analyses.values('spot_sample__production_line__name')
             .annotate(count=Count('id'))
             .order_by('-count')
         )
@@ -388,7 +436,7 @@ class SystemStatsAPIView(LoginRequiredMixin, TemplateView):
         daily_data = []
         for i in range(7):
             date = timezone.now().date() - timedelta(days=i)
-            count = SpotAnalysis.objects.filter(date=date).count()
+            count = SpotAnalysis.objects.filter(spot_sample__date=date).count()
             daily_data.append({
                 'date': date.strftime('%d/%m'),
                 'count': count
@@ -417,11 +465,18 @@ def generate_shift_qr(request, line_id, date_str, shift_name):
         shift = get_object_or_404(Shift, name=shift_name)
         date = datetime.strptime(date_str, '%Y-%m-%d').date()
         
-        qr_image = QRCodeGenerator.generate_shift_qr_code(line, shift, date)
+        # PNG (padrão) ou SVG com ?format=svg
+        kind = 'svg' if request.GET.get('format', '').lower() == 'svg' else 'png'
+        data = QRCodeGenerator.shift_qr_data(line, shift, date)
         
-        # Retornar imagem
-        response = HttpResponse(content_type='image/png')
-        qr_image.save(response, 'PNG')
+        # O conteúdo não muda para a linha, o turno e a data: tablets e impressoras
+        # revalidam pelo ETag e recebem 304 sem baixar a imagem de novo
+        etag = QRCodeGenerator.etag(data, kind)
+        response = get_conditional_response(request, etag=etag)
+        if response is None:
+            response = HttpResponse(QRCodeGenerator.render(data, kind), content_type=QR_CONTENT_TYPES[kind])
+        response['ETag'] = etag
+        patch_cache_control(response, private=True, max_age=settings.QR_CODE_MAX_AGE)
         
         return response
         
@@ -444,30 +499,36 @@ class BackupView(LoginRequiredMixin, TemplateView):
             'total_reports': QualityReport.objects.count(),
             'total_samples': CompositeSample.objects.count(),
             'database_size': self._get_database_size(),
+            'last_snapshot': latest_snapshot(),
         })
         
         return context
     
     def _get_database_size(self):
         """
-        Estima o tamanho do banco de dados
+        Tamanho do banco de dados e do último snapshot (comando snapshot_database)
         """
         try:
-            import os
-            from django.conf import settings
+            db_path = sqlite_database_path()
+            size = _format_size(os.path.getsize(db_path)) if db_path and os.path.exists(db_path) else "N/A"
             
-            if 'sqlite' in settings.DATABASES['default']['ENGINE']:
-                db_path = settings.DATABASES['default']['NAME']
-                if os.path.exists(db_path):
-                    size_bytes = os.path.getsize(db_path)
-                    size_mb = size_bytes / (1024 * 1024)
-                    return f"{size_mb:.2f} MB"
+            snapshot = latest_snapshot()
+            if snapshot:
+                created_at = timezone.localtime(datetime.fromisoformat(snapshot['created_at']))
+                size += (
+                    f" (snapshot de {created_at:%d/%m/%Y %H:%M}: {_format_size(snapshot['size'])}, "
+                    f"SHA-256 {snapshot['sha256'][:12]})"
+                )
             
-            return "N/A"
-        except:
+            return size
+        except (OSError, ValueError, KeyError):
             return "N/A"
 
 
+def _format_size(size_bytes):
+    return f"{size_bytes / (1024 * 1024):.2f} MB"
+
+
 @login_required
 def create_backup(request):
     """
@@ -475,9 +536,7 @@ def create_backup(request):
     """
     try:
         # Exportar todas as análises
-        all_analyses = SpotAnalysis.objects.all().select_related(
-            'product', 'property', 'production_line', 'shift', 'operator'
-        )
+        all_analyses = SpotAnalysis.objects.all()
         
         buffer, filename = DataExporter.export_spot_analyses_to_excel(
             all_analyses, 
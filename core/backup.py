@@ -0,0 +1,660 @@
+"""
+Backup incremental em segmentos JSON Lines compactados (gzip)
+
+O primeiro segmento (full) copia todas as linhas dos modelos de BACKUP_MODELS;
+os seguintes (incremental) copiam apenas as linhas com updated_at (ou
+created_at/timestamp) a partir da marca d'água registrada no segmento
+anterior. Modelos sem campo de data são copiados inteiros em todo segmento.
+
+Cada modelo é lido em blocos com values_list e gravado em fluxo, uma linha
+por objeto no formato do serializador 'python' do Django ({"model", "pk",
+"fields"}); a memória usada não depende do tamanho do banco. Ao fim de cada
+modelo o segmento grava também as faixas de ids existentes naquele momento,
+usadas na restauração para remover as linhas excluídas depois do backup
+anterior e para apontar linhas que a marca d'água deixou de fora.
+
+O manifest.json do diretório lista os segmentos em ordem, com o tamanho, o
+SHA-256 e as marcas d'água por modelo. A restauração reaplica o último
+segmento full e os incrementais seguintes em uma única transação, com
+INSERT ... ON CONFLICT DO UPDATE em blocos. Os cadastros são casados pela
+chave natural (NATURAL_KEYS), então o backup pode ser restaurado em outro
+banco (por exemplo, do SQLite para o PostgreSQL). O consolidado por turno é
+reconstruído ao final.
+
+Alterações feitas com queryset.update() ou bulk_update sem updated_at não
+entram no incremental. A margem settings.BACKUP_WATERMARK_OVERLAP cobre
+gravações que fazem commit depois do início do backup com um updated_at
+anterior.
+
+Nas instalações com SQLite, snapshot_sqlite grava também uma cópia
+consistente do arquivo do banco com a API de backup online, sem parar a
+aplicação.
+"""
+
+import gzip
+import hashlib
+import json
+import os
+import sqlite3
+from bisect import bisect_right
+from datetime import date, datetime, time, timedelta
+from decimal import Decimal
+from itertools import groupby, islice
+from operator import itemgetter
+from pathlib import Path
+from time import monotonic, sleep
+
+from django.apps import apps
+from django.conf import settings
+from django.core.management.color import no_style
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import DEFAULT_DB_ALIAS, connection, connections, transaction
+from django.db.models import Max
+from django.db.models.constants import OnConflict
+from django.utils import timezone
+
+
+MANIFEST_NAME = 'manifest.json'
+MANIFEST_VERSION = 1
+
+DEFAULT_CHUNK_SIZE = 2000
+
+# Modelos copiados, em ordem de dependência (referenciados antes de quem os referencia).
+# ShiftQualityRollup é derivado e reconstruído na restauração.
+BACKUP_MODELS = [
+    'auth.User',
+    'core.Plant',
+    'core.ProductionLine',
+    'core.Shift',
+    'core.UserProfile',
+    'core.ChangeLog',
+    'quality_control.AnalysisType',
+    'quality_control.Product',
+    'quality_control.Property',
+    'quality_control.AnalysisTypeProperty',
+    'quality_control.ProductPropertyMap',
+    'quality_control.Specification',
+    'quality_control.SpotSample',
+    'quality_control.SpotAnalysis',
+    'quality_control.CompositeSample',
+    'quality_control.CompositeSampleResult',
+    'quality_control.ChemicalAnalysis',
+    'quality_control.ChemicalAnalysisResult',
+    'quality_control.QualityReport',
+    'quality_control.LoadingOrder',
+    'quality_control.SequenceCounter',
+]
+
+# Chaves naturais dos cadastros, usadas para casar as linhas com as do banco de destino
+NATURAL_KEYS = {
+    'auth.User': ('username',),
+    'core.Plant': ('code',),
+    'core.ProductionLine': ('plant', 'code'),
+    'core.Shift': ('name',),
+    'core.UserProfile': ('user',),
+    'quality_control.AnalysisType': ('code',),
+    'quality_control.Product': ('code',),
+    'quality_control.Property': ('identifier',),
+    'quality_control.SequenceCounter': ('key',),
+}
+
+# Campos usados como marca d'água, em ordem de preferência
+WATERMARK_FIELDS = ('updated_at', 'created_at', 'timestamp')
+
+
+class BackupError(Exception):
+    """Manifest ou segmento ausente ou corrompido"""
+
+
+class _BackupEncoder(DjangoJSONEncoder):
+    """Datas com microssegundos (o DjangoJSONEncoder corta em milissegundos)"""
+
+    def default(self, o):
+        if isinstance(o, datetime):
+            return o.isoformat()
+        return super().default(o)
+
+
+def _backup_dir(directory=None):
+    return Path(directory or settings.BACKUP_DIR)
+
+
+def load_manifest(directory=None):
+    """Manifest do diretório de backup (vazio se ainda não houver segmentos)"""
+    path = _backup_dir(directory) / MANIFEST_NAME
+    if not path.exists():
+        return {'version': MANIFEST_VERSION, 'segments': []}
+    with open(path, encoding='utf-8') as f:
+        manifest = json.load(f)
+    if manifest.get('version') != MANIFEST_VERSION:
+        raise BackupError(f"Versão de manifest não suportada: {manifest.get('version')}")
+    return manifest
+
+
+def _write_json(path, data):
+    # Escrita atômica: um backup interrompido não deixa o arquivo pela metade
+    temporary = path.with_suffix('.tmp')
+    with open(temporary, 'w', encoding='utf-8') as f:
+        json.dump(data, f, indent=2, ensure_ascii=False)
+    os.replace(temporary, path)
+
+
+def _write_manifest(directory, manifest):
+    _write_json(directory / MANIFEST_NAME, manifest)
+
+
+def _sha256(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        while block := f.read(1024 * 1024):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def _watermark_field(model):
+    names = {field.name for field in model._meta.concrete_fields}
+    return next((name for name in WATERMARK_FIELDS if name in names), None)
+
+
+def _serialized_fields(model):
+    """Campos copiados: os concretos e os ManyToMany entre modelos do backup"""
+    fields = [field for field in model._meta.concrete_fields if not field.primary_key]
+    m2m = [
+        field for field in model._meta.many_to_many
+        if field.related_model._meta.label in BACKUP_MODELS
+    ]
+    return fields, m2m
+
+
+def _m2m_values(field, pks):
+    """Ids relacionados pelo ManyToMany, por id de origem, em uma consulta"""
+    through = field.remote_field.through
+    source, target = f'{field.m2m_field_name()}_id', f'{field.m2m_reverse_field_name()}_id'
+    related = {}
+    for pk, related_pk in through._default_manager.filter(**{f'{source}__in': pks}).values_list(source, target):
+        related.setdefault(pk, []).append(related_pk)
+    return related
+
+
+def _records(model, queryset, chunk_size):
+    """
+    Linhas do queryset no formato do serializador 'python' do Django, lidas em
+    blocos com values_list (sem instanciar os modelos)
+    """
+    fields, m2m = _serialized_fields(model)
+    label = model._meta.label_lower
+    names = [field.name for field in fields]
+    rows = queryset.values_list('pk', *[field.attname for field in fields]).iterator(chunk_size=chunk_size)
+    while chunk := list(islice(rows, chunk_size)):
+        related = {field.name: _m2m_values(field, [row[0] for row in chunk]) for field in m2m}
+        for row in chunk:
+            values = dict(zip(names, row[1:]))
+            for name, related_pks in related.items():
+                values[name] = related_pks.get(row[0], [])
+            yield {'model': label, 'pk': row[0], 'fields': values}
+
+
+def _id_ranges(model, chunk_size):
+    """Ids existentes como faixas [início, fim]"""
+    ranges = []
+    ids = model._base_manager.order_by('pk').values_list('pk', flat=True).iterator(chunk_size=chunk_size * 5)
+    for pk in ids:
+        if ranges and ranges[-1][1] == pk - 1:
+            ranges[-1][1] = pk
+        else:
+            ranges.append([pk, pk])
+    return ranges
+
+
+def create_backup(directory=None, full=False, chunk_size=DEFAULT_CHUNK_SIZE):
+    """
+    Grava um novo segmento e o registra no manifest
+
+    O segmento é full quando não há segmento anterior ou full=True; caso
+    contrário é incremental a partir das marcas d'água do último segmento.
+    Retorna a entrada do manifest.
+    """
+    directory = _backup_dir(directory)
+    directory.mkdir(parents=True, exist_ok=True)
+    manifest = load_manifest(directory)
+    previous = manifest['segments'][-1] if manifest['segments'] and not full else None
+
+    kind = 'incremental' if previous else 'full'
+    overlap = timedelta(seconds=settings.BACKUP_WATERMARK_OVERLAP)
+    started_at = timezone.now()
+    name = f"{len(manifest['segments']) + 1:05d}-{kind}-{started_at:%Y%m%dT%H%M%S}.jsonl.gz"
+    temporary = directory / f'{name}.tmp'
+
+    models = {}
+    with gzip.open(temporary, 'wt', compresslevel=6, encoding='utf-8') as f:
+        for label in BACKUP_MODELS:
+            model = apps.get_model(label)
+            queryset = model._base_manager.order_by('pk')
+            field = _watermark_field(model)
+            since = previous['models'].get(label, {}).get('watermark') if previous else None
+
+            watermark = queryset.aggregate(value=Max(field))['value'] if field else None
+            if since:
+                queryset = queryset.filter(**{f'{field}__gte': datetime.fromisoformat(since) - overlap})
+
+            rows = 0
+            for record in _records(model, queryset, chunk_size):
+                f.write(json.dumps(record, cls=_BackupEncoder, ensure_ascii=False))
+                f.write('\n')
+                rows += 1
+
+            ranges = _id_ranges(model, chunk_size)
+            f.write(json.dumps({'ids': ranges, 'model': label}))
+            f.write('\n')
+
+            models[label] = {
+                'rows': rows,
+                'total': sum(end - start + 1 for start, end in ranges),
+                'watermark': watermark.isoformat() if watermark else since,
+            }
+
+    os.replace(temporary, directory / name)
+    segment = {
+        'name': name,
+        'kind': kind,
+        'created_at': started_at.isoformat(),
+        'size': (directory / name).stat().st_size,
+        'sha256': _sha256(directory / name),
+        'models': models,
+    }
+    manifest['segments'].append(segment)
+    _write_manifest(directory, manifest)
+    return segment
+
+
+def restore_chain(manifest, until=None):
+    """Segmentos a reaplicar: o último full até until (número do segmento) e os incrementais seguintes"""
+    segments = manifest['segments'][:until] if until else manifest['segments']
+    for position in range(len(segments) - 1, -1, -1):
+        if segments[position]['kind'] == 'full':
+            return segments[position:]
+    raise BackupError('Nenhum backup completo encontrado')
+
+
+class _IdRanges:
+    """Conjunto de ids guardado como faixas [início, fim] ordenadas"""
+
+    def __init__(self, ranges):
+        self.ranges = ranges
+        self.starts = [start for start, _ in ranges]
+
+    def __contains__(self, pk):
+        position = bisect_right(self.starts, pk) - 1
+        return position >= 0 and pk <= self.ranges[position][1]
+
+    def __iter__(self):
+        for start, end in self.ranges:
+            yield from range(start, end + 1)
+
+    def __len__(self):
+        return sum(end - start + 1 for start, end in self.ranges)
+
+
+def _segment_ids(path):
+    """Faixas de ids por modelo gravadas no segmento"""
+    ids = {}
+    with gzip.open(path, 'rt', encoding='utf-8') as f:
+        for line in f:
+            if line.startswith('{"ids"'):
+                record = json.loads(line)
+                ids[record['model']] = record['ids']
+    return ids
+
+
+class _Restorer:
+    """
+    Grava os segmentos com INSERT ... ON CONFLICT DO UPDATE em blocos
+
+    As linhas dos modelos de NATURAL_KEYS (cadastros) são casadas pela chave
+    natural com as do banco de destino, que pode ter sido criado do zero ou
+    ter outros ids: o mapa id de origem -> id de destino é usado para
+    reescrever as chaves estrangeiras das linhas seguintes. Os demais modelos
+    mantêm os ids do backup.
+    """
+
+    def __init__(self, chunk_size):
+        self.chunk_size = chunk_size
+        self.maps = {label: {} for label in NATURAL_KEYS}
+        self.stats = {label: {'saved': 0, 'deleted': 0, 'missing': 0} for label in BACKUP_MODELS}
+        self.restored = set()
+
+    def replay(self, path):
+        with gzip.open(path, 'rt', encoding='utf-8') as f:
+            records = (json.loads(line) for line in f if not line.startswith('{"ids"'))
+            for _, model_records in groupby(records, key=itemgetter('model')):
+                while chunk := list(islice(model_records, self.chunk_size)):
+                    self._save(apps.get_model(chunk[0]['model']), chunk)
+
+    def _remap(self, field, value):
+        related = self.maps.get(field.related_model._meta.label)
+        if related is None or value is None:
+            return value
+        return related.get(value, value)
+
+    def _save(self, model, records):
+        label = model._meta.label
+        _, m2m = _serialized_fields(model)
+        natural_key = NATURAL_KEYS.get(label)
+        key_fields = [model._meta.get_field(name) for name in natural_key] if natural_key else [model._meta.pk]
+
+        # Cadastros recebem o id do destino pela chave natural; os demais mantêm o do backup
+        fields = [field for field in model._meta.concrete_fields if not field.generated]
+        if natural_key:
+            fields = [field for field in fields if not field.primary_key]
+        # Por campo: nome no JSON, mapa de ids (chaves para cadastros) e conversão
+        columns = [
+            (
+                field.name, field.primary_key, field.get_default,
+                self.maps.get(field.related_model._meta.label) if field.is_relation else None,
+                _converter(field, connections[DEFAULT_DB_ALIAS]),
+            )
+            for field in fields
+        ]
+
+        rows = []
+        for record in records:
+            values = record['fields']
+            row = []
+            for name, primary_key, default, remap, convert in columns:
+                if primary_key:
+                    value = record['pk']
+                elif name in values:
+                    value = values[name]
+                else:
+                    # Campo criado depois do backup
+                    value = default()
+                if value is not None:
+                    if remap is not None:
+                        value = remap.get(value, value)
+                    elif convert is not None:
+                        value = convert(value)
+                row.append(value)
+            rows.append(row)
+
+        _upsert(model, fields, rows, key_fields)
+        self.restored.add(label)
+        self.stats[label]['saved'] += len(rows)
+
+        if natural_key:
+            positions = [fields.index(field) for field in key_fields]
+            attnames = [field.attname for field in key_fields]
+            target = {tuple(row[1:]): row[0] for row in model._base_manager.values_list('pk', *attnames)}
+            for record, row in zip(records, rows):
+                self.maps[label][record['pk']] = target[tuple(row[position] for position in positions)]
+            pks = [self.maps[label][record['pk']] for record in records]
+        else:
+            pks = [record['pk'] for record in records]
+
+        for field in m2m:
+            through = field.remote_field.through
+            source, target_name = f'{field.m2m_field_name()}_id', f'{field.m2m_reverse_field_name()}_id'
+            through._default_manager.filter(**{f'{source}__in': pks}).delete()
+            through._default_manager.bulk_create([
+                through(**{source: pk, target_name: self._remap(field, related_pk)})
+                for pk, record in zip(pks, records)
+                for related_pk in record['fields'].get(field.name, [])
+            ], batch_size=self.chunk_size)
+
+    def _live_ids(self, label, ranges):
+        """Ids de destino das linhas existentes no momento do backup"""
+        if label not in self.maps:
+            return _IdRanges(ranges)
+        return {self.maps[label][pk] for pk in _IdRanges(ranges) if pk in self.maps[label]}
+
+    def remove_missing(self, ids, labels):
+        """
+        Exclui as linhas que não existiam no backup, filhos antes dos pais
+        (para não esbarrar em chaves PROTECT)
+        """
+        for label in reversed(labels):
+            if label not in ids:
+                continue
+            model = apps.get_model(label)
+            live = self._live_ids(label, ids[label])
+            extra = [pk for pk in self._target_ids(model) if pk not in live]
+            for start in range(0, len(extra), self.chunk_size):
+                model._base_manager.filter(pk__in=extra[start:start + self.chunk_size]).delete()
+            self.stats[label]['deleted'] += len(extra)
+
+    def count_missing(self, ids):
+        """Linhas do backup que não foram restauradas (alteradas sem updated_at, por exemplo)"""
+        for label, ranges in ids.items():
+            live = self._live_ids(label, ranges)
+            kept = sum(1 for pk in self._target_ids(apps.get_model(label)) if pk in live)
+            self.stats[label]['missing'] = len(live) - kept
+
+    def _target_ids(self, model):
+        ids = model._base_manager.order_by('pk').values_list('pk', flat=True)
+        return ids.iterator(chunk_size=self.chunk_size * 5)
+
+    def reset_sequences(self):
+        """Ajusta as sequências de id (PostgreSQL) após gravar ids explícitos"""
+        models = [apps.get_model(label) for label in self.restored if label not in NATURAL_KEYS]
+        statements = connection.ops.sequence_reset_sql(no_style(), models)
+        if statements:
+            with connection.cursor() as cursor:
+                for sql in statements:
+                    cursor.execute(sql)
+
+
+# Tipos gravados como vieram do JSON; os demais passam por get_db_prep_save
+PLAIN_FIELD_TYPES = {
+    'AutoField', 'BigAutoField', 'SmallAutoField', 'BigIntegerField', 'BooleanField', 'CharField',
+    'EmailField', 'FloatField', 'ForeignKey', 'IntegerField', 'OneToOneField', 'PositiveBigIntegerField',
+    'PositiveIntegerField', 'PositiveSmallIntegerField', 'SlugField', 'SmallIntegerField', 'TextField',
+}
+
+
+def _converter(field, connection):
+    """Conversão do valor lido do JSON para o banco (datas, decimais, JSON...), ou None"""
+    internal_type = field.get_internal_type()
+    if internal_type in PLAIN_FIELD_TYPES:
+        return None
+
+    # Datas e decimais (a maior parte dos valores) sem passar pelas camadas do campo
+    ops = connection.ops
+    if internal_type == 'DateTimeField':
+        return lambda value: ops.adapt_datetimefield_value(datetime.fromisoformat(value))
+    if internal_type == 'DateField':
+        return lambda value: ops.adapt_datefield_value(date.fromisoformat(value))
+    if internal_type == 'TimeField':
+        return lambda value: ops.adapt_timefield_value(time.fromisoformat(value))
+    if internal_type == 'DecimalField':
+        return lambda value: ops.adapt_decimalfield_value(Decimal(value), field.max_digits, field.decimal_places)
+    return lambda value: field.get_db_prep_save(value, connection)
+
+
+def _upsert(model, fields, rows, key_fields):
+    """
+    INSERT ... VALUES (...), (...) ON CONFLICT (key_fields) DO UPDATE em lotes
+
+    Faz o mesmo que bulk_create(update_conflicts=True) sem montar instâncias
+    nem compilar uma consulta por lote, e grava os valores como estão:
+    auto_now e auto_now_add não substituem as datas do backup.
+    """
+    if not rows:
+        return
+    update_fields = [field for field in fields if not field.primary_key and field not in key_fields]
+    on_conflict = OnConflict.UPDATE if update_fields else OnConflict.IGNORE
+    suffix = connection.ops.on_conflict_suffix_sql(
+        fields, on_conflict, [field.column for field in update_fields], [field.column for field in key_fields]
+    )
+
+    quote = connection.ops.quote_name
+    columns = ', '.join(quote(field.column) for field in fields)
+    placeholders = '(' + ', '.join(['%s'] * len(fields)) + ')'
+    batch_size = max(connection.ops.bulk_batch_size(fields, rows), 1)
+
+    with connection.cursor() as cursor:
+        for start in range(0, len(rows), batch_size):
+            batch = rows[start:start + batch_size]
+            sql = (
+                f'INSERT INTO {quote(model._meta.db_table)} ({columns}) '
+                f'VALUES {", ".join([placeholders] * len(batch))} {suffix}'
+            )
+            cursor.execute(sql, [value for row in batch for value in row])
+
+
+def restore_backup(directory=None, until=None, chunk_size=DEFAULT_CHUNK_SIZE):
+    """
+    Reaplica a cadeia de segmentos sobre o banco atual
+
+    Ao final o banco fica como no momento do último segmento reaplicado: linhas
+    criadas depois são excluídas. As gravações em bloco não disparam sinais; o
+    recálculo de status fica adiado durante as exclusões e o consolidado por
+    turno é reconstruído uma vez ao final. Retorna {modelo: {'saved',
+    'deleted', 'missing'}}.
+    """
+    from quality_control.api_cache import bump_data_version
+    from quality_control.models import SpotSample
+    from quality_control.rollups import rebuild_rollups
+
+    directory = _backup_dir(directory)
+    chain = restore_chain(load_manifest(directory), until)
+
+    # Verifica todos os arquivos antes de alterar o banco
+    for segment in chain:
+        path = directory / segment['name']
+        if not path.exists():
+            raise BackupError(f"Segmento não encontrado: {segment['name']}")
+        if _sha256(path) != segment['sha256']:
+            raise BackupError(f"Segmento corrompido: {segment['name']}")
+
+    restorer = _Restorer(chunk_size)
+    ids = _segment_ids(directory / chain[-1]['name'])
+    data_models = [label for label in BACKUP_MODELS if label not in NATURAL_KEYS]
+
+    with transaction.atomic():
+        with SpotSample.deferred_status():
+            # Linhas com ids do backup: as que sobram saem antes, para não colidir
+            # com as restauradas em outras chaves únicas
+            restorer.remove_missing(ids, data_models)
+            for segment in chain:
+                restorer.replay(directory / segment['name'])
+            # Linhas de segmentos anteriores excluídas depois; os cadastros só
+            # têm o id de destino depois de gravados
+            restorer.remove_missing(ids, BACKUP_MODELS)
+            restorer.count_missing(ids)
+            restorer.reset_sequences()
+
+        rebuild_rollups()
+        transaction.on_commit(bump_data_version)
+
+    return restorer.stats
+
+
+# Snapshot online do SQLite
+
+SNAPSHOT_DIR = 'snapshots'
+SNAPSHOT_REPORT = 'snapshot.json'
+
+# Páginas copiadas por passo da API de backup (4 MB com páginas de 4 KB)
+SNAPSHOT_PAGES = 1024
+# Pausa entre os passos, para as gravações da aplicação seguirem
+SNAPSHOT_PAUSE = 0.05
+# Recomeços (o banco mudou durante a cópia) antes de copiar o restante em um único passo
+SNAPSHOT_MAX_RESTARTS = 5
+
+
+class _TooManyRestarts(Exception):
+    pass
+
+
+def sqlite_database_path():
+    """Arquivo do banco padrão, ou None se o banco não for SQLite"""
+    database = settings.DATABASES['default']
+    if database['ENGINE'] != 'django.db.backends.sqlite3':
+        return None
+    return str(database['NAME'])
+
+
+def snapshot_sqlite(directory=None, source=None, pages=SNAPSHOT_PAGES, pause=SNAPSHOT_PAUSE, keep=None):
+    """
+    Cópia consistente do banco SQLite com a API de backup online
+
+    A cópia é feita em passos de `pages` páginas com uma pausa entre eles, sem
+    bloquear a aplicação. Se o banco for alterado por outra conexão, o SQLite
+    recomeça a cópia; depois de SNAPSHOT_MAX_RESTARTS recomeços o restante é
+    copiado em um único passo. O snapshot é verificado (PRAGMA quick_check) e
+    o relatório com tamanho e SHA-256 é gravado ao lado dele e em
+    snapshot.json, lido por latest_snapshot(). Com keep, apenas os `keep`
+    snapshots mais recentes são mantidos.
+    """
+    source = source or sqlite_database_path()
+    if source is None:
+        raise BackupError('O snapshot online está disponível apenas para bancos SQLite')
+    if not os.path.exists(source):
+        raise BackupError(f'Banco de dados não encontrado: {source}')
+
+    directory = _backup_dir(directory)
+    snapshots = directory / SNAPSHOT_DIR
+    snapshots.mkdir(parents=True, exist_ok=True)
+    started_at = timezone.now()
+    path = snapshots / f'db-{started_at:%Y%m%dT%H%M%S}.sqlite3'
+    temporary = path.with_name(f'{path.name}.tmp')
+
+    progress = {'steps': 0, 'restarts': 0, 'remaining': None}
+
+    def step(status, remaining, total):
+        if progress['remaining'] is not None and remaining > progress['remaining']:
+            progress['restarts'] += 1
+            if progress['restarts'] > SNAPSHOT_MAX_RESTARTS:
+                raise _TooManyRestarts()
+        progress['steps'] += 1
+        progress['remaining'] = remaining
+        sleep(pause)
+
+    started = monotonic()
+    source_connection = sqlite3.connect(source)
+    target_connection = sqlite3.connect(temporary)
+    try:
+        try:
+            source_connection.backup(target_connection, pages=pages, progress=step)
+        except _TooManyRestarts:
+            source_connection.backup(target_connection)
+            progress['steps'] += 1
+        integrity = target_connection.execute('PRAGMA quick_check').fetchone()[0]
+    finally:
+        target_connection.close()
+        source_connection.close()
+
+    if integrity != 'ok':
+        temporary.unlink()
+        raise BackupError(f'Snapshot inconsistente: {integrity}')
+    os.replace(temporary, path)
+
+    report = {
+        'name': path.name,
+        'path': str(path),
+        'created_at': started_at.isoformat(),
+        'duration': round(monotonic() - started, 3),
+        'size': path.stat().st_size,
+        'sha256': _sha256(path),
+        'source': source,
+        'steps': progress['steps'],
+        'restarts': progress['restarts'],
+        'integrity': integrity,
+    }
+    _write_json(path.with_suffix('.json'), report)
+    _write_json(directory / SNAPSHOT_REPORT, report)
+
+    if keep:
+        for old in sorted(snapshots.glob('db-*.sqlite3'), reverse=True)[keep:]:
+            old.unlink()
+            old.with_suffix('.json').unlink(missing_ok=True)
+
+    return report
+
+
+def latest_snapshot(directory=None):
+    """Relatório do último snapshot (None se não houver)"""
+    path = _backup_dir(directory) / SNAPSHOT_REPORT
+    if not path.exists():
+        return None
+    with open(path, encoding='utf-8') as f:
+        return json.load(f)
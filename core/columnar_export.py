@@ -0,0 +1,222 @@
+"""
+Exportação colunar (Parquet ou Arrow IPC) das análises para a equipe de dados
+
+Gera uma tabela fato desnormalizada, com uma linha por análise pontual ou
+resultado de amostra composta: data, turno, planta, linha, produto,
+propriedade, valor (float64), unidade, status e horários, com os tipos
+preservados. As linhas são lidas em blocos com values_list (junções
+resolvidas na consulta) e gravadas em grupos de até ROW_GROUP_ROWS linhas. Os
+bytes seguem para o cliente à medida que o arquivo é escrito, então a memória
+usada não depende do período exportado.
+
+Com partição por mês o resultado é um ZIP com um arquivo por mês e origem no
+layout do Hive (month=2025-01/spot.parquet), que pyarrow.dataset e o pandas
+leem como um único conjunto de dados.
+"""
+
+import zipfile
+from itertools import groupby, islice
+from operator import itemgetter
+from typing import NamedTuple
+
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+
+FORMATS = {
+    'parquet': ('.parquet', 'application/vnd.apache.parquet'),
+    'arrow': ('.arrow', 'application/vnd.apache.arrow.file'),
+}
+
+DEFAULT_CHUNK_SIZE = 5000
+
+# Linhas por grupo de linhas do Parquet (e por bloco do Arrow)
+ROW_GROUP_ROWS = 65536
+
+SCHEMA = pa.schema([
+    ('source', pa.string()),
+    ('analysis_id', pa.int64()),
+    ('sample_id', pa.int64()),
+    ('date', pa.date32()),
+    ('shift', pa.string()),
+    ('plant', pa.string()),
+    ('line', pa.string()),
+    ('product', pa.string()),
+    ('property', pa.string()),
+    ('value', pa.float64()),
+    ('unit', pa.string()),
+    ('status', pa.string()),
+    ('sample_time', pa.timestamp('us', tz='UTC')),
+    ('created_at', pa.timestamp('us', tz='UTC')),
+    ('updated_at', pa.timestamp('us', tz='UTC')),
+])
+
+VALUE_COLUMN = SCHEMA.get_field_index('value') - 1
+
+
+class Source(NamedTuple):
+    """Origem das linhas da tabela fato"""
+    name: str
+    sample: str
+    time_field: str
+
+    def columns(self):
+        """Colunas do values_list, na ordem do SCHEMA (sem a coluna source)"""
+        sample = self.sample
+        return (
+            'id', f'{sample}_id', f'{sample}__date', f'{sample}__shift__name',
+            f'{sample}__production_line__plant__name', f'{sample}__production_line__name',
+            f'{sample}__product__code', 'property__identifier', 'value', 'unit', 'status',
+            f'{sample}__{self.time_field}', 'created_at', 'updated_at',
+        )
+
+
+SPOT = Source('spot', 'spot_sample', 'sample_time')
+COMPOSITE = Source('composite', 'composite_sample', 'collection_time')
+
+
+def record_batches(source, queryset, chunk_size=DEFAULT_CHUNK_SIZE, by_month=False):
+    """
+    Blocos (RecordBatch) da tabela fato, em ordem de data
+
+    Gera pares (mês 'AAAA-MM' ou None, bloco); com by_month, um bloco nunca
+    mistura meses.
+    """
+    rows = queryset.order_by(f'{source.sample}__date', 'id').values_list(*source.columns())
+    rows = rows.iterator(chunk_size=chunk_size)
+    date_index = 2
+    while chunk := list(islice(rows, chunk_size)):
+        if not by_month:
+            yield None, _to_batch(source, chunk)
+            continue
+        for month, month_rows in groupby(chunk, key=lambda row: row[date_index].strftime('%Y-%m')):
+            yield month, _to_batch(source, list(month_rows))
+
+
+def _to_batch(source, rows):
+    columns = list(zip(*rows))
+    columns[VALUE_COLUMN] = [float(value) if value is not None else None for value in columns[VALUE_COLUMN]]
+    arrays = [pa.array([source.name] * len(rows), pa.string())]
+    arrays += [pa.array(column, type=field.type) for column, field in zip(columns, list(SCHEMA)[1:])]
+    return pa.RecordBatch.from_arrays(arrays, schema=SCHEMA)
+
+
+def _tables(batches):
+    """Agrupa os blocos em tabelas de até ROW_GROUP_ROWS linhas, sem misturar meses"""
+    for month, month_batches in groupby(batches, key=itemgetter(0)):
+        pending, rows = [], 0
+        for _, batch in month_batches:
+            pending.append(batch)
+            rows += batch.num_rows
+            if rows >= ROW_GROUP_ROWS:
+                yield month, pa.Table.from_batches(pending, schema=SCHEMA)
+                pending, rows = [], 0
+        if pending:
+            yield month, pa.Table.from_batches(pending, schema=SCHEMA)
+
+
+class _StreamBuffer:
+    """Destino de escrita cujo conteúdo é retirado (drain) a cada parte enviada"""
+
+    def __init__(self):
+        self.parts = []
+        self.position = 0
+        self.closed = False
+
+    def write(self, data):
+        self.parts.append(bytes(data))
+        self.position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self.position
+
+    def flush(self):
+        pass
+
+    def close(self):
+        pass
+
+    def drain(self):
+        data = b''.join(self.parts)
+        self.parts = []
+        return data
+
+
+class _EntryFile:
+    """Arquivo dentro do ZIP com tell(), exigido pelos gravadores do pyarrow"""
+
+    def __init__(self, entry):
+        self.entry = entry
+        self.position = 0
+        self.closed = False
+
+    def write(self, data):
+        self.entry.write(data)
+        self.position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self.position
+
+    def flush(self):
+        pass
+
+    def close(self):
+        # O arquivo do ZIP é fechado por quem o abriu
+        pass
+
+
+def _open_writer(file_format, file):
+    sink = pa.PythonFile(file, mode='w')
+    if file_format == 'parquet':
+        return pq.ParquetWriter(sink, SCHEMA, compression='snappy')
+    return pa.ipc.new_file(sink, SCHEMA)
+
+
+def stream_export(sources, file_format='parquet', partition_by_month=False, chunk_size=DEFAULT_CHUNK_SIZE,
+                  on_complete=None):
+    """
+    Gerador dos bytes do arquivo exportado
+
+    sources é uma lista de pares (Source, queryset). Sem partição, todas as
+    origens vão para um único arquivo; com partição, para um ZIP com um
+    arquivo por mês e origem. on_complete, se informado, é chamado com o
+    número de linhas gravadas quando o arquivo termina.
+    """
+    if file_format not in FORMATS:
+        raise ValueError(f'Formato não suportado: {file_format}')
+    extension = FORMATS[file_format][0]
+    buffer = _StreamBuffer()
+    rows = 0
+
+    if not partition_by_month:
+        writer = _open_writer(file_format, buffer)
+        yield buffer.drain()
+        for source, queryset in sources:
+            for _, table in _tables(record_batches(source, queryset, chunk_size)):
+                writer.write_table(table)
+                rows += table.num_rows
+                yield buffer.drain()
+        writer.close()
+        if on_complete is not None:
+            on_complete(rows)
+        yield buffer.drain()
+        return
+
+    # Parquet e Arrow já são compactados; o ZIP só agrupa os arquivos
+    with zipfile.ZipFile(buffer, 'w', compression=zipfile.ZIP_STORED) as archive:
+        for source, queryset in sources:
+            batches = record_batches(source, queryset, chunk_size, by_month=True)
+            for month, tables in groupby(_tables(batches), key=itemgetter(0)):
+                with archive.open(f'month={month}/{source.name}{extension}', 'w', force_zip64=True) as entry:
+                    writer = _open_writer(file_format, _EntryFile(entry))
+                    for _, table in tables:
+                        writer.write_table(table)
+                        rows += table.num_rows
+                        yield buffer.drain()
+                    writer.close()
+                yield buffer.drain()
+    if on_complete is not None:
+        on_complete(rows)
+    yield buffer.drain()
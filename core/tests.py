@@ -1,3 +1,552 @@
-from django.test import TestCase
+import hashlib
+import json
+import os
+import sqlite3
+import tempfile
+from datetime import date, datetime, time, timedelta
+from decimal import Decimal
+from io import BytesIO, StringIO
+from unittest import mock
 
-# Create your tests here.
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
+from django.test import RequestFactory, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from quality_control.models import (
+    CompositeSample, CompositeSampleResult, Product, QualityReport, Specification, SpotAnalysis, SpotSample
+)
+from quality_control.rollups import rollup_totals
+from quality_control.tests import QualityDataMixin
+
+from .auxiliary_views import SystemStatsAPIView
+from .backup import BackupError, create_backup, latest_snapshot, load_manifest, restore_backup, snapshot_sqlite
+from .models import Shift
+from .utils import AuditLogger, DataExporter, QRCodeGenerator, _encode_qr as encode_qr, _render_qr
+
+
+class SystemStatsAPITest(QualityDataMixin, TestCase):
+    """
+    Estatísticas do sistema filtradas pela data da amostra e servidas do cache
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.create_base_data(lines=1, products=1)
+        cls.user = User.objects.create_user('analista', password='senha')
+        cls.create_sample(cls.lines[0], cls.products[0], [5, 20], sample_date=timezone.now().date())
+
+    def setUp(self):
+        cache.clear()
+        self.factory = RequestFactory()
+
+    def _get_stats(self):
+        request = self.factory.get('/api/system-stats/')
+        request.user = self.user
+        return SystemStatsAPIView.as_view()(request)
+
+    def test_stats_by_sample_date(self):
+        response = self._get_stats()
+
+        self.assertEqual(response.status_code, 200)
+        data = json.loads(response.content)
+        self.assertEqual(data['recent_analyses'], 2)
+        self.assertEqual(data['approval_rate'], 50.0)
+        self.assertEqual(data['lines_data'], [{'spot_sample__production_line__name': self.lines[0].name, 'count': 2}])
+        self.assertEqual(data['daily_data'][-1]['count'], 2)
+
+    def test_repeated_requests_hit_cache(self):
+        first = self._get_stats()
+        self.assertEqual(first['X-Cache'], 'MISS')
+
+        with self.assertNumQueries(0):
+            second = self._get_stats()
+
+        self.assertEqual(second['X-Cache'], 'HIT')
+        self.assertEqual(second.content, first.content)
+
+
+class CSVExportTest(QualityDataMixin, TestCase):
+    """
+    A exportação CSV é enviada em fluxo, lendo o banco em blocos com values_list
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.create_base_data(lines=2, products=1, properties=2)
+        cls.user = User.objects.create_user('exportador', first_name='Ana', last_name='Lima')
+        for _ in range(3):
+            cls.create_sample(cls.lines[0], cls.products[0], [5, 20])
+        cls.create_sample(cls.lines[1], cls.products[0], [5, 5], sample_date=date(2025, 1, 10))
+        SpotSample.objects.update(operator=cls.user)
+
+    def read(self, response):
+        self.assertTrue(response.streaming)
+        return b''.join(response.streaming_content).decode('utf-8')
+
+    def test_spot_analyses_rows(self):
+        queryset = SpotAnalysis.objects.filter(spot_sample__date=self.today).order_by('id')
+
+        response = DataExporter.export_spot_analyses_to_csv(queryset, chunk_size=2)
+        with CaptureQueriesContext(connection) as queries:
+            lines = self.read(response).splitlines()
+
+        self.assertEqual(len(queries), 1)
+        self.assertTrue(lines[0].startswith('\ufeffData,Turno,Linha'))
+        self.assertEqual(len(lines), 7)
+        self.assertEqual(
+            lines[2], '15/01/2025,Turno A (07:00-19:00),Linha 0,Produto 0,PROP1 - Propriedade 1,1,20.0,%,'
+                      f'Reprovado,{timezone.localtime(SpotSample.objects.first().sample_time):%H:%M},Ana Lima,'
+        )
+
+    def test_generic_export_streams(self):
+        response = DataExporter.export_to_csv(SpotAnalysis.objects.order_by('id'),
+                                              ['id', 'property__identifier', 'value'], chunk_size=3)
+
+        with CaptureQueriesContext(connection) as queries:
+            lines = self.read(response).splitlines()
+
+        self.assertEqual(len(queries), 1)
+        self.assertEqual(len(lines), 9)
+        self.assertEqual(lines[0], '\ufeffID,Identificador,Valor')
+        self.assertTrue(lines[1].endswith(',PROP0,5.0000'))
+
+    def test_export_view_filters_by_date(self):
+        self.client.force_login(self.user)
+
+        response = self.client.post('/core/export/data/', {
+            'export_type': 'spot_analyses', 'format': 'csv', 'start_date': '2025-01-15',
+            'line_id': self.lines[0].id,
+        })
+
+        self.assertEqual(response['Content-Type'], 'text/csv; charset=utf-8')
+        self.assertEqual(len(self.read(response).splitlines()), 7)
+
+    def test_export_logged_after_last_row(self):
+        self.client.force_login(self.user)
+
+        with mock.patch.object(AuditLogger, 'log_data_export') as log_export:
+            response = self.client.post('/core/export/data/', {'export_type': 'spot_analyses', 'format': 'csv'})
+            log_export.assert_not_called()
+
+            with CaptureQueriesContext(connection) as queries:
+                self.read(response)
+
+        # Sem COUNT: a quantidade vem das linhas enviadas
+        self.assertEqual(len(queries), 1)
+        log_export.assert_called_once_with(self.user, 'SpotAnalysis', 8)
+
+
+class ExcelExportTest(QualityDataMixin, TestCase):
+    """
+    A exportação Excel é gravada em modo write_only a partir de uma única consulta
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.create_base_data(lines=1, products=1, properties=2)
+        cls.user = User.objects.create_user('exportador', first_name='Ana', last_name='Lima')
+        for _ in range(3):
+            cls.create_sample(cls.lines[0], cls.products[0], [5, 20])
+        QualityReport.objects.create(
+            report_number='L-1', date=cls.today, product=cls.products[0], plant=cls.plant,
+            client_name='Cliente com um nome bem comprido', total_quantity=Decimal('1000'),
+            loading_type='EXPORT', created_by=cls.user,
+        )
+
+    def load(self, buffer):
+        from openpyxl import load_workbook
+        return load_workbook(buffer).active
+
+    def test_spot_analyses_single_query(self):
+        with CaptureQueriesContext(connection) as queries:
+            buffer, filename = DataExporter.export_spot_analyses_to_excel(SpotAnalysis.objects.order_by('id'))
+
+        self.assertEqual(len(queries), 1)
+        self.assertTrue(filename.endswith('.xlsx'))
+        sheet = self.load(buffer)
+        rows = list(sheet.iter_rows(values_only=True))
+        self.assertEqual(rows[0][:3], ('Data', 'Turno', 'Linha'))
+        self.assertEqual(len(rows), 7)
+        self.assertEqual(rows[2][4:9], ('PROP1 - Propriedade 1', 1, 20, '%', 'Reprovado'))
+        self.assertTrue(sheet['A1'].font.bold)
+        # Largura estimada pelo maior valor: "Turno A (07:00-19:00)" + 2
+        self.assertEqual(sheet.column_dimensions['B'].width, 23)
+
+    def test_quality_reports(self):
+        with CaptureQueriesContext(connection) as queries:
+            buffer, _ = DataExporter.export_quality_reports_to_excel(QualityReport.objects.all())
+
+        self.assertEqual(len(queries), 1)
+        rows = list(self.load(buffer).iter_rows(values_only=True))
+        self.assertEqual(rows[1][:8], ('L-1', '15/01/2025', 'Produto 0', 'Planta 1',
+                                       'Cliente com um nome bem comprido', None, 'Exportação', 1000))
+        self.assertEqual(rows[1][10], 'Ana Lima')
+
+    def test_export_view_logs_row_count(self):
+        self.client.force_login(self.user)
+
+        with mock.patch.object(AuditLogger, 'log_data_export') as log_export:
+            self.client.post('/core/export/data/', {'export_type': 'quality_reports', 'format': 'excel'})
+
+        log_export.assert_called_once_with(self.user, 'QualityReport', 1)
+
+
+class ColumnarExportTest(QualityDataMixin, TestCase):
+    """
+    A tabela fato em Parquet/Arrow preserva os tipos e é lida em blocos
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.create_base_data(lines=1, products=1, properties=2)
+        cls.user = User.objects.create_user('analista')
+        for _ in range(3):
+            cls.create_sample(cls.lines[0], cls.products[0], [5, 20])
+        cls.create_sample(cls.lines[0], cls.products[0], [2, 3], sample_date=date(2024, 12, 20))
+        composite = CompositeSample.objects.create(
+            date=cls.today, shift=cls.shift, production_line=cls.lines[0], product=cls.products[0],
+            collection_time=timezone.make_aware(datetime.combine(cls.today, time(12, 0))),
+        )
+        CompositeSampleResult.objects.create(
+            composite_sample=composite, property=cls.properties[0], value=Decimal('4.5')
+        )
+
+    def read(self, response):
+        self.assertTrue(response.streaming)
+        return BytesIO(b''.join(response.streaming_content))
+
+    def test_parquet_types_and_rows(self):
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        response = DataExporter.export_analyses_columnar(
+            SpotAnalysis.objects.all(), CompositeSampleResult.objects.all(), chunk_size=3
+        )
+        with CaptureQueriesContext(connection) as queries:
+            table = pq.read_table(self.read(response))
+
+        self.assertEqual(len(queries), 2)
+        self.assertEqual(response['Content-Type'], 'application/vnd.apache.parquet')
+        self.assertEqual(table.num_rows, 9)
+        self.assertEqual(table.schema.field('value').type, pa.float64())
+        self.assertEqual(table.schema.field('date').type, pa.date32())
+        rows = table.to_pylist()
+        self.assertEqual(rows[0]['date'], date(2024, 12, 20))
+        self.assertEqual(
+            {key: rows[-1][key] for key in ('source', 'shift', 'line', 'product', 'property', 'value')},
+            {'source': 'composite', 'shift': 'A', 'line': 'Linha 0', 'product': 'PR0',
+             'property': 'PROP0', 'value': 4.5}
+        )
+
+    def test_arrow_file(self):
+        import pyarrow as pa
+
+        response = DataExporter.export_analyses_columnar(SpotAnalysis.objects.all(), file_format='arrow')
+
+        table = pa.ipc.open_file(self.read(response)).read_all()
+        self.assertTrue(response['Content-Disposition'].endswith('.arrow"'))
+        self.assertEqual(table.num_rows, 8)
+        self.assertEqual(sorted(set(table.column('status').to_pylist())), ['APPROVED', 'REJECTED'])
+
+    def test_partition_by_month(self):
+        import zipfile
+        import pyarrow.parquet as pq
+
+        counts = []
+        response = DataExporter.export_analyses_columnar(
+            SpotAnalysis.objects.all(), CompositeSampleResult.objects.all(), partition_by_month=True,
+            on_complete=counts.append
+        )
+
+        archive = zipfile.ZipFile(self.read(response))
+        self.assertEqual(counts, [9])
+        self.assertEqual(response['Content-Type'], 'application/zip')
+        self.assertEqual(sorted(archive.namelist()), [
+            'month=2024-12/spot.parquet', 'month=2025-01/composite.parquet', 'month=2025-01/spot.parquet',
+        ])
+        self.assertEqual(pq.read_table(BytesIO(archive.read('month=2025-01/spot.parquet'))).num_rows, 6)
+
+    def test_invalid_format(self):
+        with self.assertRaises(ValueError):
+            DataExporter.export_analyses_columnar(SpotAnalysis.objects.all(), file_format='orc')
+
+    def test_export_view(self):
+        import pyarrow.parquet as pq
+        self.client.force_login(self.user)
+
+        with mock.patch.object(AuditLogger, 'log_data_export') as log_export:
+            response = self.client.post('/core/export/data/', {
+                'export_type': 'all_analyses', 'format': 'parquet', 'start_date': '2025-01-01',
+            })
+            log_export.assert_not_called()
+            content = self.read(response)
+
+        self.assertEqual(pq.read_table(content).num_rows, 7)
+        log_export.assert_called_once_with(self.user, 'AnalysisFacts', 7)
+
+
+@override_settings(BACKUP_WATERMARK_OVERLAP=0)
+class IncrementalBackupTest(QualityDataMixin, TestCase):
+    """
+    O backup incremental copia apenas as linhas alteradas e a restauração reaplica a cadeia
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.create_base_data(lines=1, products=1, properties=2)
+        for _ in range(3):
+            cls.create_sample(cls.lines[0], cls.products[0], [5, 5])
+
+    def setUp(self):
+        temp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(temp_dir.cleanup)
+        self.directory = temp_dir.name
+        # Linhas gravadas no passado; a última análise tem o maior updated_at (a marca d'água)
+        yesterday = timezone.now() - timedelta(days=1)
+        SpotSample.objects.update(updated_at=yesterday)
+        for position, pk in enumerate(SpotAnalysis.objects.order_by('id').values_list('id', flat=True)):
+            SpotAnalysis.objects.filter(pk=pk).update(updated_at=yesterday + timedelta(seconds=position))
+
+    def test_incremental_only_changed_rows(self):
+        full = create_backup(self.directory)
+        analysis = SpotAnalysis.objects.order_by('id').last()
+        analysis.value = Decimal('7')
+        analysis.save()
+
+        incremental = create_backup(self.directory)
+
+        self.assertEqual(full['kind'], 'full')
+        self.assertEqual(full['models']['quality_control.SpotAnalysis']['rows'], 6)
+        self.assertEqual(incremental['kind'], 'incremental')
+        self.assertEqual(incremental['models']['quality_control.SpotAnalysis']['rows'], 1)
+        # Sem campo de data: copiado inteiro
+        self.assertEqual(incremental['models']['core.Shift']['rows'], Shift.objects.count())
+        self.assertEqual([s['name'] for s in load_manifest(self.directory)['segments']],
+                         [full['name'], incremental['name']])
+
+    def test_restore_replays_base_and_increments(self):
+        create_backup(self.directory)
+        first, deleted = SpotAnalysis.objects.order_by('id')[:2]
+        first.value = Decimal('20')
+        first.save()
+        deleted.delete()
+        create_backup(self.directory)
+
+        # Alterações depois do último backup são desfeitas
+        SpotSample.objects.all().delete()
+        self.create_sample(self.lines[0], self.products[0], [5, 5])
+        Product.objects.update(name='Outro nome')
+
+        stats = restore_backup(self.directory)
+
+        self.assertEqual(SpotAnalysis.objects.count(), 5)
+        self.assertFalse(SpotAnalysis.objects.filter(pk=deleted.pk).exists())
+        self.assertEqual(SpotAnalysis.objects.get(pk=first.pk).value, Decimal('20'))
+        self.assertEqual(Product.objects.get().name, 'Produto 0')
+        self.assertEqual(stats['quality_control.SpotSample']['deleted'], 1)
+        self.assertEqual(stats['quality_control.SpotAnalysis']['missing'], 0)
+        self.assertEqual(rollup_totals()['spot_analyses_rejected'], 1)
+
+    def test_incremental_carries_sample_status_change(self):
+        analysis = SpotAnalysis.objects.order_by('id').first()
+        # Amostra antiga: fica abaixo da marca d'água do backup completo
+        SpotSample.objects.filter(pk=analysis.spot_sample_id).update(
+            updated_at=timezone.now() - timedelta(days=30))
+        create_backup(self.directory)
+        analysis.value = Decimal('20')
+        analysis.save()
+        self.assertEqual(SpotSample.objects.get(pk=analysis.spot_sample_id).status, 'REJECTED')
+
+        create_backup(self.directory)
+        SpotSample.objects.all().delete()
+        restore_backup(self.directory)
+
+        # A mudança de status atualiza updated_at, então a amostra entra no incremental
+        self.assertEqual(SpotSample.objects.get(pk=analysis.spot_sample_id).status, 'REJECTED')
+        self.assertEqual(rollup_totals()['spot_samples_rejected'], 1)
+        self.assertEqual(rollup_totals()['spot_samples_approved'], 2)
+
+    def test_restore_remaps_natural_keys(self):
+        create_backup(self.directory)
+        original = self.products[0]
+        updated_at = SpotAnalysis.objects.order_by('id').first().updated_at
+
+        # Banco de destino com o mesmo cadastro sob outro id
+        SpotSample.objects.all().delete()
+        Specification.objects.all().delete()
+        Product.objects.all().delete()
+        product = Product.objects.create(name='Produto novo', code=original.code)
+
+        with CaptureQueriesContext(connection) as queries:
+            restore_backup(self.directory)
+
+        self.assertNotEqual(product.pk, original.pk)
+        self.assertEqual(Product.objects.get().pk, product.pk)
+        self.assertEqual(Product.objects.get().name, 'Produto 0')
+        self.assertEqual(set(SpotSample.objects.values_list('product_id', flat=True)), {product.pk})
+        self.assertEqual(Specification.objects.filter(product=product).count(), 2)
+        self.assertEqual(SpotAnalysis.objects.count(), 6)
+        # Gravação raw: auto_now não altera as datas do backup
+        self.assertEqual(SpotAnalysis.objects.order_by('id').first().updated_at, updated_at)
+        # Gravações em bloco: o número de consultas não depende do número de linhas
+        self.assertLess(len(queries), 100)
+
+    def test_restore_until_and_checksum(self):
+        create_backup(self.directory)
+        SpotAnalysis.objects.order_by('id').first().delete()
+        second = create_backup(self.directory)
+
+        restore_backup(self.directory, until=1)
+        self.assertEqual(SpotAnalysis.objects.count(), 6)
+
+        with open(os.path.join(self.directory, second['name']), 'ab') as f:
+            f.write(b'x')
+        with self.assertRaises(BackupError):
+            restore_backup(self.directory)
+
+    def test_commands(self):
+        out = StringIO()
+        call_command('backup_incremental', '--dir', self.directory, stdout=out)
+        call_command('backup_incremental', '--dir', self.directory, '--full', stdout=out)
+        call_command('restore_backup', '--dir', self.directory, '--noinput', stdout=out)
+
+        self.assertIn('(full)', out.getvalue())
+        self.assertEqual([s['kind'] for s in load_manifest(self.directory)['segments']], ['full', 'full'])
+        # Apenas o último backup completo é reaplicado
+        self.assertNotIn('00001-full', out.getvalue().split('Segmento 00002')[1])
+        self.assertIn('Restauração concluída', out.getvalue())
+
+
+class SQLiteSnapshotTest(TestCase):
+    """
+    O snapshot online copia o SQLite em passos e registra tamanho e SHA-256
+    """
+
+    def setUp(self):
+        temp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(temp_dir.cleanup)
+        self.directory = temp_dir.name
+        self.source = os.path.join(self.directory, 'origem.sqlite3')
+        with sqlite3.connect(self.source) as db:
+            db.execute('CREATE TABLE amostra (id INTEGER PRIMARY KEY, valor TEXT)')
+            db.executemany('INSERT INTO amostra (valor) VALUES (?)', [('x' * 500,)] * 2000)
+
+    def count(self, path):
+        with sqlite3.connect(path) as db:
+            return db.execute('SELECT COUNT(*) FROM amostra').fetchone()[0]
+
+    def test_snapshot_in_steps(self):
+        report = snapshot_sqlite(self.directory, source=self.source, pages=10, pause=0)
+
+        self.assertGreater(report['steps'], 1)
+        self.assertEqual(report['integrity'], 'ok')
+        self.assertEqual(self.count(report['path']), 2000)
+        self.assertEqual(report['size'], os.path.getsize(report['path']))
+        with open(report['path'], 'rb') as f:
+            self.assertEqual(report['sha256'], hashlib.sha256(f.read()).hexdigest())
+        self.assertEqual(latest_snapshot(self.directory), report)
+
+    def test_writes_during_snapshot(self):
+        writer = sqlite3.connect(self.source)
+        self.addCleanup(writer.close)
+
+        def write(seconds):
+            # Outra conexão grava entre os passos: o SQLite recomeça a cópia
+            writer.execute("INSERT INTO amostra (valor) VALUES ('novo')")
+            writer.commit()
+
+        with mock.patch('core.backup.sleep', write):
+            report = snapshot_sqlite(self.directory, source=self.source, pages=10)
+
+        self.assertGreater(report['restarts'], 0)
+        self.assertEqual(report['integrity'], 'ok')
+        self.assertGreater(self.count(report['path']), 2000)
+
+    def test_keep_and_not_sqlite(self):
+        for second in range(3):
+            with mock.patch('core.backup.timezone.now', return_value=timezone.now() + timedelta(seconds=second)):
+                snapshot_sqlite(self.directory, source=self.source, pause=0, keep=2)
+        self.assertEqual(len(os.listdir(os.path.join(self.directory, 'snapshots'))), 4)
+
+        # Banco que não é SQLite
+        with mock.patch('core.backup.sqlite_database_path', return_value=None):
+            with self.assertRaises(BackupError):
+                snapshot_sqlite(self.directory)
+
+    def test_backup_view_shows_snapshot(self):
+        user = User.objects.create_user('backup')
+        self.client.force_login(user)
+        report = snapshot_sqlite(self.directory, source=self.source, pause=0)
+
+        with override_settings(BACKUP_DIR=self.directory):
+            response = self.client.get('/core/backup/')
+
+        self.assertContains(response, report['sha256'])
+        self.assertIn(f"SHA-256 {report['sha256'][:12]}", response.context['database_size'])
+
+
+class QRCodeCacheTest(QualityDataMixin, TestCase):
+    """
+    QR Codes renderizados uma vez por conteúdo e servidos com ETag/Cache-Control
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.create_base_data(lines=1, products=1, properties=1)
+        cls.user = User.objects.create_user('tablet')
+
+    def setUp(self):
+        temp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(temp_dir.cleanup)
+        settings_override = override_settings(QR_CACHE_DIR=temp_dir.name)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        self.directory = temp_dir.name
+        _render_qr.cache_clear()
+        self.addCleanup(_render_qr.cache_clear)
+        self.url = f'/core/qr/shift/{self.lines[0].id}/2025-01-15/A/'
+
+    def test_rendered_once_per_payload(self):
+        with mock.patch('core.utils._encode_qr', wraps=encode_qr) as encode:
+            png = QRCodeGenerator.render('Linha 0', 'png')
+            self.assertEqual(QRCodeGenerator.render('Linha 0', 'PNG'), png)
+            svg = QRCodeGenerator.render('Linha 0', 'svg')
+            QRCodeGenerator.generate_shift_qr_code(self.lines[0], self.shift, self.today, format='BASE64')
+            QRCodeGenerator.generate_shift_qr_code(self.lines[0], self.shift, self.today, format='BASE64')
+        self.assertEqual(encode.call_count, 3)
+        self.assertTrue(png.startswith(b'\x89PNG'))
+        self.assertIn(b'<svg', svg)
+        self.assertEqual(len(os.listdir(self.directory)), 3)
+
+        # Outro processo (memória vazia) lê do disco
+        _render_qr.cache_clear()
+        with mock.patch('core.utils._encode_qr') as encode:
+            self.assertEqual(QRCodeGenerator.render('Linha 0', 'png'), png)
+        encode.assert_not_called()
+
+        image = QRCodeGenerator.generate_shift_qr_code(self.lines[0], self.shift, self.today)
+        self.assertEqual(image.size[0], image.size[1])
+        with self.assertRaises(ValueError):
+            QRCodeGenerator.render('Linha 0', 'gif')
+
+    def test_shift_qr_view_etag(self):
+        self.client.force_login(self.user)
+        response = self.client.get(self.url)
+
+        self.assertEqual(response['Content-Type'], 'image/png')
+        self.assertIn('max-age=86400', response['Cache-Control'])
+        self.assertIn('private', response['Cache-Control'])
+        etag = response['ETag']
+
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response.content, b'')
+
+        response = self.client.get(self.url, {'format': 'svg'}, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], 'image/svg+xml')
+        self.assertNotEqual(response['ETag'], etag)
@@ -1,5 +1,5 @@
 from django.urls import path
-from . import views
+from . import views, auxiliary_views
 
 app_name = 'core'
 
@@ -9,4 +9,9 @@ urlpatterns = [
     path('logout/', views.logout_view, name='logout'),
     path('mobile/', views.MobileHomeView.as_view(), name='mobile_home'),
     path('mobile-home/', views.mobile_home, name='mobile_home_alt'),
+    path('export/', auxiliary_views.DataExportView.as_view(), name='data_export'),
+    path('export/data/', auxiliary_views.export_data, name='export_data'),
+    path('backup/', auxiliary_views.BackupView.as_view(), name='backup'),
+    path('backup/create/', auxiliary_views.create_backup, name='create_backup'),
+    path('qr/shift/<int:line_id>/<str:date_str>/<str:shift_name>/', auxiliary_views.generate_shift_qr, name='shift_qr'),
 ]
@@ -3,20 +3,94 @@ Utilitários gerais do sistema
 """
 
 import qrcode
+import qrcode.image.svg
+import hashlib
 import io
+import os
 import base64
+import tempfile
+from functools import lru_cache
 from PIL import Image
-from django.http import HttpResponse
+from django.http import StreamingHttpResponse
 from django.conf import settings
+from django.core.exceptions import FieldDoesNotExist
 from django.utils import timezone
 from datetime import datetime, timedelta
+from itertools import islice
 import csv
+import logging
 import openpyxl
+from openpyxl.cell import WriteOnlyCell
 from openpyxl.styles import Font, Alignment, PatternFill
+from openpyxl.utils import get_column_letter
 from openpyxl.utils.dataframe import dataframe_to_rows
 import pandas as pd
 
 
+logger = logging.getLogger(__name__)
+
+
+# QR Codes renderizados mantidos em memória por processo (os mais recentes)
+QR_MEMORY_CACHE_SIZE = 256
+
+QR_CONTENT_TYPES = {'png': 'image/png', 'svg': 'image/svg+xml'}
+
+
+def qr_cache_key(data, kind):
+    """Chave do QR Code no cache: SHA-256 do formato e do conteúdo"""
+    return hashlib.sha256(f'{kind}\0{data}'.encode('utf-8')).hexdigest()
+
+
+def _encode_qr(data, kind):
+    qr = qrcode.QRCode(
+        version=1,
+        error_correction=qrcode.constants.ERROR_CORRECT_M,
+        box_size=10,
+        border=4,
+    )
+    qr.add_data(data)
+    qr.make(fit=True)
+    
+    buffer = io.BytesIO()
+    if kind == 'svg':
+        qr.make_image(image_factory=qrcode.image.svg.SvgPathImage).save(buffer)
+    else:
+        qr.make_image(fill_color="black", back_color="white").save(buffer, format='PNG')
+    return buffer.getvalue()
+
+
+@lru_cache(maxsize=QR_MEMORY_CACHE_SIZE)
+def _render_qr(data, kind):
+    """
+    Bytes do QR Code: memória do processo, depois disco (QR_CACHE_DIR), por último a renderização
+    
+    O arquivo em disco é compartilhado entre os processos e sobrevive a reinícios;
+    falhas ao gravá-lo só fazem o QR Code ser renderizado de novo depois.
+    """
+    directory = settings.QR_CACHE_DIR
+    path = os.path.join(directory, f'{qr_cache_key(data, kind)}.{kind}')
+    try:
+        with open(path, 'rb') as f:
+            return f.read()
+    except OSError:
+        pass
+    
+    content = _encode_qr(data, kind)
+    try:
+        os.makedirs(directory, exist_ok=True)
+        fd, temp_path = tempfile.mkstemp(dir=directory, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                f.write(content)
+            os.replace(temp_path, path)
+        except OSError:
+            os.unlink(temp_path)
+            raise
+    except OSError as e:
+        logger.warning('Não foi possível gravar o QR Code em cache: %s', e)
+    return content
+
+
 class QRCodeGenerator:
     """
     Gerador de QR Codes para o sistema
@@ -49,6 +123,12 @@ class QRCodeGenerator:
         """
         Gera QR Code para turno específico
         """
+        qr_string = QRCodeGenerator.shift_qr_data(production_line, shift, date)
+        return QRCodeGenerator._create_qr_image(qr_string, format)
+    
+    @staticmethod
+    def shift_qr_data(production_line, shift, date):
+        """Conteúdo do QR Code do turno (o mesmo para a linha, o turno e a data)"""
         qr_data = {
             'type': 'shift_summary',
             'line_code': production_line.code,
@@ -62,7 +142,7 @@ class QRCodeGenerator:
         qr_string += f"Data: {date.strftime('%d/%m/%Y')}\n"
         qr_string += f"Acesso: {qr_data['url']}"
         
-        return QRCodeGenerator._create_qr_image(qr_string, format)
+        return qr_string
     
     @staticmethod
     def generate_report_qr_code(quality_report, format='PNG'):
@@ -76,211 +156,356 @@ class QRCodeGenerator:
         
         return QRCodeGenerator._create_qr_image(qr_string, format)
     
+    @staticmethod
+    def render(data, kind='png'):
+        """
+        Bytes do QR Code ('png' ou 'svg'), renderizado uma vez por conteúdo distinto
+        """
+        kind = kind.lower()
+        if kind not in QR_CONTENT_TYPES:
+            raise ValueError(f'Formato de QR Code não suportado: {kind}')
+        return _render_qr(data, kind)
+    
+    @staticmethod
+    def etag(data, kind='png'):
+        """ETag do QR Code: muda só quando o conteúdo muda"""
+        return f'"{qr_cache_key(data, kind.lower())}"'
+    
     @staticmethod
     def _create_qr_image(data, format='PNG'):
         """
-        Cria imagem do QR Code
+        Cria imagem do QR Code a partir do cache
         """
-        qr = qrcode.QRCode(
-            version=1,
-            error_correction=qrcode.constants.ERROR_CORRECT_M,
-            box_size=10,
-            border=4,
-        )
-        qr.add_data(data)
-        qr.make(fit=True)
-        
-        # Criar imagem
-        img = qr.make_image(fill_color="black", back_color="white")
-        
         if format.upper() == 'BASE64':
             # Retornar como base64 para uso em templates
-            buffer = io.BytesIO()
-            img.save(buffer, format='PNG')
-            buffer.seek(0)
-            img_base64 = base64.b64encode(buffer.getvalue()).decode()
+            img_base64 = base64.b64encode(QRCodeGenerator.render(data, 'png')).decode()
             return f"data:image/png;base64,{img_base64}"
+        elif format.upper() == 'SVG':
+            return QRCodeGenerator.render(data, 'svg')
         else:
             # Retornar imagem PIL
-            return img
+            return Image.open(io.BytesIO(QRCodeGenerator.render(data, 'png')))
+
+
+class _Echo:
+    """Destino do csv.writer que devolve a linha formatada em vez de gravá-la"""
+    
+    def write(self, value):
+        return value
+
+
+def _counted(rows, on_complete):
+    """Repassa as linhas e chama on_complete(quantidade) depois da última"""
+    count = 0
+    for row in rows:
+        count += 1
+        yield row
+    on_complete(count)
 
 
 class DataExporter:
     """
     Exportador de dados para Excel e CSV
+
+    As exportações aceitam on_complete, chamado com o número de linhas
+    exportadas depois da última linha (ex.: para o log de auditoria), sem uma
+    consulta de contagem antes da exportação.
     """
     
+    # Registros lidos do banco por vez nas exportações em fluxo
+    STREAM_CHUNK_SIZE = 2000
+    
+    # Linhas de CSV agrupadas em cada parte enviada ao cliente
+    CSV_ROWS_PER_CHUNK = 500
+    
+    SPOT_ANALYSIS_HEADERS = [
+        'Data', 'Turno', 'Linha', 'Produto', 'Propriedade',
+        'Sequência', 'Valor', 'Unidade', 'Status', 'Hora',
+        'Operador', 'Ação Tomada'
+    ]
+    
+    # Colunas lidas com values_list, já com as junções (sem instanciar os modelos)
+    SPOT_ANALYSIS_COLUMNS = (
+        'spot_sample__date', 'spot_sample__shift__name', 'spot_sample__production_line__name',
+        'spot_sample__product__name', 'property__identifier', 'property__name',
+        'spot_sample__sample_sequence', 'value', 'unit', 'status', 'spot_sample__sample_time',
+        'spot_sample__operator__first_name', 'spot_sample__operator__last_name',
+        'spot_sample__operator__username', 'action_taken',
+    )
+    
+    QUALITY_REPORT_HEADERS = [
+        'Número do Laudo', 'Data', 'Produto', 'Planta', 'Cliente',
+        'Nota Fiscal', 'Tipo de Carregamento', 'Quantidade (kg)', 'Status',
+        'Criado em', 'Criado por', 'Aprovado por', 'Aprovado em'
+    ]
+    
+    QUALITY_REPORT_COLUMNS = (
+        'report_number', 'date', 'product__name', 'plant__name', 'client_name', 'invoice_number',
+        'loading_type', 'total_quantity', 'status', 'created_at',
+        'created_by__first_name', 'created_by__last_name', 'created_by__username',
+        'approved_by__first_name', 'approved_by__last_name', 'approved_by__username', 'approved_at',
+    )
+    
+    # Formatos da tabela fato para análise de dados (core.columnar_export)
+    COLUMNAR_FORMATS = ('parquet', 'arrow')
+    
+    # Linhas usadas para estimar a largura das colunas no Excel
+    WIDTH_SAMPLE_ROWS = 200
+    
     @staticmethod
-    def export_spot_analyses_to_excel(queryset, filename=None):
+    def spot_analysis_rows(queryset, chunk_size=None):
         """
-        Exporta análises pontuais para Excel
+        Linhas das análises pontuais com os valores já formatados, lidas do banco
+        em blocos de chunk_size registros
+        """
+        from quality_control.models import SpotAnalysis
+        from .models import Shift
+        
+        shifts = dict(Shift.SHIFT_CHOICES)
+        statuses = dict(SpotAnalysis.STATUS_CHOICES)
+        rows = queryset.values_list(*DataExporter.SPOT_ANALYSIS_COLUMNS).iterator(
+            chunk_size=chunk_size or DataExporter.STREAM_CHUNK_SIZE
+        )
+        for (date, shift, line, product, identifier, property_name, sequence, value, unit, status,
+             sample_time, first_name, last_name, username, action_taken) in rows:
+            yield [
+                date.strftime('%d/%m/%Y') if date else '',
+                shifts.get(shift, shift or ''),
+                line or '',
+                product or '',
+                f"{identifier} - {property_name}",
+                sequence if sequence is not None else '',
+                float(value),
+                unit or '',
+                statuses.get(status, status),
+                timezone.localtime(sample_time).strftime('%H:%M') if sample_time else '',
+                f"{first_name} {last_name}".strip() or username or '',
+                action_taken or '',
+            ]
+    
+    @staticmethod
+    def stream_csv(headers, rows, filename, on_complete=None):
+        """
+        Resposta CSV em fluxo: as linhas são formatadas e enviadas à medida que
+        são lidas, sem montar o arquivo em memória
+        """
+        writer = csv.writer(_Echo())
+        if on_complete is not None:
+            rows = _counted(rows, on_complete)
+        
+        def generate():
+            # BOM para o Excel reconhecer UTF-8; o cabeçalho sai antes da consulta
+            yield '\ufeff' + writer.writerow(headers)
+            lines = []
+            for row in rows:
+                lines.append(writer.writerow(row))
+                if len(lines) >= DataExporter.CSV_ROWS_PER_CHUNK:
+                    yield ''.join(lines)
+                    lines = []
+            if lines:
+                yield ''.join(lines)
+        
+        response = StreamingHttpResponse(generate(), content_type='text/csv; charset=utf-8')
+        response['Content-Disposition'] = f'attachment; filename="{filename}"'
+        return response
+    
+    @staticmethod
+    def export_spot_analyses_to_csv(queryset, filename=None, chunk_size=None, on_complete=None):
+        """
+        Exporta análises pontuais para CSV em fluxo
         """
         if not filename:
-            filename = f"analises_pontuais_{timezone.now().strftime('%Y%m%d_%H%M%S')}.xlsx"
+            filename = f"analises_pontuais_{timezone.now().strftime('%Y%m%d_%H%M%S')}.csv"
+        
+        return DataExporter.stream_csv(
+            DataExporter.SPOT_ANALYSIS_HEADERS,
+            DataExporter.spot_analysis_rows(queryset, chunk_size=chunk_size),
+            filename,
+            on_complete=on_complete
+        )
+    
+    @staticmethod
+    def quality_report_rows(queryset, chunk_size=None):
+        """
+        Linhas dos laudos de qualidade com os valores já formatados, lidas do banco
+        em blocos de chunk_size registros
+        """
+        from quality_control.models import QualityReport
         
-        # Criar workbook
-        wb = openpyxl.Workbook()
-        ws = wb.active
-        ws.title = "Análises Pontuais"
+        statuses = dict(QualityReport.STATUS_CHOICES)
+        loading_types = dict(QualityReport.LOADING_TYPE_CHOICES)
+        rows = queryset.values_list(*DataExporter.QUALITY_REPORT_COLUMNS).iterator(
+            chunk_size=chunk_size or DataExporter.STREAM_CHUNK_SIZE
+        )
         
-        # Cabeçalhos
-        headers = [
-            'Data', 'Turno', 'Linha', 'Produto', 'Propriedade', 
-            'Sequência', 'Valor', 'Unidade', 'Status', 'Hora', 
-            'Operador', 'Ação Tomada'
-        ]
+        def user_name(first_name, last_name, username):
+            return f"{first_name or ''} {last_name or ''}".strip() or username or ''
+        
+        def moment(value):
+            return timezone.localtime(value).strftime('%d/%m/%Y %H:%M') if value else ''
+        
+        for (report_number, date, product, plant, client_name, invoice_number, loading_type, quantity,
+             status, created_at, created_first, created_last, created_username,
+             approved_first, approved_last, approved_username, approved_at) in rows:
+            yield [
+                report_number,
+                date.strftime('%d/%m/%Y'),
+                product,
+                plant,
+                client_name,
+                invoice_number or '',
+                loading_types.get(loading_type, loading_type),
+                float(quantity) if quantity is not None else '',
+                statuses.get(status, status),
+                moment(created_at),
+                user_name(created_first, created_last, created_username),
+                user_name(approved_first, approved_last, approved_username),
+                moment(approved_at),
+            ]
+    
+    @staticmethod
+    def write_excel(title, headers, rows, on_complete=None):
+        """
+        Planilha em modo write_only, montada em uma única passagem pelas linhas
         
-        # Estilo do cabeçalho
-        header_font = Font(bold=True, color="FFFFFF")
-        header_fill = PatternFill(start_color="366092", end_color="366092", fill_type="solid")
-        header_alignment = Alignment(horizontal="center", vertical="center")
+        As larguras das colunas precisam ser definidas antes da primeira linha;
+        são estimadas pelas primeiras WIDTH_SAMPLE_ROWS linhas, que ficam em
+        memória apenas até serem gravadas. Retorna um BytesIO posicionado no início.
+        """
+        wb = openpyxl.Workbook(write_only=True)
+        ws = wb.create_sheet(title)
         
-        # Adicionar cabeçalhos
+        if on_complete is not None:
+            rows = _counted(rows, on_complete)
+        rows = iter(rows)
+        sample = list(islice(rows, DataExporter.WIDTH_SAMPLE_ROWS))
         for col, header in enumerate(headers, 1):
-            cell = ws.cell(row=1, column=col, value=header)
-            cell.font = header_font
-            cell.fill = header_fill
-            cell.alignment = header_alignment
-        
-        # Adicionar dados
-        for row, analysis in enumerate(queryset, 2):
-            ws.cell(row=row, column=1, value=analysis.date.strftime('%d/%m/%Y'))
-            ws.cell(row=row, column=2, value=analysis.shift.get_name_display())
-            ws.cell(row=row, column=3, value=analysis.production_line.name)
-            ws.cell(row=row, column=4, value=analysis.product.name)
-            ws.cell(row=row, column=5, value=f"{analysis.property.identifier} - {analysis.property.name}")
-            ws.cell(row=row, column=6, value=analysis.sequence)
-            ws.cell(row=row, column=7, value=float(analysis.value))
-            ws.cell(row=row, column=8, value=analysis.property.unit or '')
-            ws.cell(row=row, column=9, value=analysis.get_status_display())
-            ws.cell(row=row, column=10, value=analysis.sample_time.strftime('%H:%M'))
-            ws.cell(row=row, column=11, value=analysis.operator.get_full_name() or analysis.operator.username)
-            ws.cell(row=row, column=12, value=analysis.action_taken or '')
-        
-        # Ajustar largura das colunas
-        for column in ws.columns:
-            max_length = 0
-            column_letter = column[0].column_letter
-            for cell in column:
-                try:
-                    if len(str(cell.value)) > max_length:
-                        max_length = len(str(cell.value))
-                except:
-                    pass
-            adjusted_width = min(max_length + 2, 50)
-            ws.column_dimensions[column_letter].width = adjusted_width
-        
-        # Salvar em buffer
+            width = max([len(str(header))] + [len(str(row[col - 1])) for row in sample])
+            ws.column_dimensions[get_column_letter(col)].width = min(width + 2, 50)
+        
+        # Estilo do cabeçalho
+        header_cells = []
+        for header in headers:
+            cell = WriteOnlyCell(ws, value=header)
+            cell.font = Font(bold=True, color="FFFFFF")
+            cell.fill = PatternFill(start_color="366092", end_color="366092", fill_type="solid")
+            cell.alignment = Alignment(horizontal="center", vertical="center")
+            header_cells.append(cell)
+        ws.append(header_cells)
+        
+        for row in sample:
+            ws.append(row)
+        for row in rows:
+            ws.append(row)
+        
         buffer = io.BytesIO()
         wb.save(buffer)
         buffer.seek(0)
+        return buffer
+    
+    @staticmethod
+    def export_spot_analyses_to_excel(queryset, filename=None, chunk_size=None, on_complete=None):
+        """
+        Exporta análises pontuais para Excel
+        """
+        if not filename:
+            filename = f"analises_pontuais_{timezone.now().strftime('%Y%m%d_%H%M%S')}.xlsx"
         
+        buffer = DataExporter.write_excel(
+            "Análises Pontuais",
+            DataExporter.SPOT_ANALYSIS_HEADERS,
+            DataExporter.spot_analysis_rows(queryset, chunk_size=chunk_size),
+            on_complete=on_complete
+        )
         return buffer, filename
     
     @staticmethod
-    def export_quality_reports_to_excel(queryset, filename=None):
+    def export_quality_reports_to_excel(queryset, filename=None, chunk_size=None, on_complete=None):
         """
         Exporta laudos de qualidade para Excel
         """
         if not filename:
             filename = f"laudos_qualidade_{timezone.now().strftime('%Y%m%d_%H%M%S')}.xlsx"
         
-        wb = openpyxl.Workbook()
-        ws = wb.active
-        ws.title = "Laudos de Qualidade"
+        buffer = DataExporter.write_excel(
+            "Laudos de Qualidade",
+            DataExporter.QUALITY_REPORT_HEADERS,
+            DataExporter.quality_report_rows(queryset, chunk_size=chunk_size),
+            on_complete=on_complete
+        )
+        return buffer, filename
+    
+    @staticmethod
+    def export_analyses_columnar(spot_queryset=None, composite_queryset=None, file_format='parquet',
+                                 partition_by_month=False, filename=None, chunk_size=None, on_complete=None):
+        """
+        Exporta análises pontuais e resultados de amostras compostas como tabela
+        fato em Parquet ou Arrow IPC, em fluxo (ver core.columnar_export)
         
-        headers = [
-            'Número do Laudo', 'Tipo', 'Produto', 'Linha', 'Data Inicial', 
-            'Data Final', 'Cliente', 'Lote', 'Quantidade (ton)', 'Status',
-            'Criado em', 'Criado por', 'Aprovado por', 'Aprovado em'
-        ]
+        Com partition_by_month o arquivo é um ZIP com uma partição por mês.
+        """
+        from .columnar_export import COMPOSITE, DEFAULT_CHUNK_SIZE, FORMATS, SPOT, stream_export
         
-        # Estilo do cabeçalho
-        header_font = Font(bold=True, color="FFFFFF")
-        header_fill = PatternFill(start_color="366092", end_color="366092", fill_type="solid")
-        header_alignment = Alignment(horizontal="center", vertical="center")
+        if file_format not in FORMATS:
+            raise ValueError(f'Formato não suportado: {file_format}')
         
-        for col, header in enumerate(headers, 1):
-            cell = ws.cell(row=1, column=col, value=header)
-            cell.font = header_font
-            cell.fill = header_fill
-            cell.alignment = header_alignment
-        
-        for row, report in enumerate(queryset, 2):
-            ws.cell(row=row, column=1, value=report.report_number)
-            ws.cell(row=row, column=2, value=report.get_report_type_display())
-            ws.cell(row=row, column=3, value=report.product.name)
-            ws.cell(row=row, column=4, value=report.production_line.name)
-            ws.cell(row=row, column=5, value=report.start_date.strftime('%d/%m/%Y'))
-            ws.cell(row=row, column=6, value=report.end_date.strftime('%d/%m/%Y'))
-            ws.cell(row=row, column=7, value=report.customer_name or '')
-            ws.cell(row=row, column=8, value=report.batch_number or '')
-            ws.cell(row=row, column=9, value=float(report.quantity) if report.quantity else '')
-            ws.cell(row=row, column=10, value=report.get_status_display())
-            ws.cell(row=row, column=11, value=report.created_at.strftime('%d/%m/%Y %H:%M'))
-            ws.cell(row=row, column=12, value=report.created_by.get_full_name() or report.created_by.username)
-            ws.cell(row=row, column=13, value=report.approved_by.get_full_name() if report.approved_by else '')
-            ws.cell(row=row, column=14, value=report.approved_at.strftime('%d/%m/%Y %H:%M') if report.approved_at else '')
-        
-        # Ajustar largura das colunas
-        for column in ws.columns:
-            max_length = 0
-            column_letter = column[0].column_letter
-            for cell in column:
-                try:
-                    if len(str(cell.value)) > max_length:
-                        max_length = len(str(cell.value))
-                except:
-                    pass
-            adjusted_width = min(max_length + 2, 50)
-            ws.column_dimensions[column_letter].width = adjusted_width
+        sources = [
+            (source, queryset)
+            for source, queryset in ((SPOT, spot_queryset), (COMPOSITE, composite_queryset))
+            if queryset is not None
+        ]
         
-        buffer = io.BytesIO()
-        wb.save(buffer)
-        buffer.seek(0)
+        extension, content_type = FORMATS[file_format]
+        if partition_by_month:
+            extension, content_type = '.zip', 'application/zip'
+        if not filename:
+            filename = f"analises_{timezone.now().strftime('%Y%m%d_%H%M%S')}{extension}"
         
-        return buffer, filename
+        parts = stream_export(
+            sources, file_format=file_format, partition_by_month=partition_by_month,
+            chunk_size=chunk_size or DEFAULT_CHUNK_SIZE, on_complete=on_complete
+        )
+        response = StreamingHttpResponse((part for part in parts if part), content_type=content_type)
+        response['Content-Disposition'] = f'attachment; filename="{filename}"'
+        return response
     
     @staticmethod
-    def export_to_csv(queryset, fields, filename=None):
+    def export_to_csv(queryset, fields, filename=None, chunk_size=None, on_complete=None):
         """
-        Exporta queryset para CSV
+        Exporta queryset para CSV em fluxo, lendo os campos com values_list
+        
+        fields são caminhos aceitos por values_list, inclusive por relações
+        (ex.: 'property__name'), resolvidos com junções na mesma consulta.
         """
         if not filename:
             filename = f"export_{timezone.now().strftime('%Y%m%d_%H%M%S')}.csv"
         
-        response = HttpResponse(content_type='text/csv; charset=utf-8')
-        response['Content-Disposition'] = f'attachment; filename="{filename}"'
-        
-        # Adicionar BOM para Excel reconhecer UTF-8
-        response.write('\ufeff')
-        
-        writer = csv.writer(response)
-        
-        # Cabeçalhos
+        # Cabeçalhos: nome do último campo do caminho
         headers = []
         for field in fields:
-            if hasattr(queryset.model, field):
-                field_obj = queryset.model._meta.get_field(field)
-                headers.append(field_obj.verbose_name)
-            else:
+            model = queryset.model
+            *relations, name = field.split('__')
+            try:
+                for relation in relations:
+                    model = model._meta.get_field(relation).related_model
+                headers.append(str(model._meta.get_field(name).verbose_name))
+            except (FieldDoesNotExist, AttributeError):
                 headers.append(field)
         
-        writer.writerow(headers)
-        
         # Dados
-        for obj in queryset:
-            row = []
-            for field in fields:
-                value = getattr(obj, field, '')
-                if hasattr(value, 'strftime'):  # Data/datetime
-                    value = value.strftime('%d/%m/%Y %H:%M') if hasattr(value, 'hour') else value.strftime('%d/%m/%Y')
-                elif hasattr(value, '__call__'):  # Métodos
-                    value = value()
-                row.append(str(value))
-            writer.writerow(row)
-        
-        return response
+        def rows():
+            values = queryset.values_list(*fields).iterator(chunk_size=chunk_size or DataExporter.STREAM_CHUNK_SIZE)
+            for record in values:
+                row = []
+                for value in record:
+                    if value is None:
+                        value = ''
+                    elif hasattr(value, 'strftime'):  # Data/datetime
+                        value = value.strftime('%d/%m/%Y %H:%M') if hasattr(value, 'hour') else value.strftime('%d/%m/%Y')
+                    row.append(str(value))
+                yield row
+        
+        return DataExporter.stream_csv(headers, rows(), filename, on_complete=on_complete)
 
 
 class DataImporter:
@@ -289,18 +514,17 @@ class DataImporter:
     """
     
     @staticmethod
-    def import_from_excel(file_path, sheet_name=None):
+    def import_from_excel_batches(file_path, sheet_name=None, batch_size=1000):
         """
-        Importa dados de arquivo Excel
+        Lê o arquivo Excel (ou CSV) em blocos de DataFrames, sem carregá-lo inteiro
+
+        Retorna (iterador de DataFrames, None) ou (None, mensagem de erro). O
+        índice de cada bloco é a posição da linha após o cabeçalho.
         """
+        from quality_control.import_reader import iter_batches
+
         try:
-            # Ler arquivo Excel
-            if sheet_name:
-                df = pd.read_excel(file_path, sheet_name=sheet_name)
-            else:
-                df = pd.read_excel(file_path)
-            
-            return df, None
+            return iter_batches(file_path, sheet_name=sheet_name, batch_size=batch_size), None
         except Exception as e:
             return None, str(e)
     
@@ -433,7 +657,13 @@ class AuditLogger:
         """
         Registra ação do usuário
         """
-        from core.models import AuditLog
+        try:
+            from core.models import AuditLog
+        except ImportError:
+            # Sem o modelo de auditoria a ação vai para o log da aplicação, sem
+            # interromper a operação auditada
+            logger.info('%s %s %s %s %s', user, action, object_type, object_id, details or {})
+            return
         
         AuditLog.objects.create(
             user=user,
@@ -5,12 +5,14 @@ Módulo de análises estatísticas para controle de qualidade
 import numpy as np
 import pandas as pd
 from scipy import stats
-from django.db.models import Avg, StdDev, Count, Min, Max
+from django.db.models import Avg, StdDev, Count, Min, Max, Q
+from django.db.models.functions import TruncDay, TruncWeek, TruncMonth
 from django.utils import timezone
 from datetime import datetime, timedelta
 from typing import Dict, List, Tuple, Optional
 
 from .models import SpotAnalysis, CompositeSample, Specification, Property
+from .rollups import rollup_totals
 
 
 class QualityAnalytics:
@@ -308,6 +310,73 @@ class DashboardMetrics:
     Classe para métricas do dashboard
     """
     
+    TREND_BUCKETS = {
+        'day': TruncDay,
+        'week': TruncWeek,
+        'month': TruncMonth,
+    }
+    
+    @staticmethod
+    def _bucket_start(date: datetime.date, bucket: str) -> datetime.date:
+        """
+        Início do período (dia, semana ISO ou mês) que contém a data
+        """
+        if bucket == 'week':
+            return date - timedelta(days=date.weekday())
+        if bucket == 'month':
+            return date.replace(day=1)
+        return date
+    
+    @staticmethod
+    def _next_bucket(date: datetime.date, bucket: str) -> datetime.date:
+        if bucket == 'week':
+            return date + timedelta(weeks=1)
+        if bucket == 'month':
+            return (date.replace(day=28) + timedelta(days=4)).replace(day=1)
+        return date + timedelta(days=1)
+    
+    @classmethod
+    def get_status_trend(cls, start_date: datetime.date, end_date: datetime.date,
+                         bucket: str = 'day') -> List[Dict]:
+        """
+        Obtém a contagem de análises pontuais por status agrupada por período
+        
+        Usa uma única consulta GROUP BY, independentemente do tamanho da janela.
+        Períodos sem análises são incluídos com contagens zeradas.
+        """
+        if bucket not in cls.TREND_BUCKETS:
+            raise ValueError(f"Período inválido: {bucket}")
+        
+        rows = (
+            SpotAnalysis.objects
+            .filter(spot_sample__date__range=[start_date, end_date])
+            .annotate(period=cls.TREND_BUCKETS[bucket]('spot_sample__date'))
+            .values('period')
+            .annotate(
+                total=Count('id'),
+                approved=Count('id', filter=Q(status='APPROVED')),
+                alert=Count('id', filter=Q(status='ALERT')),
+                rejected=Count('id', filter=Q(status='REJECTED')),
+            )
+            .order_by('period')
+        )
+        counts = {row['period']: row for row in rows}
+        
+        trend = []
+        period = cls._bucket_start(start_date, bucket)
+        while period <= end_date:
+            row = counts.get(period, {})
+            trend.append({
+                'period': period,
+                'total': row.get('total', 0),
+                'approved': row.get('approved', 0),
+                'alert': row.get('alert', 0),
+                'rejected': row.get('rejected', 0),
+            })
+            period = cls._next_bucket(period, bucket)
+        
+        return trend
+    
     @staticmethod
     def get_daily_summary(date: datetime.date = None) -> Dict:
         """
@@ -316,21 +385,20 @@ class DashboardMetrics:
         if date is None:
             date = timezone.now().date()
         
-        spot_analyses = SpotAnalysis.objects.filter(date=date)
-        composite_samples = CompositeSample.objects.filter(date=date)
+        totals = rollup_totals(date=date)
         
         return {
             'date': date,
             'spot_analyses': {
-                'total': spot_analyses.count(),
-                'approved': spot_analyses.filter(status='APPROVED').count(),
+                'total': totals['spot_analyses_total'],
+                'approved': totals['spot_analyses_approved'],
                 'alert': 0,
-                'rejected': spot_analyses.filter(status='REJECTED').count()
+                'rejected': totals['spot_analyses_rejected']
             },
             'composite_samples': {
-                'total': composite_samples.count(),
-                'approved': composite_samples.filter(status='APPROVED').count(),
-                'rejected': composite_samples.filter(status='REJECTED').count()
+                'total': totals['composite_samples_total'],
+                'approved': totals['composite_samples_approved'],
+                'rejected': totals['composite_samples_rejected']
             }
         }
     
@@ -0,0 +1,163 @@
+"""
+Cache de respostas das APIs de dashboard
+
+As respostas são guardadas no cache do Django com chave formada pelo nome da
+API, pelos parâmetros da requisição, pela data atual e por um contador de
+versão dos dados. Os sinais post_save/post_delete dos modelos de qualidade
+incrementam esse contador após o commit, de modo que qualquer gravação
+invalida todas as respostas de uma vez e as consultas repetidas entre
+gravações não acessam o banco. Contadores de acertos e falhas permitem
+acompanhar a taxa de acerto.
+
+O contador de versão fica no banco (uma linha de SequenceCounter), e não no
+cache, porque o cache padrão é local a cada processo: as gravações feitas
+pelos workers de importação e de laudos precisam invalidar as respostas
+guardadas pelos processos web. Cada processo relê o contador no máximo a cada
+DASHBOARD_DATA_VERSION_TTL segundos; as gravações do próprio processo passam a
+valer imediatamente.
+"""
+
+import hashlib
+import threading
+import time
+from functools import wraps
+
+from django.conf import settings
+from django.core.cache import cache
+from django.http import HttpResponse
+from django.utils import timezone
+
+from .models import SequenceCounter
+from .sequences import next_value
+
+
+CACHE_PREFIX = 'qc_api_cache'
+DATA_VERSION_KEY = f'{CACHE_PREFIX}:data_version'
+DEFAULT_TIMEOUT = 300
+DEFAULT_VERSION_TTL = 2
+
+# APIs registradas com cached_api_response, para o relatório de acertos
+CACHED_APIS = []
+
+
+_version_lock = threading.Lock()
+# Última versão lida (ou gravada) por este processo e o instante da leitura
+_version = {'value': None, 'read_at': 0.0}
+
+
+def _remember_version(value):
+    with _version_lock:
+        _version['value'] = value
+        _version['read_at'] = time.monotonic()
+    return value
+
+
+def get_data_version():
+    """
+    Versão atual dos dados
+
+    Relida do banco quando a leitura anterior tem mais de DASHBOARD_DATA_VERSION_TTL
+    segundos.
+    """
+    ttl = getattr(settings, 'DASHBOARD_DATA_VERSION_TTL', DEFAULT_VERSION_TTL)
+    with _version_lock:
+        if _version['value'] is not None and time.monotonic() - _version['read_at'] < ttl:
+            return _version['value']
+
+    version = SequenceCounter.objects.filter(key=DATA_VERSION_KEY).values_list('value', flat=True).first()
+    return _remember_version(version or 0)
+
+
+def bump_data_version():
+    """
+    Invalida todas as respostas em cache, em todos os processos
+
+    Chamar após o commit (transaction.on_commit), para que uma requisição
+    concorrente não guarde dados antigos com a versão nova. O contador é criado
+    a partir do relógio para nunca reaproveitar uma versão antiga.
+    """
+    return _remember_version(next_value(DATA_VERSION_KEY, seed=lambda: int(time.time() * 1000)))
+
+
+def _counter_key(name, outcome):
+    return f'{CACHE_PREFIX}:{outcome}:{name}'
+
+
+def _count(name, outcome):
+    key = _counter_key(name, outcome)
+    if not cache.add(key, 1, timeout=None):
+        try:
+            cache.incr(key)
+        except ValueError:
+            cache.set(key, 1, timeout=None)
+
+
+def get_cache_stats():
+    """
+    Acertos e falhas por API e no total
+    """
+    keys = [_counter_key(name, outcome) for name in CACHED_APIS for outcome in ('hits', 'misses')]
+    values = cache.get_many(keys)
+
+    stats = {'apis': {}, 'hits': 0, 'misses': 0}
+    for name in CACHED_APIS:
+        hits = values.get(_counter_key(name, 'hits'), 0)
+        misses = values.get(_counter_key(name, 'misses'), 0)
+        stats['apis'][name] = {'hits': hits, 'misses': misses}
+        stats['hits'] += hits
+        stats['misses'] += misses
+
+    requests = stats['hits'] + stats['misses']
+    stats['hit_rate'] = round(stats['hits'] / requests * 100, 1) if requests else 0
+    return stats
+
+
+def reset_cache_stats():
+    cache.delete_many([
+        _counter_key(name, outcome) for name in CACHED_APIS for outcome in ('hits', 'misses')
+    ])
+
+
+def _response_key(name, request):
+    params = sorted(request.GET.lists())
+    digest = hashlib.md5(repr(params).encode('utf-8')).hexdigest()
+    return f'{CACHE_PREFIX}:{name}:{get_data_version()}:{timezone.now().date().isoformat()}:{digest}'
+
+
+def cached_api_response(name, timeout=None):
+    """
+    Decorador que serve a resposta JSON do cache enquanto os dados não mudarem
+
+    Apenas respostas 200 são guardadas. Em views baseadas em classe, usar com
+    method_decorator no método get.
+    """
+    if timeout is None:
+        timeout = getattr(settings, 'DASHBOARD_API_CACHE_TIMEOUT', DEFAULT_TIMEOUT)
+
+    def decorator(view_func):
+        CACHED_APIS.append(name)
+
+        @wraps(view_func)
+        def wrapper(request, *args, **kwargs):
+            if request.method != 'GET':
+                return view_func(request, *args, **kwargs)
+
+            key = _response_key(name, request)
+            cached = cache.get(key)
+            if cached is not None:
+                _count(name, 'hits')
+                content, content_type = cached
+                response = HttpResponse(content, content_type=content_type)
+                response['X-Cache'] = 'HIT'
+                return response
+
+            _count(name, 'misses')
+            response = view_func(request, *args, **kwargs)
+            if response.status_code == 200 and not response.streaming:
+                cache.set(key, (response.content, response['Content-Type']), timeout)
+            response['X-Cache'] = 'MISS'
+            return response
+
+        return wrapper
+
+    return decorator
@@ -0,0 +1,297 @@
+"""
+Benchmarks dos principais caminhos do sistema
+
+Mede dashboards, APIs, importação, exportação e geração de PDF sobre a massa
+de dados do banco atual (normalmente criada por generate_synthetic_data). Cada
+cenário é executado uma vez para aquecimento e depois repeat vezes; o
+resultado registra os tempos (mediana, mínimo e máximo em ms), o número de
+consultas SQL da última execução e, se o cenário falhar, o erro, para que a
+falha também apareça na comparação entre versões.
+
+Os cenários que alteram o banco (importação) rodam dentro de uma transação
+desfeita ao final, então a massa de dados é a mesma em todas as repetições.
+"""
+
+import io
+import platform
+import statistics
+import subprocess
+import time
+from contextlib import redirect_stdout
+from datetime import timedelta
+from typing import Callable, NamedTuple
+
+import django
+from django.conf import settings
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+from django.db import connection, transaction
+from django.db.models import Max
+from django.test import Client, RequestFactory
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from core.models import Shift
+from .models import SpotSample, SpotAnalysis, CompositeSample, CompositeSampleResult, QualityReport
+from .synthetic_data import build_import_workbook, get_benchmark_user
+
+
+GROUPS = ['dashboards', 'apis', 'importacao', 'exportacao', 'pdf']
+
+DEFAULT_REPEAT = 5
+DEFAULT_IMPORT_ROWS = 500
+
+
+class Scenario(NamedTuple):
+    """Cenário medido; com cold=True o cache é limpo antes de cada execução"""
+    group: str
+    name: str
+    run: Callable
+    cold: bool = True
+
+
+class BenchmarkContext:
+    """Objetos compartilhados pelos cenários (usuário, cliente HTTP e dia de referência)"""
+
+    def __init__(self, import_rows=DEFAULT_IMPORT_ROWS):
+        self.user = get_benchmark_user()
+        self.client = Client()
+        self.client.force_login(self.user)
+        self.factory = RequestFactory()
+        self.import_rows = import_rows
+        self._import_content = None
+
+        # Como em produção, as janelas "recentes" terminam no dia mais recente com dados
+        self.day = SpotSample.objects.aggregate(last=Max('date'))['last'] or timezone.localdate()
+        self.shift = Shift.objects.order_by('name').first()
+
+    def get(self, path, **params):
+        response = self.client.get(path, params)
+        if response.status_code >= 400:
+            raise RuntimeError(f'HTTP {response.status_code} em {path}')
+        return response
+
+    def call_view(self, view, **params):
+        request = self.factory.get('/', params)
+        request.user = self.user
+        response = view(request)
+        if response.status_code >= 400:
+            raise RuntimeError(f'HTTP {response.status_code}')
+        return response
+
+    @property
+    def import_content(self):
+        """Planilha do cenário de importação, montada uma vez fora da medição"""
+        if self._import_content is None:
+            self._import_content = build_import_workbook(self.import_rows, date=self.day)
+        return self._import_content
+
+    def recent_analyses(self, days=30):
+        return SpotAnalysis.objects.filter(
+            spot_sample__date__gt=self.day - timedelta(days=days), spot_sample__date__lte=self.day
+        )
+
+
+def _shift_dashboard(ctx):
+    from .dashboard_data import build_shift_dashboard
+    return build_shift_dashboard(ctx.day, ctx.shift)
+
+
+def _rollup_totals(ctx):
+    from .rollups import rollup_totals
+    return rollup_totals(date__gt=ctx.day - timedelta(days=30), date__lte=ctx.day)
+
+
+def _dashboard_trend(ctx):
+    from .dashboard_views import DashboardDataAPIView
+    return ctx.call_view(DashboardDataAPIView.as_view(), type='trends', bucket='month',
+                         start=(ctx.day - timedelta(days=364)).isoformat(), end=ctx.day.isoformat())
+
+
+def _system_stats(ctx):
+    from core.auxiliary_views import SystemStatsAPIView
+    return ctx.call_view(SystemStatsAPIView.as_view())
+
+
+def _import_workbook(ctx):
+    from .models_import import ImportTemplate, ImportSession
+    from .import_engine import process_import_file
+
+    content = ctx.import_content
+    with transaction.atomic():
+        template, _ = ImportTemplate.objects.get_or_create(
+            name='Benchmark', defaults={'template_type': 'BOTH', 'created_by': ctx.user}
+        )
+        session = ImportSession(template=template, user=ctx.user, original_filename='benchmark.xlsx')
+        session.excel_file.save('benchmark.xlsx', ContentFile(content), save=False)
+        try:
+            session.save()
+            process_import_file(session)
+            session.refresh_from_db()
+            if session.status == 'FAILED':
+                raise RuntimeError(f'Importação falhou: {session.error_log}')
+            if session.failed_rows:
+                raise RuntimeError(f'{session.failed_rows} de {session.total_rows} linhas rejeitadas')
+        finally:
+            session.excel_file.delete(save=False)
+            transaction.set_rollback(True)
+
+
+def _export_excel(ctx):
+    from core.utils import DataExporter
+    return DataExporter.export_spot_analyses_to_excel(
+        ctx.recent_analyses(7).select_related('spot_sample', 'property')
+    )
+
+
+def _consume(response):
+    """Percorre a resposta (em fluxo ou não) como o cliente faria"""
+    if response.streaming:
+        return sum(len(part) for part in response.streaming_content)
+    return len(response.content)
+
+
+def _export_csv(ctx):
+    from core.utils import DataExporter
+    return _consume(DataExporter.export_to_csv(
+        ctx.recent_analyses(7), ['id', 'property__identifier', 'value', 'unit', 'status']
+    ))
+
+
+def _export_spot_csv(ctx):
+    from core.utils import DataExporter
+    return _consume(DataExporter.export_spot_analyses_to_csv(ctx.recent_analyses(7)))
+
+
+def _report_pdf(ctx, shared=True):
+    """
+    PDF do laudo mais recente pelo gerador, sem o cache em disco
+
+    Com shared=False o registro de pdf_assets é esvaziado antes do laudo, então
+    estilos e logotipo são montados de novo, como antes do registro.
+    """
+    from . import pdf_assets
+    from .pdf_generator import PDFReportGenerator
+    report = QualityReport.objects.select_related(
+        'product', 'plant', 'created_by', 'approved_by'
+    ).order_by('-date', '-id').first()
+    if report is None:
+        raise RuntimeError('Nenhum laudo na massa de dados')
+    if not shared:
+        pdf_assets.clear()
+    return PDFReportGenerator(report).generate_pdf().getvalue()
+
+
+def get_scenarios():
+    return [
+        Scenario('dashboards', 'dashboard_turno', _shift_dashboard),
+        Scenario('dashboards', 'dashboard_pontual', lambda ctx: ctx.get('/qc/dashboard/spot/')),
+        Scenario('dashboards', 'dashboard_pontual_por_planta', lambda ctx: ctx.get('/qc/dashboard/spot/by-plant/')),
+        Scenario('dashboards', 'dashboard_pontual_por_linha', lambda ctx: ctx.get('/qc/dashboard/spot/by-line/')),
+        Scenario('dashboards', 'consolidado_30_dias', _rollup_totals),
+        Scenario('apis', 'api_dashboard_data', lambda ctx: ctx.get('/qc/api/dashboard-data/')),
+        Scenario('apis', 'api_dashboard_data_em_cache', lambda ctx: ctx.get('/qc/api/dashboard-data/'), cold=False),
+        Scenario('apis', 'api_tendencia_mensal', _dashboard_trend),
+        Scenario('apis', 'api_estatisticas_sistema', _system_stats),
+        Scenario('importacao', 'importacao_planilha', _import_workbook),
+        Scenario('exportacao', 'exportacao_excel_7_dias', _export_excel),
+        Scenario('exportacao', 'exportacao_csv_7_dias', _export_csv),
+        Scenario('exportacao', 'exportacao_csv_pontuais_7_dias', _export_spot_csv),
+        Scenario('pdf', 'pdf_laudo', _report_pdf),
+        Scenario('pdf', 'pdf_laudo_estilos_por_laudo', lambda ctx: _report_pdf(ctx, shared=False)),
+    ]
+
+
+def measure(scenario, ctx, repeat):
+    """Executa o cenário e retorna o dicionário de resultado"""
+    result = {'group': scenario.group}
+    timings = []
+    try:
+        for attempt in range(repeat + 1):
+            if scenario.cold:
+                cache.clear()
+            # Algumas views imprimem mensagens de depuração; ficam fora da saída do benchmark
+            with CaptureQueriesContext(connection) as queries, redirect_stdout(io.StringIO()):
+                started = time.perf_counter()
+                scenario.run(ctx)
+                elapsed = (time.perf_counter() - started) * 1000
+            # A primeira execução é aquecimento
+            if attempt:
+                timings.append(elapsed)
+    except Exception as e:
+        result.update(status='error', error=f'{type(e).__name__}: {e}')
+        return result
+
+    result.update(
+        status='ok',
+        median_ms=round(statistics.median(timings), 3),
+        min_ms=round(min(timings), 3),
+        max_ms=round(max(timings), 3),
+        queries=len(queries),
+    )
+    return result
+
+
+def _git_revision():
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], cwd=settings.BASE_DIR,
+            capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def dataset_summary():
+    return {
+        'spot_samples': SpotSample.objects.count(),
+        'spot_analyses': SpotAnalysis.objects.count(),
+        'composite_samples': CompositeSample.objects.count(),
+        'composite_results': CompositeSampleResult.objects.count(),
+        'quality_reports': QualityReport.objects.count(),
+    }
+
+
+def run_benchmarks(repeat=DEFAULT_REPEAT, groups=None, import_rows=DEFAULT_IMPORT_ROWS, progress=None):
+    """
+    Executa os cenários dos grupos informados (padrão: todos)
+
+    progress, se informado, é chamado com (nome, resultado) após cada cenário.
+    Retorna o dicionário gravado no arquivo JSON de resultados.
+    """
+    ctx = BenchmarkContext(import_rows=import_rows)
+    results = {}
+    for scenario in get_scenarios():
+        if groups and scenario.group not in groups:
+            continue
+        results[scenario.name] = measure(scenario, ctx, repeat)
+        if progress:
+            progress(scenario.name, results[scenario.name])
+
+    return {
+        'executed_at': timezone.now().isoformat(),
+        'revision': _git_revision(),
+        'python': platform.python_version(),
+        'django': django.get_version(),
+        'database': connection.vendor,
+        'repeat': repeat,
+        'reference_date': ctx.day.isoformat(),
+        'dataset': dataset_summary(),
+        'results': results,
+    }
+
+
+def compare_results(previous, current):
+    """
+    Compara dois arquivos de resultados
+
+    Retorna [(cenário, mediana anterior, mediana atual, razão atual/anterior)];
+    medianas ausentes (cenário novo ou com erro) ficam como None.
+    """
+    rows = []
+    for name, result in current['results'].items():
+        before = previous.get('results', {}).get(name, {}).get('median_ms')
+        after = result.get('median_ms')
+        ratio = round(after / before, 3) if before and after is not None else None
+        rows.append((name, before, after, ratio))
+    return rows
@@ -0,0 +1,115 @@
+"""
+Montagem dos dados do dashboard de amostras pontuais do turno
+
+Carrega amostras e análises do turno em um número fixo de consultas
+(select_related + prefetch_related) e agrupa tudo em memória, evitando
+uma consulta por amostra à medida que a planta cresce.
+"""
+
+from django.db.models import Prefetch
+
+from .models import SpotSample, SpotAnalysis
+
+
+def get_shift_samples(date, shift):
+    """
+    Retorna as amostras do turno com linha, planta, produto e análises pré-carregados
+    """
+    analyses = SpotAnalysis.objects.select_related('property').order_by('property__display_order')
+
+    return SpotSample.objects.filter(
+        date=date,
+        shift=shift
+    ).select_related(
+        'product', 'production_line', 'production_line__plant', 'shift'
+    ).prefetch_related(
+        Prefetch('spotanalysis_set', queryset=analyses, to_attr='prefetched_analyses')
+    ).order_by('production_line', 'product', '-sample_sequence')
+
+
+def calculate_sample_status(analyses):
+    """
+    Calcula o status geral de uma amostra a partir das análises já carregadas
+    """
+    if not analyses:
+        return 'PENDENTE'
+
+    statuses = {analysis.status for analysis in analyses}
+
+    if 'REJECTED' in statuses:
+        return 'REJECTED'
+    if 'ALERT' in statuses:
+        return 'ALERT'
+    return 'APPROVED'
+
+
+def build_shift_dashboard(date, shift):
+    """
+    Monta a grade linha → produto → propriedade do dashboard do turno
+
+    Retorna uma tupla (lines_data, stats) com a mesma estrutura usada pelo
+    template spot_dashboard_by_line.html. Executa sempre duas consultas,
+    independente da quantidade de linhas, produtos ou amostras.
+    """
+    samples = list(get_shift_samples(date, shift))
+
+    lines_data = {}
+    approved_samples = 0
+    rejected_samples = 0
+
+    for sample in samples:
+        line = sample.production_line
+        plant = line.plant
+        analyses = sample.prefetched_analyses
+
+        # Criar chave única para a linha
+        line_key = f"{line.id}_{plant.id}"
+
+        if line_key not in lines_data:
+            lines_data[line_key] = {
+                'line': line,
+                'plant': plant,
+                'products': {}
+            }
+
+        # Organizar análises por propriedade
+        property_analyses = {}
+        for analysis in analyses:
+            property_analyses[analysis.property_id] = analysis
+
+        sample_status = calculate_sample_status(analyses)
+
+        # A última amostra percorrida de cada produto é a exibida na grade
+        lines_data[line_key]['products'][sample.product_id] = {
+            'product': sample.product,
+            'sample': sample,
+            'analyses': analyses,
+            'property_analyses': property_analyses,
+            'status': sample_status,
+            'sequence': sample.sample_sequence,
+            'observations': sample.observations,
+            'sample_time': sample.sample_time
+        }
+
+        # Estatísticas: amostras sem análises não entram na contagem
+        if analyses:
+            if sample_status == 'REJECTED':
+                rejected_samples += 1
+            else:
+                approved_samples += 1
+
+    # Converter para lista
+    lines_list = []
+    for line_data in lines_data.values():
+        line_data['products'] = list(line_data['products'].values())
+        lines_list.append(line_data)
+
+    total_samples = len(samples)
+    stats = {
+        'total_samples': total_samples,
+        'approved_samples': approved_samples,
+        'rejected_samples': rejected_samples,
+        'approval_rate': (approved_samples / total_samples * 100) if total_samples > 0 else 0
+    }
+
+    return lines_list, stats
@@ -8,6 +8,7 @@ from django.contrib.auth.mixins import LoginRequiredMixin
 from django.views.generic import TemplateView
 from django.http import JsonResponse
 from django.utils import timezone
+from django.utils.decorators import method_decorator
 from django.db.models import Count, Avg, Q
 from datetime import datetime, timedelta
 
@@ -17,6 +18,7 @@ from .models import (
     Specification, ProductPropertyMap
 )
 from .analytics import QualityAnalytics, DashboardMetrics
+from .api_cache import cached_api_response
 
 
 class DashboardView(LoginRequiredMixin, TemplateView):
@@ -143,6 +145,7 @@ class DashboardDataAPIView(LoginRequiredMixin, TemplateView):
     API para dados do dashboard
     """
     
+    @method_decorator(cached_api_response('dashboard_data'))
     def get(self, request, *args, **kwargs):
         data_type = request.GET.get('type', 'summary')
         
@@ -155,70 +158,88 @@ class DashboardDataAPIView(LoginRequiredMixin, TemplateView):
         
         return JsonResponse({'error': 'Tipo de dados inválido'}, status=400)
     
+    TREND_LABELS = {
+        'day': '%d/%m',
+        'week': '%d/%m',
+        'month': '%m/%Y',
+    }
+    
     def _get_summary_data(self):
         """Dados de resumo para o dashboard"""
         today = timezone.now().date()
         last_30_days = today - timedelta(days=30)
+        recent_analyses = SpotAnalysis.objects.filter(spot_sample__date__gte=last_30_days)
         
         # Análises por status nos últimos 30 dias
         status_data = (
-            SpotAnalysis.objects.filter(date__gte=last_30_days)
+            recent_analyses
             .values('status')
             .annotate(count=Count('id'))
         )
         
         # Análises por linha de produção
         line_data = (
-            SpotAnalysis.objects.filter(date__gte=last_30_days)
-            .values('production_line__name')
+            recent_analyses
+            .values('spot_sample__production_line__name')
             .annotate(count=Count('id'))
             .order_by('-count')
         )
         
         # Tendência diária (últimos 7 dias)
-        daily_trend = []
-        for i in range(7):
-            date = today - timedelta(days=i)
-            count = SpotAnalysis.objects.filter(date=date).count()
-            daily_trend.append({
-                'date': date.strftime('%d/%m'),
-                'count': count
-            })
-        
-        daily_trend.reverse()
+        daily_trend = [
+            {'date': item['period'].strftime('%d/%m'), 'count': item['total']}
+            for item in DashboardMetrics.get_status_trend(today - timedelta(days=6), today)
+        ]
         
         return JsonResponse({
             'status_distribution': list(status_data),
-            'line_distribution': list(line_data),
+            'line_distribution': [
+                {'production_line__name': item['spot_sample__production_line__name'], 'count': item['count']}
+                for item in line_data
+            ],
             'daily_trend': daily_trend
         })
     
+    def _get_trend_window(self):
+        """
+        Janela da tendência: start/end (AAAA-MM-DD) ou os últimos N dias
+        """
+        end = self.request.GET.get('end')
+        start = self.request.GET.get('start')
+        
+        end_date = datetime.strptime(end, '%Y-%m-%d').date() if end else timezone.now().date()
+        if start:
+            start_date = datetime.strptime(start, '%Y-%m-%d').date()
+        else:
+            start_date = end_date - timedelta(days=int(self.request.GET.get('days', 30)))
+        
+        if start_date > end_date:
+            raise ValueError('Data inicial posterior à data final')
+        
+        return start_date, end_date
+    
     def _get_trends_data(self):
         """Dados de tendências"""
-        days = int(self.request.GET.get('days', 30))
-        end_date = timezone.now().date()
-        start_date = end_date - timedelta(days=days)
+        bucket = self.request.GET.get('bucket', 'day')
+        if bucket not in self.TREND_LABELS:
+            return JsonResponse({'error': 'bucket deve ser day, week ou month'}, status=400)
+        
+        try:
+            start_date, end_date = self._get_trend_window()
+        except ValueError as e:
+            return JsonResponse({'error': f'Período inválido: {e}'}, status=400)
         
-        # Tendência de aprovação por dia
+        # Tendência de aprovação por período
         approval_trend = []
-        current_date = start_date
-        
-        while current_date <= end_date:
-            total = SpotAnalysis.objects.filter(date=current_date).count()
-            approved = SpotAnalysis.objects.filter(
-                date=current_date, 
-                status='APPROVED'
-            ).count()
-            
-            approval_rate = (approved / total * 100) if total > 0 else 0
+        for item in DashboardMetrics.get_status_trend(start_date, end_date, bucket):
+            total = item['total']
+            approval_rate = (item['approved'] / total * 100) if total > 0 else 0
             
             approval_trend.append({
-                'date': current_date.strftime('%d/%m'),
+                'date': item['period'].strftime(self.TREND_LABELS[bucket]),
                 'approval_rate': round(approval_rate, 1),
                 'total': total
             })
-            
-            current_date += timedelta(days=1)
         
         return JsonResponse({
             'approval_trend': approval_trend
@@ -0,0 +1,710 @@
+"""
+Motor de importação em massa das planilhas de análises
+
+Substitui o processamento linha a linha (df.iterrows com um .get() por chave
+estrangeira e um create() por linha):
+
+- os cadastros de referência (produtos, linhas, turnos, tipos de análise e
+  propriedades) são carregados uma única vez em dicionários;
+- a validação é feita por coluna sobre o DataFrame inteiro (datas, horários,
+  chaves estrangeiras, sequências e valores numéricos);
+- os status das análises são avaliados vetorialmente com o índice de
+  especificações;
+- as linhas válidas são gravadas com bulk_create em blocos, cada bloco em sua
+  própria transação, e os erros são gravados em ImportError com bulk_create.
+
+Como bulk_create não dispara sinais, o consolidado por turno das chaves
+importadas é recalculado e o cache das APIs invalidado ao final.
+
+Formato das abas (ver create_import_template.py):
+
+- Analises_Pontuais: Data, Hora_Amostra, Tipo_Analise, Produto_Codigo,
+  Linha_Producao, Turno e, opcionalmente, Sequencia, Metodo_Teste e
+  Observacoes. Cada linha é uma amostra pontual.
+- Amostras_Compostas: Data_Coleta, Hora_Inicio, Hora_Fim, Tipo_Analise,
+  Produto_Codigo, Linha_Producao, Turno e, opcionalmente, Sequencia,
+  Metodo_Teste e Observacoes. Cada linha é uma amostra composta.
+
+As demais colunas são propriedades: o cabeçalho é o identificador da
+propriedade ou uma coluna mapeada para ele em ImportTemplate.field_mapping.
+Colunas não reconhecidas são ignoradas.
+
+No modo UPSERT da sessão as linhas são casadas com as amostras já gravadas
+pela chave natural (data, turno, linha, produto, sequência) e as análises pela
+propriedade: valores alterados são atualizados com bulk_update, valores
+iguais são mantidos e o que não existe é incluído. A busca das amostras e
+análises existentes é feita por bloco, com uma consulta para cada. Reimportar
+a mesma planilha não grava nada; linhas sem sequência são sempre amostras
+novas.
+
+O arquivo é lido em blocos (ver import_reader): cada bloco é validado e
+gravado antes da leitura do próximo. Um arquivo .csv tem uma única tabela,
+importada como amostras compostas se tiver a coluna Data_Coleta e como
+análises pontuais caso contrário.
+"""
+
+from collections import Counter, defaultdict
+from datetime import datetime
+from decimal import Decimal
+from typing import NamedTuple
+
+import pandas as pd
+from django.db import transaction
+from django.db.models import Max
+from django.utils import timezone
+
+from .api_cache import bump_data_version
+from .import_reader import SpreadsheetReader
+from .models import (
+    AnalysisType, Product, Property, SpotSample, SpotAnalysis, CompositeSample, CompositeSampleResult,
+    count_statuses
+)
+from .models_import import ImportError
+from .rollups import refresh_rollups
+from .sequences import advance_to, next_value
+from .specifications import invalidate_specification_index
+from .status_recalc import evaluate_statuses
+from core.models import ProductionLine, Shift
+
+
+DEFAULT_CHUNK_SIZE = 1000
+
+SPOT_REQUIRED = ['Data', 'Hora_Amostra', 'Tipo_Analise', 'Produto_Codigo', 'Linha_Producao', 'Turno']
+COMPOSITE_REQUIRED = [
+    'Data_Coleta', 'Hora_Inicio', 'Hora_Fim', 'Tipo_Analise', 'Produto_Codigo', 'Linha_Producao', 'Turno'
+]
+
+SPOT_SHEET = 'Analises_Pontuais'
+COMPOSITE_SHEET = 'Amostras_Compostas'
+
+# Linha do cabeçalho na planilha; a primeira linha de dados é a 2
+HEADER_ROW = 1
+
+# Chave natural de uma amostra nas linhas validadas
+KEY_COLUMNS = ['date', 'shift_id', 'line_id', 'product_id', 'sequence']
+
+# Contadores gravados em success_log ao final da importação
+STATS_LABELS = [
+    ('samples_created', 'Amostras incluídas'),
+    ('samples_updated', 'Amostras atualizadas'),
+    ('results_created', 'Análises incluídas'),
+    ('results_updated', 'Análises atualizadas'),
+    ('results_unchanged', 'Análises sem alteração'),
+]
+
+
+class SampleKind(NamedTuple):
+    """Modelos e campos de um tipo de amostra usados na atualização das existentes"""
+    sample_model: type
+    result_model: type
+    sample_fk: str
+    sequence_field: str
+    time_field: str
+
+
+SPOT = SampleKind(SpotSample, SpotAnalysis, 'spot_sample_id', 'sample_sequence', 'sample_time')
+COMPOSITE = SampleKind(CompositeSample, CompositeSampleResult, 'composite_sample_id', 'sequence', 'collection_time')
+
+
+class ReferenceData:
+    """
+    Cadastros usados na importação, carregados uma vez por sessão
+
+    Nomes de linha de produção repetidos em plantas diferentes são ambíguos e
+    ficam fora do dicionário (a linha é reportada como erro).
+    """
+
+    def __init__(self, field_mapping=None):
+        self.products = dict(Product.objects.filter(is_active=True).values_list('code', 'id'))
+        self.shifts = dict(Shift.objects.values_list('name', 'id'))
+        self.analysis_types = dict(AnalysisType.objects.filter(is_active=True).values_list('code', 'id'))
+
+        lines = list(ProductionLine.objects.filter(is_active=True).values_list('name', 'id'))
+        names = Counter(name for name, _ in lines)
+        self.lines = {name: line_id for name, line_id in lines if names[name] == 1}
+        self.ambiguous_lines = {name for name, count in names.items() if count > 1}
+
+        self.properties = {
+            prop.identifier: prop for prop in Property.objects.filter(is_active=True)
+        }
+        self.field_mapping = field_mapping or {}
+
+    def property_columns(self, columns):
+        """{coluna: Property} das colunas da planilha que correspondem a propriedades"""
+        resolved = {}
+        for column in columns:
+            identifier = self.field_mapping.get(column, column)
+            if identifier in self.properties:
+                resolved[column] = self.properties[identifier]
+        return resolved
+
+
+def _clean(series):
+    """Texto sem espaços nas pontas; vazios viram NaN"""
+    text = series.map(lambda value: str(value).strip(), na_action='ignore')
+    return text.mask(text == '')
+
+
+def _text(df, column):
+    """Coluna opcional de texto, com '' nas células vazias"""
+    if column not in df:
+        return ''
+    return _clean(df[column]).fillna('')
+
+
+def _parse_dates(series):
+    return pd.to_datetime(series, errors='coerce').dt.date
+
+
+def _parse_times(series):
+    """Horários HH:MM (texto, time ou datetime vindos do Excel)"""
+    def to_text(value):
+        if hasattr(value, 'strftime'):
+            return value.strftime('%H:%M')
+        return str(value).strip()[:5]
+
+    parsed = pd.to_datetime(series.map(to_text, na_action='ignore'), format='%H:%M', errors='coerce')
+    return parsed.dt.time
+
+
+class SheetValidator:
+    """
+    Validação vetorizada de uma aba
+
+    Cada verificação recebe uma máscara booleana das linhas com problema; as
+    mensagens de erro só são formatadas para essas linhas.
+    """
+
+    def __init__(self, df):
+        self.df = df
+        self.invalid = pd.Series(False, index=df.index)
+        self.errors = []
+
+    def flag(self, mask, column, error_type, message):
+        mask = mask.fillna(False).astype(bool)
+        for index in mask.index[mask]:
+            value = self.df.at[index, column] if column in self.df else ''
+            self.errors.append((index, column, error_type, message.format(value=value)))
+        self.invalid |= mask
+
+    def required(self, columns):
+        """Retorna False (e registra erro de cabeçalho) se faltar alguma coluna obrigatória"""
+        missing = [column for column in columns if column not in self.df]
+        for column in missing:
+            self.errors.append((None, column, 'MISSING_COLUMN', f'Coluna obrigatória {column} ausente'))
+        if missing:
+            self.invalid[:] = True
+            return False
+
+        for column in columns:
+            self.flag(_clean(self.df[column]).isna(), column, 'REQUIRED_FIELD',
+                      f'Campo obrigatório {column} está vazio')
+        return True
+
+    def date(self, column):
+        parsed = _parse_dates(self.df[column])
+        self.flag(parsed.isna() & self.df[column].notna(), column, 'INVALID_DATE', 'Data inválida: {value}')
+        return parsed
+
+    def time(self, column):
+        parsed = _parse_times(self.df[column])
+        self.flag(parsed.isna() & self.df[column].notna(), column, 'INVALID_TIME', 'Horário inválido: {value}')
+        return parsed
+
+    def lookup(self, column, mapping, label, ambiguous=()):
+        values = _clean(self.df[column])
+        ids = values.map(mapping)
+        self.flag(values.isin(ambiguous), column, 'LOOKUP_ERROR', f'{label} {{value}} é ambíguo')
+        self.flag(ids.isna() & values.notna() & ~values.isin(ambiguous), column, 'LOOKUP_ERROR',
+                  f'{label} {{value}} não encontrado')
+        return ids
+
+    def sequence(self, column='Sequencia'):
+        """Sequência informada (inteiro positivo) ou NaN quando a coluna está vazia ou ausente"""
+        if column not in self.df:
+            return pd.Series(float('nan'), index=self.df.index)
+        numbers = pd.to_numeric(self.df[column], errors='coerce')
+        self.flag(self.df[column].notna() & ((numbers < 1) | (numbers % 1 != 0) | numbers.isna()),
+                  column, 'INVALID_SEQUENCE', 'Sequência inválida: {value}')
+        return numbers
+
+    def values(self, property_columns):
+        """DataFrame de valores numéricos das colunas de propriedade"""
+        values = pd.DataFrame(index=self.df.index)
+        for column in property_columns:
+            values[column] = pd.to_numeric(self.df[column], errors='coerce')
+            self.flag(values[column].isna() & _clean(self.df[column]).notna(), column, 'INVALID_VALUE',
+                      'Valor numérico inválido: {value}')
+        self.flag(values.notna().sum(axis=1) == 0, '', 'NO_VALUES', 'Nenhuma propriedade informada')
+        return values
+
+
+class ImportEngine:
+    """
+    Importa as abas de uma sessão de importação
+
+    Os contadores da sessão (processed_rows, successful_rows e failed_rows)
+    são atualizados a cada bloco gravado.
+    """
+
+    def __init__(self, session, chunk_size=DEFAULT_CHUNK_SIZE):
+        self.session = session
+        self.chunk_size = chunk_size
+        self.refs = ReferenceData(session.template.field_mapping if session.template_id else None)
+        self.rollup_keys = set()
+        self.sequence_keys = {}
+        # Erros de cabeçalho já gravados, para não repeti-los a cada bloco
+        self.header_errors = set()
+        self.upsert = session.import_mode == 'UPSERT'
+        self.stats = Counter()
+
+    def run(self, df_spot, df_composite):
+        """Importa as duas abas; retorna (linhas importadas, linhas com erro)"""
+        return self.run_batches([df_spot], [df_composite], total_rows=len(df_spot) + len(df_composite))
+
+    def run_batches(self, spot_batches, composite_batches, total_rows=0):
+        """
+        Importa as abas bloco a bloco; retorna (linhas importadas, linhas com erro)
+
+        total_rows é a estimativa usada no andamento enquanto o arquivo é lido;
+        ao final ele passa a ser o número de linhas efetivamente processadas.
+        """
+        self.session.total_rows = total_rows
+        self.session.processed_rows = self.session.successful_rows = self.session.failed_rows = 0
+        self.session.save(update_fields=['total_rows', 'processed_rows', 'successful_rows', 'failed_rows'])
+
+        # Sempre com as especificações atuais do banco (podem ter sido alteradas por outro processo)
+        invalidate_specification_index()
+
+        try:
+            for df in spot_batches:
+                self.import_spot(df)
+            for df in composite_batches:
+                self.import_composite(df)
+        finally:
+            # Os blocos já gravados continuam no banco mesmo se um bloco seguinte falhar
+            self.finish()
+
+        self.session.total_rows = self.session.processed_rows
+        self.session.success_log = '\n'.join(f'{label}: {self.stats[key]}' for key, label in STATS_LABELS)
+        self.session.save(update_fields=['total_rows', 'success_log'])
+        return self.session.successful_rows, self.session.failed_rows
+
+    def finish(self):
+        """Consolidado por turno, contadores de sequência e cache das APIs dos blocos gravados"""
+        refresh_rollups(self.rollup_keys)
+        for key, value in self.sequence_keys.items():
+            advance_to(key, value)
+        if self.rollup_keys:
+            transaction.on_commit(bump_data_version)
+
+    # Validação
+
+    def _validate_common(self, validator, required, date_column):
+        if not validator.required(required):
+            return None
+
+        df = validator.df
+        return pd.DataFrame({
+            'date': validator.date(date_column),
+            'product_id': validator.lookup('Produto_Codigo', self.refs.products, 'Produto'),
+            'line_id': validator.lookup('Linha_Producao', self.refs.lines, 'Linha de produção',
+                                        self.refs.ambiguous_lines),
+            'shift_id': validator.lookup('Turno', self.refs.shifts, 'Turno'),
+            'sequence': validator.sequence(),
+            'test_method': _text(df, 'Metodo_Teste'),
+            'observations': _text(df, 'Observacoes'),
+        }, index=df.index)
+
+    def _statuses(self, rows, values, property_columns):
+        """Status de cada valor informado: {(índice, coluna): status}"""
+        stacked = values.stack()
+        if stacked.empty:
+            return {}
+        indexes = stacked.index.get_level_values(0)
+        columns = stacked.index.get_level_values(1)
+        product_ids = rows.loc[indexes, 'product_id'].to_numpy()
+        property_ids = [property_columns[column].id for column in columns]
+        statuses = evaluate_statuses(stacked.to_numpy(), product_ids, property_ids)
+        return dict(zip(stacked.index, statuses))
+
+    # Amostras pontuais
+
+    def import_spot(self, df):
+        if df is None or df.empty:
+            return
+
+        validator = SheetValidator(df)
+        rows = self._validate_common(validator, SPOT_REQUIRED, 'Data')
+        if rows is not None:
+            rows['time'] = validator.time('Hora_Amostra')
+            rows['analysis_type_id'] = validator.lookup('Tipo_Analise', self.refs.analysis_types, 'Tipo de análise')
+            property_columns = self.refs.property_columns(df.columns)
+            values = validator.values(list(property_columns))
+            self._flag_duplicates(validator, rows)
+
+        self._write_errors(df, validator, SPOT_SHEET)
+        if rows is None:
+            self._advance(len(df), 0)
+            return
+
+        valid = rows[~validator.invalid].copy()
+        self._allocate_sequences(SPOT, valid)
+        statuses = self._statuses(valid, values.loc[valid.index], property_columns)
+        if self.upsert:
+            valid = self._update_existing(SPOT, valid, values, property_columns, statuses)
+
+        for start in range(0, len(valid), self.chunk_size):
+            chunk = valid.iloc[start:start + self.chunk_size]
+            with transaction.atomic():
+                samples, analyses = [], []
+                for index, row in zip(chunk.index, chunk.itertuples(index=False)):
+                    row_statuses = []
+                    for column, prop in property_columns.items():
+                        status = statuses.get((index, column))
+                        if status is not None:
+                            row_statuses.append(status)
+                            analyses.append((len(samples), SpotAnalysis(
+                                property_id=prop.id, value=_decimal(values.at[index, column]), unit=prop.unit,
+                                test_method=row.test_method or prop.test_method, status=status,
+                                created_by_id=self.session.user_id,
+                            )))
+                    samples.append(SpotSample(
+                        analysis_type_id=int(row.analysis_type_id), date=row.date, shift_id=int(row.shift_id),
+                        production_line_id=int(row.line_id), product_id=int(row.product_id),
+                        sample_sequence=int(row.sequence),
+                        sample_time=timezone.make_aware(datetime.combine(row.date, row.time)),
+                        operator_id=self.session.user_id, observations=row.observations,
+                        status=SpotSample.status_from_counts(count_statuses(row_statuses)),
+                    ))
+
+                samples = SpotSample.objects.bulk_create(samples, batch_size=self.chunk_size)
+                for position, analysis in analyses:
+                    analysis.spot_sample_id = samples[position].id
+                SpotAnalysis.objects.bulk_create([analysis for _, analysis in analyses], batch_size=self.chunk_size)
+
+            self.stats.update(samples_created=len(samples), results_created=len(analyses))
+            self._track(chunk)
+            self._advance(len(chunk), len(chunk))
+
+        self._advance(int(validator.invalid.sum()), 0)
+
+    def _allocate_sequences(self, kind, rows):
+        """
+        Preenche as sequências não informadas reservando um bloco no contador de
+        cada chave, e registra o maior número usado para avançar os contadores
+        """
+        key_columns = ['date', 'shift_id', 'line_id', 'product_id']
+        missing = rows['sequence'].isna()
+        for key, group in rows[missing].groupby(key_columns, sort=False):
+            sequence_key = kind.sample_model.sequence_key(*_key(key))
+            samples = kind.sample_model.objects.filter(
+                date=key[0], shift_id=key[1], production_line_id=key[2], product_id=key[3]
+            )
+            last = next_value(
+                sequence_key, count=len(group),
+                seed=lambda: samples.aggregate(last=Max(kind.sequence_field))['last'] or 0
+            )
+            rows.loc[group.index, 'sequence'] = list(range(last - len(group) + 1, last + 1))
+
+        for key, last in rows[~missing].groupby(key_columns, sort=False)['sequence'].max().items():
+            sequence_key = kind.sample_model.sequence_key(*_key(key))
+            self.sequence_keys[sequence_key] = max(self.sequence_keys.get(sequence_key, 0), int(last))
+
+    # Amostras compostas
+
+    def import_composite(self, df):
+        if df is None or df.empty:
+            return
+
+        validator = SheetValidator(df)
+        rows = self._validate_common(validator, COMPOSITE_REQUIRED, 'Data_Coleta')
+        if rows is not None:
+            rows['time'] = validator.time('Hora_Inicio')
+            validator.time('Hora_Fim')
+            property_columns = self.refs.property_columns(df.columns)
+            values = validator.values(list(property_columns))
+            self._flag_duplicates(validator, rows)
+
+        self._write_errors(df, validator, COMPOSITE_SHEET)
+        if rows is None:
+            self._advance(len(df), 0)
+            return
+
+        valid = rows[~validator.invalid].copy()
+        self._allocate_sequences(COMPOSITE, valid)
+        statuses = self._statuses(valid, values.loc[valid.index], property_columns)
+        if self.upsert:
+            valid = self._update_existing(COMPOSITE, valid, values, property_columns, statuses)
+
+        for start in range(0, len(valid), self.chunk_size):
+            chunk = valid.iloc[start:start + self.chunk_size]
+            with transaction.atomic():
+                samples, results = [], []
+                for index, row in zip(chunk.index, chunk.itertuples(index=False)):
+                    row_statuses = []
+                    for column, prop in property_columns.items():
+                        status = statuses.get((index, column))
+                        if status is not None:
+                            row_statuses.append(status)
+                            results.append((len(samples), CompositeSampleResult(
+                                property_id=prop.id, value=_decimal(values.at[index, column]), unit=prop.unit,
+                                test_method=row.test_method or prop.test_method, status=status,
+                                created_by_id=self.session.user_id,
+                            )))
+                    samples.append(CompositeSample(
+                        date=row.date, shift_id=int(row.shift_id), production_line_id=int(row.line_id),
+                        product_id=int(row.product_id),
+                        sequence=int(row.sequence),
+                        collection_time=timezone.make_aware(datetime.combine(row.date, row.time)),
+                        operator_id=self.session.user_id, created_by_id=self.session.user_id,
+                        observations=row.observations,
+                        status=CompositeSample.status_from_counts(count_statuses(row_statuses)),
+                    ))
+
+                samples = CompositeSample.objects.bulk_create(samples, batch_size=self.chunk_size)
+                for position, result in results:
+                    result.composite_sample_id = samples[position].id
+                CompositeSampleResult.objects.bulk_create([result for _, result in results],
+                                                          batch_size=self.chunk_size)
+
+            self.stats.update(samples_created=len(samples), results_created=len(results))
+            self._track(chunk)
+            self._advance(len(chunk), len(chunk))
+
+        self._advance(int(validator.invalid.sum()), 0)
+
+    # Atualização das amostras existentes (modo UPSERT)
+
+    def _flag_duplicates(self, validator, rows):
+        """No modo UPSERT, a mesma chave natural só pode aparecer uma vez no bloco"""
+        if not self.upsert:
+            return
+        keyed = rows[~validator.invalid & rows['sequence'].notna()]
+        duplicated = keyed.duplicated(subset=KEY_COLUMNS, keep='first').reindex(rows.index, fill_value=False)
+        validator.flag(duplicated, 'Sequencia', 'DUPLICATE_ROW',
+                       'Amostra repetida na planilha (mesma data, turno, linha, produto e sequência)')
+
+    def _update_existing(self, kind, rows, values, property_columns, statuses):
+        """
+        Atualiza as amostras já gravadas com a chave natural das linhas e
+        retorna as linhas sem correspondência, que seguem para a inclusão
+        """
+        existing = self._existing_samples(kind, rows)
+        matched = pd.Series(
+            [_sample_key(key) in existing for key in rows[KEY_COLUMNS].itertuples(index=False)],
+            index=rows.index, dtype=bool,
+        )
+
+        rows_matched = rows[matched]
+        for start in range(0, len(rows_matched), self.chunk_size):
+            chunk = rows_matched.iloc[start:start + self.chunk_size]
+            with transaction.atomic():
+                changed = self._update_chunk(kind, chunk, existing, values, property_columns, statuses)
+            self._track(chunk.loc[changed])
+            self._advance(len(chunk), len(chunk))
+
+        return rows[~matched]
+
+    def _existing_samples(self, kind, rows):
+        """{chave natural: amostra} das amostras gravadas com as chaves das linhas, em uma consulta"""
+        keyed = rows[rows['sequence'].notna()]
+        if keyed.empty:
+            return {}
+
+        queryset = kind.sample_model.objects.filter(**{
+            'date__in': set(keyed['date']),
+            'shift_id__in': set(keyed['shift_id'].astype(int)),
+            'production_line_id__in': set(keyed['line_id'].astype(int)),
+            'product_id__in': set(keyed['product_id'].astype(int)),
+            f'{kind.sequence_field}__in': set(keyed['sequence'].astype(int)),
+        }).only(
+            'id', 'date', 'shift_id', 'production_line_id', 'product_id', kind.sequence_field, kind.time_field,
+            'observations', 'status',
+        ).order_by('id')
+
+        samples = {}
+        for sample in queryset:
+            key = (sample.date, sample.shift_id, sample.production_line_id, sample.product_id,
+                   getattr(sample, kind.sequence_field))
+            # Sem restrição de unicidade no banco; com chaves repetidas, vale a amostra mais antiga
+            samples.setdefault(key, sample)
+        return samples
+
+    def _update_chunk(self, kind, chunk, existing, values, property_columns, statuses):
+        """Grava as diferenças de um bloco de linhas já existentes; retorna a máscara das linhas alteradas"""
+        samples = {
+            index: existing[_sample_key(key)]
+            for index, key in zip(chunk.index, chunk[KEY_COLUMNS].itertuples(index=False))
+        }
+
+        # Todas as análises das amostras (o status da amostra depende de todas) e a
+        # primeira de cada propriedade, que é a atualizada
+        all_results, by_property = defaultdict(list), defaultdict(dict)
+        results = kind.result_model.objects.filter(
+            **{f'{kind.sample_fk}__in': [sample.id for sample in samples.values()]}
+        ).only('id', kind.sample_fk, 'property_id', 'value', 'unit', 'test_method', 'status').order_by('id')
+        for result in results:
+            sample_id = getattr(result, kind.sample_fk)
+            all_results[sample_id].append(result)
+            by_property[sample_id].setdefault(result.property_id, result)
+
+        now = timezone.now()
+        user_id = self.session.user_id
+        created, updated, updated_samples = [], {}, []
+        changed = pd.Series(False, index=chunk.index)
+
+        for index, row in zip(chunk.index, chunk.itertuples(index=False)):
+            sample = samples[index]
+            row_changed = False
+            for column, prop in property_columns.items():
+                status = statuses.get((index, column))
+                if status is None:
+                    continue
+                value = _decimal(values.at[index, column])
+                test_method = row.test_method or prop.test_method
+                result = by_property[sample.id].get(prop.id)
+                if result is None:
+                    result = kind.result_model(
+                        property_id=prop.id, value=value, unit=prop.unit, test_method=test_method,
+                        status=status, created_by_id=user_id, **{kind.sample_fk: sample.id},
+                    )
+                    created.append(result)
+                    all_results[sample.id].append(result)
+                    by_property[sample.id][prop.id] = result
+                    row_changed = True
+                elif (result.value, result.unit, result.test_method, result.status) != (
+                        value, prop.unit, test_method, status):
+                    result.value, result.unit, result.test_method, result.status = (
+                        value, prop.unit, test_method, status
+                    )
+                    result.updated_by_id, result.updated_at = user_id, now
+                    updated[result.id] = result
+                    row_changed = True
+                else:
+                    self.stats['results_unchanged'] += 1
+
+            sample_status = kind.sample_model.status_from_counts(
+                count_statuses([result.status for result in all_results[sample.id]])
+            )
+            sample_time = timezone.make_aware(datetime.combine(row.date, row.time))
+            observations = row.observations or sample.observations
+            current = (sample.status, getattr(sample, kind.time_field), sample.observations)
+            if current != (sample_status, sample_time, observations):
+                sample.status, sample.observations = sample_status, observations
+                setattr(sample, kind.time_field, sample_time)
+                sample.updated_at = now
+                updated_samples.append(sample)
+                row_changed = True
+            changed[index] = row_changed
+
+        kind.result_model.objects.bulk_create(created, batch_size=self.chunk_size)
+        kind.result_model.objects.bulk_update(
+            updated.values(), ['value', 'unit', 'test_method', 'status', 'updated_by', 'updated_at'],
+            batch_size=self.chunk_size,
+        )
+        kind.sample_model.objects.bulk_update(
+            updated_samples, ['status', kind.time_field, 'observations', 'updated_at'], batch_size=self.chunk_size
+        )
+
+        self.stats.update(
+            samples_updated=int(changed.sum()), results_created=len(created), results_updated=len(updated)
+        )
+        return changed
+
+    # Registro do andamento
+
+    def _track(self, chunk):
+        for key in chunk[['date', 'shift_id', 'line_id', 'product_id']].drop_duplicates().itertuples(index=False):
+            self.rollup_keys.add(_key(key))
+
+    def _advance(self, processed, successful):
+        if not processed:
+            return
+        self.session.processed_rows += processed
+        self.session.successful_rows += successful
+        self.session.failed_rows += processed - successful
+        self.session.heartbeat_at = timezone.now()
+        self.session.save(update_fields=['processed_rows', 'successful_rows', 'failed_rows', 'heartbeat_at'])
+
+    def _write_errors(self, df, validator, sheet):
+        errors = []
+        for index, column, error_type, message in validator.errors:
+            if index is None:
+                if (sheet, column) in self.header_errors:
+                    continue
+                self.header_errors.add((sheet, column))
+                row_number, raw_data = HEADER_ROW, ', '.join(map(str, df.columns))
+            else:
+                row_number, raw_data = _row_number(index), str(df.loc[index].to_dict())
+            errors.append(ImportError(
+                session=self.session, row_number=row_number, column_name=column,
+                error_type=error_type, error_message=message, raw_data=raw_data,
+            ))
+        ImportError.objects.bulk_create(errors, batch_size=self.chunk_size)
+
+
+def _key(key):
+    date, shift_id, line_id, product_id = key
+    return date, int(shift_id), int(line_id), int(product_id)
+
+
+def _sample_key(key):
+    """Chave natural (data, turno, linha, produto, sequência); sem sequência, None"""
+    date, shift_id, line_id, product_id, sequence = key
+    if pd.isna(sequence):
+        return None
+    return date, int(shift_id), int(line_id), int(product_id), int(sequence)
+
+
+def _row_number(index):
+    """Número da linha na planilha (o índice é a posição da linha após o cabeçalho)"""
+    return int(index) + HEADER_ROW + 1
+
+
+def _decimal(value):
+    return Decimal(f'{value:.4f}')
+
+
+def import_dataframes(session, df_spot, df_composite, chunk_size=DEFAULT_CHUNK_SIZE):
+    """Importa as abas de análises pontuais e amostras compostas da sessão"""
+    return ImportEngine(session, chunk_size=chunk_size).run(df_spot, df_composite)
+
+
+def import_file(session, path, chunk_size=DEFAULT_CHUNK_SIZE):
+    """Importa um arquivo .xlsx (abas de análises pontuais e amostras compostas) ou .csv, em blocos"""
+    engine = ImportEngine(session, chunk_size=chunk_size)
+    with SpreadsheetReader(path, batch_size=chunk_size) as reader:
+        if reader.is_csv:
+            sheet = COMPOSITE_SHEET if 'Data_Coleta' in reader.header() else SPOT_SHEET
+            batches = {sheet: reader.batches()}
+            total_rows = reader.estimated_rows()
+        else:
+            batches = {sheet: reader.batches(sheet) for sheet in (SPOT_SHEET, COMPOSITE_SHEET)}
+            total_rows = sum(reader.estimated_rows(sheet) for sheet in batches)
+        return engine.run_batches(batches.get(SPOT_SHEET, ()), batches.get(COMPOSITE_SHEET, ()), total_rows)
+
+
+def process_import_file(session):
+    """
+    Processa o arquivo da sessão de importação
+
+    Erros que impedem a leitura do arquivo marcam a sessão como FAILED; erros
+    de linha ficam em ImportError e não interrompem a importação.
+    """
+    try:
+        session.status = 'PROCESSING'
+        session.heartbeat_at = timezone.now()
+        session.save()
+
+        import_file(session, session.excel_file.path)
+
+        session.status = 'COMPLETED'
+        session.completed_at = timezone.now()
+        session.save()
+
+    except Exception as e:
+        session.status = 'FAILED'
+        session.error_log = str(e)
+        session.completed_at = timezone.now()
+        session.save()
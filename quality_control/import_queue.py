@@ -0,0 +1,111 @@
+"""
+Fila de importações em segundo plano
+
+O upload apenas grava a ImportSession como PENDING e retorna; o comando
+process_imports consulta periodicamente as sessões pendentes e as processa.
+A própria tabela de sessões é a fila: o worker assume uma sessão com um
+UPDATE condicional (PENDING → PROCESSING), de modo que vários workers, em
+threads ou processos diferentes, nunca processam o mesmo arquivo e arquivos
+diferentes são importados em paralelo.
+
+Durante o processamento o motor de importação grava o andamento e o
+heartbeat_at a cada bloco. Sessões sem sinal há mais de IMPORT_STALE_AFTER
+segundos (worker interrompido) são marcadas como falha em vez de voltarem
+para a fila, porque os blocos já gravados seriam importados de novo.
+"""
+
+import os
+import socket
+import threading
+from datetime import timedelta
+
+from django.conf import settings
+from django.utils import timezone
+
+from .import_engine import process_import_file
+from .models_import import ImportSession
+
+
+# Sessões pendentes examinadas por tentativa de claim
+CLAIM_BATCH = 10
+
+
+def worker_name():
+    """Identificação do worker gravada na sessão (host, processo e thread)"""
+    return f'{socket.gethostname()}:{os.getpid()}:{threading.current_thread().name}'[:100]
+
+
+def enqueue(session):
+    """
+    Coloca a sessão na fila
+
+    A sessão já é criada como PENDING; com IMPORT_INLINE (padrão) o arquivo
+    é processado imediatamente, na própria requisição. Como no worker, a
+    sessão é assumida antes com o UPDATE condicional, então um process_imports
+    rodando ao mesmo tempo nunca importa o mesmo arquivo.
+    """
+    if getattr(settings, 'IMPORT_INLINE', True):
+        claimed = _claim(session.id, worker_name())
+        if claimed is not None:
+            process_import_file(claimed)
+            session.refresh_from_db()
+
+
+def _claim(session_id, worker):
+    claimed = ImportSession.objects.filter(id=session_id, status='PENDING').update(
+        status='PROCESSING', worker=worker, heartbeat_at=timezone.now()
+    )
+    # 0 linhas alteradas: outro worker assumiu a sessão primeiro
+    if not claimed:
+        return None
+    return ImportSession.objects.select_related('template', 'user').get(id=session_id)
+
+
+def claim_next(worker=None):
+    """Assume a sessão pendente mais antiga; retorna None se a fila estiver vazia"""
+    worker = worker or worker_name()
+    pending = ImportSession.objects.filter(status='PENDING').order_by('started_at', 'id')
+
+    for session_id in pending.values_list('id', flat=True)[:CLAIM_BATCH]:
+        session = _claim(session_id, worker)
+        if session is not None:
+            return session
+    return None
+
+
+def process_next(worker=None):
+    """Processa a próxima sessão da fila; retorna a sessão ou None se não havia nenhuma"""
+    session = claim_next(worker)
+    if session is not None:
+        process_import_file(session)
+    return session
+
+
+def fail_stale_sessions(stale_after=None):
+    """Marca como falha as sessões em processamento sem sinal do worker; retorna quantas"""
+    if stale_after is None:
+        stale_after = settings.IMPORT_STALE_AFTER
+    limit = timezone.now() - timedelta(seconds=stale_after)
+
+    return ImportSession.objects.filter(status='PROCESSING', heartbeat_at__lt=limit).update(
+        status='FAILED',
+        error_log='Processamento interrompido: o worker parou de responder',
+        completed_at=timezone.now(),
+    )
+
+
+def session_progress(session):
+    """Andamento da sessão no formato da API de progresso"""
+    return {
+        'id': session.id,
+        'status': session.status,
+        'status_display': session.get_status_display(),
+        'total_rows': session.total_rows,
+        'processed_rows': session.processed_rows,
+        'successful_rows': session.successful_rows,
+        'failed_rows': session.failed_rows,
+        'progress_percentage': round(session.progress_percentage, 1),
+        'finished': session.status in ('COMPLETED', 'FAILED', 'CANCELLED'),
+        'completed_at': session.completed_at.isoformat() if session.completed_at else None,
+        'error_log': session.error_log,
+    }
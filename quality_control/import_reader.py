@@ -0,0 +1,185 @@
+"""
+Leitura em blocos dos arquivos de importação
+
+pd.read_excel monta a aba inteira em um DataFrame antes que a primeira linha
+seja importada. Aqui as linhas são lidas com openpyxl em modo read_only (que
+percorre o XML da aba sem carregar a pasta de trabalho em memória) ou, para
+arquivos .csv, com pd.read_csv(chunksize=...), e entregues em DataFrames de
+até batch_size linhas. A memória usada depende do tamanho do bloco e não do
+tamanho do arquivo.
+
+O índice de cada bloco é a posição da linha na aba (0 = primeira linha após o
+cabeçalho), para que os erros apontem a linha correta da planilha. Linhas
+totalmente vazias são ignoradas.
+"""
+
+import csv
+import os
+from collections import Counter
+
+import pandas as pd
+from openpyxl import load_workbook
+
+
+DEFAULT_BATCH_SIZE = 1000
+
+CSV_EXTENSIONS = ('.csv', '.txt')
+CSV_ENCODING = 'utf-8-sig'
+
+# Blocos lidos ao contar as linhas de um CSV
+COUNT_BUFFER = 1024 * 1024
+
+
+def is_csv(path):
+    return os.path.splitext(str(path))[1].lower() in CSV_EXTENSIONS
+
+
+def _columns(header):
+    """Nomes das colunas como no pd.read_excel: vazias viram Unnamed: n e repetidas ganham .1, .2..."""
+    columns, seen = [], Counter()
+    for position, value in enumerate(header):
+        name = str(value).strip() if value is not None else ''
+        name = name or f'Unnamed: {position}'
+        if seen[name]:
+            columns.append(f'{name}.{seen[name]}')
+        else:
+            columns.append(name)
+        seen[name] += 1
+    return columns
+
+
+def _is_blank(value):
+    return value is None or (isinstance(value, str) and not value.strip())
+
+
+def _row_batches(rows, columns, batch_size):
+    """Agrupa as tuplas de valores de uma aba em DataFrames de até batch_size linhas"""
+    width = len(columns)
+    values, index = [], []
+    for position, row in enumerate(rows):
+        if all(_is_blank(value) for value in row):
+            continue
+        row = tuple(row[:width])
+        values.append(row + (None,) * (width - len(row)))
+        index.append(position)
+        if len(values) == batch_size:
+            yield pd.DataFrame(values, columns=columns, index=index)
+            values, index = [], []
+    if values:
+        yield pd.DataFrame(values, columns=columns, index=index)
+
+
+class SpreadsheetReader:
+    """
+    Arquivo .xlsx ou .csv aberto para leitura em blocos
+
+    Um .csv tem uma única tabela; o nome da aba é ignorado.
+    """
+
+    def __init__(self, path, batch_size=DEFAULT_BATCH_SIZE):
+        self.path = str(path)
+        self.batch_size = batch_size
+        self.is_csv = is_csv(self.path)
+        self.workbook = None if self.is_csv else load_workbook(self.path, read_only=True, data_only=True)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def close(self):
+        if self.workbook is not None:
+            self.workbook.close()
+            self.workbook = None
+
+    def _worksheet(self, sheet_name):
+        if sheet_name is None:
+            return self.workbook.worksheets[0]
+        if sheet_name not in self.workbook.sheetnames:
+            raise ValueError(f'Aba {sheet_name} não encontrada na planilha')
+        return self.workbook[sheet_name]
+
+    def _delimiter(self, line):
+        """Separador do CSV: ponto e vírgula (padrão do Excel em português) ou vírgula"""
+        return ';' if line.count(';') > line.count(',') else ','
+
+    def _csv_header(self):
+        with open(self.path, encoding=CSV_ENCODING, newline='') as f:
+            line = f.readline()
+        delimiter = self._delimiter(line)
+        return next(csv.reader([line], delimiter=delimiter), []), delimiter
+
+    def header(self, sheet_name=None):
+        """Colunas da aba"""
+        if self.is_csv:
+            return _columns(self._csv_header()[0])
+        row = next(self._worksheet(sheet_name).iter_rows(max_row=1, values_only=True), ())
+        return _columns(row)
+
+    def estimated_rows(self, sheet_name=None):
+        """
+        Linhas de dados da aba sem percorrê-la (dimensão gravada na planilha ou
+        quebras de linha do CSV); pode incluir linhas vazias
+        """
+        if self.is_csv:
+            lines = 0
+            with open(self.path, 'rb') as f:
+                while block := f.read(COUNT_BUFFER):
+                    lines += block.count(b'\n')
+            return max(lines - 1, 0)
+        max_row = self._worksheet(sheet_name).max_row
+        return max((max_row or 0) - 1, 0)
+
+    def batches(self, sheet_name=None):
+        """
+        Iterador de DataFrames de até batch_size linhas
+
+        A aba é verificada na chamada (ValueError se não existir); a leitura só
+        acontece ao percorrer o iterador.
+        """
+        if self.is_csv:
+            return self._csv_batches()
+        return self._sheet_batches(self._worksheet(sheet_name))
+
+    def _sheet_batches(self, worksheet):
+        rows = worksheet.iter_rows(values_only=True)
+        header = next(rows, None)
+        if header is None:
+            return
+        yield from _row_batches(rows, _columns(header), self.batch_size)
+
+    def _csv_batches(self):
+        header, delimiter = self._csv_header()
+        if not header:
+            return
+        chunks = pd.read_csv(
+            self.path, sep=delimiter, encoding=CSV_ENCODING, chunksize=self.batch_size,
+            names=_columns(header), header=0, skip_blank_lines=False,
+        )
+        with chunks:
+            for chunk in chunks:
+                # O índice do read_csv continua entre os blocos; só as linhas vazias são descartadas
+                chunk = chunk.dropna(how='all')
+                if not chunk.empty:
+                    yield chunk
+
+
+def iter_batches(path, sheet_name=None, batch_size=DEFAULT_BATCH_SIZE):
+    """
+    Blocos de uma aba do arquivo; o arquivo é fechado ao fim da leitura
+
+    Erros de abertura (arquivo inválido, aba inexistente) são levantados na chamada.
+    """
+    reader = SpreadsheetReader(path, batch_size=batch_size)
+    try:
+        batches = reader.batches(sheet_name)
+    except Exception:
+        reader.close()
+        raise
+
+    def read():
+        with reader:
+            yield from batches
+
+    return read()
@@ -0,0 +1,30 @@
+"""
+Grava um segmento do backup incremental (core.backup)
+"""
+
+from django.core.management.base import BaseCommand, CommandError
+
+from core.backup import DEFAULT_CHUNK_SIZE, BackupError, create_backup
+
+
+class Command(BaseCommand):
+    help = 'Grava as linhas alteradas desde o último backup (ou um backup completo) em um segmento .jsonl.gz'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--full', action='store_true', help='Grava um backup completo e inicia uma nova cadeia')
+        parser.add_argument('--dir', help='Diretório do backup (padrão: settings.BACKUP_DIR)')
+        parser.add_argument('--chunk-size', type=int, default=DEFAULT_CHUNK_SIZE, help='Linhas lidas por consulta')
+
+    def handle(self, *args, **options):
+        if options['chunk_size'] < 1:
+            raise CommandError('--chunk-size deve ser maior que zero')
+
+        try:
+            segment = create_backup(options['dir'], full=options['full'], chunk_size=options['chunk_size'])
+        except BackupError as e:
+            raise CommandError(str(e))
+
+        rows = sum(model['rows'] for model in segment['models'].values())
+        self.stdout.write(self.style.SUCCESS(
+            f"Segmento {segment['name']} ({segment['kind']}): {rows} linhas, {segment['size']} bytes"
+        ))
@@ -0,0 +1,34 @@
+"""
+Geração em lote dos PDFs de laudos (ex.: todos os laudos de um embarque)
+"""
+
+from django.core.management.base import BaseCommand, CommandError
+
+from quality_control.models import QualityReport
+from quality_control.pdf_generator import generate_quality_report_pdfs
+
+
+class Command(BaseCommand):
+    help = 'Gera os PDFs dos laudos informados em paralelo e opcionalmente os reúne em um ZIP'
+
+    def add_arguments(self, parser):
+        parser.add_argument('report_ids', nargs='+', type=int, help='IDs dos laudos')
+        parser.add_argument('--workers', type=int, help='Processos de renderização (padrão: número de CPUs)')
+        parser.add_argument('--output', help='Arquivo ZIP com os PDFs (sem ele os PDFs ficam só no cache)')
+
+    def handle(self, *args, **options):
+        if options['workers'] is not None and options['workers'] < 1:
+            raise CommandError('--workers deve ser maior que zero')
+
+        try:
+            result = generate_quality_report_pdfs(
+                options['report_ids'], output=options['output'], workers=options['workers']
+            )
+        except QualityReport.DoesNotExist as e:
+            raise CommandError(str(e))
+
+        destination = f" em {options['output']}" if options['output'] else ''
+        self.stdout.write(self.style.SUCCESS(
+            f"{len(result.files)} laudos gerados{destination} em {result.seconds:.2f}s "
+            f"({result.rate:.1f} laudos/s)"
+        ))
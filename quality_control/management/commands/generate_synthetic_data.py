@@ -0,0 +1,81 @@
+"""
+Gera massa de dados sintética para testes de carga e benchmarks
+"""
+
+import time
+from datetime import datetime
+
+from django.core.management.base import BaseCommand, CommandError
+
+from core.models import Plant
+from quality_control.synthetic_data import DEFAULTS, generate_dataset
+
+
+# Opções que aceitam zero; as demais precisam ser positivas
+MINIMUMS = {'composites_per_shift': 0, 'reports_per_day': 0, 'seed': 0}
+
+
+def add_dataset_arguments(parser):
+    """Opções da massa de dados, compartilhadas com run_benchmarks"""
+    parser.add_argument('--days', type=int, default=DEFAULTS['days'], help='Dias de produção gerados')
+    parser.add_argument('--end', help='Último dia gerado (AAAA-MM-DD, padrão: hoje)')
+    parser.add_argument('--plants', type=int, default=DEFAULTS['plants'], help='Plantas')
+    parser.add_argument('--lines-per-plant', type=int, default=DEFAULTS['lines_per_plant'],
+                        help='Linhas de produção por planta')
+    parser.add_argument('--products', type=int, default=DEFAULTS['products'], help='Produtos')
+    parser.add_argument('--properties', type=int, default=DEFAULTS['properties'],
+                        help='Propriedades analisadas em cada amostra')
+    parser.add_argument('--samples-per-shift', type=int, default=DEFAULTS['samples_per_shift'],
+                        help='Amostras pontuais por linha e turno')
+    parser.add_argument('--composites-per-shift', type=int, default=DEFAULTS['composites_per_shift'],
+                        help='Amostras compostas por linha e turno')
+    parser.add_argument('--reports-per-day', type=int, default=DEFAULTS['reports_per_day'],
+                        help='Laudos emitidos por dia')
+    parser.add_argument('--seed', type=int, default=DEFAULTS['seed'], help='Semente do gerador aleatório')
+    parser.add_argument('--prefix', default=DEFAULTS['prefix'], help='Prefixo dos códigos do cadastro gerado')
+
+
+def dataset_options(options):
+    """Converte as opções do comando nos parâmetros de generate_dataset"""
+    params = {name: options[name] for name in DEFAULTS}
+    for name, value in params.items():
+        if name != 'prefix' and value < MINIMUMS.get(name, 1):
+            raise CommandError(f"--{name.replace('_', '-')} inválido: {value}")
+
+    end_date = None
+    if options.get('end'):
+        try:
+            end_date = datetime.strptime(options['end'], '%Y-%m-%d').date()
+        except ValueError:
+            raise CommandError(f"Data inválida: {options['end']}")
+    return end_date, params
+
+
+class Command(BaseCommand):
+    help = 'Gera em massa plantas, linhas, produtos, especificações, amostras, análises e laudos sintéticos'
+
+    def add_arguments(self, parser):
+        add_dataset_arguments(parser)
+
+    def handle(self, *args, **options):
+        end_date, params = dataset_options(options)
+
+        if Plant.objects.filter(code__startswith=params['prefix']).exists():
+            raise CommandError(
+                f"Já existem dados com o prefixo {params['prefix']}; use outro --prefix ou um banco vazio"
+            )
+
+        started = time.perf_counter()
+        try:
+            summary = generate_dataset(end_date=end_date, **params)
+        except ValueError as e:
+            raise CommandError(str(e))
+        elapsed = time.perf_counter() - started
+
+        self.stdout.write(f"Período: {summary['start_date']:%d/%m/%Y} a {summary['end_date']:%d/%m/%Y}")
+        self.stdout.write(f"Amostras pontuais: {summary['spot_samples']}")
+        self.stdout.write(f"Análises pontuais: {summary['spot_analyses']}")
+        self.stdout.write(f"Amostras compostas: {summary['composite_samples']}")
+        self.stdout.write(f"Resultados compostos: {summary['composite_results']}")
+        self.stdout.write(f"Laudos: {summary['quality_reports']}")
+        self.stdout.write(self.style.SUCCESS(f'Massa de dados gerada em {elapsed:.1f}s'))
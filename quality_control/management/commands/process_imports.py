@@ -0,0 +1,91 @@
+"""
+Worker das importações de planilhas enfileiradas pelo upload
+"""
+
+import signal
+import threading
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+
+from quality_control.import_queue import fail_stale_sessions, process_next, worker_name
+
+
+class Command(BaseCommand):
+    help = 'Processa as sessões de importação pendentes (uma por worker, em paralelo)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=1, help='Importações processadas em paralelo')
+        parser.add_argument('--interval', type=float, default=5.0,
+                            help='Segundos entre consultas à fila quando ela está vazia')
+        parser.add_argument('--once', action='store_true',
+                            help='Processa as sessões pendentes e encerra quando a fila esvaziar')
+        parser.add_argument('--stale-after', type=int, default=settings.IMPORT_STALE_AFTER,
+                            help='Segundos sem sinal após os quais uma sessão em processamento é marcada como falha')
+
+    def handle(self, *args, **options):
+        if options['workers'] < 1:
+            raise CommandError('--workers deve ser maior que zero')
+        if options['interval'] <= 0:
+            raise CommandError('--interval deve ser maior que zero')
+
+        self.stop = threading.Event()
+        self.processed = 0
+        self.lock = threading.Lock()
+
+        # SIGTERM (parada do serviço) encerra após as importações em andamento
+        previous_handler = signal.signal(signal.SIGTERM, lambda *args: self.stop.set())
+
+        threads = [
+            threading.Thread(target=self._work, args=(options,), name=f'import-{i + 1}')
+            for i in range(options['workers'])
+        ]
+        try:
+            self._fail_stale(options)
+            for thread in threads:
+                thread.start()
+
+            last_check = time.monotonic()
+            while any(thread.is_alive() for thread in threads):
+                if self.stop.wait(0.2):
+                    break
+                if time.monotonic() - last_check >= options['interval']:
+                    self._fail_stale(options)
+                    last_check = time.monotonic()
+        except KeyboardInterrupt:
+            self.stop.set()
+        finally:
+            for thread in threads:
+                if thread.is_alive():
+                    thread.join()
+            signal.signal(signal.SIGTERM, previous_handler)
+
+        self.stdout.write(self.style.SUCCESS(f'{self.processed} importações processadas'))
+
+    def _fail_stale(self, options):
+        stale = fail_stale_sessions(options['stale_after'])
+        if stale:
+            self.stdout.write(self.style.WARNING(f'{stale} sessões interrompidas marcadas como falha'))
+
+    def _work(self, options):
+        worker = worker_name()
+        try:
+            while not self.stop.is_set():
+                session = process_next(worker)
+                if session is None:
+                    if options['once']:
+                        return
+                    self.stop.wait(options['interval'])
+                    continue
+
+                with self.lock:
+                    self.processed += 1
+                self.stdout.write(
+                    f'Sessão {session.id} ({session.original_filename}): {session.get_status_display()}, '
+                    f'{session.successful_rows}/{session.total_rows} linhas importadas'
+                )
+        finally:
+            # Cada thread tem sua própria conexão com o banco
+            connection.close()
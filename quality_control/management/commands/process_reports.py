@@ -0,0 +1,92 @@
+"""
+Worker da renderização dos laudos gerados (fila de report_queue)
+"""
+
+import signal
+import threading
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+
+from quality_control.import_queue import worker_name
+from quality_control.report_queue import process_next, requeue_stale_renders
+
+
+class Command(BaseCommand):
+    help = 'Renderiza os PDFs dos laudos pendentes (um por worker, em paralelo)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=1, help='Laudos renderizados em paralelo')
+        parser.add_argument('--interval', type=float, default=2.0,
+                            help='Segundos entre consultas à fila quando ela está vazia')
+        parser.add_argument('--once', action='store_true',
+                            help='Renderiza os laudos pendentes e encerra quando a fila esvaziar')
+        parser.add_argument('--stale-after', type=int, default=settings.REPORT_RENDER_STALE_AFTER,
+                            help='Segundos sem sinal após os quais um laudo em renderização volta para a fila')
+
+    def handle(self, *args, **options):
+        if options['workers'] < 1:
+            raise CommandError('--workers deve ser maior que zero')
+        if options['interval'] <= 0:
+            raise CommandError('--interval deve ser maior que zero')
+
+        self.stop = threading.Event()
+        self.processed = 0
+        self.lock = threading.Lock()
+
+        # SIGTERM (parada do serviço) encerra após os laudos em andamento
+        previous_handler = signal.signal(signal.SIGTERM, lambda *args: self.stop.set())
+
+        threads = [
+            threading.Thread(target=self._work, args=(options,), name=f'report-{i + 1}')
+            for i in range(options['workers'])
+        ]
+        try:
+            self._requeue_stale(options)
+            for thread in threads:
+                thread.start()
+
+            last_check = time.monotonic()
+            while any(thread.is_alive() for thread in threads):
+                if self.stop.wait(0.2):
+                    break
+                if time.monotonic() - last_check >= options['interval']:
+                    self._requeue_stale(options)
+                    last_check = time.monotonic()
+        except KeyboardInterrupt:
+            self.stop.set()
+        finally:
+            for thread in threads:
+                if thread.is_alive():
+                    thread.join()
+            signal.signal(signal.SIGTERM, previous_handler)
+
+        self.stdout.write(self.style.SUCCESS(f'{self.processed} laudos renderizados'))
+
+    def _requeue_stale(self, options):
+        stale = requeue_stale_renders(options['stale_after'])
+        if stale:
+            self.stdout.write(self.style.WARNING(f'{stale} laudos interrompidos devolvidos à fila'))
+
+    def _work(self, options):
+        worker = worker_name()
+        try:
+            while not self.stop.is_set():
+                report = process_next(worker)
+                if report is None:
+                    if options['once']:
+                        return
+                    self.stop.wait(options['interval'])
+                    continue
+
+                with self.lock:
+                    self.processed += 1
+                message = f'Laudo {report.report_number}: {report.get_render_status_display()}'
+                if report.render_error:
+                    message += f' ({report.render_error})'
+                self.stdout.write(message)
+        finally:
+            # Cada thread tem sua própria conexão com o banco
+            connection.close()
@@ -0,0 +1,36 @@
+"""
+Reconstrói o consolidado de qualidade por turno a partir das tabelas de origem
+"""
+
+from datetime import datetime
+
+from django.core.management.base import BaseCommand, CommandError
+
+from quality_control.rollups import rebuild_rollups
+
+
+class Command(BaseCommand):
+    help = 'Reconstrói a tabela ShiftQualityRollup (opcionalmente apenas de um período)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--start', help='Data inicial (AAAA-MM-DD)')
+        parser.add_argument('--end', help='Data final (AAAA-MM-DD)')
+        parser.add_argument('--batch-size', type=int, default=1000, help='Tamanho do lote do bulk_create')
+
+    def handle(self, *args, **options):
+        start_date = self._parse_date(options['start'])
+        end_date = self._parse_date(options['end'])
+
+        if start_date and end_date and start_date > end_date:
+            raise CommandError('A data inicial deve ser anterior à data final')
+
+        total = rebuild_rollups(start_date, end_date, batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f'{total} linhas do consolidado reconstruídas'))
+
+    def _parse_date(self, value):
+        if not value:
+            return None
+        try:
+            return datetime.strptime(value, '%Y-%m-%d').date()
+        except ValueError:
+            raise CommandError(f'Data inválida: {value}')
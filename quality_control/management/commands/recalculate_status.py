@@ -0,0 +1,69 @@
+"""
+Reaplica as especificações atuais aos status de análises e amostras em massa
+"""
+
+from datetime import datetime
+
+from django.core.management.base import BaseCommand, CommandError
+
+from quality_control.status_recalc import DEFAULT_CHUNK_SIZE, recalculate_statuses
+
+
+LABELS = {
+    'spot_analyses': 'Análises pontuais',
+    'spot_samples': 'Amostras pontuais',
+    'composite_results': 'Resultados compostos',
+    'composite_samples': 'Amostras compostas',
+    'registrations': 'Registros de análise',
+}
+
+
+class Command(BaseCommand):
+    help = 'Recalcula em blocos os status de análises pontuais, resultados compostos e amostras'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--start', help='Data inicial (AAAA-MM-DD)')
+        parser.add_argument('--end', help='Data final (AAAA-MM-DD)')
+        parser.add_argument('--product', type=int, action='append', dest='products',
+                            help='Id do produto (pode ser repetido)')
+        parser.add_argument('--property', type=int, action='append', dest='properties',
+                            help='Id da propriedade (pode ser repetido)')
+        parser.add_argument('--chunk-size', type=int, default=DEFAULT_CHUNK_SIZE,
+                            help='Linhas lidas e gravadas por bloco')
+        parser.add_argument('--dry-run', action='store_true',
+                            help='Apenas conta as alterações, sem gravar')
+
+    def handle(self, *args, **options):
+        start_date = self._parse_date(options['start'])
+        end_date = self._parse_date(options['end'])
+
+        if start_date and end_date and start_date > end_date:
+            raise CommandError('A data inicial deve ser anterior à data final')
+        if options['chunk_size'] < 1:
+            raise CommandError('--chunk-size deve ser maior que zero')
+
+        summary = recalculate_statuses(
+            start_date=start_date,
+            end_date=end_date,
+            product_ids=options['products'],
+            property_ids=options['properties'],
+            chunk_size=options['chunk_size'],
+            dry_run=options['dry_run'],
+        )
+
+        for name, label in LABELS.items():
+            examined, changed = summary[name]
+            self.stdout.write(f'{label}: {examined} avaliados, {changed} alterados')
+
+        if options['dry_run']:
+            self.stdout.write(self.style.WARNING('Simulação: nenhuma alteração gravada'))
+        else:
+            self.stdout.write(self.style.SUCCESS('Status recalculados'))
+
+    def _parse_date(self, value):
+        if not value:
+            return None
+        try:
+            return datetime.strptime(value, '%Y-%m-%d').date()
+        except ValueError:
+            raise CommandError(f'Data inválida: {value}')
@@ -0,0 +1,45 @@
+"""
+Restaura o backup incremental (core.backup): o último backup completo e os incrementais seguintes
+"""
+
+from django.core.management.base import BaseCommand, CommandError
+
+from core.backup import DEFAULT_CHUNK_SIZE, BackupError, load_manifest, restore_backup, restore_chain
+
+
+class Command(BaseCommand):
+    help = 'Reaplica os segmentos do backup incremental; o banco volta ao estado do último segmento'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dir', help='Diretório do backup (padrão: settings.BACKUP_DIR)')
+        parser.add_argument('--until', type=int, help='Número do último segmento reaplicado (padrão: o mais recente)')
+        parser.add_argument('--chunk-size', type=int, default=DEFAULT_CHUNK_SIZE, help='Linhas gravadas por bloco')
+        parser.add_argument('--noinput', '--no-input', action='store_false', dest='interactive',
+                            help='Não pede confirmação')
+
+    def handle(self, *args, **options):
+        try:
+            chain = restore_chain(load_manifest(options['dir']), options['until'])
+        except BackupError as e:
+            raise CommandError(str(e))
+
+        for segment in chain:
+            self.stdout.write(f"{segment['name']} ({segment['kind']}, {segment['created_at']})")
+
+        if options['interactive']:
+            answer = input('Os dados atuais serão substituídos pelos do backup. Digite "sim" para continuar: ')
+            if answer.strip().lower() != 'sim':
+                raise CommandError('Restauração cancelada')
+
+        try:
+            stats = restore_backup(options['dir'], until=options['until'], chunk_size=options['chunk_size'])
+        except BackupError as e:
+            raise CommandError(str(e))
+
+        for label, counts in stats.items():
+            if any(counts.values()):
+                self.stdout.write(
+                    f"{label}: {counts['saved']} gravadas, {counts['deleted']} excluídas"
+                    + (f", {counts['missing']} ausentes no backup" if counts['missing'] else '')
+                )
+        self.stdout.write(self.style.SUCCESS('Restauração concluída'))
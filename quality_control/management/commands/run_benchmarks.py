@@ -0,0 +1,88 @@
+"""
+Mede dashboards, APIs, importação, exportação e PDF e grava os tempos em JSON
+"""
+
+import json
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+
+from quality_control.benchmarks import (
+    DEFAULT_IMPORT_ROWS, DEFAULT_REPEAT, GROUPS, compare_results, run_benchmarks
+)
+from quality_control.synthetic_data import generate_dataset
+from .generate_synthetic_data import add_dataset_arguments, dataset_options
+
+
+class Command(BaseCommand):
+    help = (
+        'Executa os benchmarks sobre a massa de dados do banco atual (ou, com --fresh, '
+        'sobre uma massa sintética em um banco de testes) e grava os resultados em JSON'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--output', default='benchmark_results.json', help='Arquivo JSON de resultados')
+        parser.add_argument('--repeat', type=int, default=DEFAULT_REPEAT, help='Execuções medidas por cenário')
+        parser.add_argument('--group', action='append', dest='groups', choices=GROUPS,
+                            help='Grupo de cenários (pode ser repetido; padrão: todos)')
+        parser.add_argument('--import-rows', type=int, default=DEFAULT_IMPORT_ROWS,
+                            help='Linhas da planilha usada no cenário de importação')
+        parser.add_argument('--compare', help='Arquivo JSON de uma execução anterior para comparação')
+        parser.add_argument('--fresh', action='store_true',
+                            help='Cria um banco de testes com a massa sintética (opções abaixo) e o descarta ao final')
+        add_dataset_arguments(parser)
+
+    def handle(self, *args, **options):
+        if options['repeat'] < 1:
+            raise CommandError('--repeat deve ser maior que zero')
+
+        previous = None
+        if options['compare']:
+            try:
+                with open(options['compare'], encoding='utf-8') as f:
+                    previous = json.load(f)
+            except (OSError, ValueError) as e:
+                raise CommandError(f"Não foi possível ler {options['compare']}: {e}")
+
+        old_name = None
+        if options['fresh']:
+            end_date, params = dataset_options(options)
+            old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True)
+            started = time.perf_counter()
+            generate_dataset(end_date=end_date, **params)
+            self.stdout.write(f'Massa de dados gerada em {time.perf_counter() - started:.1f}s')
+
+        try:
+            report = run_benchmarks(
+                repeat=options['repeat'],
+                groups=options['groups'],
+                import_rows=options['import_rows'],
+                progress=self._progress,
+            )
+        except ValueError as e:
+            raise CommandError(str(e))
+        finally:
+            if old_name:
+                connection.creation.destroy_test_db(old_name, verbosity=0)
+
+        with open(options['output'], 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2, ensure_ascii=False)
+        self.stdout.write(self.style.SUCCESS(f"Resultados gravados em {options['output']}"))
+
+        if previous:
+            self._print_comparison(compare_results(previous, report))
+
+    def _progress(self, name, result):
+        if result['status'] == 'ok':
+            self.stdout.write(f"{name}: {result['median_ms']:.1f} ms ({result['queries']} consultas)")
+        else:
+            self.stdout.write(self.style.WARNING(f"{name}: erro - {result['error']}"))
+
+    def _print_comparison(self, rows):
+        self.stdout.write(f"\n{'Cenário':<32} {'Anterior (ms)':>14} {'Atual (ms)':>14} {'Razão':>8}")
+        for name, before, after, ratio in rows:
+            before = f'{before:.1f}' if before is not None else '-'
+            after = f'{after:.1f}' if after is not None else '-'
+            ratio = f'{ratio:.2f}x' if ratio is not None else '-'
+            self.stdout.write(f'{name:<32} {before:>14} {after:>14} {ratio:>8}')
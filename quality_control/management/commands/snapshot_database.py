@@ -0,0 +1,37 @@
+"""
+Snapshot consistente do banco SQLite com a aplicação em funcionamento (core.backup)
+"""
+
+from django.core.management.base import BaseCommand, CommandError
+
+from core.backup import SNAPSHOT_PAGES, SNAPSHOT_PAUSE, BackupError, snapshot_sqlite
+
+
+class Command(BaseCommand):
+    help = 'Copia o banco SQLite com a API de backup online e grava o relatório com tamanho e SHA-256'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dir', help='Diretório do backup (padrão: settings.BACKUP_DIR)')
+        parser.add_argument('--pages', type=int, default=SNAPSHOT_PAGES, help='Páginas copiadas por passo')
+        parser.add_argument('--pause', type=float, default=SNAPSHOT_PAUSE, help='Segundos de pausa entre os passos')
+        parser.add_argument('--keep', type=int, help='Quantidade de snapshots mantidos (os mais antigos são removidos)')
+
+    def handle(self, *args, **options):
+        if options['pages'] < 1:
+            raise CommandError('--pages deve ser maior que zero')
+        if options['pause'] < 0:
+            raise CommandError('--pause não pode ser negativo')
+        if options['keep'] is not None and options['keep'] < 1:
+            raise CommandError('--keep deve ser maior que zero')
+
+        try:
+            report = snapshot_sqlite(
+                options['dir'], pages=options['pages'], pause=options['pause'], keep=options['keep']
+            )
+        except BackupError as e:
+            raise CommandError(str(e))
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Snapshot {report['path']}: {report['size']} bytes em {report['duration']}s "
+            f"({report['steps']} passos, {report['restarts']} recomeços), SHA-256 {report['sha256']}"
+        ))
@@ -0,0 +1,44 @@
+# Generated manually for the shift quality rollup table
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0002_alter_shift_name'),
+        ('quality_control', '0015_add_production_models'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ShiftQualityRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField(verbose_name='Data')),
+                ('spot_samples_total', models.PositiveIntegerField(default=0, verbose_name='Amostras Pontuais')),
+                ('spot_samples_approved', models.PositiveIntegerField(default=0, verbose_name='Amostras Aprovadas')),
+                ('spot_samples_alert', models.PositiveIntegerField(default=0, verbose_name='Amostras em Alerta')),
+                ('spot_samples_rejected', models.PositiveIntegerField(default=0, verbose_name='Amostras Reprovadas')),
+                ('spot_analyses_total', models.PositiveIntegerField(default=0, verbose_name='Análises Pontuais')),
+                ('spot_analyses_approved', models.PositiveIntegerField(default=0, verbose_name='Análises Aprovadas')),
+                ('spot_analyses_alert', models.PositiveIntegerField(default=0, verbose_name='Análises em Alerta')),
+                ('spot_analyses_rejected', models.PositiveIntegerField(default=0, verbose_name='Análises Reprovadas')),
+                ('composite_samples_total', models.PositiveIntegerField(default=0, verbose_name='Amostras Compostas')),
+                ('composite_samples_approved', models.PositiveIntegerField(default=0, verbose_name='Compostas Aprovadas')),
+                ('composite_samples_alert', models.PositiveIntegerField(default=0, verbose_name='Compostas em Alerta')),
+                ('composite_samples_rejected', models.PositiveIntegerField(default=0, verbose_name='Compostas Reprovadas')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='Atualizado em')),
+                ('product', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='quality_control.product', verbose_name='Produto')),
+                ('production_line', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='core.productionline', verbose_name='Linha de Produção')),
+                ('shift', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='core.shift', verbose_name='Turno')),
+            ],
+            options={
+                'verbose_name': 'Consolidado de Qualidade do Turno',
+                'verbose_name_plural': 'Consolidados de Qualidade dos Turnos',
+                'ordering': ['-date', 'shift', 'production_line', 'product'],
+                'unique_together': {('date', 'shift', 'production_line', 'product')},
+            },
+        ),
+    ]
@@ -0,0 +1,27 @@
+# Generated manually for the shared sequence counters
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('quality_control', '0016_shiftqualityrollup'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SequenceCounter',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('key', models.CharField(max_length=200, unique=True, verbose_name='Chave')),
+                ('value', models.PositiveBigIntegerField(default=0, verbose_name='Último Valor')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='Atualizado em')),
+            ],
+            options={
+                'verbose_name': 'Contador de Sequência',
+                'verbose_name_plural': 'Contadores de Sequência',
+                'ordering': ['key'],
+            },
+        ),
+    ]
@@ -0,0 +1,29 @@
+# Generated manually for the indexes of the hot quality tables
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('quality_control', '0017_sequencecounter'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='spotsample',
+            index=models.Index(fields=['date', 'shift', 'production_line', 'product'], name='qc_spotsample_key_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='spotanalysis',
+            index=models.Index(condition=models.Q(('status', 'REJECTED')), fields=['spot_sample', 'property'], name='qc_spotanalysis_rejected_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='compositesample',
+            index=models.Index(condition=models.Q(('status', 'REJECTED')), fields=['date'], name='qc_composite_rejected_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='compositesample',
+            index=models.Index(fields=['date', 'shift', 'production_line', 'product'], name='qc_composite_key_idx'),
+        ),
+    ]
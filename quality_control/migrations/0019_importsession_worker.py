@@ -0,0 +1,23 @@
+# Generated manually for the background import worker
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('quality_control', '0018_quality_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='importsession',
+            name='worker',
+            field=models.CharField(blank=True, max_length=100, verbose_name='Processado por'),
+        ),
+        migrations.AddField(
+            model_name='importsession',
+            name='heartbeat_at',
+            field=models.DateTimeField(blank=True, null=True, verbose_name='Último Sinal do Processamento'),
+        ),
+    ]
@@ -0,0 +1,21 @@
+# Generated manually for the upsert import mode
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('quality_control', '0019_importsession_worker'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='importsession',
+            name='import_mode',
+            field=models.CharField(
+                choices=[('APPEND', 'Incluir como novas amostras'), ('UPSERT', 'Atualizar amostras existentes')],
+                default='APPEND', max_length=10, verbose_name='Modo de Importação'
+            ),
+        ),
+    ]
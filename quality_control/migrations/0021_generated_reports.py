@@ -0,0 +1,84 @@
+# Generated manually for the background report renderer
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('quality_control', '0020_importsession_import_mode'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ReportTemplate',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=100, unique=True, verbose_name='Nome do Template')),
+                ('template_type', models.CharField(choices=[('SPOT', 'Análise Pontual'), ('COMPOSITE', 'Análise Composta'), ('GENERAL', 'Geral')], max_length=20, verbose_name='Tipo de Template')),
+                ('description', models.TextField(blank=True, verbose_name='Descrição')),
+                ('header_template', models.TextField(blank=True, help_text='HTML para o cabeçalho do laudo', verbose_name='Cabeçalho (HTML)')),
+                ('footer_template', models.TextField(blank=True, help_text='HTML para o rodapé do laudo', verbose_name='Rodapé (HTML)')),
+                ('body_template', models.TextField(blank=True, help_text='HTML para o corpo do laudo', verbose_name='Corpo (HTML)')),
+                ('page_size', models.CharField(choices=[('A4', 'A4'), ('A3', 'A3'), ('LETTER', 'Carta')], default='A4', max_length=20, verbose_name='Tamanho da Página')),
+                ('orientation', models.CharField(choices=[('PORTRAIT', 'Retrato'), ('LANDSCAPE', 'Paisagem')], default='PORTRAIT', max_length=20, verbose_name='Orientação')),
+                ('is_active', models.BooleanField(default=True, verbose_name='Ativo')),
+                ('is_default', models.BooleanField(default=False, verbose_name='Template Padrão')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='Criado em')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='Atualizado em')),
+                ('created_by', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.PROTECT, to=settings.AUTH_USER_MODEL, verbose_name='Criado por')),
+            ],
+            options={
+                'verbose_name': 'Template de Laudo',
+                'verbose_name_plural': 'Templates de Laudos',
+                'ordering': ['name'],
+            },
+        ),
+        migrations.CreateModel(
+            name='ReportField',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=100, verbose_name='Nome do Campo')),
+                ('field_type', models.CharField(choices=[('TEXT', 'Texto'), ('NUMBER', 'Número'), ('DATE', 'Data'), ('TIME', 'Hora'), ('BOOLEAN', 'Sim/Não'), ('IMAGE', 'Imagem'), ('TABLE', 'Tabela')], max_length=20, verbose_name='Tipo do Campo')),
+                ('source_field', models.CharField(help_text='Campo do modelo de dados (ex: product.name)', max_length=100, verbose_name='Campo de Origem')),
+                ('display_order', models.PositiveIntegerField(default=0, verbose_name='Ordem de Exibição')),
+                ('is_required', models.BooleanField(default=True, verbose_name='Obrigatório')),
+                ('format_string', models.CharField(blank=True, help_text='Formato para exibição (ex: %.2f para números)', max_length=100, verbose_name='Formato')),
+                ('template', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='fields', to='quality_control.reporttemplate')),
+            ],
+            options={
+                'verbose_name': 'Campo do Laudo',
+                'verbose_name_plural': 'Campos do Laudo',
+                'ordering': ['display_order', 'name'],
+            },
+        ),
+        migrations.CreateModel(
+            name='GeneratedReport',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('title', models.CharField(max_length=200, verbose_name='Título')),
+                ('report_number', models.CharField(max_length=50, unique=True, verbose_name='Número do Laudo')),
+                ('status', models.CharField(choices=[('DRAFT', 'Rascunho'), ('FINAL', 'Final'), ('APPROVED', 'Aprovado')], default='DRAFT', max_length=20, verbose_name='Status')),
+                ('generated_at', models.DateTimeField(auto_now_add=True, verbose_name='Gerado em')),
+                ('pdf_file', models.FileField(blank=True, null=True, upload_to='reports/', verbose_name='Arquivo PDF')),
+                ('render_status', models.CharField(choices=[('PENDING', 'Na Fila'), ('RENDERING', 'Renderizando'), ('READY', 'Pronto'), ('FAILED', 'Falhou')], default='PENDING', max_length=20, verbose_name='Status da Renderização')),
+                ('render_requested_at', models.DateTimeField(blank=True, null=True, verbose_name='Renderização Solicitada em')),
+                ('rendered_at', models.DateTimeField(blank=True, null=True, verbose_name='Renderizado em')),
+                ('render_error', models.TextField(blank=True, verbose_name='Erro da Renderização')),
+                ('worker', models.CharField(blank=True, max_length=100, verbose_name='Renderizado por')),
+                ('heartbeat_at', models.DateTimeField(blank=True, null=True, verbose_name='Último Sinal da Renderização')),
+                ('composite_sample', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, to='quality_control.compositesample')),
+                ('generated_by', models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, to=settings.AUTH_USER_MODEL, verbose_name='Gerado por')),
+                ('spot_analysis', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, to='quality_control.spotanalysis')),
+                ('template', models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, to='quality_control.reporttemplate')),
+            ],
+            options={
+                'verbose_name': 'Laudo Gerado',
+                'verbose_name_plural': 'Laudos Gerados',
+                'ordering': ['-generated_at'],
+            },
+        ),
+    ]
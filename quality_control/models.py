@@ -3,10 +3,13 @@ Modelos para o sistema de controle de qualidade
 """
 
 from django.db import models
+from django.db.models import Count, Max, Q
 from django.contrib.auth.models import User
 from django.core.validators import MinValueValidator, MaxValueValidator
 from django.utils import timezone
+from contextlib import contextmanager
 from decimal import Decimal
+import threading
 import uuid
 
 from core.models import AuditModel, Plant, ProductionLine, Shift
@@ -160,6 +163,55 @@ class Specification(AuditModel):
         return self.lsl is not None and self.usl is not None
 
 
+# Contagens por status usadas no status geral das amostras
+STATUS_COUNTS = {
+    'total': Count('id'),
+    'approved': Count('id', filter=Q(status='APPROVED')),
+    'alert': Count('id', filter=Q(status='ALERT')),
+    'rejected': Count('id', filter=Q(status='REJECTED')),
+}
+
+
+def count_statuses(statuses):
+    """Contagens no formato de STATUS_COUNTS a partir de uma lista de status já calculados"""
+    return {
+        'total': len(statuses),
+        'approved': statuses.count('APPROVED'),
+        'alert': statuses.count('ALERT'),
+        'rejected': statuses.count('REJECTED'),
+    }
+
+_status_batches = threading.local()
+
+
+class _DeferredStatusBatch:
+    """Amostras com status a recalcular e ações agendadas em um bloco deferred_status"""
+    
+    def __init__(self):
+        self.samples = {}
+        self.callbacks = {}
+    
+    def flush_statuses(self):
+        by_model = {}
+        for (model, _), sample in self.samples.items():
+            by_model.setdefault(model, []).append(sample)
+        for model, samples in by_model.items():
+            model.update_statuses(samples)
+    
+    def run_callbacks(self):
+        for callback in self.callbacks.values():
+            callback()
+
+
+def _defer_status_update(sample):
+    """Registra a amostra no bloco deferred_status ativo; retorna False se não houver"""
+    batch = getattr(_status_batches, 'current', None)
+    if batch is None:
+        return False
+    batch.samples.setdefault((type(sample), sample.pk), sample)
+    return True
+
+
 class SpotSample(models.Model):
     """
     Amostra pontual que agrupa múltiplas análises de propriedades
@@ -194,6 +246,10 @@ class SpotSample(models.Model):
         verbose_name = 'Amostra Pontual'
         verbose_name_plural = 'Amostras Pontuais'
         ordering = ['-date', '-sample_time']
+        indexes = [
+            # Dashboards do turno, consolidado e alocação de sequência: (data, turno[, linha, produto])
+            models.Index(fields=['date', 'shift', 'production_line', 'product'], name='qc_spotsample_key_idx'),
+        ]
         # unique_together = [['date', 'shift', 'production_line', 'product', 'sequence']]
     
     def __str__(self):
@@ -202,45 +258,114 @@ class SpotSample(models.Model):
     def save(self, *args, **kwargs):
         if not self.pk:  # Se é um novo objeto
             # Gerar sequência automática para o dia/turno/linha/produto
-            last_sample = SpotSample.objects.filter(
-                date=self.date,
-                shift=self.shift,
-                production_line=self.production_line,
-                product=self.product
-            ).order_by('-sample_sequence').first()
-            
-            if last_sample:
-                self.sample_sequence = last_sample.sample_sequence + 1
-            else:
-                self.sample_sequence = 1
+            self.sample_sequence = self.next_sample_sequence()
         
         super().save(*args, **kwargs)
     
-    def calculate_overall_status(self):
-        """Calcula o status geral da amostra baseado nas análises"""
-        analyses = self.spotanalysis_set.all()
+    def next_sample_sequence(self):
+        """Próxima sequência do dia/turno/linha/produto, alocada no contador compartilhado"""
+        from .sequences import next_value
         
-        if not analyses.exists():
+        samples = SpotSample.objects.filter(
+            date=self.date,
+            shift_id=self.shift_id,
+            production_line_id=self.production_line_id,
+            product_id=self.product_id
+        )
+        key = self.sequence_key(self.date, self.shift_id, self.production_line_id, self.product_id)
+        
+        # Na primeira vez, o contador parte da maior sequência já gravada
+        return next_value(key, seed=lambda: samples.aggregate(last=Max('sample_sequence'))['last'] or 0)
+    
+    @staticmethod
+    def sequence_key(date, shift_id, production_line_id, product_id):
+        """Chave do SequenceCounter das amostras do dia/turno/linha/produto"""
+        return f"spot_sample:{date}:{shift_id}:{production_line_id}:{product_id}"
+    
+    @staticmethod
+    def status_from_counts(counts):
+        """Status da amostra a partir das contagens de análises por status"""
+        if not counts or not counts['total']:
             return 'PENDENTE'
         
         # Se alguma análise foi rejeitada, a amostra é rejeitada
-        if analyses.filter(status='REJECTED').exists():
+        if counts['rejected']:
             return 'REJECTED'
         
         # Se alguma análise está em alerta, a amostra está em alerta
-        if analyses.filter(status='ALERT').exists():
+        if counts['alert']:
             return 'ALERT'
         
         # Se todas as análises são aprovadas, a amostra é aprovada
-        if analyses.filter(status='APPROVED').exists() and not analyses.exclude(status='APPROVED').exists():
+        if counts['approved'] == counts['total']:
             return 'APPROVED'
         
         return 'PENDENTE'
     
+    def calculate_overall_status(self):
+        """Calcula o status geral da amostra baseado nas análises"""
+        return self.status_from_counts(self.spotanalysis_set.aggregate(**STATUS_COUNTS))
+    
     def update_status(self):
         """Atualiza o status da amostra baseado nas análises"""
+        if _defer_status_update(self):
+            return
         self.status = self.calculate_overall_status()
-        self.save(update_fields=['status'])
+        self.save(update_fields=['status', 'updated_at'])
+    
+    @classmethod
+    def update_statuses(cls, samples):
+        """Recalcula o status de várias amostras com uma única consulta agregada"""
+        samples = list(samples)
+        counts = {
+            row['spot_sample_id']: row
+            for row in SpotAnalysis.objects.filter(spot_sample__in=samples)
+            .values('spot_sample_id').annotate(**STATUS_COUNTS).order_by()
+        }
+        for sample in samples:
+            sample.status = cls.status_from_counts(counts.get(sample.pk))
+            sample.save(update_fields=['status', 'updated_at'])
+    
+    @classmethod
+    @contextmanager
+    def deferred_status(cls):
+        """
+        Adia o recálculo de status das amostras (pontuais e compostas) até o fim do bloco
+        
+        Dentro do bloco, update_status apenas registra a amostra; na saída cada
+        amostra afetada é recalculada uma única vez. Blocos aninhados são
+        incorporados ao mais externo. Se o bloco terminar com exceção, nada é
+        recalculado.
+        
+            with SpotSample.deferred_status():
+                for prop, value in values:
+                    SpotAnalysis.objects.create(spot_sample=sample, property=prop, value=value)
+        """
+        if getattr(_status_batches, 'current', None) is not None:
+            yield
+            return
+        
+        batch = _status_batches.current = _DeferredStatusBatch()
+        try:
+            yield
+            batch.flush_statuses()
+        finally:
+            _status_batches.current = None
+        batch.run_callbacks()
+    
+    @staticmethod
+    def defer_until_status_flush(key, callback):
+        """
+        Agenda uma ação para depois do recálculo de status do bloco deferred_status ativo
+        
+        Ações com a mesma chave são executadas uma única vez. Retorna False se não
+        houver bloco ativo, e a ação deve então ser executada imediatamente.
+        """
+        batch = getattr(_status_batches, 'current', None)
+        if batch is None:
+            return False
+        batch.callbacks.setdefault(key, callback)
+        return True
 
 
 class SpotAnalysis(AuditModel):
@@ -270,6 +395,14 @@ class SpotAnalysis(AuditModel):
         verbose_name = 'Análise Pontual'
         verbose_name_plural = 'Análises Pontuais'
         ordering = ['property__display_order']
+        indexes = [
+            # Motivos de reprovação: poucas linhas, índice parcial pequeno. Os filtros por
+            # (spot_sample, status) e (property, status) já são atendidos pelos índices das FKs
+            models.Index(
+                fields=['spot_sample', 'property'], condition=Q(status='REJECTED'),
+                name='qc_spotanalysis_rejected_idx'
+            ),
+        ]
         # unique_together = [['spot_sample', 'property']]
     
     def __str__(self):
@@ -293,35 +426,11 @@ class SpotAnalysis(AuditModel):
     
     def calculate_status(self):
         """Calcula o status baseado nas especificações do produto e propriedade"""
+        from .specifications import evaluate_status
+        
         try:
-            # Buscar especificação para o produto e propriedade
-            specification = Specification.objects.get(
-                product=self.spot_sample.product,
-                property=self.property,
-                is_active=True
-            )
-            
-            value = float(self.value)
-            
-            # Verificar limites
-            if specification.lsl is not None and value < float(specification.lsl):
-                return 'REJECTED'
-            
-            if specification.usl is not None and value > float(specification.usl):
-                return 'REJECTED'
-            
-            # Verificar alertas (se definidos)
-            if specification.alert_lsl is not None and value < float(specification.alert_lsl):
-                return 'ALERT'
-            
-            if specification.alert_usl is not None and value > float(specification.alert_usl):
-                return 'ALERT'
-            
-            return 'APPROVED'
-            
-        except Specification.DoesNotExist:
-            # Se não há especificação, considerar aprovado
-            return 'APPROVED'
+            # Sem especificação cadastrada, o índice considera aprovado
+            return evaluate_status(self.spot_sample.product_id, self.property_id, self.value)
         except Exception:
             # Em caso de erro, considerar pendente
             return 'PENDENTE'
@@ -362,33 +471,64 @@ class CompositeSample(AuditModel):
         verbose_name = 'Amostra Composta'
         verbose_name_plural = 'Amostras Compostas'
         ordering = ['-date', '-collection_time']
+        indexes = [
+            # Reprovações recentes do dashboard: só as reprovadas entram no índice
+            models.Index(fields=['date'], condition=Q(status='REJECTED'), name='qc_composite_rejected_idx'),
+            # Consolidado por turno e sequência da amostra composta
+            models.Index(fields=['date', 'shift', 'production_line', 'product'], name='qc_composite_key_idx'),
+        ]
         # Removido unique_together para permitir múltiplas amostras no mesmo dia
     
     def __str__(self):
         return f"{self.date} - {self.shift} - {self.production_line} - {self.product.code}"
     
-    def calculate_overall_status(self):
-        """Calcula o status geral baseado nos resultados"""
-        results = CompositeSampleResult.objects.filter(composite_sample=self)
-        
-        if not results.exists():
+    @staticmethod
+    def sequence_key(date, shift_id, production_line_id, product_id):
+        """Chave do SequenceCounter das amostras compostas do dia/turno/linha/produto"""
+        return f"composite_sample:{date}:{shift_id}:{production_line_id}:{product_id}"
+    
+    @staticmethod
+    def status_from_counts(counts):
+        """Status da amostra a partir das contagens de resultados por status"""
+        if not counts or not counts['total']:
             return 'APPROVED'  # Se não há resultados, considerar aprovado
         
         # Se qualquer resultado for rejeitado, a amostra é rejeitada
-        if results.filter(status='REJECTED').exists():
+        if counts['rejected']:
             return 'REJECTED'
         
         # Se qualquer resultado for alerta, a amostra é alerta (se implementado)
-        if results.filter(status='ALERT').exists():
+        if counts['alert']:
             return 'ALERT'
         
         # Se todos os resultados são aprovados, a amostra é aprovada
         return 'APPROVED'
     
+    def calculate_overall_status(self):
+        """Calcula o status geral baseado nos resultados"""
+        return self.status_from_counts(
+            CompositeSampleResult.objects.filter(composite_sample=self).aggregate(**STATUS_COUNTS)
+        )
+    
     def update_status(self):
         """Atualiza o status da amostra baseado nos resultados"""
+        if _defer_status_update(self):
+            return
         self.status = self.calculate_overall_status()
-        self.save(update_fields=['status'])
+        self.save(update_fields=['status', 'updated_at'])
+    
+    @classmethod
+    def update_statuses(cls, samples):
+        """Recalcula o status de várias amostras com uma única consulta agregada"""
+        samples = list(samples)
+        counts = {
+            row['composite_sample_id']: row
+            for row in CompositeSampleResult.objects.filter(composite_sample__in=samples)
+            .values('composite_sample_id').annotate(**STATUS_COUNTS).order_by()
+        }
+        for sample in samples:
+            sample.status = cls.status_from_counts(counts.get(sample.pk))
+            sample.save(update_fields=['status', 'updated_at'])
 
 
 class CompositeSampleResult(AuditModel):
@@ -428,23 +568,72 @@ class CompositeSampleResult(AuditModel):
     
     def calculate_status(self):
         """Calcula o status baseado nas especificações"""
-        try:
-            spec = Specification.objects.get(
-                product=self.composite_sample.product, 
-                property=self.property, 
-                is_active=True
-            )
-            
-            if spec.lsl is not None and self.value < spec.lsl:
-                return 'REJECTED'
-            if spec.usl is not None and self.value > spec.usl:
-                return 'REJECTED'
-            
-            # Pode implementar lógica de alerta aqui (ex: próximo aos limites)
-            return 'APPROVED'
-            
-        except Specification.DoesNotExist:
-            return 'APPROVED'
+        from .specifications import evaluate_status
+        
+        return evaluate_status(self.composite_sample.product_id, self.property_id, self.value)
+
+
+class ShiftQualityRollup(models.Model):
+    """
+    Totais de qualidade por data, turno, linha e produto
+
+    Mantido incrementalmente pelos sinais de SpotSample, SpotAnalysis e
+    CompositeSample (ver rollups.py), para que os dashboards não precisem
+    recontar as análises a cada requisição.
+    """
+    date = models.DateField('Data')
+    shift = models.ForeignKey(Shift, on_delete=models.CASCADE, verbose_name='Turno')
+    production_line = models.ForeignKey(ProductionLine, on_delete=models.CASCADE, verbose_name='Linha de Produção')
+    product = models.ForeignKey(Product, on_delete=models.CASCADE, verbose_name='Produto')
+    
+    # Amostras pontuais (status geral da amostra)
+    spot_samples_total = models.PositiveIntegerField('Amostras Pontuais', default=0)
+    spot_samples_approved = models.PositiveIntegerField('Amostras Aprovadas', default=0)
+    spot_samples_alert = models.PositiveIntegerField('Amostras em Alerta', default=0)
+    spot_samples_rejected = models.PositiveIntegerField('Amostras Reprovadas', default=0)
+    
+    # Análises pontuais (uma por propriedade)
+    spot_analyses_total = models.PositiveIntegerField('Análises Pontuais', default=0)
+    spot_analyses_approved = models.PositiveIntegerField('Análises Aprovadas', default=0)
+    spot_analyses_alert = models.PositiveIntegerField('Análises em Alerta', default=0)
+    spot_analyses_rejected = models.PositiveIntegerField('Análises Reprovadas', default=0)
+    
+    # Amostras compostas
+    composite_samples_total = models.PositiveIntegerField('Amostras Compostas', default=0)
+    composite_samples_approved = models.PositiveIntegerField('Compostas Aprovadas', default=0)
+    composite_samples_alert = models.PositiveIntegerField('Compostas em Alerta', default=0)
+    composite_samples_rejected = models.PositiveIntegerField('Compostas Reprovadas', default=0)
+    
+    updated_at = models.DateTimeField('Atualizado em', auto_now=True)
+    
+    class Meta:
+        verbose_name = 'Consolidado de Qualidade do Turno'
+        verbose_name_plural = 'Consolidados de Qualidade dos Turnos'
+        ordering = ['-date', 'shift', 'production_line', 'product']
+        unique_together = [['date', 'shift', 'production_line', 'product']]
+    
+    def __str__(self):
+        return f"{self.date} - {self.shift} - {self.production_line} - {self.product.code}"
+
+
+class SequenceCounter(models.Model):
+    """
+    Contadores usados na numeração sequencial (amostras, laudos, ordens)
+
+    Incrementados atomicamente por sequences.next_value, para que gravações
+    concorrentes nunca recebam o mesmo número.
+    """
+    key = models.CharField('Chave', max_length=200, unique=True)
+    value = models.PositiveBigIntegerField('Último Valor', default=0)
+    updated_at = models.DateTimeField('Atualizado em', auto_now=True)
+    
+    class Meta:
+        verbose_name = 'Contador de Sequência'
+        verbose_name_plural = 'Contadores de Sequência'
+        ordering = ['key']
+    
+    def __str__(self):
+        return f"{self.key} = {self.value}"
 
 
 class ChemicalAnalysis(AuditModel):
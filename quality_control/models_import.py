@@ -58,6 +58,11 @@ class ImportSession(models.Model):
         ('CANCELLED', 'Cancelado'),
     ]
     
+    MODE_CHOICES = [
+        ('APPEND', 'Incluir como novas amostras'),
+        ('UPSERT', 'Atualizar amostras existentes'),
+    ]
+    
     template = models.ForeignKey(ImportTemplate, on_delete=models.PROTECT)
     user = models.ForeignKey(User, on_delete=models.PROTECT, verbose_name='Usuário')
     
@@ -65,6 +70,10 @@ class ImportSession(models.Model):
     excel_file = models.FileField('Arquivo Excel', upload_to='imports/')
     original_filename = models.CharField('Nome Original', max_length=255)
     
+    # No modo UPSERT as linhas são casadas com as amostras já gravadas pela chave
+    # (data, turno, linha, produto, sequência) e as análises pela propriedade
+    import_mode = models.CharField('Modo de Importação', max_length=10, choices=MODE_CHOICES, default='APPEND')
+    
     # Status e resultados
     status = models.CharField('Status', max_length=20, choices=STATUS_CHOICES, default='PENDING')
     total_rows = models.PositiveIntegerField('Total de Linhas', default=0)
@@ -76,6 +85,10 @@ class ImportSession(models.Model):
     error_log = models.TextField('Log de Erros', blank=True)
     success_log = models.TextField('Log de Sucessos', blank=True)
     
+    # Processamento em segundo plano (comando process_imports)
+    worker = models.CharField('Processado por', max_length=100, blank=True)
+    heartbeat_at = models.DateTimeField('Último Sinal do Processamento', null=True, blank=True)
+    
     # Timestamps
     started_at = models.DateTimeField('Iniciado em', auto_now_add=True)
     completed_at = models.DateTimeField('Concluído em', null=True, blank=True)
@@ -136,36 +136,13 @@ class SpotAnalysisRegistration(models.Model):
         """
         Calcula o resultado da análise baseado nas especificações do produto
         """
-        from .models import Specification
+        from .specifications import evaluate_status
         
-        # Buscar especificações do produto
-        specifications = Specification.objects.filter(
-            product=self.product,
-            is_active=True
-        )
-        
-        if not specifications.exists():
-            # Se não há especificações, manter como aprovado
-            return 'APPROVED'
-        
-        # Verificar cada propriedade analisada
+        # Verificar cada propriedade analisada; sem especificação, o índice considera aprovado
         for property_result in self.property_results.all():
-            try:
-                # Buscar especificação para esta propriedade
-                spec = specifications.filter(property=property_result.property).first()
-                
-                if spec:
-                    value = property_result.value
-                    
-                    # Verificar limites
-                    if spec.lsl is not None and value < spec.lsl:
-                        return 'REJECTED'  # Abaixo do limite inferior
-                    if spec.usl is not None and value > spec.usl:
-                        return 'REJECTED'  # Acima do limite superior
-                        
-            except Exception:
-                # Em caso de erro, manter como aprovado
-                continue
+            status = evaluate_status(self.product_id, property_result.property_id, property_result.value)
+            if status == 'REJECTED':
+                return 'REJECTED'
         
         # Se chegou até aqui, está dentro dos limites
         return 'APPROVED'
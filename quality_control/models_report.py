@@ -103,6 +103,13 @@ class GeneratedReport(models.Model):
         ('APPROVED', 'Aprovado'),
     ]
     
+    RENDER_STATUS_CHOICES = [
+        ('PENDING', 'Na Fila'),
+        ('RENDERING', 'Renderizando'),
+        ('READY', 'Pronto'),
+        ('FAILED', 'Falhou'),
+    ]
+    
     template = models.ForeignKey(ReportTemplate, on_delete=models.PROTECT)
     title = models.CharField('Título', max_length=200)
     report_number = models.CharField('Número do Laudo', max_length=50, unique=True)
@@ -119,6 +126,14 @@ class GeneratedReport(models.Model):
     # Arquivo gerado
     pdf_file = models.FileField('Arquivo PDF', upload_to='reports/', null=True, blank=True)
     
+    # Renderização em segundo plano (fila do comando process_reports)
+    render_status = models.CharField('Status da Renderização', max_length=20, choices=RENDER_STATUS_CHOICES, default='PENDING')
+    render_requested_at = models.DateTimeField('Renderização Solicitada em', null=True, blank=True)
+    rendered_at = models.DateTimeField('Renderizado em', null=True, blank=True)
+    render_error = models.TextField('Erro da Renderização', blank=True)
+    worker = models.CharField('Renderizado por', max_length=100, blank=True)
+    heartbeat_at = models.DateTimeField('Último Sinal da Renderização', null=True, blank=True)
+    
     class Meta:
         verbose_name = 'Laudo Gerado'
         verbose_name_plural = 'Laudos Gerados'
@@ -126,9 +141,3 @@ class GeneratedReport(models.Model):
     
     def __str__(self):
         return f"{self.report_number} - {self.title}"
-
-
-
-
-
-
@@ -0,0 +1,161 @@
+"""
+Estilos e recursos compartilhados pelos PDFs de laudos
+
+Folha de estilos, estilos de parágrafo, estilos de tabela e o logotipo são
+montados na primeira utilização e reaproveitados por todos os geradores do
+processo, em vez de reconstruídos a cada laudo. Os objetos não são alterados
+durante a renderização (Table.setStyle copia os comandos do TableStyle), então
+o compartilhamento é seguro também entre threads.
+
+As funções build_* montam os objetos sem cache e são usadas pelos acessores
+com cache e pelo benchmark da geração de PDF.
+"""
+
+import os
+import threading
+from functools import lru_cache
+from io import BytesIO
+from typing import NamedTuple
+
+from django.conf import settings
+from reportlab.lib import colors
+from reportlab.lib.enums import TA_CENTER
+from reportlab.lib.styles import ParagraphStyle, getSampleStyleSheet
+from reportlab.lib.utils import ImageReader
+from reportlab.platypus import Flowable, TableStyle
+
+
+FONT = 'Helvetica'
+FONT_BOLD = 'Helvetica-Bold'
+
+
+class PDFStyles(NamedTuple):
+    """Folha de estilos base e estilos de parágrafo dos laudos"""
+    sheet: object
+    title: ParagraphStyle
+    subtitle: ParagraphStyle
+    normal: ParagraphStyle
+
+
+def build_styles():
+    sheet = getSampleStyleSheet()
+    return PDFStyles(
+        sheet=sheet,
+        title=ParagraphStyle(
+            'CustomTitle', parent=sheet['Heading1'], fontSize=18, spaceAfter=30,
+            alignment=TA_CENTER, textColor=colors.darkblue
+        ),
+        subtitle=ParagraphStyle(
+            'CustomSubtitle', parent=sheet['Heading2'], fontSize=14, spaceAfter=12, textColor=colors.darkblue
+        ),
+        normal=ParagraphStyle('CustomNormal', parent=sheet['Normal'], fontSize=10, spaceAfter=6),
+    )
+
+
+def _data_table_commands(font_size):
+    """Tabela com cabeçalho destacado e linhas alternadas (resultados, especificações)"""
+    return [
+        ('BACKGROUND', (0, 0), (-1, 0), colors.darkblue),
+        ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
+        ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
+        ('FONTNAME', (0, 0), (-1, 0), FONT_BOLD),
+        ('FONTNAME', (0, 1), (-1, -1), FONT),
+        ('FONTSIZE', (0, 0), (-1, -1), font_size),
+        ('GRID', (0, 0), (-1, -1), 1, colors.black),
+        ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
+        ('ROWBACKGROUNDS', (0, 1), (-1, -1), [colors.white, colors.lightgrey]),
+    ]
+
+
+TABLE_STYLES = {
+    # Pares rótulo/valor (informações do laudo, do produto e responsáveis)
+    'info': lambda: [
+        ('BACKGROUND', (0, 0), (0, -1), colors.lightgrey),
+        ('TEXTCOLOR', (0, 0), (-1, -1), colors.black),
+        ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
+        ('FONTNAME', (0, 0), (0, -1), FONT_BOLD),
+        ('FONTNAME', (1, 0), (1, -1), FONT),
+        ('FONTSIZE', (0, 0), (-1, -1), 10),
+        ('GRID', (0, 0), (-1, -1), 1, colors.black),
+        ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
+    ],
+    'results': lambda: _data_table_commands(9),
+    'specifications': lambda: _data_table_commands(8),
+}
+
+
+def build_table_style(name):
+    return TableStyle(TABLE_STYLES[name]())
+
+
+@lru_cache(maxsize=None)
+def styles():
+    """Estilos de parágrafo compartilhados"""
+    return build_styles()
+
+
+@lru_cache(maxsize=None)
+def table_style(name):
+    """TableStyle compartilhado ('info', 'results' ou 'specifications')"""
+    return build_table_style(name)
+
+
+def logo_path():
+    return os.path.join(settings.STATIC_ROOT or settings.STATICFILES_DIRS[0], 'images', 'logo.png')
+
+
+_logo_lock = threading.Lock()
+_logo_cache = {}
+
+
+def logo_reader():
+    """
+    ImageReader do logotipo, lido e decodificado uma vez; None se não houver logotipo
+
+    A data de modificação faz parte da chave, então um logotipo substituído é relido.
+    """
+    path = logo_path()
+    try:
+        key = (path, os.stat(path).st_mtime_ns)
+    except OSError:
+        return None
+    with _logo_lock:
+        if key not in _logo_cache:
+            with open(path, 'rb') as f:
+                reader = ImageReader(BytesIO(f.read()))
+            # Decodifica agora, fora da renderização
+            reader.getRGBData()
+            _logo_cache.clear()
+            _logo_cache[key] = reader
+        return _logo_cache[key]
+
+
+class SharedImage(Flowable):
+    """Imagem de tamanho fixo desenhada a partir de um ImageReader compartilhado"""
+
+    def __init__(self, reader, width, height, hAlign='CENTER'):
+        super().__init__()
+        self.hAlign = hAlign
+        self.reader = reader
+        self.width = width
+        self.height = height
+
+    def wrap(self, available_width, available_height):
+        return self.width, self.height
+
+    def draw(self):
+        self.canv.drawImage(self.reader, 0, 0, self.width, self.height, mask='auto')
+
+
+def logo_image(width, height):
+    """Flowable do logotipo, ou None se não houver logotipo"""
+    reader = logo_reader()
+    return SharedImage(reader, width, height) if reader is not None else None
+
+
+def clear():
+    """Descarta os objetos em cache (ex.: após trocar as configurações nos testes)"""
+    styles.cache_clear()
+    table_style.cache_clear()
+    with _logo_lock:
+        _logo_cache.clear()
@@ -0,0 +1,75 @@
+"""
+Geração em lote dos PDFs de laudos
+
+Os laudos de um embarque são lidos de uma vez (com as relações pré-carregadas)
+e renderizados em um pool de processos, já que a montagem do documento no
+ReportLab é limitada pela CPU. O resultado pode ser reunido em um único ZIP.
+"""
+
+import multiprocessing
+import os
+import zipfile
+from concurrent.futures import ProcessPoolExecutor
+from time import monotonic
+from typing import NamedTuple
+
+from django.db import connections
+
+
+class BatchResult(NamedTuple):
+    """Arquivos gerados (nome no ZIP, caminho) e tempo total em segundos"""
+    files: list
+    seconds: float
+
+    @property
+    def rate(self):
+        """Laudos por segundo"""
+        return len(self.files) / self.seconds if self.seconds else 0.0
+
+
+def render_all(items, render, workers=None):
+    """
+    Aplica render a cada item e retorna os resultados na ordem dos itens
+
+    Com mais de um worker os itens são enviados (por pickle) a processos
+    criados por fork, que herdam a configuração do Django; cada processo abre
+    a sua conexão com o banco.
+    """
+    items = list(items)
+    workers = min(workers or os.cpu_count() or 1, len(items))
+    if workers <= 1:
+        return [render(item) for item in items]
+
+    chunksize = max(1, len(items) // (workers * 4))
+    context = multiprocessing.get_context('fork')
+    with ProcessPoolExecutor(max_workers=workers, mp_context=context, initializer=_discard_connections) as executor:
+        return list(executor.map(render, items, chunksize=chunksize))
+
+
+# Conexões herdadas do processo pai, mantidas referenciadas no processo filho
+_inherited_connections = []
+
+
+def _discard_connections():
+    # As conexões herdadas são descartadas sem fechar (nem coletar): fechá-las no
+    # processo filho encerraria também a do processo pai (ex.: socket do PostgreSQL)
+    for connection in connections.all(initialized_only=True):
+        _inherited_connections.append(connection.connection)
+        connection.connection = None
+
+
+def write_zip(files, output):
+    """Reúne os arquivos (nome no ZIP, caminho) em um ZIP; output é um caminho ou arquivo aberto"""
+    with zipfile.ZipFile(output, 'w', compression=zipfile.ZIP_DEFLATED) as archive:
+        for name, path in files:
+            archive.write(path, arcname=name)
+    return output
+
+
+def run_batch(items, render, workers=None, output=None):
+    """Renderiza os itens em paralelo, grava o ZIP se pedido e mede o tempo"""
+    start = monotonic()
+    files = render_all(items, render, workers)
+    if output is not None:
+        write_zip(files, output)
+    return BatchResult(files, monotonic() - start)
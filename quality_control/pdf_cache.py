@@ -0,0 +1,72 @@
+"""
+Cache em disco dos PDFs de laudos, endereçado pelo conteúdo
+
+O arquivo de cada laudo é gravado como <prefixo>_<chave>.pdf, em que a chave é
+o SHA-256 dos dados usados na renderização (análises, especificações, estado de
+aprovação e versão do modelo do documento). Enquanto esses dados não mudam, os
+downloads seguintes só leem o arquivo; qualquer alteração gera outra chave, e o
+arquivo antigo do mesmo prefixo é removido ao gravar o novo.
+"""
+
+import hashlib
+import json
+import os
+import tempfile
+from pathlib import Path
+
+from django.conf import settings
+
+
+def content_key(data):
+    """SHA-256 de uma estrutura serializável (datas e decimais viram texto)"""
+    payload = json.dumps(data, sort_keys=True, default=str, separators=(',', ':'))
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+def cache_dir():
+    return Path(getattr(settings, 'REPORT_PDF_CACHE_DIR', None) or Path(settings.MEDIA_ROOT) / 'reports' / 'cache')
+
+
+def cached_path(prefix, key):
+    """Caminho do PDF em cache, ou None se ainda não foi gerado"""
+    path = cache_dir() / f'{prefix}_{key}.pdf'
+    return path if path.exists() else None
+
+
+def store(prefix, key, content):
+    """
+    Grava o PDF (bytes ou arquivo em memória) e remove as versões anteriores do prefixo
+
+    A gravação é atômica: um download simultâneo vê o arquivo completo ou nenhum.
+    """
+    directory = cache_dir()
+    directory.mkdir(parents=True, exist_ok=True)
+    if not isinstance(content, bytes):
+        content = content.getvalue()
+
+    path = directory / f'{prefix}_{key}.pdf'
+    fd, temp_path = tempfile.mkstemp(dir=directory, prefix=f'.{prefix}_', suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(content)
+        os.replace(temp_path, path)
+    except BaseException:
+        os.unlink(temp_path)
+        raise
+
+    for stale in directory.glob(f'{prefix}_*.pdf'):
+        if stale != path:
+            stale.unlink(missing_ok=True)
+    return path
+
+
+def get_or_render(prefix, key, render):
+    """
+    Caminho do PDF da chave; render() só é chamado quando não há arquivo em cache
+
+    Retorna (caminho, True se veio do cache).
+    """
+    path = cached_path(prefix, key)
+    if path is not None:
+        return path, True
+    return store(prefix, key, render()), False
@@ -6,7 +6,7 @@ import os
 from io import BytesIO
 from django.template.loader import render_to_string
 from django.conf import settings
-from django.core.files.base import ContentFile
+from django.utils import timezone
 from reportlab.pdfgen import canvas
 from reportlab.lib.pagesizes import A4, letter
 from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
@@ -18,7 +18,12 @@ from datetime import datetime
 import qrcode
 from PIL import Image as PILImage
 
-from .report_models import QualityReport, ReportTemplate
+from . import pdf_assets, pdf_batch, pdf_cache
+from .models import CompositeSampleResult, QualityReport
+
+
+# Versão do layout do documento; incrementar ao mudar a renderização invalida os PDFs em cache
+TEMPLATE_VERSION = 1
 
 
 class PDFReportGenerator:
@@ -37,33 +42,14 @@ class PDFReportGenerator:
             topMargin=30*mm,
             bottomMargin=30*mm
         )
-        self.styles = getSampleStyleSheet()
         self.story = []
         
-        # Estilos personalizados
-        self.title_style = ParagraphStyle(
-            'CustomTitle',
-            parent=self.styles['Heading1'],
-            fontSize=18,
-            spaceAfter=30,
-            alignment=TA_CENTER,
-            textColor=colors.darkblue
-        )
-        
-        self.subtitle_style = ParagraphStyle(
-            'CustomSubtitle',
-            parent=self.styles['Heading2'],
-            fontSize=14,
-            spaceAfter=12,
-            textColor=colors.darkblue
-        )
-        
-        self.normal_style = ParagraphStyle(
-            'CustomNormal',
-            parent=self.styles['Normal'],
-            fontSize=10,
-            spaceAfter=6
-        )
+        # Estilos compartilhados entre os laudos (montados uma vez por processo)
+        shared_styles = pdf_assets.styles()
+        self.styles = shared_styles.sheet
+        self.title_style = shared_styles.title
+        self.subtitle_style = shared_styles.subtitle
+        self.normal_style = shared_styles.normal
     
     def generate_pdf(self) -> BytesIO:
         """
@@ -74,7 +60,6 @@ class PDFReportGenerator:
         self._add_product_info()
         self._add_analysis_results()
         self._add_specifications_compliance()
-        self._add_observations()
         self._add_signatures()
         self._add_footer()
         
@@ -87,10 +72,9 @@ class PDFReportGenerator:
     
     def _add_header(self):
         """Adiciona cabeçalho do laudo"""
-        # Logo da empresa (se existir)
-        logo_path = os.path.join(settings.STATIC_ROOT or settings.STATICFILES_DIRS[0], 'images', 'logo.png')
-        if os.path.exists(logo_path):
-            logo = Image(logo_path, width=60*mm, height=30*mm)
+        # Logo da empresa (se existir), lido e decodificado uma vez por processo
+        logo = pdf_assets.logo_image(60*mm, 30*mm)
+        if logo is not None:
             self.story.append(logo)
             self.story.append(Spacer(1, 12))
         
@@ -111,68 +95,46 @@ class PDFReportGenerator:
         
         # Dados em tabela
         data = [
-            ['Data de Emissão:', datetime.now().strftime('%d/%m/%Y %H:%M')],
-            ['Período de Análise:', f"{self.report.start_date.strftime('%d/%m/%Y')} a {self.report.end_date.strftime('%d/%m/%Y')}"],
-            ['Linha de Produção:', self.report.production_line.name],
+            ['Data do Laudo:', self.report.date.strftime('%d/%m/%Y')],
+            ['Planta:', self.report.plant.name],
+            ['Tipo de Carregamento:', self.report.get_loading_type_display()],
             ['Status:', self.report.get_status_display()],
+            ['Quantidade Total:', f"{self.report.total_quantity} kg"],
         ]
         
-        if self.report.batch_number:
-            data.append(['Número do Lote:', self.report.batch_number])
-        
-        if self.report.quantity:
-            data.append(['Quantidade:', f"{self.report.quantity} toneladas"])
+        if self.report.invoice_number:
+            data.append(['Nota Fiscal:', self.report.invoice_number])
         
         table = Table(data, colWidths=[60*mm, 100*mm])
-        table.setStyle(TableStyle([
-            ('BACKGROUND', (0, 0), (0, -1), colors.lightgrey),
-            ('TEXTCOLOR', (0, 0), (-1, -1), colors.black),
-            ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
-            ('FONTNAME', (0, 0), (0, -1), 'Helvetica-Bold'),
-            ('FONTNAME', (1, 0), (1, -1), 'Helvetica'),
-            ('FONTSIZE', (0, 0), (-1, -1), 10),
-            ('GRID', (0, 0), (-1, -1), 1, colors.black),
-            ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
-        ]))
+        table.setStyle(pdf_assets.table_style('info'))
         
         self.story.append(table)
         self.story.append(Spacer(1, 20))
     
     def _add_product_info(self):
-        """Adiciona informações do produto"""
+        """Adiciona informações do produto e do carregamento"""
         subtitle = Paragraph("INFORMAÇÕES DO PRODUTO", self.subtitle_style)
         self.story.append(subtitle)
         
         data = [
             ['Produto:', self.report.product.name],
             ['Código:', self.report.product.code],
-            ['Categoria:', self.report.product.get_category_display()],
         ]
         
         if self.report.product.description:
             data.append(['Descrição:', self.report.product.description])
         
-        # Informações do cliente
-        if self.report.customer_name:
-            data.append(['Cliente:', self.report.customer_name])
+        # Informações do cliente e do transporte
+        data.append(['Cliente:', self.report.client_name])
         
-        if self.report.customer_document:
-            data.append(['CNPJ/CPF:', self.report.customer_document])
+        if self.report.driver_name:
+            data.append(['Motorista:', self.report.driver_name])
         
-        if self.report.destination:
-            data.append(['Destino:', self.report.destination])
+        if self.report.truck_plate:
+            data.append(['Placa do Caminhão:', self.report.truck_plate])
         
         table = Table(data, colWidths=[60*mm, 100*mm])
-        table.setStyle(TableStyle([
-            ('BACKGROUND', (0, 0), (0, -1), colors.lightgrey),
-            ('TEXTCOLOR', (0, 0), (-1, -1), colors.black),
-            ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
-            ('FONTNAME', (0, 0), (0, -1), 'Helvetica-Bold'),
-            ('FONTNAME', (1, 0), (1, -1), 'Helvetica'),
-            ('FONTSIZE', (0, 0), (-1, -1), 10),
-            ('GRID', (0, 0), (-1, -1), 1, colors.black),
-            ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
-        ]))
+        table.setStyle(pdf_assets.table_style('info'))
         
         self.story.append(table)
         self.story.append(Spacer(1, 20))
@@ -182,13 +144,13 @@ class PDFReportGenerator:
         subtitle = Paragraph("RESULTADOS DAS ANÁLISES", self.subtitle_style)
         self.story.append(subtitle)
         
-        # Análises pontuais
-        spot_analyses = self.report.spot_analyses.all().order_by('property__category', 'property__identifier')
+        # Resultados das amostras compostas do laudo
+        results = self._results()
         
-        if spot_analyses.exists():
+        if results:
             # Agrupar por propriedade
             properties_data = {}
-            for analysis in spot_analyses:
+            for analysis in results:
                 prop_key = f"{analysis.property.identifier} - {analysis.property.name}"
                 if prop_key not in properties_data:
                     properties_data[prop_key] = {
@@ -215,21 +177,11 @@ class PDFReportGenerator:
                 ])
             
             table = Table(data, colWidths=[50*mm, 20*mm, 40*mm, 25*mm, 25*mm])
-            table.setStyle(TableStyle([
-                ('BACKGROUND', (0, 0), (-1, 0), colors.darkblue),
-                ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
-                ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
-                ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-                ('FONTNAME', (0, 1), (-1, -1), 'Helvetica'),
-                ('FONTSIZE', (0, 0), (-1, -1), 9),
-                ('GRID', (0, 0), (-1, -1), 1, colors.black),
-                ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
-                ('ROWBACKGROUNDS', (0, 1), (-1, -1), [colors.white, colors.lightgrey]),
-            ]))
+            table.setStyle(pdf_assets.table_style('results'))
             
             self.story.append(table)
         else:
-            no_data = Paragraph("Nenhuma análise pontual encontrada.", self.normal_style)
+            no_data = Paragraph("Nenhum resultado de amostra composta encontrado.", self.normal_style)
             self.story.append(no_data)
         
         self.story.append(Spacer(1, 20))
@@ -240,16 +192,20 @@ class PDFReportGenerator:
         self.story.append(subtitle)
         
         # Buscar especificações do produto
-        specifications = self.report.product.specification_set.all()
+        specifications = self._specifications()
         
-        if specifications.exists():
+        if specifications:
             data = [['Propriedade', 'LIE', 'Alvo', 'LSE', 'Resultado', 'Status']]
             
+            analyses_by_property = {}
+            for analysis in self._results():
+                analyses_by_property.setdefault(analysis.property_id, []).append(analysis)
+            
             for spec in specifications:
-                # Buscar análises desta propriedade
-                analyses = self.report.spot_analyses.filter(property=spec.property)
+                # Análises desta propriedade
+                analyses = analyses_by_property.get(spec.property_id, [])
                 
-                if analyses.exists():
+                if analyses:
                     values = [a.value for a in analyses]
                     mean_value = sum(values) / len(values)
                     
@@ -274,17 +230,7 @@ class PDFReportGenerator:
             
             if len(data) > 1:  # Se há dados além do cabeçalho
                 table = Table(data, colWidths=[40*mm, 20*mm, 20*mm, 20*mm, 25*mm, 35*mm])
-                table.setStyle(TableStyle([
-                    ('BACKGROUND', (0, 0), (-1, 0), colors.darkblue),
-                    ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
-                    ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
-                    ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-                    ('FONTNAME', (0, 1), (-1, -1), 'Helvetica'),
-                    ('FONTSIZE', (0, 0), (-1, -1), 8),
-                    ('GRID', (0, 0), (-1, -1), 1, colors.black),
-                    ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
-                    ('ROWBACKGROUNDS', (0, 1), (-1, -1), [colors.white, colors.lightgrey]),
-                ]))
+                table.setStyle(pdf_assets.table_style('specifications'))
                 
                 self.story.append(table)
             else:
@@ -296,16 +242,36 @@ class PDFReportGenerator:
         
         self.story.append(Spacer(1, 20))
     
-    def _add_observations(self):
-        """Adiciona observações"""
-        if self.report.observations:
-            subtitle = Paragraph("OBSERVAÇÕES", self.subtitle_style)
-            self.story.append(subtitle)
-            
-            observations = Paragraph(self.report.observations, self.normal_style)
-            self.story.append(observations)
-            
-            self.story.append(Spacer(1, 20))
+    def _results(self):
+        """
+        Resultados das amostras compostas do laudo ordenados por categoria e identificador da propriedade
+
+        Usa os resultados pré-carregados (prefetch_reports) quando houver; lidos uma vez por gerador.
+        """
+        if not hasattr(self, '_results_cache'):
+            if _is_prefetched(self.report, 'composite_samples'):
+                results = [
+                    result
+                    for sample in self.report.composite_samples.all()
+                    for result in sample.compositesampleresult_set.all()
+                ]
+            else:
+                results = CompositeSampleResult.objects.filter(
+                    composite_sample__qualityreport=self.report
+                ).select_related('property')
+            self._results_cache = sorted(
+                results, key=lambda a: (a.property.category, a.property.identifier, a.id)
+            )
+        return self._results_cache
+    
+    def _specifications(self):
+        """Especificações do produto (pré-carregadas quando houver)"""
+        if not hasattr(self, '_specifications_cache'):
+            specifications = self.report.product.specification_set.all()
+            if not _is_prefetched(self.report.product, 'specification_set'):
+                specifications = specifications.select_related('property')
+            self._specifications_cache = sorted(specifications, key=lambda spec: spec.id)
+        return self._specifications_cache
     
     def _add_signatures(self):
         """Adiciona área de assinaturas"""
@@ -314,27 +280,18 @@ class PDFReportGenerator:
         
         # Dados dos responsáveis
         data = [
-            ['Elaborado por:', self.report.created_by.get_full_name() or self.report.created_by.username],
-            ['Data de Elaboração:', self.report.created_at.strftime('%d/%m/%Y %H:%M')],
+            ['Elaborado por:', _user_name(self.report.created_by)],
+            ['Data de Elaboração:', timezone.localtime(self.report.created_at).strftime('%d/%m/%Y %H:%M')],
         ]
         
         if self.report.approved_by:
             data.extend([
-                ['Aprovado por:', self.report.approved_by.get_full_name() or self.report.approved_by.username],
-                ['Data de Aprovação:', self.report.approved_at.strftime('%d/%m/%Y %H:%M') if self.report.approved_at else '-'],
+                ['Aprovado por:', _user_name(self.report.approved_by)],
+                ['Data de Aprovação:', timezone.localtime(self.report.approved_at).strftime('%d/%m/%Y %H:%M') if self.report.approved_at else '-'],
             ])
         
         table = Table(data, colWidths=[60*mm, 100*mm])
-        table.setStyle(TableStyle([
-            ('BACKGROUND', (0, 0), (0, -1), colors.lightgrey),
-            ('TEXTCOLOR', (0, 0), (-1, -1), colors.black),
-            ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
-            ('FONTNAME', (0, 0), (0, -1), 'Helvetica-Bold'),
-            ('FONTNAME', (1, 0), (1, -1), 'Helvetica'),
-            ('FONTSIZE', (0, 0), (-1, -1), 10),
-            ('GRID', (0, 0), (-1, -1), 1, colors.black),
-            ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
-        ]))
+        table.setStyle(pdf_assets.table_style('info'))
         
         self.story.append(table)
         self.story.append(Spacer(1, 40))
@@ -366,26 +323,94 @@ class PDFReportGenerator:
         text = f"Página {page_num}"
         canvas.drawRightString(200*mm, 20*mm, text)
     
-    def save_pdf_to_report(self):
-        """Salva o PDF gerado no modelo QualityReport"""
-        pdf_buffer = self.generate_pdf()
-        
-        # Criar nome do arquivo
-        filename = f"laudo_{self.report.report_number}.pdf"
-        
-        # Salvar no modelo
-        self.report.pdf_file.save(
-            filename,
-            ContentFile(pdf_buffer.getvalue()),
-            save=True
+    def cache_key(self):
+        """
+        Chave do PDF em cache: hash de tudo que aparece no documento
+
+        Usa as mesmas análises e especificações lidas para o documento, sem montá-lo.
+        """
+        report = self.report
+        product = report.product
+        analyses = sorted(
+            (a.id, a.property_id, a.property.identifier, a.property.name, a.property.unit,
+             a.property.category, a.value)
+            for a in self._results()
         )
-        
-        return self.report.pdf_file
+        specifications = [
+            (spec.property_id, spec.lsl, spec.target, spec.usl) for spec in self._specifications()
+        ]
+        return pdf_cache.content_key({
+            'template': TEMPLATE_VERSION,
+            'report': [
+                report.report_number, report.status, report.date, report.plant.name,
+                report.loading_type, report.total_quantity, report.invoice_number,
+                report.client_name, report.driver_name, report.truck_plate,
+                _user_name(report.created_by), report.created_at,
+                _user_name(report.approved_by), report.approved_at,
+            ],
+            'product': [product.name, product.code, product.description],
+            'analyses': analyses,
+            'specifications': specifications,
+        })
+
+    def cached_pdf(self):
+        """
+        Caminho do PDF do laudo, gerado só quando os dados mudaram desde a última vez
+
+        Retorna (caminho, True se veio do cache).
+        """
+        return pdf_cache.get_or_render(
+            f"laudo_{self.report.report_number}", self.cache_key(), self.generate_pdf
+        )
+
+
+def cached_quality_report_pdf(quality_report: QualityReport):
+    """
+    Função utilitária para obter o PDF de um laudo pelo cache em disco
+    """
+    return PDFReportGenerator(quality_report).cached_pdf()[0]
+
+
+def _user_name(user):
+    if user is None:
+        return '-'
+    return user.get_full_name() or user.username
 
 
-def generate_quality_report_pdf(quality_report: QualityReport):
+def _is_prefetched(instance, name):
+    return name in getattr(instance, '_prefetched_objects_cache', {})
+
+
+def prefetch_reports(report_ids):
+    """
+    Laudos com tudo que o PDF usa carregado em bloco (consultas fixas, não por laudo)
+
+    Levanta QualityReport.DoesNotExist com os IDs que não existem.
     """
-    Função utilitária para gerar PDF de um laudo
+    reports = {
+        report.pk: report
+        for report in QualityReport.objects.filter(pk__in=report_ids).select_related(
+            'product', 'plant', 'created_by', 'approved_by'
+        ).prefetch_related(
+            'composite_samples__compositesampleresult_set__property', 'product__specification_set__property'
+        )
+    }
+    missing = [pk for pk in report_ids if pk not in reports]
+    if missing:
+        raise QualityReport.DoesNotExist(f"Laudos não encontrados: {', '.join(map(str, missing))}")
+    return [reports[pk] for pk in dict.fromkeys(report_ids)]
+
+
+def render_report_file(quality_report: QualityReport):
+    """PDF do laudo pelo cache em disco; retorna (nome do arquivo, caminho)"""
+    path = PDFReportGenerator(quality_report).cached_pdf()[0]
+    return f"laudo_{quality_report.report_number}.pdf", str(path)
+
+
+def generate_quality_report_pdfs(report_ids, output=None, workers=None):
+    """
+    Gera os PDFs de vários laudos em paralelo (pdf_batch.BatchResult)
+
+    Com output (caminho ou arquivo aberto) os PDFs são reunidos em um ZIP.
     """
-    generator = PDFReportGenerator(quality_report)
-    return generator.save_pdf_to_report()
+    return pdf_batch.run_batch(prefetch_reports(report_ids), render_report_file, workers, output)
@@ -186,14 +186,16 @@ class QualityReport(models.Model):
     
     def generate_report_number(self):
         """Gera número único do laudo"""
+        from .sequences import next_value
+        
         year = timezone.now().year
         month = timezone.now().month
         
-        # Contar laudos do mês atual
-        count = QualityReport.objects.filter(
-            created_at__year=year,
-            created_at__month=month
-        ).count() + 1
+        # Contador mensal; na primeira vez parte do número de laudos já criados no mês
+        count = next_value(
+            f"quality_report:{year}{month:02d}",
+            seed=lambda: QualityReport.objects.filter(created_at__year=year, created_at__month=month).count()
+        )
         
         return f"LQ{year}{month:02d}{count:04d}"
     
@@ -344,14 +346,16 @@ class LoadingOrder(models.Model):
     
     def generate_order_number(self):
         """Gera número único da ordem"""
+        from .sequences import next_value
+        
         year = timezone.now().year
         month = timezone.now().month
         
-        # Contar ordens do mês atual
-        count = LoadingOrder.objects.filter(
-            created_at__year=year,
-            created_at__month=month
-        ).count() + 1
+        # Contador mensal; na primeira vez parte do número de ordens já criadas no mês
+        count = next_value(
+            f"loading_order:{year}{month:02d}",
+            seed=lambda: LoadingOrder.objects.filter(created_at__year=year, created_at__month=month).count()
+        )
         
         return f"OC{year}{month:02d}{count:04d}"
     
@@ -0,0 +1,178 @@
+"""
+Fila de renderização dos laudos gerados
+
+Como na fila de importações, a requisição apenas cria (ou atualiza) o
+GeneratedReport como PENDING e retorna; o comando process_reports assume os
+laudos pendentes com um UPDATE condicional (PENDING → RENDERING) e grava o PDF.
+O cliente consulta o andamento pela API de status e baixa o arquivo quando o
+laudo fica READY, sem que a montagem do PDF ocupe o worker web.
+
+Um laudo pedido de novo durante a renderização volta para PENDING; o worker
+que o renderizava descarta o arquivo produzido, porque ele já está
+desatualizado. Renderizar de novo não tem efeito colateral, então laudos sem
+sinal do worker há mais de REPORT_RENDER_STALE_AFTER segundos voltam para a
+fila em vez de serem marcados como falha.
+"""
+
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.utils import timezone
+
+from .import_queue import worker_name
+from .models_report import GeneratedReport
+from .report_render import render_generated_report
+from .sequences import next_value
+
+
+# Laudos pendentes examinados por tentativa de claim
+CLAIM_BATCH = 10
+
+
+def _next_report_number():
+    now = timezone.localtime()
+    prefix = f'LG{now.year}{now.month:02d}'
+    count = next_value(
+        f'generated_report:{now.year}{now.month:02d}',
+        seed=lambda: GeneratedReport.objects.filter(report_number__startswith=prefix).count()
+    )
+    return f'{prefix}{count:04d}'
+
+
+def request_render(template, user, spot_analysis=None, composite_sample=None, title=''):
+    """
+    Cria ou atualiza o laudo da amostra com o template e o coloca na fila
+
+    Informe a análise pontual ou a amostra composta (uma das duas).
+    """
+    if (spot_analysis is None) == (composite_sample is None):
+        raise ValueError('Informe uma análise pontual ou uma amostra composta')
+
+    now = timezone.now()
+    report = GeneratedReport.objects.filter(
+        template=template, spot_analysis=spot_analysis, composite_sample=composite_sample
+    ).order_by('id').first()
+
+    if report is None:
+        sample = composite_sample or spot_analysis.spot_sample
+        report = GeneratedReport.objects.create(
+            template=template,
+            title=title or (f'{sample.product.name} - {sample.date:%d/%m/%Y}' if sample else template.name),
+            report_number=_next_report_number(),
+            spot_analysis=spot_analysis,
+            composite_sample=composite_sample,
+            generated_by=user,
+            render_status='PENDING',
+            render_requested_at=now,
+        )
+    else:
+        changes = {'render_status': 'PENDING', 'render_requested_at': now, 'render_error': ''}
+        if title:
+            changes['title'] = title
+        GeneratedReport.objects.filter(pk=report.pk).update(**changes)
+        report.refresh_from_db()
+
+    enqueue(report)
+    return report
+
+
+def enqueue(report):
+    """
+    Coloca o laudo na fila
+
+    O laudo já está PENDING; com REPORT_RENDER_INLINE (padrão) o PDF é gerado
+    imediatamente, na própria requisição.
+    """
+    if getattr(settings, 'REPORT_RENDER_INLINE', True):
+        claimed = _claim(report.pk, worker_name())
+        if claimed is not None:
+            render_report(claimed)
+            report.refresh_from_db()
+
+
+def _claim(report_id, worker):
+    claimed = GeneratedReport.objects.filter(id=report_id, render_status='PENDING').update(
+        render_status='RENDERING', worker=worker, heartbeat_at=timezone.now()
+    )
+    if not claimed:
+        return None
+    return GeneratedReport.objects.select_related('template', 'generated_by').get(id=report_id)
+
+
+def claim_next(worker=None):
+    """Assume o laudo pendente mais antigo; retorna None se a fila estiver vazia"""
+    worker = worker or worker_name()
+    pending = GeneratedReport.objects.filter(render_status='PENDING').order_by('render_requested_at', 'id')
+
+    for report_id in pending.values_list('id', flat=True)[:CLAIM_BATCH]:
+        # None: outro worker assumiu o laudo primeiro
+        report = _claim(report_id, worker)
+        if report is not None:
+            return report
+    return None
+
+
+def render_report(report):
+    """Renderiza o laudo assumido por report.worker e grava o PDF; retorna o laudo atualizado"""
+    claimed = GeneratedReport.objects.filter(pk=report.pk, render_status='RENDERING', worker=report.worker)
+
+    try:
+        content = render_generated_report(report)
+    except Exception as e:
+        claimed.update(render_status='FAILED', render_error=str(e), heartbeat_at=None)
+        report.refresh_from_db()
+        return report
+
+    field = report.pdf_file.field
+    storage = report.pdf_file.storage
+    name = storage.save(field.generate_filename(report, f'{report.report_number}.pdf'), ContentFile(content))
+    previous = report.pdf_file.name
+
+    finished = claimed.update(
+        render_status='READY', pdf_file=name, rendered_at=timezone.now(), render_error='', heartbeat_at=None
+    )
+    if finished:
+        if previous and previous != name:
+            storage.delete(previous)
+    else:
+        # O laudo foi pedido de novo (ou devolvido à fila) durante a renderização
+        storage.delete(name)
+
+    report.refresh_from_db()
+    return report
+
+
+def process_next(worker=None):
+    """Renderiza o próximo laudo da fila; retorna o laudo ou None se não havia nenhum"""
+    report = claim_next(worker)
+    if report is not None:
+        report = render_report(report)
+    return report
+
+
+def requeue_stale_renders(stale_after=None):
+    """Devolve à fila os laudos em renderização sem sinal do worker; retorna quantos"""
+    if stale_after is None:
+        stale_after = settings.REPORT_RENDER_STALE_AFTER
+    limit = timezone.now() - timedelta(seconds=stale_after)
+
+    return GeneratedReport.objects.filter(render_status='RENDERING', heartbeat_at__lt=limit).update(
+        render_status='PENDING', worker='', heartbeat_at=None
+    )
+
+
+def render_progress(report):
+    """Andamento da renderização no formato da API de status"""
+    return {
+        'id': report.id,
+        'report_number': report.report_number,
+        'title': report.title,
+        'status': report.render_status,
+        'status_display': report.get_render_status_display(),
+        'ready': report.render_status == 'READY',
+        'finished': report.render_status in ('READY', 'FAILED'),
+        'requested_at': report.render_requested_at.isoformat() if report.render_requested_at else None,
+        'rendered_at': report.rendered_at.isoformat() if report.rendered_at else None,
+        'error': report.render_error,
+    }
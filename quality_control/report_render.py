@@ -0,0 +1,114 @@
+"""
+PDF dos laudos gerados (GeneratedReport)
+
+O laudo de uma amostra composta traz os resultados da amostra; o de uma
+análise pontual traz todas as análises da amostra pontual a que ela pertence.
+Tamanho e orientação da página vêm do template do laudo; estilos e logotipo
+vêm do registro compartilhado de pdf_assets.
+"""
+
+from io import BytesIO
+
+from reportlab.lib.pagesizes import A3, A4, landscape, letter
+from reportlab.lib.units import mm
+from reportlab.platypus import Paragraph, SimpleDocTemplate, Spacer, Table
+from django.utils import timezone
+
+from . import pdf_assets
+from .models import CompositeSampleResult, SpotAnalysis
+
+
+PAGE_SIZES = {'A4': A4, 'A3': A3, 'LETTER': letter}
+
+
+def _sample_data(report):
+    """(linhas de informação da amostra, análises ordenadas) do laudo"""
+    if report.composite_sample_id:
+        sample = report.composite_sample
+        analyses = CompositeSampleResult.objects.filter(composite_sample=sample)
+        sample_time = sample.collection_time
+        kind = 'Amostra Composta'
+    else:
+        analysis = report.spot_analysis
+        sample = analysis.spot_sample
+        if sample is None:
+            analyses = SpotAnalysis.objects.filter(pk=analysis.pk)
+        else:
+            analyses = SpotAnalysis.objects.filter(spot_sample=sample)
+        sample_time = sample.sample_time if sample else analysis.created_at
+        kind = 'Análise Pontual'
+
+    analyses = analyses.select_related('property').order_by('property__display_order', 'property__identifier', 'id')
+    info = [['Tipo:', kind]]
+    if sample is not None:
+        info += [
+            ['Produto:', str(sample.product)],
+            ['Linha de Produção:', sample.production_line.name],
+            ['Data / Turno:', f"{sample.date.strftime('%d/%m/%Y')} - Turno {sample.shift.name}"],
+            ['Horário:', timezone.localtime(sample_time).strftime('%d/%m/%Y %H:%M')],
+            ['Status da Amostra:', sample.get_status_display()],
+        ]
+    return info, list(analyses)
+
+
+def render_generated_report(report):
+    """Monta o PDF do laudo e retorna os bytes"""
+    template = report.template
+    page_size = PAGE_SIZES.get(template.page_size, A4)
+    if template.orientation == 'LANDSCAPE':
+        page_size = landscape(page_size)
+
+    styles = pdf_assets.styles()
+    info, analyses = _sample_data(report)
+    info += [
+        ['Template:', template.name],
+        ['Status do Laudo:', report.get_status_display()],
+        ['Gerado por:', report.generated_by.get_full_name() or report.generated_by.username],
+    ]
+
+    story = []
+    logo = pdf_assets.logo_image(60 * mm, 30 * mm)
+    if logo is not None:
+        story += [logo, Spacer(1, 12)]
+    story += [
+        Paragraph('LAUDO DE QUALIDADE', styles.title),
+        Paragraph(f'<b>Laudo Nº:</b> {report.report_number} - {report.title}', styles.subtitle),
+        Spacer(1, 12),
+    ]
+
+    table = Table(info, colWidths=[60 * mm, 100 * mm])
+    table.setStyle(pdf_assets.table_style('info'))
+    story += [table, Spacer(1, 20), Paragraph('RESULTADOS DAS ANÁLISES', styles.subtitle)]
+
+    if analyses:
+        data = [['Propriedade', 'Valor', 'Unidade', 'Método', 'Status']] + [
+            [
+                f'{analysis.property.identifier} - {analysis.property.name}',
+                f'{analysis.value:.4f}',
+                analysis.unit or '-',
+                analysis.test_method or '-',
+                analysis.get_status_display(),
+            ]
+            for analysis in analyses
+        ]
+        table = Table(data, colWidths=[60 * mm, 25 * mm, 20 * mm, 30 * mm, 25 * mm], repeatRows=1)
+        table.setStyle(pdf_assets.table_style('results'))
+        story.append(table)
+    else:
+        story.append(Paragraph('Nenhuma análise encontrada.', styles.normal))
+
+    story += [
+        Spacer(1, 20),
+        Paragraph(
+            f"<font size=8>Gerado pelo Sistema de Controle de Qualidade em "
+            f"{timezone.localtime().strftime('%d/%m/%Y %H:%M')}</font>",
+            styles.normal
+        ),
+    ]
+
+    buffer = BytesIO()
+    SimpleDocTemplate(
+        buffer, pagesize=page_size, rightMargin=20 * mm, leftMargin=20 * mm, topMargin=30 * mm, bottomMargin=30 * mm,
+        title=f'Laudo {report.report_number}'
+    ).build(story)
+    return buffer.getvalue()
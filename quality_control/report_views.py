@@ -7,16 +7,18 @@ from django.contrib.auth.mixins import LoginRequiredMixin
 from django.contrib.auth.decorators import login_required
 from django.views.generic import ListView, DetailView, CreateView, UpdateView
 from django.contrib import messages
-from django.http import HttpResponse, JsonResponse, Http404
+from django.http import FileResponse, HttpResponse, JsonResponse, Http404
 from django.urls import reverse_lazy
 from django.utils import timezone
+from django.utils.decorators import method_decorator
 from django.db.models import Q, Count
 from datetime import datetime, timedelta
 
 from core.models import ProductionLine
 from .models import Product, SpotAnalysis, CompositeSample
 from .report_models import QualityReport, LoadingOrder, ReportTemplate
-from .pdf_generator import generate_quality_report_pdf
+from .pdf_generator import cached_quality_report_pdf
+from .api_cache import cached_api_response
 
 
 class QualityReportListView(LoginRequiredMixin, ListView):
@@ -270,14 +272,16 @@ def generate_report_pdf(request, pk):
     report = get_object_or_404(QualityReport, pk=pk)
     
     try:
-        # Gerar PDF
-        pdf_file = generate_quality_report_pdf(report)
+        # PDF em cache enquanto os dados do laudo não mudam; gerado só na primeira vez
+        pdf_path = cached_quality_report_pdf(report)
         
-        # Retornar arquivo para download
-        response = HttpResponse(pdf_file.read(), content_type='application/pdf')
-        response['Content-Disposition'] = f'attachment; filename="laudo_{report.report_number}.pdf"'
-        
-        return response
+        # Retornar arquivo para download (enviado em partes pelo FileResponse)
+        return FileResponse(
+            open(pdf_path, 'rb'),
+            as_attachment=True,
+            filename=f'laudo_{report.report_number}.pdf',
+            content_type='application/pdf'
+        )
         
     except Exception as e:
         messages.error(request, f'Erro ao gerar PDF: {str(e)}')
@@ -363,6 +367,7 @@ class ReportStatsAPIView(LoginRequiredMixin, DetailView):
     API para estatísticas de laudos
     """
     
+    @method_decorator(cached_api_response('report_stats'))
     def get(self, request, *args, **kwargs):
         # Estatísticas gerais
         total_reports = QualityReport.objects.count()
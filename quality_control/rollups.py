@@ -0,0 +1,218 @@
+"""
+Manutenção do consolidado de qualidade por turno (ShiftQualityRollup)
+
+Cada chave (data, turno, linha, produto) é recalculada a partir das tabelas
+de origem com consultas agregadas limitadas àquela chave, de modo que o custo
+de uma gravação não cresce com o histórico. O rebuild completo usa as mesmas
+agregações com GROUP BY sobre o período inteiro.
+"""
+
+from django.db import transaction
+from django.db.models import Count, Q, Sum
+
+from .models import SpotSample, SpotAnalysis, CompositeSample, ShiftQualityRollup
+
+
+STATUS_FIELDS = {
+    'APPROVED': 'approved',
+    'ALERT': 'alert',
+    'REJECTED': 'rejected',
+}
+
+ROLLUP_COUNTERS = [
+    f"{prefix}_{suffix}"
+    for prefix in ('spot_samples', 'spot_analyses', 'composite_samples')
+    for suffix in ('total', 'approved', 'alert', 'rejected')
+]
+
+
+def _status_counts():
+    """Agregados condicionais de total e por status"""
+    counts = {'total': Count('id')}
+    for status, suffix in STATUS_FIELDS.items():
+        counts[suffix] = Count('id', filter=Q(status=status))
+    return counts
+
+
+def _collect(rollups, queryset, key_fields, prefix):
+    """Agrupa o queryset pela chave do consolidado e acumula os contadores"""
+    rows = queryset.values(*key_fields).annotate(**_status_counts()).order_by()
+    for row in rows:
+        key = tuple(row[field] for field in key_fields)
+        counters = rollups.setdefault(key, dict.fromkeys(ROLLUP_COUNTERS, 0))
+        counters[f"{prefix}_total"] = row['total']
+        for suffix in STATUS_FIELDS.values():
+            counters[f"{prefix}_{suffix}"] = row[suffix]
+
+
+def compute_rollups(start_date=None, end_date=None, key=None, dates=None):
+    """
+    Calcula os contadores consolidados a partir das tabelas de origem
+
+    Retorna um dicionário {(date, shift_id, production_line_id, product_id): contadores}.
+    Pode ser restrito a um período, a um conjunto de datas ou a uma única chave.
+    """
+    sample_filter = Q()
+    analysis_filter = Q()
+
+    if key is not None:
+        date, shift_id, line_id, product_id = key
+        sample_filter &= Q(date=date, shift_id=shift_id, production_line_id=line_id, product_id=product_id)
+        analysis_filter &= Q(
+            spot_sample__date=date,
+            spot_sample__shift_id=shift_id,
+            spot_sample__production_line_id=line_id,
+            spot_sample__product_id=product_id
+        )
+    if start_date:
+        sample_filter &= Q(date__gte=start_date)
+        analysis_filter &= Q(spot_sample__date__gte=start_date)
+    if end_date:
+        sample_filter &= Q(date__lte=end_date)
+        analysis_filter &= Q(spot_sample__date__lte=end_date)
+    if dates is not None:
+        sample_filter &= Q(date__in=dates)
+        analysis_filter &= Q(spot_sample__date__in=dates)
+
+    sample_key = ['date', 'shift_id', 'production_line_id', 'product_id']
+    analysis_key = [
+        'spot_sample__date', 'spot_sample__shift_id',
+        'spot_sample__production_line_id', 'spot_sample__product_id'
+    ]
+
+    rollups = {}
+    _collect(rollups, SpotSample.objects.filter(sample_filter), sample_key, 'spot_samples')
+    _collect(
+        rollups,
+        SpotAnalysis.objects.filter(analysis_filter, spot_sample__isnull=False),
+        analysis_key,
+        'spot_analyses'
+    )
+    _collect(rollups, CompositeSample.objects.filter(sample_filter), sample_key, 'composite_samples')
+    return rollups
+
+
+def refresh_rollup(date, shift_id, production_line_id, product_id):
+    """
+    Recalcula o consolidado de uma única chave (data, turno, linha, produto)
+    """
+    key = (date, shift_id, production_line_id, product_id)
+    counters = compute_rollups(key=key).get(key)
+
+    lookup = {
+        'date': date,
+        'shift_id': shift_id,
+        'production_line_id': production_line_id,
+        'product_id': product_id,
+    }
+
+    if not counters or not any(counters.values()):
+        ShiftQualityRollup.objects.filter(**lookup).delete()
+        return None
+
+    rollup, _ = ShiftQualityRollup.objects.update_or_create(defaults=counters, **lookup)
+    return rollup
+
+
+def refresh_rollups(keys, batch_size=1000):
+    """
+    Recalcula o consolidado de várias chaves de uma vez
+
+    Usado após gravações em massa (bulk_create não dispara os sinais): as
+    agregações são feitas por data, como no rebuild, e apenas as chaves
+    informadas são substituídas. Retorna o número de linhas gravadas.
+    """
+    keys = set(keys)
+    if not keys:
+        return 0
+
+    dates = {date for date, _, _, _ in keys}
+    key_fields = ('date', 'shift_id', 'production_line_id', 'product_id')
+
+    # Cálculo e substituição na mesma transação: importações paralelas que
+    # tocam as mesmas chaves não gravam um consolidado desatualizado
+    with transaction.atomic():
+        rollups = compute_rollups(dates=dates)
+        stale_ids = [
+            row[0]
+            for row in ShiftQualityRollup.objects.filter(date__in=dates).order_by().values_list('id', *key_fields)
+            if row[1:] in keys
+        ]
+        objects = [
+            ShiftQualityRollup(**dict(zip(key_fields, key)), **rollups[key])
+            for key in keys if key in rollups
+        ]
+
+        ShiftQualityRollup.objects.filter(id__in=stale_ids).delete()
+        ShiftQualityRollup.objects.bulk_create(
+            objects, batch_size=batch_size, update_conflicts=True,
+            unique_fields=['date', 'shift', 'production_line', 'product'],
+            update_fields=ROLLUP_COUNTERS,
+        )
+
+    return len(objects)
+
+
+def rebuild_rollups(start_date=None, end_date=None, batch_size=1000):
+    """
+    Reconstrói o consolidado do zero (opcionalmente apenas de um período)
+
+    Retorna o número de linhas gravadas.
+    """
+    rollups = compute_rollups(start_date=start_date, end_date=end_date)
+
+    existing = ShiftQualityRollup.objects.all()
+    if start_date:
+        existing = existing.filter(date__gte=start_date)
+    if end_date:
+        existing = existing.filter(date__lte=end_date)
+
+    objects = [
+        ShiftQualityRollup(
+            date=date,
+            shift_id=shift_id,
+            production_line_id=line_id,
+            product_id=product_id,
+            **counters
+        )
+        for (date, shift_id, line_id, product_id), counters in rollups.items()
+    ]
+
+    with transaction.atomic():
+        existing.delete()
+        ShiftQualityRollup.objects.bulk_create(objects, batch_size=batch_size)
+
+    return len(objects)
+
+
+def rollup_totals(queryset=None, **filters):
+    """
+    Soma os contadores consolidados de um conjunto de linhas em uma consulta
+    """
+    if queryset is None:
+        queryset = ShiftQualityRollup.objects.all()
+    if filters:
+        queryset = queryset.filter(**filters)
+
+    totals = queryset.aggregate(**{field: Sum(field) for field in ROLLUP_COUNTERS})
+    return {field: value or 0 for field, value in totals.items()}
+
+
+def shift_sample_stats(date, shift):
+    """
+    Estatísticas de amostras pontuais do turno lidas do consolidado
+
+    Amostras reprovadas são as que têm ao menos uma análise reprovada;
+    todas as demais contam como aprovadas.
+    """
+    totals = rollup_totals(date=date, shift=shift)
+    total_samples = totals['spot_samples_total']
+    rejected_samples = totals['spot_samples_rejected']
+    approved_samples = total_samples - rejected_samples
+
+    return {
+        'total_samples': total_samples,
+        'approved_samples': approved_samples,
+        'rejected_samples': rejected_samples,
+        'approval_rate': (approved_samples / total_samples * 100) if total_samples > 0 else 0
+    }
@@ -0,0 +1,103 @@
+"""
+Alocação atômica de números sequenciais
+
+Cada sequência (amostras pontuais por dia/turno/linha/produto, laudos e
+ordens de carregamento por mês) é uma linha de SequenceCounter. O incremento
+é feito no próprio banco: com UPDATE ... RETURNING quando o banco suporta
+(PostgreSQL e SQLite >= 3.35) ou, nos demais, com UPDATE value = value + 1
+seguido da leitura com select_for_update na mesma transação. Em ambos os
+casos a linha fica bloqueada entre o incremento e a leitura, então duas
+gravações concorrentes nunca recebem o mesmo número.
+"""
+
+import sqlite3
+
+from django.db import IntegrityError, connections, router, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .models import SequenceCounter
+
+
+def supports_update_returning(connection):
+    """Indica se o banco aceita UPDATE ... RETURNING"""
+    if connection.vendor == 'postgresql':
+        return True
+    if connection.vendor == 'sqlite':
+        return sqlite3.sqlite_version_info >= (3, 35, 0)
+    return False
+
+
+def _ensure_counter(key, seed, using):
+    """Cria o contador na primeira utilização, partindo do valor retornado por seed"""
+    counters = SequenceCounter.objects.using(using)
+    if counters.filter(key=key).exists():
+        return
+
+    try:
+        with transaction.atomic(using=using):
+            counters.create(key=key, value=seed() if seed else 0)
+    except IntegrityError:
+        # Criado em paralelo por outra conexão; o incremento abaixo usa o existente
+        pass
+
+
+def _increment_returning(key, using, count):
+    connection = connections[using]
+    quote = connection.ops.quote_name
+    table = quote(SequenceCounter._meta.db_table)
+    value, updated_at, key_column = quote('value'), quote('updated_at'), quote('key')
+
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"UPDATE {table} SET {value} = {value} + %s, {updated_at} = %s "
+            f"WHERE {key_column} = %s RETURNING {value}",
+            [count, connection.ops.adapt_datetimefield_value(timezone.now()), key]
+        )
+        row = cursor.fetchone()
+    return row[0] if row else None
+
+
+def _increment_locked(key, using, count):
+    counters = SequenceCounter.objects.using(using)
+    with transaction.atomic(using=using):
+        if not counters.filter(key=key).update(value=F('value') + count, updated_at=timezone.now()):
+            return None
+        return counters.select_for_update().values_list('value', flat=True).get(key=key)
+
+
+def next_value(key, seed=None, using=None, returning=None, count=1):
+    """
+    Incrementa e retorna o contador da chave
+
+    seed é chamado apenas quando o contador ainda não existe e deve retornar o
+    último número já usado (por exemplo, a maior sequência gravada antes da
+    criação do contador). returning força o caminho de incremento; por padrão
+    usa UPDATE ... RETURNING quando disponível. Com count > 1 reserva um bloco
+    de números consecutivos e retorna o último deles.
+    """
+    using = using or router.db_for_write(SequenceCounter)
+    if returning is None:
+        returning = supports_update_returning(connections[using])
+
+    _ensure_counter(key, seed, using)
+
+    increment = _increment_returning if returning else _increment_locked
+    value = increment(key, using, count)
+    if value is None:
+        raise SequenceCounter.DoesNotExist(f'Contador {key} não encontrado')
+    return value
+
+
+def advance_to(key, value, using=None):
+    """
+    Garante que o contador já existente da chave esteja em pelo menos value
+
+    Usado quando números são gravados explicitamente (por exemplo, sequências
+    vindas de uma planilha importada). Contadores ainda não criados não são
+    alterados: na criação eles partem do maior número já gravado.
+    """
+    using = using or router.db_for_write(SequenceCounter)
+    SequenceCounter.objects.using(using).filter(key=key, value__lt=value).update(
+        value=value, updated_at=timezone.now()
+    )
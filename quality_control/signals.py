@@ -0,0 +1,110 @@
+"""
+Sinais do app quality_control
+"""
+
+from functools import partial
+
+from django.apps import apps
+from django.db import transaction
+from django.db.models.signals import post_init, post_save, post_delete
+from django.dispatch import receiver
+
+from core.models import ChangeLog
+
+from .api_cache import bump_data_version
+from .models import SpotSample, SpotAnalysis, CompositeSample, ShiftQualityRollup, Specification, SequenceCounter
+from .models_import import ImportError, ImportSession, ImportTemplate
+from .models_report import GeneratedReport
+from .rollups import refresh_rollup
+from .specifications import invalidate_specification_index
+
+
+# Apps cujas gravações alteram os dados exibidos nos dashboards
+DATA_VERSION_APPS = {'core', 'quality_control'}
+
+# Tabelas derivadas, de controle ou de registro que não invalidam o cache das APIs
+# (o progresso de uma importação grava a sessão a cada bloco)
+DATA_VERSION_IGNORED_MODELS = {
+    ShiftQualityRollup, SequenceCounter,
+    ImportSession, ImportError, ImportTemplate, GeneratedReport, ChangeLog,
+}
+
+
+def _rollup_key(instance):
+    """Chave do consolidado (data, turno, linha, produto) de uma amostra"""
+    return (instance.date, instance.shift_id, instance.production_line_id, instance.product_id)
+
+
+def _refresh_keys(*keys):
+    """
+    Recalcula as chaves informadas, ignorando repetidas ou incompletas
+
+    Dentro de SpotSample.deferred_status, cada chave é recalculada uma única
+    vez, depois do recálculo de status das amostras.
+    """
+    for key in dict.fromkeys(keys):
+        if key and all(part is not None for part in key):
+            if not SpotSample.defer_until_status_flush(('rollup', key), partial(refresh_rollup, *key)):
+                refresh_rollup(*key)
+
+
+@receiver(post_init, sender=SpotSample)
+@receiver(post_init, sender=CompositeSample)
+def remember_rollup_key(sender, instance, **kwargs):
+    """Guarda a chave carregada para atualizar também a chave antiga quando a amostra muda"""
+    instance._rollup_key = _rollup_key(instance)
+
+
+@receiver(post_save, sender=SpotSample)
+@receiver(post_save, sender=CompositeSample)
+def update_rollup_on_sample_save(sender, instance, raw=False, **kwargs):
+    # Carga de fixtures ou restauração de backup: o consolidado é reconstruído ao final
+    if raw:
+        return
+    old_key = getattr(instance, '_rollup_key', None)
+    new_key = _rollup_key(instance)
+    _refresh_keys(new_key, old_key)
+    instance._rollup_key = new_key
+
+
+@receiver(post_delete, sender=SpotSample)
+@receiver(post_delete, sender=CompositeSample)
+def update_rollup_on_sample_delete(sender, instance, **kwargs):
+    _refresh_keys(_rollup_key(instance))
+
+
+@receiver(post_save, sender=SpotAnalysis)
+@receiver(post_delete, sender=SpotAnalysis)
+def update_rollup_on_analysis_change(sender, instance, origin=None, raw=False, **kwargs):
+    if raw or not instance.spot_sample_id:
+        return
+
+    # Exclusão em cascata a partir da amostra: o sinal da própria amostra atualiza o consolidado
+    if isinstance(origin, SpotSample):
+        return
+
+    try:
+        sample = instance.spot_sample
+    except SpotSample.DoesNotExist:
+        return
+
+    _refresh_keys(_rollup_key(sample))
+
+
+@receiver(post_save)
+@receiver(post_delete)
+def bump_api_cache_version(sender, using=None, **kwargs):
+    """Invalida o cache das APIs de dashboard após o commit de cada gravação nos modelos de qualidade"""
+    # Modelos históricos das migrações de dados: o contador pode ainda não existir
+    if sender._meta.apps is not apps:
+        return
+    if sender._meta.app_label in DATA_VERSION_APPS and sender not in DATA_VERSION_IGNORED_MODELS:
+        transaction.on_commit(bump_data_version, using=using)
+
+
+@receiver(post_save, sender=Specification)
+@receiver(post_delete, sender=Specification)
+def invalidate_specifications(sender, **kwargs):
+    """Descarta o índice de especificações agora e novamente após o commit"""
+    invalidate_specification_index()
+    transaction.on_commit(invalidate_specification_index)
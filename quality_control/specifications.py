@@ -0,0 +1,134 @@
+"""
+Índice em memória das especificações ativas
+
+Os cálculos de status (SpotAnalysis, CompositeSampleResult e
+SpotAnalysisRegistration) consultam os limites por (product_id, property_id)
+neste índice em vez de buscar a Specification no banco a cada valor gravado.
+O índice é carregado com uma única consulta na primeira utilização e
+descartado pelos sinais de Specification (ver signals.py), sendo recarregado
+na próxima avaliação.
+
+Os sinais só alcançam o próprio processo. Para que uma especificação alterada
+pela interface web chegue aos workers de importação (e vice-versa), a
+assinatura da tabela (quantidade de especificações e maior updated_at) é
+conferida no máximo a cada SPECIFICATION_INDEX_TTL segundos, e o índice é
+recarregado quando ela muda. Importações e recálculos de status descartam o
+índice ao começar.
+"""
+
+import threading
+import time
+from typing import Dict, NamedTuple, Optional, Tuple
+
+from django.conf import settings
+from django.db.models import Count, Max
+
+
+class SpecLimits(NamedTuple):
+    """Limites de uma especificação convertidos para float"""
+    lsl: Optional[float]
+    usl: Optional[float]
+    alert_lsl: Optional[float] = None
+    alert_usl: Optional[float] = None
+
+    def evaluate(self, value) -> str:
+        """Status de um valor frente aos limites"""
+        value = float(value)
+
+        if self.lsl is not None and value < self.lsl:
+            return 'REJECTED'
+        if self.usl is not None and value > self.usl:
+            return 'REJECTED'
+
+        if self.alert_lsl is not None and value < self.alert_lsl:
+            return 'ALERT'
+        if self.alert_usl is not None and value > self.alert_usl:
+            return 'ALERT'
+
+        return 'APPROVED'
+
+
+DEFAULT_TTL = 5
+
+_index: Optional[Dict[Tuple[int, int], SpecLimits]] = None
+# Assinatura das especificações quando o índice foi carregado e instante da última conferência
+_signature = None
+_checked_at = 0.0
+_lock = threading.Lock()
+
+
+def _as_float(value):
+    return float(value) if value is not None else None
+
+
+def _load_index() -> Dict[Tuple[int, int], SpecLimits]:
+    from .models import Specification
+
+    index = {}
+    specifications = Specification.objects.filter(is_active=True).order_by('id')
+    for spec in specifications:
+        # Havendo especificações duplicadas, vale a primeira cadastrada
+        index.setdefault((spec.product_id, spec.property_id), SpecLimits(
+            lsl=_as_float(spec.lsl),
+            usl=_as_float(spec.usl),
+            alert_lsl=_as_float(getattr(spec, 'alert_lsl', None)),
+            alert_usl=_as_float(getattr(spec, 'alert_usl', None)),
+        ))
+    return index
+
+
+def _table_signature():
+    """(quantidade, maior updated_at) das especificações; muda a cada gravação ou exclusão"""
+    from .models import Specification
+
+    signature = Specification.objects.aggregate(count=Count('id'), updated_at=Max('updated_at'))
+    return signature['count'], signature['updated_at']
+
+
+def _is_fresh(ttl):
+    return _index is not None and time.monotonic() - _checked_at < ttl
+
+
+def get_specification_index() -> Dict[Tuple[int, int], SpecLimits]:
+    """
+    Retorna o índice {(product_id, property_id): SpecLimits}, carregando-o se necessário
+    """
+    global _index, _signature, _checked_at
+
+    ttl = getattr(settings, 'SPECIFICATION_INDEX_TTL', DEFAULT_TTL)
+    index = _index
+    if _is_fresh(ttl):
+        return index
+
+    with _lock:
+        if not _is_fresh(ttl):
+            signature = _table_signature()
+            if _index is None or signature != _signature:
+                _index = _load_index()
+                _signature = signature
+            _checked_at = time.monotonic()
+        return _index
+
+
+def invalidate_specification_index():
+    """Descarta o índice; a próxima avaliação recarrega as especificações"""
+    global _index, _signature
+    with _lock:
+        _index = None
+        _signature = None
+
+
+def get_limits(product_id, property_id) -> Optional[SpecLimits]:
+    return get_specification_index().get((product_id, property_id))
+
+
+def evaluate_status(product_id, property_id, value) -> str:
+    """
+    Status de um valor para o produto e a propriedade
+
+    Sem especificação ativa o valor é considerado aprovado.
+    """
+    limits = get_limits(product_id, property_id)
+    if limits is None:
+        return 'APPROVED'
+    return limits.evaluate(value)
@@ -0,0 +1,225 @@
+"""
+Recálculo em massa dos status de análises e amostras
+
+Substitui os scripts que carregavam e salvavam linha a linha: os valores são
+lidos em blocos por faixa de id, comparados com os limites do índice de
+especificações de forma vetorizada (NumPy) e apenas as linhas alteradas são
+gravadas com bulk_update (com updated_at, usado pelo backup incremental). Os
+status das amostras são recalculados em seguida com contagens agregadas. Como
+bulk_update não dispara sinais, o consolidado por turno é reconstruído no
+período e o cache das APIs é invalidado ao final.
+"""
+
+import numpy as np
+from django.db import transaction
+from django.utils import timezone
+
+from .api_cache import bump_data_version
+from .models import (
+    SpotSample, SpotAnalysis, CompositeSample, CompositeSampleResult, STATUS_COUNTS
+)
+from .models_production import SpotAnalysisRegistration, SpotAnalysisPropertyResult
+from .rollups import rebuild_rollups
+from .specifications import get_specification_index, invalidate_specification_index
+
+
+DEFAULT_CHUNK_SIZE = 5000
+
+
+def evaluate_statuses(values, product_ids, property_ids, index=None):
+    """
+    Avalia vetorialmente o status de cada valor frente à especificação do par
+    (produto, propriedade)
+
+    Retorna um array de strings 'APPROVED', 'ALERT' ou 'REJECTED'; valores sem
+    especificação ativa são aprovados, como em specifications.evaluate_status.
+    """
+    if index is None:
+        index = get_specification_index()
+
+    values = np.asarray(values, dtype=float)
+    if not len(values):
+        return np.array([], dtype=object)
+
+    keys = np.column_stack([product_ids, property_ids]).astype(np.int64)
+    unique_keys, inverse = np.unique(keys, axis=0, return_inverse=True)
+
+    # Limites de cada par distinto (NaN quando não definidos), expandidos por linha
+    table = np.full((len(unique_keys), 4), np.nan)
+    for row, (product_id, property_id) in enumerate(unique_keys):
+        limits = index.get((int(product_id), int(property_id)))
+        if limits is not None:
+            table[row] = [np.nan if limit is None else limit for limit in limits]
+    lsl, usl, alert_lsl, alert_usl = table[inverse.reshape(-1)].T
+
+    # Comparações com NaN são falsas, ou seja, limite ausente não reprova
+    rejected = (values < lsl) | (values > usl)
+    alert = (values < alert_lsl) | (values > alert_usl)
+
+    return np.where(rejected, 'REJECTED', np.where(alert, 'ALERT', 'APPROVED')).astype(object)
+
+
+def _chunks(queryset, fields, chunk_size):
+    """Percorre o queryset em blocos por faixa de id, sem OFFSET"""
+    last_id = 0
+    while True:
+        rows = list(queryset.filter(id__gt=last_id).order_by('id').values_list('id', *fields)[:chunk_size])
+        if not rows:
+            return
+        yield rows
+        last_id = rows[-1][0]
+
+
+def _recalculate_results(model, queryset, product_field, chunk_size, dry_run, index):
+    """
+    Reavalia o campo status de SpotAnalysis ou CompositeSampleResult
+
+    Retorna (linhas avaliadas, linhas alteradas).
+    """
+    examined = changed = 0
+    for rows in _chunks(queryset, [product_field, 'property_id', 'value', 'status'], chunk_size):
+        ids, product_ids, property_ids, values, statuses = zip(*rows)
+        new_statuses = evaluate_statuses(values, product_ids, property_ids, index)
+
+        now = timezone.now()
+        updates = [
+            model(id=pk, status=new, updated_at=now)
+            for pk, old, new in zip(ids, statuses, new_statuses)
+            if old != new
+        ]
+        if updates and not dry_run:
+            model.objects.bulk_update(updates, ['status', 'updated_at'], batch_size=chunk_size)
+
+        examined += len(rows)
+        changed += len(updates)
+    return examined, changed
+
+
+def _recalculate_samples(model, queryset, results, sample_field, chunk_size, dry_run):
+    """
+    Recalcula o status geral das amostras a partir das contagens por status dos resultados
+
+    Retorna (amostras avaliadas, amostras alteradas).
+    """
+    examined = changed = 0
+    for rows in _chunks(queryset, ['status'], chunk_size):
+        ids = [pk for pk, _ in rows]
+        counts = {
+            row[sample_field]: row
+            for row in results.filter(**{f'{sample_field}__in': ids})
+            .values(sample_field).annotate(**STATUS_COUNTS).order_by()
+        }
+
+        updates = []
+        now = timezone.now()
+        for pk, old in rows:
+            new = model.status_from_counts(counts.get(pk))
+            if old != new:
+                updates.append(model(id=pk, status=new, updated_at=now))
+        if updates and not dry_run:
+            model.objects.bulk_update(updates, ['status', 'updated_at'], batch_size=chunk_size)
+
+        examined += len(rows)
+        changed += len(updates)
+    return examined, changed
+
+
+def _recalculate_registrations(queryset, chunk_size, dry_run, index):
+    """
+    Recalcula SpotAnalysisRegistration.analysis_result (reprovado se algum resultado estiver fora)
+
+    Retorna (registros avaliados, registros alterados).
+    """
+    examined = changed = 0
+    for rows in _chunks(queryset, ['product_id', 'analysis_result'], chunk_size):
+        ids = [pk for pk, _, _ in rows]
+        results = list(
+            SpotAnalysisPropertyResult.objects.filter(analysis_id__in=ids)
+            .values_list('analysis_id', 'analysis__product_id', 'property_id', 'value')
+        )
+
+        rejected_ids = set()
+        if results:
+            analysis_ids, product_ids, property_ids, values = zip(*results)
+            statuses = evaluate_statuses(values, product_ids, property_ids, index)
+            rejected_ids = set(np.asarray(analysis_ids)[statuses == 'REJECTED'].tolist())
+
+        updates = []
+        for pk, _, old in rows:
+            new = 'REJECTED' if pk in rejected_ids else 'APPROVED'
+            if old != new:
+                updates.append(SpotAnalysisRegistration(id=pk, analysis_result=new))
+        if updates and not dry_run:
+            SpotAnalysisRegistration.objects.bulk_update(updates, ['analysis_result'], batch_size=chunk_size)
+
+        examined += len(rows)
+        changed += len(updates)
+    return examined, changed
+
+
+def recalculate_statuses(start_date=None, end_date=None, product_ids=None, property_ids=None,
+                         chunk_size=DEFAULT_CHUNK_SIZE, dry_run=False):
+    """
+    Reaplica as especificações atuais às análises e amostras do filtro
+
+    Retorna {nome: (avaliados, alterados)} para análises pontuais, amostras
+    pontuais, resultados compostos, amostras compostas e registros de análise.
+    """
+    def sample_filter(prefix=''):
+        filters = {}
+        if start_date:
+            filters[f'{prefix}date__gte'] = start_date
+        if end_date:
+            filters[f'{prefix}date__lte'] = end_date
+        if product_ids:
+            filters[f'{prefix}product_id__in'] = product_ids
+        return filters
+
+    property_filter = {'property_id__in': property_ids} if property_ids else {}
+
+    spot_analyses = SpotAnalysis.objects.filter(
+        spot_sample__isnull=False, **sample_filter('spot_sample__'), **property_filter
+    )
+    composite_results = CompositeSampleResult.objects.filter(
+        **sample_filter('composite_sample__'), **property_filter
+    )
+
+    spot_samples = SpotSample.objects.filter(**sample_filter())
+    composite_samples = CompositeSample.objects.filter(**sample_filter())
+    registrations = SpotAnalysisRegistration.objects.filter(**sample_filter())
+    if property_ids:
+        # Com filtro de propriedade, só as amostras que têm resultados dessas propriedades mudam
+        spot_samples = spot_samples.filter(id__in=spot_analyses.values('spot_sample_id'))
+        composite_samples = composite_samples.filter(id__in=composite_results.values('composite_sample_id'))
+        registrations = registrations.filter(
+            id__in=SpotAnalysisPropertyResult.objects.filter(**property_filter).values('analysis_id')
+        )
+
+    # Sempre com as especificações atuais do banco
+    invalidate_specification_index()
+    index = get_specification_index()
+
+    summary = {}
+    with transaction.atomic():
+        summary['spot_analyses'] = _recalculate_results(
+            SpotAnalysis, spot_analyses, 'spot_sample__product_id', chunk_size, dry_run, index
+        )
+        summary['composite_results'] = _recalculate_results(
+            CompositeSampleResult, composite_results, 'composite_sample__product_id', chunk_size, dry_run, index
+        )
+        summary['registrations'] = _recalculate_registrations(registrations, chunk_size, dry_run, index)
+
+        # No modo simulação os resultados não foram gravados, então as amostras refletem o banco atual
+        summary['spot_samples'] = _recalculate_samples(
+            SpotSample, spot_samples, SpotAnalysis.objects.all(), 'spot_sample_id', chunk_size, dry_run
+        )
+        summary['composite_samples'] = _recalculate_samples(
+            CompositeSample, composite_samples, CompositeSampleResult.objects.all(),
+            'composite_sample_id', chunk_size, dry_run
+        )
+
+        if not dry_run and any(changed for _, changed in summary.values()):
+            rebuild_rollups(start_date, end_date)
+            transaction.on_commit(bump_data_version)
+
+    return summary
@@ -0,0 +1,308 @@
+"""
+Geração de massa de dados sintética
+
+Cria plantas, linhas, produtos, propriedades, especificações, amostras
+pontuais com suas análises, amostras compostas com resultados e laudos em
+volume parametrizável, usado pelo comando generate_synthetic_data e pelos
+benchmarks. Tudo é gravado com bulk_create, sem passar por save() nem pelos
+sinais; por isso os status já são calculados a partir das especificações
+geradas e, ao final, o consolidado por turno é reconstruído e o cache das APIs
+invalidado.
+
+Os valores seguem uma distribuição normal em torno do alvo, de forma que
+cerca de 2% das análises ficam fora da especificação, e a geração é
+determinística para a mesma semente.
+"""
+
+import random
+from datetime import datetime, time, timedelta
+from decimal import Decimal
+from io import BytesIO
+
+import pandas as pd
+from django.contrib.auth.models import User
+from django.db import transaction
+from django.utils import timezone
+
+from core.models import Plant, ProductionLine, Shift
+from .api_cache import bump_data_version
+from .models import (
+    AnalysisType, Product, Property, Specification, SpotSample, SpotAnalysis,
+    CompositeSample, CompositeSampleResult, QualityReport, count_statuses
+)
+from .rollups import rebuild_rollups
+from .specifications import SpecLimits, invalidate_specification_index
+
+
+DEFAULTS = {
+    'days': 365,
+    'plants': 1,
+    'lines_per_plant': 6,
+    'products': 4,
+    'properties': 10,
+    'samples_per_shift': 3,
+    'composites_per_shift': 1,
+    'reports_per_day': 2,
+    'seed': 42,
+    'prefix': 'SD',
+}
+
+BATCH_SIZE = 5000
+
+# Turnos padrão do sistema (ver Shift.SHIFT_CHOICES)
+SHIFT_TIMES = {
+    'A': (7, 19),
+    'B': (19, 7),
+}
+
+SPEC_LSL, SPEC_TARGET, SPEC_USL = 1.0, 5.5, 10.0
+VALUE_SIGMA = 2.0
+
+BENCHMARK_USERNAME = 'benchmark'
+
+
+def get_benchmark_user():
+    """
+    Usuário operador dos dados sintéticos e dos benchmarks
+
+    Sem senha e sem privilégios: as views medidas exigem apenas login. Uma
+    conta com o mesmo nome e senha utilizável não é reaproveitada.
+    """
+    user, created = User.objects.get_or_create(
+        username=BENCHMARK_USERNAME,
+        defaults={'first_name': 'Benchmark'},
+    )
+    if created:
+        user.set_unusable_password()
+        user.save(update_fields=['password'])
+    elif user.has_usable_password():
+        raise ValueError(f'Já existe o usuário {BENCHMARK_USERNAME} com senha; use um banco de testes')
+    elif user.is_staff or user.is_superuser:
+        # Criado como administrador por versões anteriores
+        user.is_staff = user.is_superuser = False
+        user.save(update_fields=['is_staff', 'is_superuser'])
+    return user
+
+
+def get_shifts():
+    shifts = []
+    for name, (start, end) in SHIFT_TIMES.items():
+        shift, _ = Shift.objects.get_or_create(
+            name=name,
+            defaults={'start_time': time(start), 'end_time': time(end)},
+        )
+        shifts.append(shift)
+    return shifts
+
+
+def _create_master_data(params, user):
+    prefix = params['prefix']
+
+    plants = Plant.objects.bulk_create([
+        Plant(name=f'Planta {prefix}{i + 1}', code=f'{prefix}{i + 1}', created_by=user)
+        for i in range(params['plants'])
+    ])
+    lines = ProductionLine.objects.bulk_create([
+        ProductionLine(plant=plant, name=f'Linha {prefix}{p + 1}.{i + 1}', code=f'{prefix}L{i + 1}', created_by=user)
+        for p, plant in enumerate(plants) for i in range(params['lines_per_plant'])
+    ])
+    products = Product.objects.bulk_create([
+        Product(name=f'Produto {prefix}{i + 1}', code=f'{prefix}P{i + 1}', display_order=i, created_by=user)
+        for i in range(params['products'])
+    ])
+    properties = Property.objects.bulk_create([
+        Property(identifier=f'{prefix}_PROP_{i + 1}', name=f'Propriedade {prefix}{i + 1}', unit='%',
+                 category='FISICA', display_order=i, created_by=user)
+        for i in range(params['properties'])
+    ])
+    Specification.objects.bulk_create([
+        Specification(product=product, property=prop, lsl=Decimal(str(SPEC_LSL)),
+                      target=Decimal(str(SPEC_TARGET)), usl=Decimal(str(SPEC_USL)), created_by=user)
+        for product in products for prop in properties
+    ])
+    return plants, lines, products, properties
+
+
+def _measure(rng, limits):
+    """Valor sintético com quatro casas decimais e o status correspondente"""
+    value = round(rng.gauss(SPEC_TARGET, VALUE_SIGMA), 4)
+    return Decimal(f'{value:.4f}'), limits.evaluate(value)
+
+
+def _moment(day, hours):
+    """Data/hora com hours horas a partir da meia-noite do dia (passa para o dia seguinte no turno B)"""
+    return timezone.make_aware(datetime.combine(day, time()) + timedelta(hours=hours))
+
+
+def _shift_moment(day, shift, fraction):
+    """Horário dentro do turno de 12 horas, com fraction entre 0 (início) e 1 (fim)"""
+    return _moment(day, shift.start_time.hour + 12 * fraction)
+
+
+def _flush(model, objects):
+    model.objects.bulk_create(objects, batch_size=BATCH_SIZE)
+    objects.clear()
+
+
+def generate_dataset(end_date=None, **params):
+    """
+    Gera a massa de dados sintética terminando em end_date (padrão: hoje)
+
+    Os parâmetros aceitos e seus valores padrão estão em DEFAULTS. Retorna um
+    dicionário com a quantidade de registros criados por tipo e o período.
+    """
+    unknown = set(params) - set(DEFAULTS)
+    if unknown:
+        raise TypeError(f'Parâmetros desconhecidos: {", ".join(sorted(unknown))}')
+    params = {**DEFAULTS, **params}
+
+    rng = random.Random(params['seed'])
+    end_date = end_date or timezone.localdate()
+    start_date = end_date - timedelta(days=params['days'] - 1)
+    limits = SpecLimits(lsl=SPEC_LSL, usl=SPEC_USL)
+
+    with transaction.atomic():
+        user = get_benchmark_user()
+        shifts = get_shifts()
+        analysis_type = AnalysisType.objects.get(code='PONTUAL')
+        plants, lines, products, properties = _create_master_data(params, user)
+
+        counts = dict.fromkeys(['spot_samples', 'spot_analyses', 'composite_samples',
+                                'composite_results', 'quality_reports'], 0)
+        for offset in range(params['days']):
+            day = start_date + timedelta(days=offset)
+
+            # Amostras do dia: cada linha produz um produto por turno, em rodízio
+            samples, sample_measures = [], []
+            composites, composite_measures = [], []
+            for s, shift in enumerate(shifts):
+                for l, line in enumerate(lines):
+                    product = products[(offset + s + l) % len(products)]
+                    key = dict(date=day, shift=shift, production_line=line, product=product)
+
+                    for sequence in range(1, params['samples_per_shift'] + 1):
+                        measures = [_measure(rng, limits) for _ in properties]
+                        samples.append(SpotSample(
+                            analysis_type=analysis_type, sample_sequence=sequence, operator=user,
+                            sample_time=_shift_moment(day, shift, (sequence - 0.5) / params['samples_per_shift']),
+                            status=SpotSample.status_from_counts(count_statuses([status for _, status in measures])), **key
+                        ))
+                        sample_measures.append(measures)
+
+                    for sequence in range(1, params['composites_per_shift'] + 1):
+                        measures = [_measure(rng, limits) for _ in properties]
+                        composites.append(CompositeSample(
+                            sequence=sequence, operator=user, created_by=user,
+                            collection_time=_shift_moment(day, shift, 1),
+                            quantity_produced=Decimal(rng.randint(5000, 20000)),
+                            status=CompositeSample.status_from_counts(count_statuses([status for _, status in measures])), **key
+                        ))
+                        composite_measures.append(measures)
+
+            samples = SpotSample.objects.bulk_create(samples, batch_size=BATCH_SIZE)
+            composites = CompositeSample.objects.bulk_create(composites, batch_size=BATCH_SIZE)
+
+            analyses = [
+                SpotAnalysis(spot_sample=sample, property=prop, value=value, unit=prop.unit, status=status)
+                for sample, measures in zip(samples, sample_measures)
+                for prop, (value, status) in zip(properties, measures)
+            ]
+            results = [
+                CompositeSampleResult(composite_sample=composite, property=prop, value=value, unit=prop.unit,
+                                      status=status)
+                for composite, measures in zip(composites, composite_measures)
+                for prop, (value, status) in zip(properties, measures)
+            ]
+            counts['spot_samples'] += len(samples)
+            counts['spot_analyses'] += len(analyses)
+            counts['composite_samples'] += len(composites)
+            counts['composite_results'] += len(results)
+            _flush(SpotAnalysis, analyses)
+            _flush(CompositeSampleResult, results)
+
+            counts['quality_reports'] += _create_reports(rng, params, day, plants, composites, user)
+
+        rebuild_rollups(start_date, end_date)
+        transaction.on_commit(invalidate_specification_index)
+        transaction.on_commit(bump_data_version)
+
+    return {'start_date': start_date, 'end_date': end_date, **counts}
+
+
+def _create_reports(rng, params, day, plants, composites, user):
+    """Laudos do dia, cada um com as amostras compostas aprovadas de um produto"""
+    approved = {}
+    for composite in composites:
+        if composite.status == 'APPROVED':
+            approved.setdefault(composite.product_id, []).append(composite)
+    if not approved:
+        return 0
+
+    reports, links = [], []
+    product_ids = sorted(approved)
+    for number in range(1, params['reports_per_day'] + 1):
+        product_id = product_ids[(number - 1) % len(product_ids)]
+        reports.append(QualityReport(
+            report_number=f"{params['prefix']}{day:%Y%m%d}{number:03d}",
+            date=day,
+            product_id=product_id,
+            plant=plants[(number - 1) % len(plants)],
+            client_name=f'Cliente {rng.randint(1, 50)}',
+            total_quantity=Decimal(rng.randint(10000, 40000)),
+            loading_type=rng.choice(['NATIONAL', 'EXPORT']),
+            status='APPROVED',
+            approved_by=user,
+            approved_at=_moment(day, 18),
+            created_by=user,
+        ))
+    reports = QualityReport.objects.bulk_create(reports)
+
+    through = QualityReport.composite_samples.through
+    for report in reports:
+        links.extend(
+            through(qualityreport_id=report.id, compositesample_id=composite.id)
+            for composite in approved[report.product_id]
+        )
+    through.objects.bulk_create(links, batch_size=BATCH_SIZE)
+    return len(reports)
+
+
+def build_import_workbook(rows, date=None, prefix=DEFAULTS['prefix'], seed=DEFAULTS['seed']):
+    """
+    Planilha de importação (formato de create_import_template.py) com rows
+    análises pontuais sobre o cadastro sintético do prefixo
+
+    Retorna o conteúdo do arquivo .xlsx em bytes.
+    """
+    rng = random.Random(seed)
+    date = date or timezone.localdate()
+
+    lines = list(ProductionLine.objects.filter(code__startswith=f'{prefix}L').order_by('id'))
+    products = list(Product.objects.filter(code__startswith=f'{prefix}P').order_by('id'))
+    properties = list(Property.objects.filter(identifier__startswith=f'{prefix}_PROP_').order_by('id'))
+    if not (lines and products and properties):
+        raise ValueError(f'Cadastro sintético com prefixo {prefix} não encontrado')
+
+    spot_rows = []
+    for i in range(rows):
+        shift = 'A' if i % 2 == 0 else 'B'
+        row = {
+            'Data': date.isoformat(),
+            'Hora_Amostra': f'{(SHIFT_TIMES[shift][0] + i % 12) % 24:02d}:{i % 60:02d}',
+            'Tipo_Analise': 'PONTUAL',
+            'Produto_Codigo': products[i % len(products)].code,
+            'Linha_Producao': lines[i % len(lines)].name,
+            'Turno': shift,
+            'Sequencia': i // (2 * len(lines)) + 1,
+        }
+        for prop in properties:
+            row[prop.identifier] = round(rng.gauss(SPEC_TARGET, VALUE_SIGMA), 4)
+        spot_rows.append(row)
+
+    buffer = BytesIO()
+    with pd.ExcelWriter(buffer, engine='openpyxl') as writer:
+        pd.DataFrame(spot_rows).to_excel(writer, sheet_name='Analises_Pontuais', index=False)
+        pd.DataFrame(columns=[
+            'Data_Coleta', 'Hora_Inicio', 'Hora_Fim', 'Tipo_Analise', 'Produto_Codigo', 'Linha_Producao', 'Turno'
+        ]).to_excel(writer, sheet_name='Amostras_Compostas', index=False)
+    return buffer.getvalue()
@@ -1,3 +1,1743 @@
-from django.test import TestCase
+import json
+import os
+import tempfile
+import threading
+import zipfile
+from datetime import date, datetime, time, timedelta
+from decimal import Decimal
+from io import BytesIO, StringIO
+from unittest import mock
 
-# Create your tests here.
+import pandas as pd
+
+from django.contrib.auth.models import User
+from django.conf import settings
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.db import connection, connections
+from django.test import RequestFactory, TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from core.models import Plant, ProductionLine, Shift
+from .models import (
+    AnalysisType, Product, Property, Specification, SpotSample, SpotAnalysis,
+    CompositeSample, CompositeSampleResult, ShiftQualityRollup, SequenceCounter, QualityReport
+)
+from .dashboard_data import build_shift_dashboard
+from .dashboard_views import DashboardDataAPIView
+from .api_cache import DATA_VERSION_KEY, bump_data_version, get_cache_stats
+from .views import dashboard_data_api
+from .specifications import SpecLimits, evaluate_status, get_limits, invalidate_specification_index
+from .status_recalc import evaluate_statuses, recalculate_statuses
+from .import_engine import import_dataframes, import_file
+from .import_reader import SpreadsheetReader
+from .pdf_generator import PDFReportGenerator, prefetch_reports, render_report_file
+from . import pdf_assets, pdf_batch, pdf_cache
+from . import report_queue
+from .import_queue import claim_next, enqueue, fail_stale_sessions, process_next
+from .models_import import ImportError, ImportSession, ImportTemplate
+from .models_report import GeneratedReport, ReportTemplate
+from .sequences import next_value, supports_update_returning
+from .rollups import (
+    ROLLUP_COUNTERS, compute_rollups, rebuild_rollups, refresh_rollup, rollup_totals, shift_sample_stats
+)
+
+
+class QualityDataMixin:
+    """
+    Cria os cadastros básicos usados pelos testes
+    """
+
+    @classmethod
+    def create_base_data(cls, lines=2, products=2, properties=3):
+        cls.today = date(2025, 1, 15)
+        cls.shift = Shift.objects.create(name='A', start_time=time(7, 0), end_time=time(19, 0))
+        cls.analysis_type = AnalysisType.objects.get(code='PONTUAL')
+        cls.plant = Plant.objects.create(name='Planta 1', code='P1')
+        cls.lines = [
+            ProductionLine.objects.create(plant=cls.plant, name=f'Linha {i}', code=f'L{i}')
+            for i in range(lines)
+        ]
+        cls.products = [
+            Product.objects.create(name=f'Produto {i}', code=f'PR{i}', display_order=i)
+            for i in range(products)
+        ]
+        cls.properties = [
+            Property.objects.create(
+                identifier=f'PROP{i}', name=f'Propriedade {i}', category='FISICA', display_order=i
+            )
+            for i in range(properties)
+        ]
+        for product in cls.products:
+            for prop in cls.properties:
+                Specification.objects.create(
+                    product=product, property=prop, lsl=Decimal('1.0'), usl=Decimal('10.0')
+                )
+
+    @classmethod
+    def create_sample(cls, line, product, values, sample_date=None):
+        sample = SpotSample.objects.create(
+            analysis_type=cls.analysis_type,
+            date=sample_date or cls.today,
+            shift=cls.shift,
+            production_line=line,
+            product=product,
+        )
+        for prop, value in zip(cls.properties, values):
+            analysis = SpotAnalysis(
+                spot_sample=sample, property=prop, value=Decimal(str(value)), unit='%'
+            )
+            analysis.set_status_manually('APPROVED' if 1 <= value <= 10 else 'REJECTED')
+            analysis.save()
+        return sample
+
+    @classmethod
+    def create_quality_report(cls, number, values, user=None):
+        """Laudo de carregamento com uma amostra composta e um resultado por propriedade"""
+        composite = CompositeSample.objects.create(
+            date=cls.today,
+            shift=cls.shift,
+            production_line=cls.lines[0],
+            product=cls.products[0],
+            collection_time=timezone.make_aware(datetime.combine(cls.today, time(12, 0))),
+            status='APPROVED'
+        )
+        for prop, value in zip(cls.properties, values):
+            CompositeSampleResult.objects.create(
+                composite_sample=composite, property=prop, value=Decimal(str(value)), unit='%'
+            )
+        report = QualityReport.objects.create(
+            report_number=number, date=cls.today, product=cls.products[0], plant=cls.plant,
+            client_name='Cliente', total_quantity=Decimal('1000'), loading_type='NATIONAL', created_by=user,
+        )
+        report.composite_samples.add(composite)
+        return report
+
+
+class ShiftDashboardQueryBudgetTest(QualityDataMixin, TestCase):
+    """
+    O dashboard do turno deve executar um número fixo de consultas
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.create_base_data()
+
+    def _populate(self, samples_per_product):
+        for line in self.lines:
+            for product in self.products:
+                for _ in range(samples_per_product):
+                    self.create_sample(line, product, [5, 5, 5])
+
+    def test_grid_structure_and_stats(self):
+        self.create_sample(self.lines[0], self.products[0], [5, 5, 5])
+        self.create_sample(self.lines[0], self.products[1], [5, 20, 5])
+        self.create_sample(self.lines[1], self.products[0], [])
+
+        lines_data, stats = build_shift_dashboard(self.today, self.shift)
+
+        self.assertEqual(len(lines_data), 2)
+        first_line = next(item for item in lines_data if item['line'] == self.lines[0])
+        statuses = {item['product'].code: item['status'] for item in first_line['products']}
+        self.assertEqual(statuses, {'PR0': 'APPROVED', 'PR1': 'REJECTED'})
+        rejected = next(item for item in first_line['products'] if item['product'].code == 'PR1')
+        self.assertEqual(set(rejected['property_analyses']), {prop.id for prop in self.properties})
+
+        self.assertEqual(stats['total_samples'], 3)
+        self.assertEqual(stats['approved_samples'], 1)
+        self.assertEqual(stats['rejected_samples'], 1)
+
+    def test_query_count_is_constant(self):
+        self._populate(1)
+        with self.assertNumQueries(2):
+            build_shift_dashboard(self.today, self.shift)
+
+        self._populate(3)
+        with self.assertNumQueries(2):
+            lines_data, stats = build_shift_dashboard(self.today, self.shift)
+
+        self.assertEqual(stats['total_samples'], len(self.lines) * len(self.products) * 4)
+
+    def test_empty_shift(self):
+        with self.assertNumQueries(1):
+            lines_data, stats = build_shift_dashboard(self.today, self.shift)
+
+        self.assertEqual(lines_data, [])
+        self.assertEqual(stats['approval_rate'], 0)
+
+
+class ShiftQualityRollupTest(QualityDataMixin, TestCase):
+    """
+    O consolidado por turno deve acompanhar as gravações nas tabelas de origem
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.create_base_data()
+
+    def _rollup(self, line=None, product=None, sample_date=None):
+        return ShiftQualityRollup.objects.get(
+            date=sample_date or self.today,
+            shift=self.shift,
+            production_line=line or self.lines[0],
+            product=product or self.products[0]
+        )
+
+    def _stored_rollups(self):
+        return {
+            (row.date, row.shift_id, row.production_line_id, row.product_id): {
+                counter: getattr(row, counter) for counter in ROLLUP_COUNTERS
+            }
+            for row in ShiftQualityRollup.objects.all()
+        }
+
+    def test_analysis_save_and_delete_update_rollup(self):
+        sample = self.create_sample(self.lines[0], self.products[0], [5, 20, 5])
+
+        rollup = self._rollup()
+        self.assertEqual(rollup.spot_samples_total, 1)
+        self.assertEqual(rollup.spot_samples_rejected, 1)
+        self.assertEqual(rollup.spot_analyses_total, 3)
+        self.assertEqual(rollup.spot_analyses_rejected, 1)
+
+        sample.spotanalysis_set.get(status='REJECTED').delete()
+
+        rollup = self._rollup()
+        self.assertEqual(rollup.spot_analyses_total, 2)
+        self.assertEqual(rollup.spot_analyses_rejected, 0)
+
+        sample.delete()
+        self.assertFalse(ShiftQualityRollup.objects.exists())
+
+    def test_sample_moved_to_other_key(self):
+        sample = self.create_sample(self.lines[0], self.products[0], [5, 5, 5])
+
+        sample.production_line = self.lines[1]
+        sample.save()
+
+        self.assertFalse(
+            ShiftQualityRollup.objects.filter(production_line=self.lines[0]).exists()
+        )
+        self.assertEqual(self._rollup(line=self.lines[1]).spot_analyses_total, 3)
+
+    def test_composite_sample_updates_rollup(self):
+        CompositeSample.objects.create(
+            date=self.today,
+            shift=self.shift,
+            production_line=self.lines[0],
+            product=self.products[0],
+            collection_time=timezone.make_aware(datetime.combine(self.today, time(12, 0))),
+            status='REJECTED'
+        )
+
+        rollup = self._rollup()
+        self.assertEqual(rollup.composite_samples_total, 1)
+        self.assertEqual(rollup.composite_samples_rejected, 1)
+        self.assertEqual(rollup.spot_samples_total, 0)
+
+    def test_rebuild_matches_incremental(self):
+        self.create_sample(self.lines[0], self.products[0], [5, 20, 5])
+        self.create_sample(self.lines[0], self.products[0], [5, 5, 5])
+        self.create_sample(self.lines[1], self.products[1], [0, 5, 5])
+        self.create_sample(self.lines[1], self.products[0], [5, 5, 5], sample_date=date(2025, 1, 16))
+
+        incremental = self._stored_rollups()
+        self.assertEqual(incremental, compute_rollups())
+
+        ShiftQualityRollup.objects.all().delete()
+        self.assertEqual(rebuild_rollups(), 3)
+        self.assertEqual(self._stored_rollups(), incremental)
+
+    def test_rebuild_period_keeps_other_dates(self):
+        self.create_sample(self.lines[0], self.products[0], [5, 5, 5])
+        self.create_sample(self.lines[0], self.products[0], [5, 5, 5], sample_date=date(2025, 1, 16))
+
+        ShiftQualityRollup.objects.filter(date=self.today).update(spot_samples_total=99)
+        rebuild_rollups(start_date=date(2025, 1, 16))
+
+        self.assertEqual(self._rollup().spot_samples_total, 99)
+        self.assertEqual(self._rollup(sample_date=date(2025, 1, 16)).spot_samples_total, 1)
+
+    def test_shift_stats_and_totals(self):
+        self.create_sample(self.lines[0], self.products[0], [5, 5, 5])
+        self.create_sample(self.lines[0], self.products[1], [5, 20, 5])
+        self.create_sample(self.lines[1], self.products[0], [])
+
+        with self.assertNumQueries(1):
+            stats = shift_sample_stats(self.today, self.shift)
+
+        self.assertEqual(stats['total_samples'], 3)
+        self.assertEqual(stats['rejected_samples'], 1)
+        self.assertEqual(stats['approved_samples'], 2)
+        self.assertEqual(rollup_totals(date=self.today)['spot_analyses_total'], 6)
+
+    def test_rebuild_command(self):
+        self.create_sample(self.lines[0], self.products[0], [5, 5, 5])
+        ShiftQualityRollup.objects.all().delete()
+
+        out = StringIO()
+        call_command('rebuild_shift_rollups', '--start', '2025-01-01', stdout=out)
+
+        self.assertIn('1 linhas', out.getvalue())
+        self.assertEqual(self._rollup().spot_analyses_total, 3)
+
+
+class DashboardTrendAPITest(QualityDataMixin, TestCase):
+    """
+    As tendências do dashboard devem ser agregadas em uma única consulta
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.create_base_data(lines=1, products=1)
+        cls.user = User.objects.create_user('analista', password='senha')
+        cls.create_sample(cls.lines[0], cls.products[0], [5, 5, 20], sample_date=date(2025, 1, 13))
+        cls.create_sample(cls.lines[0], cls.products[0], [5, 5, 5], sample_date=date(2025, 1, 15))
+        cls.create_sample(cls.lines[0], cls.products[0], [5, 5, 5], sample_date=date(2025, 2, 3))
+
+    def setUp(self):
+        cache.clear()
+
+    def _get(self, **params):
+        request = RequestFactory().get('/api/dashboard-data/', {'type': 'trends', **params})
+        request.user = self.user
+        response = DashboardDataAPIView.as_view()(request)
+        return response.status_code, json.loads(response.content)
+
+    def test_daily_trend_fills_empty_days(self):
+        with self.assertNumQueries(1):
+            status, data = self._get(start='2025-01-13', end='2025-01-16')
+
+        self.assertEqual(status, 200)
+        self.assertEqual(data['approval_trend'], [
+            {'date': '13/01', 'approval_rate': 66.7, 'total': 3},
+            {'date': '14/01', 'approval_rate': 0, 'total': 0},
+            {'date': '15/01', 'approval_rate': 100.0, 'total': 3},
+            {'date': '16/01', 'approval_rate': 0, 'total': 0},
+        ])
+
+    def test_weekly_and_monthly_buckets(self):
+        with self.assertNumQueries(1):
+            status, data = self._get(start='2025-01-13', end='2025-02-09', bucket='week')
+
+        self.assertEqual(
+            [(item['date'], item['total']) for item in data['approval_trend']],
+            [('13/01', 6), ('20/01', 0), ('27/01', 0), ('03/02', 3)]
+        )
+
+        status, data = self._get(start='2025-01-01', end='2025-02-28', bucket='month')
+        self.assertEqual(
+            [(item['date'], item['total']) for item in data['approval_trend']],
+            [('01/2025', 6), ('02/2025', 3)]
+        )
+
+    def test_summary_daily_trend(self):
+        with self.assertNumQueries(3):
+            status, data = self._get(type='summary')
+
+        self.assertEqual(status, 200)
+        self.assertEqual(len(data['daily_trend']), 7)
+
+    def test_invalid_parameters(self):
+        self.assertEqual(self._get(bucket='year')[0], 400)
+        self.assertEqual(self._get(days='abc')[0], 400)
+        self.assertEqual(self._get(start='2025-02-01', end='2025-01-01')[0], 400)
+
+
+class DashboardAPICacheTest(QualityDataMixin, TestCase):
+    """
+    Consultas repetidas entre gravações devem ser servidas do cache
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.create_base_data(lines=1, products=1)
+        cls.user = User.objects.create_user('analista', password='senha')
+        cls.create_sample(cls.lines[0], cls.products[0], [5, 5, 5])
+
+    def setUp(self):
+        cache.clear()
+        self.factory = RequestFactory()
+
+    def _get_trends(self, **params):
+        request = self.factory.get('/api/dashboard-data/', {'type': 'trends', **params})
+        request.user = self.user
+        return DashboardDataAPIView.as_view()(request)
+
+    def test_repeated_polls_hit_cache(self):
+        first = self._get_trends(days=7)
+        self.assertEqual(first['X-Cache'], 'MISS')
+
+        with self.assertNumQueries(0):
+            second = self._get_trends(days=7)
+
+        self.assertEqual(second['X-Cache'], 'HIT')
+        self.assertEqual(second.content, first.content)
+        self.assertEqual(self._get_trends(days=30)['X-Cache'], 'MISS')
+
+        stats = get_cache_stats()
+        self.assertEqual(stats['apis']['dashboard_data'], {'hits': 1, 'misses': 2})
+
+    def test_write_invalidates_cache(self):
+        self._get_trends(days=7)
+        self.assertEqual(self._get_trends(days=7)['X-Cache'], 'HIT')
+
+        with self.captureOnCommitCallbacks() as callbacks:
+            self.create_sample(self.lines[0], self.products[0], [5, 5, 5])
+            # Antes do commit a versão não muda
+            self.assertEqual(self._get_trends(days=7)['X-Cache'], 'HIT')
+
+        for callback in callbacks:
+            callback()
+        self.assertEqual(self._get_trends(days=7)['X-Cache'], 'MISS')
+
+    @override_settings(DASHBOARD_DATA_VERSION_TTL=0)
+    def test_write_by_other_process_invalidates_cache(self):
+        self._get_trends(days=7)
+        self.assertEqual(self._get_trends(days=7)['X-Cache'], 'HIT')
+
+        # Gravação de um worker em outro processo: só o contador do banco muda
+        counter, _ = SequenceCounter.objects.get_or_create(key=DATA_VERSION_KEY)
+        SequenceCounter.objects.filter(pk=counter.pk).update(value=counter.value + 1)
+
+        self.assertEqual(self._get_trends(days=7)['X-Cache'], 'MISS')
+
+    def test_rollup_refresh_does_not_invalidate(self):
+        self._get_trends(days=7)
+        rebuild_rollups()
+        refresh_rollup(self.today, self.shift.id, self.lines[0].id, self.products[0].id)
+
+        self.assertEqual(self._get_trends(days=7)['X-Cache'], 'HIT')
+
+    def test_import_progress_does_not_invalidate(self):
+        self._get_trends(days=7)
+        template = ImportTemplate.objects.create(name='Padrão', template_type='BOTH')
+
+        with self.captureOnCommitCallbacks(execute=True) as callbacks:
+            session = ImportSession.objects.create(template=template, user=self.user, original_filename='dados.xlsx')
+            session.processed_rows = 10
+            session.save(update_fields=['processed_rows'])
+
+        self.assertEqual(callbacks, [])
+        self.assertFalse(SequenceCounter.objects.filter(key=DATA_VERSION_KEY).exists())
+        self.assertEqual(self._get_trends(days=7)['X-Cache'], 'HIT')
+
+    def test_error_responses_are_not_cached(self):
+        self.assertEqual(self._get_trends(bucket='year').status_code, 400)
+        self.assertEqual(self._get_trends(bucket='year')['X-Cache'], 'MISS')
+
+    def test_function_view_is_cached(self):
+        dashboard_data_api(self.factory.get('/qc/api/dashboard-data/'))
+
+        with self.assertNumQueries(0):
+            response = dashboard_data_api(self.factory.get('/qc/api/dashboard-data/'))
+
+        self.assertEqual(response['X-Cache'], 'HIT')
+        self.assertEqual(json.loads(response.content)['totals']['spot_analyses'], 3)
+
+
+class SpecificationIndexTest(QualityDataMixin, TestCase):
+    """
+    O status das análises deve ser avaliado pelo índice em memória de especificações
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.create_base_data(lines=1, products=1)
+
+    def setUp(self):
+        invalidate_specification_index()
+        self.sample = SpotSample.objects.create(
+            analysis_type=self.analysis_type,
+            date=self.today,
+            shift=self.shift,
+            production_line=self.lines[0],
+            product=self.products[0],
+        )
+
+    def _analyse(self, prop, value):
+        return SpotAnalysis.objects.create(
+            spot_sample=self.sample, property=prop, value=Decimal(value), unit='%'
+        )
+
+    def _specification_queries(self, queries):
+        return [q for q in queries if 'quality_control_specification' in q['sql']]
+
+    def test_status_from_limits(self):
+        self.assertEqual(self._analyse(self.properties[0], '5').status, 'APPROVED')
+        self.assertEqual(self._analyse(self.properties[1], '10.0001').status, 'REJECTED')
+        self.assertEqual(self._analyse(self.properties[2], '1').status, 'APPROVED')
+
+        other = Property.objects.create(identifier='SEMESPEC', name='Sem especificação', category='FISICA')
+        self.assertEqual(self._analyse(other, '999').status, 'APPROVED')
+
+    def test_index_loaded_once(self):
+        with CaptureQueriesContext(connection) as context:
+            for prop in self.properties:
+                self._analyse(prop, '5')
+                self._analyse(prop, '50')
+
+        # Assinatura da tabela e carga do índice, uma vez só
+        self.assertEqual(len(self._specification_queries(context.captured_queries)), 2)
+
+    def test_specification_save_invalidates_index(self):
+        self.assertEqual(get_limits(self.products[0].id, self.properties[0].id).usl, 10.0)
+
+        spec = Specification.objects.get(product=self.products[0], property=self.properties[0])
+        spec.usl = Decimal('4.5')
+        spec.save()
+        self.assertEqual(self._analyse(self.properties[0], '5').status, 'REJECTED')
+
+        spec.is_active = False
+        spec.save()
+        self.assertIsNone(get_limits(self.products[0].id, self.properties[0].id))
+
+        spec.delete()
+        self.assertEqual(evaluate_status(self.products[0].id, self.properties[0].id, 50), 'APPROVED')
+
+    @override_settings(SPECIFICATION_INDEX_TTL=0)
+    def test_change_by_other_process_reloads_index(self):
+        self.assertEqual(get_limits(self.products[0].id, self.properties[0].id).usl, 10.0)
+
+        # Gravação de outro processo: nenhum sinal chega a este
+        Specification.objects.filter(product=self.products[0], property=self.properties[0]).update(
+            usl=Decimal('4.5'), updated_at=timezone.now() + timedelta(seconds=1)
+        )
+        self.assertEqual(get_limits(self.products[0].id, self.properties[0].id).usl, 4.5)
+
+    def test_composite_result_uses_index(self):
+        composite = CompositeSample.objects.create(
+            date=self.today,
+            shift=self.shift,
+            production_line=self.lines[0],
+            product=self.products[0],
+            collection_time=timezone.make_aware(datetime.combine(self.today, time(12, 0))),
+            status='APPROVED'
+        )
+        result = CompositeSampleResult(composite_sample=composite, property=self.properties[0], value=Decimal('0.5'))
+
+        self.assertEqual(result.calculate_status(), 'REJECTED')
+        result.value = Decimal('2')
+        self.assertEqual(result.calculate_status(), 'APPROVED')
+
+
+class DeferredStatusTest(QualityDataMixin, TestCase):
+    """
+    O status das amostras deve ser recalculado uma única vez por bloco deferred_status
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.create_base_data(lines=1, products=1, properties=12)
+
+    def setUp(self):
+        invalidate_specification_index()
+
+    def _new_sample(self):
+        return SpotSample.objects.create(
+            analysis_type=self.analysis_type,
+            date=self.today,
+            shift=self.shift,
+            production_line=self.lines[0],
+            product=self.products[0],
+        )
+
+    def _sample_updates(self, queries):
+        return [q for q in queries if q['sql'].startswith('UPDATE "quality_control_spotsample"')]
+
+    def test_status_recalculated_once(self):
+        sample = self._new_sample()
+
+        with CaptureQueriesContext(connection) as context:
+            with SpotSample.deferred_status():
+                for i, prop in enumerate(self.properties):
+                    SpotAnalysis.objects.create(
+                        spot_sample=sample, property=prop, value=Decimal('50' if i == 3 else '5'), unit='%'
+                    )
+                self.assertEqual(self._sample_updates(context.captured_queries), [])
+
+        self.assertEqual(len(self._sample_updates(context.captured_queries)), 1)
+        sample.refresh_from_db()
+        self.assertEqual(sample.status, 'REJECTED')
+
+        rollup = ShiftQualityRollup.objects.get(date=self.today, production_line=self.lines[0])
+        self.assertEqual(rollup.spot_analyses_total, 12)
+        self.assertEqual(rollup.spot_samples_rejected, 1)
+
+    def test_matches_immediate_update(self):
+        deferred = self._new_sample()
+        immediate = self._new_sample()
+
+        with SpotSample.deferred_status():
+            SpotAnalysis.objects.create(spot_sample=deferred, property=self.properties[0], value=Decimal('5'), unit='%')
+        SpotAnalysis.objects.create(spot_sample=immediate, property=self.properties[0], value=Decimal('5'), unit='%')
+
+        deferred.refresh_from_db()
+        immediate.refresh_from_db()
+        self.assertEqual(deferred.status, 'APPROVED')
+        self.assertEqual(immediate.status, deferred.status)
+
+    def test_nested_blocks_flush_once_at_outer_exit(self):
+        sample = self._new_sample()
+
+        with SpotSample.deferred_status():
+            with SpotSample.deferred_status():
+                SpotAnalysis.objects.create(spot_sample=sample, property=self.properties[0], value=Decimal('5'), unit='%')
+            sample.refresh_from_db()
+            self.assertEqual(sample.status, 'PENDENTE')
+
+        sample.refresh_from_db()
+        self.assertEqual(sample.status, 'APPROVED')
+
+    def test_exception_skips_recalculation(self):
+        sample = self._new_sample()
+
+        with self.assertRaises(RuntimeError):
+            with SpotSample.deferred_status():
+                SpotAnalysis.objects.create(spot_sample=sample, property=self.properties[0], value=Decimal('5'), unit='%')
+                raise RuntimeError
+
+        sample.refresh_from_db()
+        self.assertEqual(sample.status, 'PENDENTE')
+
+        # Fora do bloco, o recálculo volta a ser imediato
+        SpotAnalysis.objects.create(spot_sample=sample, property=self.properties[1], value=Decimal('5'), unit='%')
+        sample.refresh_from_db()
+        self.assertEqual(sample.status, 'APPROVED')
+
+    def test_composite_results(self):
+        composite = CompositeSample.objects.create(
+            date=self.today,
+            shift=self.shift,
+            production_line=self.lines[0],
+            product=self.products[0],
+            collection_time=timezone.make_aware(datetime.combine(self.today, time(12, 0))),
+            status='APPROVED'
+        )
+
+        with SpotSample.deferred_status():
+            for prop in self.properties[:3]:
+                CompositeSampleResult.objects.create(
+                    composite_sample=composite, property=prop, value=Decimal('0.5'), unit='%'
+                )
+            composite.update_status()
+
+        self.assertEqual(composite.status, 'REJECTED')
+        composite.refresh_from_db()
+        self.assertEqual(composite.status, 'REJECTED')
+
+
+class RecalculateStatusTest(QualityDataMixin, TestCase):
+    """
+    O recálculo em massa deve reaplicar as especificações atuais com bulk_update
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.create_base_data(lines=1, products=2, properties=2)
+
+    def setUp(self):
+        invalidate_specification_index()
+
+    def _tighten_specs(self, **filters):
+        # update() não dispara sinais, simulando dados gravados com especificações antigas
+        Specification.objects.filter(**filters).update(usl=Decimal('4.0'))
+
+    def test_evaluate_statuses_vectorised(self):
+        index = {(1, 1): SpecLimits(lsl=1.0, usl=10.0, alert_lsl=2.0, alert_usl=9.0)}
+        statuses = evaluate_statuses([0.5, 1.5, 5, 9.5, 11, 99], [1, 1, 1, 1, 1, 2], [1, 1, 1, 1, 1, 1], index)
+
+        self.assertEqual(list(statuses), ['REJECTED', 'ALERT', 'APPROVED', 'ALERT', 'REJECTED', 'APPROVED'])
+        self.assertEqual(len(evaluate_statuses([], [], [], index)), 0)
+
+    def test_reapplies_specification_change(self):
+        sample = self.create_sample(self.lines[0], self.products[0], [5, 5])
+        self._tighten_specs(property=self.properties[0])
+
+        out = StringIO()
+        call_command('recalculate_status', '--chunk-size', '1', stdout=out)
+
+        statuses = dict(sample.spotanalysis_set.values_list('property__identifier', 'status'))
+        self.assertEqual(statuses, {'PROP0': 'REJECTED', 'PROP1': 'APPROVED'})
+        sample.refresh_from_db()
+        self.assertEqual(sample.status, 'REJECTED')
+        self.assertIn('Análises pontuais: 2 avaliados, 1 alterados', out.getvalue())
+
+        rollup = ShiftQualityRollup.objects.get(date=self.today, product=self.products[0])
+        self.assertEqual(rollup.spot_samples_rejected, 1)
+        self.assertEqual(rollup.spot_analyses_rejected, 1)
+
+    def test_filters(self):
+        in_range = self.create_sample(self.lines[0], self.products[0], [5, 5])
+        other_date = self.create_sample(self.lines[0], self.products[0], [5, 5], sample_date=date(2025, 2, 1))
+        other_product = self.create_sample(self.lines[0], self.products[1], [5, 5])
+        self._tighten_specs()
+
+        summary = recalculate_statuses(
+            start_date=self.today, end_date=self.today,
+            product_ids=[self.products[0].id], property_ids=[self.properties[1].id]
+        )
+
+        self.assertEqual(summary['spot_analyses'], (1, 1))
+        self.assertEqual(summary['spot_samples'], (1, 1))
+        self.assertEqual(in_range.spotanalysis_set.filter(status='REJECTED').count(), 1)
+        self.assertFalse(SpotAnalysis.objects.filter(
+            spot_sample__in=[other_date, other_product], status='REJECTED'
+        ).exists())
+
+    def test_composite_results_and_dry_run(self):
+        composite = CompositeSample.objects.create(
+            date=self.today,
+            shift=self.shift,
+            production_line=self.lines[0],
+            product=self.products[0],
+            collection_time=timezone.make_aware(datetime.combine(self.today, time(12, 0))),
+            status='APPROVED'
+        )
+        CompositeSampleResult.objects.create(
+            composite_sample=composite, property=self.properties[0], value=Decimal('5'), unit='%'
+        )
+        self._tighten_specs()
+
+        summary = recalculate_statuses(dry_run=True)
+        self.assertEqual(summary['composite_results'], (1, 1))
+        composite.refresh_from_db()
+        self.assertEqual(composite.status, 'APPROVED')
+
+        summary = recalculate_statuses()
+        self.assertEqual(summary['composite_samples'], (1, 1))
+        composite.refresh_from_db()
+        self.assertEqual(composite.status, 'REJECTED')
+
+    def test_invalid_dates(self):
+        with self.assertRaises(CommandError):
+            call_command('recalculate_status', '--start', '2025-02-01', '--end', '2025-01-01')
+
+
+class SequenceCounterTest(QualityDataMixin, TestCase):
+    """
+    Numeração sequencial alocada pelo contador compartilhado
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.create_base_data(lines=1, products=1, properties=1)
+
+    def test_sample_sequence(self):
+        first = self.create_sample(self.lines[0], self.products[0], [])
+        second = self.create_sample(self.lines[0], self.products[0], [])
+        next_day = self.create_sample(self.lines[0], self.products[0], [], sample_date=date(2025, 1, 16))
+
+        self.assertEqual((first.sample_sequence, second.sample_sequence), (1, 2))
+        self.assertEqual(next_day.sample_sequence, 1)
+
+    def test_counter_seeded_from_existing_samples(self):
+        self.create_sample(self.lines[0], self.products[0], [])
+        SpotSample.objects.update(sample_sequence=7)
+        SequenceCounter.objects.all().delete()
+
+        self.assertEqual(self.create_sample(self.lines[0], self.products[0], []).sample_sequence, 8)
+
+    def test_both_increment_paths(self):
+        self.assertEqual(next_value('teste', seed=lambda: 10, returning=False), 11)
+        self.assertEqual(next_value('teste', returning=False), 12)
+        if supports_update_returning(connection):
+            self.assertEqual(next_value('teste', returning=True), 13)
+
+
+class SequenceConcurrencyTest(QualityDataMixin, TransactionTestCase):
+    """
+    Threads paralelas não podem receber o mesmo número
+    """
+
+    # Preserva os tipos de análise criados pelas migrações para os demais testes
+    serialized_rollback = True
+
+    THREADS = 8
+    PER_THREAD = 25
+
+    def _run_threads(self, target):
+        errors = []
+
+        def worker():
+            try:
+                target()
+            except Exception as e:
+                errors.append(e)
+            finally:
+                connections.close_all()
+
+        threads = [threading.Thread(target=worker) for _ in range(self.THREADS)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(errors, [])
+
+    def _assert_unique_counter(self, returning):
+        values = []
+
+        def allocate():
+            for _ in range(self.PER_THREAD):
+                values.append(next_value('estresse', returning=returning))
+
+        self._run_threads(allocate)
+
+        total = self.THREADS * self.PER_THREAD
+        self.assertEqual(sorted(values), list(range(1, total + 1)))
+
+    def test_update_returning_path(self):
+        if not supports_update_returning(connection):
+            self.skipTest('Banco sem suporte a UPDATE ... RETURNING')
+        self._assert_unique_counter(returning=True)
+
+    def test_select_for_update_path(self):
+        self._assert_unique_counter(returning=False)
+
+    def test_parallel_sample_creation(self):
+        self.create_base_data(lines=1, products=1, properties=1)
+
+        def create_samples():
+            for _ in range(5):
+                self.create_sample(self.lines[0], self.products[0], [])
+
+        self._run_threads(create_samples)
+
+        sequences = sorted(SpotSample.objects.values_list('sample_sequence', flat=True))
+        self.assertEqual(sequences, list(range(1, self.THREADS * 5 + 1)))
+
+
+class SyntheticDataTest(TestCase):
+    """
+    A massa sintética deve ser coerente com as especificações e o consolidado
+    """
+
+    OPTIONS = dict(end='2025-01-10', days=2, lines_per_plant=2, products=2, properties=3,
+                   samples_per_shift=2, composites_per_shift=1, reports_per_day=1)
+
+    def _generate(self, **options):
+        out = StringIO()
+        call_command('generate_synthetic_data', stdout=out, **{**self.OPTIONS, **options})
+        return out.getvalue()
+
+    def test_generates_requested_volume(self):
+        output = self._generate()
+
+        # 2 dias x 2 turnos x 2 linhas
+        self.assertEqual(SpotSample.objects.count(), 16)
+        self.assertEqual(SpotAnalysis.objects.count(), 48)
+        self.assertEqual(CompositeSample.objects.count(), 8)
+        self.assertEqual(CompositeSampleResult.objects.count(), 24)
+        self.assertEqual(QualityReport.objects.count(), 2)
+        self.assertEqual(ShiftQualityRollup.objects.count(), 8)
+        self.assertIn('Análises pontuais: 48', output)
+
+        sequences = SpotSample.objects.filter(date=date(2025, 1, 10)).values_list('sample_sequence', flat=True)
+        self.assertEqual(sorted(set(sequences)), [1, 2])
+        self.assertEqual(rollup_totals()['spot_analyses_total'], 48)
+
+    def test_statuses_match_specifications(self):
+        self._generate(days=5, samples_per_shift=5)
+
+        summary = recalculate_statuses(dry_run=True)
+        self.assertTrue(all(changed == 0 for _, changed in summary.values()), summary)
+
+    def test_rejects_existing_prefix(self):
+        self._generate()
+        with self.assertRaises(CommandError):
+            self._generate()
+        self._generate(prefix='XX')
+        self.assertEqual(Product.objects.filter(code__startswith='XX').count(), 2)
+
+    def test_operator_is_not_privileged(self):
+        self._generate()
+
+        user = User.objects.get(username='benchmark')
+        self.assertFalse(user.is_staff or user.is_superuser)
+        self.assertFalse(user.has_usable_password())
+        self.assertEqual(set(SpotSample.objects.values_list('operator', flat=True)), {user.id})
+
+    def test_does_not_reuse_account_with_password(self):
+        User.objects.create_superuser('benchmark', password='senha')
+
+        with self.assertRaises(CommandError):
+            self._generate()
+        self.assertFalse(SpotSample.objects.exists())
+
+
+class BenchmarkRunnerTest(TestCase):
+    """
+    O runner deve gravar um JSON com tempos por cenário e registrar falhas sem interromper
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        call_command('generate_synthetic_data', days=2, lines_per_plant=1, products=1, properties=2,
+                     samples_per_shift=1, stdout=StringIO())
+
+    def setUp(self):
+        handle, self.output = tempfile.mkstemp(suffix='.json')
+        os.close(handle)
+        self.addCleanup(os.remove, self.output)
+
+    def _run(self, *args):
+        out = StringIO()
+        call_command('run_benchmarks', '--output', self.output, '--repeat', '1', *args, stdout=out)
+        with open(self.output, encoding='utf-8') as f:
+            return json.load(f), out.getvalue()
+
+    def test_writes_results(self):
+        report, output = self._run('--group', 'dashboards', '--group', 'apis')
+
+        self.assertEqual(report['dataset']['spot_samples'], 4)
+        self.assertEqual(report['repeat'], 1)
+        self.assertEqual({result['group'] for result in report['results'].values()}, {'dashboards', 'apis'})
+
+        shift_dashboard = report['results']['dashboard_turno']
+        self.assertEqual(shift_dashboard['status'], 'ok')
+        self.assertGreater(shift_dashboard['queries'], 0)
+        self.assertIn('median_ms', shift_dashboard)
+        self.assertEqual(report['results']['api_dashboard_data_em_cache']['queries'], 0)
+        self.assertIn('Resultados gravados', output)
+
+    @override_settings(MEDIA_ROOT=tempfile.gettempdir())
+    def test_import_scenario_leaves_dataset_untouched(self):
+        report, _ = self._run('--group', 'importacao', '--import-rows', '10')
+
+        self.assertIn('status', report['results']['importacao_planilha'])
+        self.assertEqual(SpotSample.objects.count(), 4)
+
+    def test_compare_with_previous_run(self):
+        self._run('--group', 'dashboards')
+
+        _, output = self._run('--group', 'dashboards', '--compare', self.output)
+        self.assertIn('Razão', output)
+        self.assertIn('dashboard_turno', output)
+
+
+class ImportEngineTest(QualityDataMixin, TestCase):
+    """
+    A importação deve validar por coluna, gravar em blocos e registrar os erros em massa
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.create_base_data(lines=2, products=2, properties=2)
+        cls.user = User.objects.create_user('importador')
+        cls.template = ImportTemplate.objects.create(
+            name='Padrão', template_type='BOTH', field_mapping={'Umidade_%': 'PROP1'}
+        )
+
+    def setUp(self):
+        invalidate_specification_index()
+        self.session = ImportSession.objects.create(
+            template=self.template, user=self.user, original_filename='dados.xlsx'
+        )
+
+    def _spot_row(self, **values):
+        row = {
+            'Data': '2025-01-15', 'Hora_Amostra': '08:30', 'Tipo_Analise': 'PONTUAL',
+            'Produto_Codigo': 'PR0', 'Linha_Producao': 'Linha 0', 'Turno': 'A',
+            'PROP0': 5.0, 'Umidade_%': 5.0,
+        }
+        row.update(values)
+        return row
+
+    def _composite_row(self, **values):
+        row = {
+            'Data_Coleta': '2025-01-15', 'Hora_Inicio': '07:00', 'Hora_Fim': '19:00', 'Tipo_Analise': 'COMPOSTA',
+            'Produto_Codigo': 'PR1', 'Linha_Producao': 'Linha 1', 'Turno': 'A', 'PROP0': 5.0,
+        }
+        row.update(values)
+        return row
+
+    def _import(self, spot_rows, composite_rows=(), chunk_size=2):
+        return import_dataframes(
+            self.session, pd.DataFrame(list(spot_rows)), pd.DataFrame(list(composite_rows)), chunk_size=chunk_size
+        )
+
+    def test_imports_valid_rows_in_chunks(self):
+        rows = [self._spot_row(Sequencia=i + 1) for i in range(5)]
+        rows[2]['PROP0'] = 20
+
+        with CaptureQueriesContext(connection) as queries:
+            result = self._import(rows, [self._composite_row()])
+        self.assertEqual(result, (6, 0))
+
+        # Cadastros carregados uma vez, independentemente do número de linhas
+        product_queries = [q for q in queries.captured_queries if 'FROM "quality_control_product"' in q['sql']]
+        self.assertEqual(len(product_queries), 1)
+
+        samples = SpotSample.objects.order_by('sample_sequence')
+        self.assertEqual(list(samples.values_list('sample_sequence', flat=True)), [1, 2, 3, 4, 5])
+        self.assertEqual(samples.get(sample_sequence=3).status, 'REJECTED')
+        self.assertEqual(SpotAnalysis.objects.count(), 10)
+        self.assertEqual(
+            set(SpotAnalysis.objects.values_list('property__identifier', flat=True)), {'PROP0', 'PROP1'}
+        )
+
+        composite = CompositeSample.objects.get()
+        self.assertEqual(composite.status, 'APPROVED')
+        self.assertEqual(composite.compositesampleresult_set.count(), 1)
+
+        self.session.refresh_from_db()
+        self.assertEqual((self.session.processed_rows, self.session.successful_rows), (6, 6))
+
+        rollup = ShiftQualityRollup.objects.get(production_line=self.lines[0], product=self.products[0])
+        self.assertEqual((rollup.spot_samples_total, rollup.spot_samples_rejected), (5, 1))
+        self.assertEqual(ShiftQualityRollup.objects.get(product=self.products[1]).composite_samples_total, 1)
+
+    def test_invalid_rows_are_reported(self):
+        rows = [
+            self._spot_row(),
+            self._spot_row(Produto_Codigo='XX'),
+            self._spot_row(Data='15/31/2025'),
+            self._spot_row(Hora_Amostra='25:99'),
+            self._spot_row(PROP0='abc'),
+            self._spot_row(PROP0=None, **{'Umidade_%': None}),
+            self._spot_row(Turno=None),
+        ]
+
+        self.assertEqual(self._import(rows), (1, 6))
+
+        errors = dict(ImportError.objects.values_list('row_number', 'error_type'))
+        self.assertEqual(errors, {
+            3: 'LOOKUP_ERROR', 4: 'INVALID_DATE', 5: 'INVALID_TIME', 6: 'INVALID_VALUE',
+            7: 'NO_VALUES', 8: 'REQUIRED_FIELD',
+        })
+        self.assertIn('Produto XX não encontrado', ImportError.objects.get(row_number=3).error_message)
+        self.assertEqual(SpotSample.objects.count(), 1)
+
+    def test_missing_column_fails_whole_sheet(self):
+        rows = [self._spot_row() for _ in range(3)]
+        for row in rows:
+            del row['Turno']
+
+        self.assertEqual(self._import(rows), (0, 3))
+        error = ImportError.objects.get()
+        self.assertEqual((error.row_number, error.error_type, error.column_name), (1, 'MISSING_COLUMN', 'Turno'))
+
+    def test_allocates_missing_sequences_after_existing_samples(self):
+        self.create_sample(self.lines[0], self.products[0], [5, 5])
+        self.create_sample(self.lines[0], self.products[0], [5, 5])
+
+        self._import([self._spot_row(), self._spot_row(), self._spot_row(Sequencia=10)])
+
+        sequences = SpotSample.objects.values_list('sample_sequence', flat=True)
+        self.assertEqual(sorted(sequences), [1, 2, 3, 4, 10])
+
+        # O contador avança além da sequência importada explicitamente
+        sample = self.create_sample(self.lines[0], self.products[0], [5, 5])
+        self.assertEqual(sample.sample_sequence, 11)
+
+    def test_failed_chunk_keeps_committed_chunks_consistent(self):
+        self.create_sample(self.lines[0], self.products[0], [5, 5])
+        bulk_create = SpotAnalysis.objects.bulk_create
+        calls = []
+
+        def fail_second_chunk(objs, **kwargs):
+            calls.append(len(objs))
+            if len(calls) == 2:
+                raise RuntimeError('falha no segundo bloco')
+            return bulk_create(objs, **kwargs)
+
+        rows = [self._spot_row(Sequencia=10 + i) for i in range(4)]
+        with self.captureOnCommitCallbacks() as callbacks:
+            with mock.patch.object(SpotAnalysis.objects, 'bulk_create', side_effect=fail_second_chunk):
+                with self.assertRaisesMessage(RuntimeError, 'falha no segundo bloco'):
+                    self._import(rows)
+
+        # Só o primeiro bloco foi gravado, e o consolidado, o contador e o cache refletem isso
+        self.assertEqual(sorted(SpotSample.objects.values_list('sample_sequence', flat=True)), [1, 10, 11])
+        rollup = ShiftQualityRollup.objects.get(production_line=self.lines[0], product=self.products[0])
+        self.assertEqual(rollup.spot_samples_total, 3)
+        self.assertGreater(self.create_sample(self.lines[0], self.products[0], [5, 5]).sample_sequence, 11)
+        self.assertIn(bump_data_version, callbacks)
+
+
+class ImportUpsertTest(ImportEngineTest):
+    """
+    No modo UPSERT a reimportação casa as amostras pela chave natural e só grava as diferenças
+    """
+
+    def setUp(self):
+        super().setUp()
+        self.session.import_mode = 'UPSERT'
+        self.session.save()
+
+    def _reimport(self, spot_rows, composite_rows=(), chunk_size=2):
+        self.session = ImportSession.objects.create(
+            template=self.template, user=self.user, original_filename='dados.xlsx', import_mode='UPSERT'
+        )
+        return self._import(spot_rows, composite_rows, chunk_size=chunk_size)
+
+    def test_reimport_without_changes_writes_nothing(self):
+        rows = [self._spot_row(Sequencia=i + 1) for i in range(4)]
+        composite = [self._composite_row(Sequencia=1)]
+        self._import(rows, composite)
+        updated_at = dict(SpotAnalysis.objects.values_list('id', 'updated_at'))
+
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(self._reimport(rows, composite), (5, 0))
+
+        writes = [q['sql'] for q in queries.captured_queries
+                  if q['sql'].startswith(('INSERT INTO "quality_control_spot', 'UPDATE "quality_control_spot',
+                                          'INSERT INTO "quality_control_composite',
+                                          'UPDATE "quality_control_composite'))]
+        self.assertEqual(writes, [])
+        self.assertEqual((SpotSample.objects.count(), SpotAnalysis.objects.count()), (4, 8))
+        self.assertEqual(CompositeSample.objects.count(), 1)
+        self.assertEqual(dict(SpotAnalysis.objects.values_list('id', 'updated_at')), updated_at)
+        self.assertIn('Análises sem alteração: 9', self.session.success_log)
+
+    def test_changed_values_are_updated_and_new_rows_created(self):
+        self._import([self._spot_row(Sequencia=i + 1) for i in range(3)])
+
+        rows = [self._spot_row(Sequencia=i + 1) for i in range(3)]
+        rows[1]['PROP0'] = 20
+        rows.append(self._spot_row(Sequencia=4))
+        self.assertEqual(self._reimport(rows), (4, 0))
+
+        self.assertEqual(SpotSample.objects.count(), 4)
+        sample = SpotSample.objects.get(sample_sequence=2)
+        self.assertEqual(sample.status, 'REJECTED')
+        self.assertEqual(
+            list(sample.spotanalysis_set.filter(property__identifier='PROP0').values_list('value', flat=True)),
+            [Decimal('20')]
+        )
+        self.assertIn('Amostras atualizadas: 1', self.session.success_log)
+        self.assertIn('Amostras incluídas: 1', self.session.success_log)
+
+        rollup = ShiftQualityRollup.objects.get(production_line=self.lines[0], product=self.products[0])
+        self.assertEqual((rollup.spot_samples_total, rollup.spot_samples_rejected), (4, 1))
+
+    def test_lookup_queries_do_not_grow_with_rows(self):
+        def count_queries(rows):
+            with CaptureQueriesContext(connection) as queries:
+                self._reimport(rows, chunk_size=100)
+            return sum('FROM "quality_control_spotanalysis"' in q['sql'] for q in queries.captured_queries)
+
+        self._import([self._spot_row(Sequencia=i + 1) for i in range(8)], chunk_size=100)
+        self.assertEqual(count_queries([self._spot_row(Sequencia=1)]),
+                         count_queries([self._spot_row(Sequencia=i + 1) for i in range(8)]))
+
+    def test_repeated_key_in_file_is_an_error(self):
+        rows = [self._spot_row(Sequencia=1), self._spot_row(Sequencia=1, PROP0=6.0)]
+
+        self.assertEqual(self._import(rows), (1, 1))
+        self.assertEqual(list(self.session.errors.values_list('error_type', flat=True)), ['DUPLICATE_ROW'])
+
+    def test_rows_without_sequence_are_new_samples(self):
+        self._import([self._spot_row(), self._spot_row()])
+        self._reimport([self._spot_row()])
+
+        self.assertEqual(SpotSample.objects.count(), 3)
+
+    def test_composites_without_sequence_get_distinct_sequences(self):
+        self._import([], [self._composite_row(), self._composite_row(PROP0=20)])
+        self._reimport([], [self._composite_row()])
+
+        samples = CompositeSample.objects.order_by('sequence')
+        self.assertEqual(list(samples.values_list('sequence', flat=True)), [1, 2, 3])
+        self.assertEqual(samples.get(sequence=2).status, 'REJECTED')
+
+
+def import_workbook(spot_rows, composite_rows=()):
+    """Conteúdo .xlsx com as abas esperadas pela importação"""
+    buffer = BytesIO()
+    with pd.ExcelWriter(buffer, engine='openpyxl') as writer:
+        pd.DataFrame(list(spot_rows)).to_excel(writer, sheet_name='Analises_Pontuais', index=False)
+        pd.DataFrame(list(composite_rows), columns=['Data_Coleta']).to_excel(
+            writer, sheet_name='Amostras_Compostas', index=False
+        )
+    return buffer.getvalue()
+
+
+class ImportQueueMixin(QualityDataMixin):
+
+    ROW = {
+        'Data': '2025-01-15', 'Hora_Amostra': '08:30', 'Tipo_Analise': 'PONTUAL',
+        'Produto_Codigo': 'PR0', 'Linha_Producao': 'Linha 0', 'Turno': 'A', 'PROP0': 5.0,
+    }
+
+    @classmethod
+    def create_queue_data(cls):
+        cls.create_base_data(lines=1, products=1, properties=1)
+        cls.user = User.objects.create_user('importador', password='senha')
+        cls.template = ImportTemplate.objects.create(name='Padrão', template_type='BOTH')
+
+    def setUp(self):
+        media = tempfile.TemporaryDirectory()
+        self.addCleanup(media.cleanup)
+        override = override_settings(MEDIA_ROOT=media.name)
+        override.enable()
+        self.addCleanup(override.disable)
+
+    def create_session(self, rows=1):
+        session = ImportSession(template=self.template, user=self.user, original_filename='dados.xlsx')
+        session.excel_file.save('dados.xlsx', SimpleUploadedFile('dados.xlsx', import_workbook([self.ROW] * rows)))
+        return session
+
+
+class ImportQueueTest(ImportQueueMixin, TestCase):
+    """
+    Com IMPORT_INLINE=false o upload só enfileira; o worker assume as sessões uma a uma e grava o andamento
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.create_queue_data()
+
+    @override_settings(IMPORT_INLINE=False)
+    def test_upload_returns_without_processing(self):
+        self.client.force_login(self.user)
+        upload = SimpleUploadedFile('dados.xlsx', import_workbook([self.ROW]))
+
+        response = self.client.post('/qc/import/upload/', {'excel_file': upload, 'template_id': self.template.id})
+
+        self.assertEqual(response.status_code, 302)
+        session = ImportSession.objects.get()
+        self.assertEqual(session.status, 'PENDING')
+        self.assertEqual(SpotSample.objects.count(), 0)
+
+        progress = self.client.get(f'/qc/import/status/{session.id}/progress/').json()
+        self.assertEqual((progress['status'], progress['finished']), ('PENDING', False))
+
+    def test_upload_processed_inline_by_default(self):
+        self.client.force_login(self.user)
+        upload = SimpleUploadedFile('dados.xlsx', import_workbook([self.ROW] * 2))
+
+        self.client.post('/qc/import/upload/', {'excel_file': upload, 'template_id': self.template.id})
+
+        self.assertEqual(ImportSession.objects.get().status, 'COMPLETED')
+        self.assertEqual(SpotSample.objects.count(), 2)
+
+    def test_inline_skips_session_claimed_by_worker(self):
+        session = self.create_session()
+        self.assertEqual(claim_next('w1').id, session.id)
+
+        enqueue(session)
+
+        session.refresh_from_db()
+        self.assertEqual((session.status, session.worker), ('PROCESSING', 'w1'))
+        self.assertEqual(SpotSample.objects.count(), 0)
+
+    def test_inline_claims_before_processing(self):
+        session = self.create_session(rows=2)
+
+        enqueue(session)
+
+        self.assertEqual(session.status, 'COMPLETED')
+        self.assertTrue(session.worker)
+        self.assertIsNone(claim_next('w1'))
+        self.assertEqual(SpotSample.objects.count(), 2)
+
+    def test_claims_oldest_pending_session_once(self):
+        first, second = self.create_session(), self.create_session()
+
+        self.assertEqual(claim_next('w1').id, first.id)
+        self.assertEqual(claim_next('w2').id, second.id)
+        self.assertIsNone(claim_next('w3'))
+
+        first.refresh_from_db()
+        self.assertEqual((first.status, first.worker), ('PROCESSING', 'w1'))
+        self.assertIsNotNone(first.heartbeat_at)
+
+    def test_process_next_reports_progress(self):
+        session = self.create_session(rows=3)
+
+        self.assertEqual(process_next('w1').id, session.id)
+
+        self.client.force_login(self.user)
+        progress = self.client.get(f'/qc/import/status/{session.id}/progress/').json()
+        self.assertEqual(progress['status'], 'COMPLETED')
+        self.assertEqual((progress['processed_rows'], progress['successful_rows']), (3, 3))
+        self.assertEqual(progress['progress_percentage'], 100.0)
+        self.assertTrue(progress['finished'])
+        self.assertEqual(SpotSample.objects.count(), 3)
+
+    def test_progress_is_private_to_the_owner(self):
+        session = self.create_session()
+        self.client.force_login(User.objects.create_user('outro'))
+
+        self.assertEqual(self.client.get(f'/qc/import/status/{session.id}/progress/').status_code, 404)
+
+    def test_stale_sessions_are_failed(self):
+        stale, running = self.create_session(), self.create_session()
+        ImportSession.objects.filter(id=stale.id).update(
+            status='PROCESSING', heartbeat_at=timezone.now() - timedelta(hours=1)
+        )
+        ImportSession.objects.filter(id=running.id).update(status='PROCESSING', heartbeat_at=timezone.now())
+
+        self.assertEqual(fail_stale_sessions(stale_after=600), 1)
+        stale.refresh_from_db()
+        self.assertEqual(stale.status, 'FAILED')
+        self.assertEqual(ImportSession.objects.get(id=running.id).status, 'PROCESSING')
+
+
+class ImportReaderTest(ImportQueueMixin, TestCase):
+    """
+    Arquivos lidos em blocos: linhas vazias ignoradas e números de linha preservados
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.create_queue_data()
+
+    def write_file(self, name, content):
+        path = os.path.join(tempfile.mkdtemp(dir=settings.MEDIA_ROOT), name)
+        mode = 'w' if isinstance(content, str) else 'wb'
+        with open(path, mode, encoding='utf-8' if mode == 'w' else None) as f:
+            f.write(content)
+        return path
+
+    def workbook_path(self, rows):
+        """Planilha com as linhas informadas (None = linha vazia) na aba de análises pontuais"""
+        from openpyxl import Workbook
+        workbook = Workbook()
+        sheet = workbook.active
+        sheet.title = 'Analises_Pontuais'
+        sheet.append(list(self.ROW))
+        for row in rows:
+            sheet.append([] if row is None else [row.get(column) for column in self.ROW])
+        workbook.create_sheet('Amostras_Compostas').append(['Data_Coleta'])
+        buffer = BytesIO()
+        workbook.save(buffer)
+        return self.write_file('dados.xlsx', buffer.getvalue())
+
+    def test_xlsx_batches_keep_sheet_positions(self):
+        path = self.workbook_path([self.ROW, self.ROW, None, self.ROW])
+
+        with SpreadsheetReader(path, batch_size=2) as reader:
+            batches = list(reader.batches('Analises_Pontuais'))
+            self.assertEqual(reader.estimated_rows('Analises_Pontuais'), 4)
+
+        self.assertEqual([list(batch.index) for batch in batches], [[0, 1], [3]])
+        self.assertEqual(list(batches[0].columns), list(self.ROW))
+
+    def test_missing_sheet_fails_on_open(self):
+        path = self.workbook_path([self.ROW])
+        with SpreadsheetReader(path) as reader:
+            with self.assertRaises(ValueError):
+                reader.batches('Outra')
+
+    def test_import_file_in_batches(self):
+        invalid = dict(self.ROW, Produto_Codigo='XX')
+        path = self.workbook_path([self.ROW, None, self.ROW, invalid, self.ROW, self.ROW])
+        session = self.create_session()
+
+        self.assertEqual(import_file(session, path, chunk_size=2), (4, 1))
+
+        session.refresh_from_db()
+        self.assertEqual((session.total_rows, session.processed_rows), (5, 5))
+        self.assertEqual(SpotSample.objects.count(), 4)
+        self.assertEqual(list(session.errors.values_list('row_number', flat=True)), [5])
+
+    def test_missing_column_reported_once(self):
+        rows = [{key: value for key, value in self.ROW.items() if key != 'Turno'}] * 5
+        session = self.create_session()
+        path = self.write_file('dados.xlsx', import_workbook(rows))
+
+        self.assertEqual(import_file(session, path, chunk_size=2), (0, 5))
+        self.assertEqual(list(session.errors.values_list('error_type', flat=True)), ['MISSING_COLUMN'])
+
+    def test_csv_semicolon(self):
+        header = ';'.join(self.ROW)
+        line = ';'.join(str(value) for value in self.ROW.values())
+        path = self.write_file('dados.csv', '\n'.join([header, line, '', line]) + '\n')
+        session = self.create_session()
+
+        self.assertEqual(import_file(session, path, chunk_size=1), (2, 0))
+        self.assertEqual(SpotSample.objects.count(), 2)
+
+
+class ImportWorkerCommandTest(ImportQueueMixin, TransactionTestCase):
+    """
+    Vários workers devem esvaziar a fila sem processar a mesma sessão duas vezes
+    """
+
+    # Preserva os tipos de análise criados pelas migrações para os demais testes
+    serialized_rollback = True
+
+    def test_parallel_workers_drain_queue(self):
+        self.create_queue_data()
+        sessions = [self.create_session(rows=2) for _ in range(4)]
+
+        out = StringIO()
+        call_command('process_imports', '--once', '--workers', '2', '--interval', '0.1', stdout=out)
+
+        self.assertIn('4 importações processadas', out.getvalue())
+        statuses = set(ImportSession.objects.values_list('status', flat=True))
+        self.assertEqual(statuses, {'COMPLETED'}, list(ImportSession.objects.values_list('error_log', flat=True)))
+        self.assertEqual(SpotSample.objects.count(), 2 * len(sessions))
+
+
+class ReportPdfCacheTest(TestCase):
+    """
+    PDFs de laudos em cache: renderizados uma vez por conteúdo, substituídos quando os dados mudam
+    """
+
+    def setUp(self):
+        temp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(temp_dir.cleanup)
+        settings_override = override_settings(REPORT_PDF_CACHE_DIR=temp_dir.name)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        self.directory = temp_dir.name
+        self.renders = []
+
+    def render(self, content):
+        def render():
+            self.renders.append(content)
+            return BytesIO(content)
+        return render
+
+    def test_content_key(self):
+        data = {'status': 'APPROVED', 'analyses': [(1, Decimal('1.5000'), date(2025, 1, 15))]}
+        self.assertEqual(pdf_cache.content_key(data), pdf_cache.content_key(dict(reversed(data.items()))))
+        self.assertNotEqual(pdf_cache.content_key(data), pdf_cache.content_key({**data, 'status': 'DRAFT'}))
+
+    def test_renders_once_per_key(self):
+        key = pdf_cache.content_key({'status': 'APPROVED'})
+        path, cached = pdf_cache.get_or_render('laudo_LQ1', key, self.render(b'%PDF-1'))
+        self.assertFalse(cached)
+
+        again, cached = pdf_cache.get_or_render('laudo_LQ1', key, self.render(b'%PDF-2'))
+        self.assertTrue(cached)
+        self.assertEqual(again, path)
+        self.assertEqual(self.renders, [b'%PDF-1'])
+        self.assertEqual(path.read_bytes(), b'%PDF-1')
+
+    def test_new_key_replaces_previous_version(self):
+        old, _ = pdf_cache.get_or_render('laudo_LQ1', 'a' * 64, self.render(b'%PDF-1'))
+        other, _ = pdf_cache.get_or_render('laudo_LQ10', 'a' * 64, self.render(b'%PDF-3'))
+        new, cached = pdf_cache.get_or_render('laudo_LQ1', 'b' * 64, self.render(b'%PDF-2'))
+
+        self.assertFalse(cached)
+        self.assertFalse(old.exists())
+        self.assertTrue(other.exists())
+        self.assertEqual(sorted(os.listdir(self.directory)), sorted([new.name, other.name]))
+
+
+class QualityReportPdfTest(QualityDataMixin, TestCase):
+    """
+    PDF do laudo de carregamento servido pelo cache enquanto os resultados não mudam
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.create_base_data(lines=1, products=1, properties=2)
+        cls.user = User.objects.create_user('laudos', first_name='Ana', last_name='Lima')
+        cls.report = cls.create_quality_report('LQ-1', [5, 6], user=cls.user)
+
+    def setUp(self):
+        temp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(temp_dir.cleanup)
+        settings_override = override_settings(REPORT_PDF_CACHE_DIR=temp_dir.name)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+    def load(self):
+        return QualityReport.objects.get(pk=self.report.pk)
+
+    def test_editing_results_renders_new_pdf(self):
+        first_key = PDFReportGenerator(self.load()).cache_key()
+        first, cached = PDFReportGenerator(self.load()).cached_pdf()
+        self.assertFalse(cached)
+        self.assertTrue(first.read_bytes().startswith(b'%PDF'))
+        self.assertEqual(PDFReportGenerator(self.load()).cached_pdf(), (first, True))
+
+        result = CompositeSampleResult.objects.filter(composite_sample__qualityreport=self.report).first()
+        result.value = Decimal('7.5')
+        result.save()
+
+        self.assertNotEqual(PDFReportGenerator(self.load()).cache_key(), first_key)
+        second, cached = PDFReportGenerator(self.load()).cached_pdf()
+        self.assertFalse(cached)
+        self.assertNotEqual(second, first)
+        self.assertFalse(first.exists())
+
+    def test_prefetched_report_renders_without_queries(self):
+        report, = prefetch_reports([self.report.pk])
+        with self.assertNumQueries(0):
+            name, path = render_report_file(report)
+        self.assertEqual(name, 'laudo_LQ-1.pdf')
+        self.assertEqual(PDFReportGenerator(self.load()).cache_key(), PDFReportGenerator(report).cache_key())
+
+    def test_pdf_view(self):
+        self.client.force_login(self.user)
+        response = self.client.get(f'/qc/reports/{self.report.pk}/pdf/')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], 'application/pdf')
+        self.assertIn('laudo_LQ-1.pdf', response['Content-Disposition'])
+        self.assertTrue(b''.join(response.streaming_content).startswith(b'%PDF'))
+
+
+def _render_test_file(item):
+    """Renderização de teste do pdf_batch (função de módulo, enviada aos processos por pickle)"""
+    directory, number = item
+    path = os.path.join(directory, f'{number}.pdf')
+    with open(path, 'wb') as f:
+        f.write(f'%PDF {number} {os.getpid()}'.encode())
+    return f'laudo_{number}.pdf', path
+
+
+class ReportPdfBatchTest(TestCase):
+    """
+    Geração em lote: renderização em processos e ZIP com um PDF por laudo
+    """
+
+    def setUp(self):
+        temp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(temp_dir.cleanup)
+        self.directory = temp_dir.name
+        self.items = [(self.directory, number) for number in range(6)]
+
+    def test_process_pool_keeps_order(self):
+        files = pdf_batch.render_all(self.items, _render_test_file, workers=2)
+
+        self.assertEqual([name for name, _ in files], [f'laudo_{number}.pdf' for number in range(6)])
+        pids = set()
+        for _, path in files:
+            with open(path, 'rb') as f:
+                pids.add(f.read().split()[-1])
+        self.assertNotIn(str(os.getpid()).encode(), pids)
+        # A conexão do processo principal continua utilizável
+        self.assertEqual(User.objects.count(), 0)
+
+    def test_single_worker_runs_inline(self):
+        files = pdf_batch.render_all(self.items[:1], _render_test_file, workers=4)
+        with open(files[0][1], 'rb') as f:
+            self.assertTrue(f.read().endswith(str(os.getpid()).encode()))
+
+    def test_zip_and_rate(self):
+        output = BytesIO()
+        result = pdf_batch.run_batch(self.items, _render_test_file, workers=1, output=output)
+
+        with zipfile.ZipFile(output) as archive:
+            self.assertEqual(archive.namelist(), [name for name, _ in result.files])
+            self.assertTrue(archive.read('laudo_3.pdf').startswith(b'%PDF 3'))
+        self.assertGreater(result.rate, 0)
+        self.assertEqual(pdf_batch.BatchResult([], 0).rate, 0.0)
+
+
+class GenerateReportPdfsCommandTest(QualityDataMixin, TransactionTestCase):
+    """
+    O comando generate_report_pdfs renderiza os laudos em processos e os reúne em um ZIP
+    """
+
+    # Preserva os tipos de análise criados pelas migrações para os demais testes
+    serialized_rollback = True
+
+    def setUp(self):
+        temp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(temp_dir.cleanup)
+        self.directory = temp_dir.name
+        settings_override = override_settings(REPORT_PDF_CACHE_DIR=os.path.join(temp_dir.name, 'cache'))
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        self.create_base_data(lines=1, products=1, properties=2)
+
+    def test_command_writes_zip(self):
+        reports = [self.create_quality_report(f'LQ-{i}', [5, i + 1]) for i in range(3)]
+        output = os.path.join(self.directory, 'laudos.zip')
+
+        out = StringIO()
+        call_command(
+            'generate_report_pdfs', *[str(report.pk) for report in reports], '--workers', '2', '--output', output,
+            stdout=out
+        )
+
+        self.assertIn(f'3 laudos gerados em {output}', out.getvalue())
+        with zipfile.ZipFile(output) as archive:
+            self.assertEqual(archive.namelist(), ['laudo_LQ-0.pdf', 'laudo_LQ-1.pdf', 'laudo_LQ-2.pdf'])
+            self.assertTrue(archive.read('laudo_LQ-2.pdf').startswith(b'%PDF'))
+        self.assertEqual(len(os.listdir(os.path.join(self.directory, 'cache'))), 3)
+
+    def test_missing_report(self):
+        report = self.create_quality_report('LQ-1', [5, 5])
+        with self.assertRaisesMessage(CommandError, 'Laudos não encontrados: 999999'):
+            call_command('generate_report_pdfs', str(report.pk), '999999', stdout=StringIO())
+
+
+class PDFAssetsTest(TestCase):
+    """
+    Registro de estilos e logotipo dos PDFs: montados uma vez e compartilhados
+    """
+
+    def setUp(self):
+        temp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(temp_dir.cleanup)
+        os.makedirs(os.path.join(temp_dir.name, 'images'))
+        self.logo = os.path.join(temp_dir.name, 'images', 'logo.png')
+        settings_override = override_settings(STATIC_ROOT=temp_dir.name)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        pdf_assets.clear()
+        self.addCleanup(pdf_assets.clear)
+
+    def save_logo(self, color, mtime):
+        from PIL import Image
+        Image.new('RGB', (40, 20), color).save(self.logo)
+        os.utime(self.logo, (mtime, mtime))
+
+    def test_styles_are_shared(self):
+        self.assertIs(pdf_assets.styles(), pdf_assets.styles())
+        self.assertIs(pdf_assets.table_style('info'), pdf_assets.table_style('info'))
+        self.assertEqual(pdf_assets.styles().title.fontSize, 18)
+        self.assertEqual(
+            pdf_assets.table_style('results').getCommands(), pdf_assets.build_table_style('results').getCommands()
+        )
+
+    def test_logo_read_once_and_reloaded_when_replaced(self):
+        self.assertIsNone(pdf_assets.logo_image(10, 10))
+
+        self.save_logo('red', 1000)
+        reader = pdf_assets.logo_reader()
+        self.assertIs(pdf_assets.logo_reader(), reader)
+
+        self.save_logo('blue', 2000)
+        self.assertIsNot(pdf_assets.logo_reader(), reader)
+
+    def test_shared_logo_renders(self):
+        from reportlab.platypus import Paragraph, SimpleDocTemplate
+        self.save_logo('red', 1000)
+        output = BytesIO()
+        story = [pdf_assets.logo_image(60, 30), Paragraph('Laudo', pdf_assets.styles().normal)]
+        for _ in range(2):
+            SimpleDocTemplate(output).build(story[:])
+            self.assertIn(b'/Subtype /Image', output.getvalue())
+            output = BytesIO()
+
+
+class GeneratedReportQueueTest(QualityDataMixin, TestCase):
+    """
+    Laudos gerados são renderizados fora da requisição e acompanhados pelo status
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.create_base_data(lines=1, products=1, properties=3)
+        cls.user = User.objects.create_user('laudos')
+        cls.template = ReportTemplate.objects.create(name='Padrão', template_type='SPOT')
+
+    def setUp(self):
+        temp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(temp_dir.cleanup)
+        settings_override = override_settings(MEDIA_ROOT=temp_dir.name, REPORT_RENDER_INLINE=False)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        sample = self.create_sample(self.lines[0], self.products[0], [5, 20, 5])
+        self.analysis = sample.spotanalysis_set.first()
+
+    def test_worker_renders_and_rerequest_updates_same_report(self):
+        report = report_queue.request_render(self.template, self.user, spot_analysis=self.analysis)
+        self.assertEqual(report.render_status, 'PENDING')
+        self.assertTrue(report.report_number.startswith('LG'))
+
+        report = report_queue.process_next('teste')
+        self.assertEqual(report.render_status, 'READY')
+        first_file = report.pdf_file.name
+        with report.pdf_file.open('rb') as f:
+            self.assertTrue(f.read().startswith(b'%PDF'))
+        self.assertIsNone(report_queue.process_next('teste'))
+
+        again = report_queue.request_render(self.template, self.user, spot_analysis=self.analysis)
+        self.assertEqual(again.pk, report.pk)
+        self.assertEqual(again.render_status, 'PENDING')
+        again = report_queue.process_next('teste')
+        self.assertEqual(again.render_status, 'READY')
+        self.assertFalse(report.pdf_file.storage.exists(first_file))
+        self.assertEqual(GeneratedReport.objects.count(), 1)
+
+    def test_rerequest_during_render_discards_stale_pdf(self):
+        report_queue.request_render(self.template, self.user, spot_analysis=self.analysis)
+        claimed = report_queue.claim_next('teste')
+        self.assertIsNone(report_queue.claim_next('outro'))
+
+        report_queue.request_render(self.template, self.user, spot_analysis=self.analysis)
+        report = report_queue.render_report(claimed)
+
+        self.assertEqual(report.render_status, 'PENDING')
+        self.assertFalse(report.pdf_file)
+        self.assertEqual(os.listdir(os.path.join(settings.MEDIA_ROOT, 'reports')), [])
+
+    def test_failure_and_stale_requeue(self):
+        report_queue.request_render(self.template, self.user, spot_analysis=self.analysis)
+        with mock.patch('quality_control.report_queue.render_generated_report', side_effect=ValueError('sem dados')):
+            report = report_queue.process_next('teste')
+        self.assertEqual(report.render_status, 'FAILED')
+        self.assertEqual(report.render_error, 'sem dados')
+
+        report_queue.request_render(self.template, self.user, spot_analysis=self.analysis)
+        report_queue.claim_next('teste')
+        GeneratedReport.objects.update(heartbeat_at=timezone.now() - timedelta(hours=1))
+        self.assertEqual(report_queue.requeue_stale_renders(600), 1)
+        self.assertEqual(GeneratedReport.objects.get().render_status, 'PENDING')
+
+        with self.assertRaises(ValueError):
+            report_queue.request_render(self.template, self.user)
+
+    def test_request_poll_and_download(self):
+        self.client.force_login(self.user)
+        response = self.client.post('/qc/reports/generated/request/', {
+            'template_id': self.template.pk, 'spot_analysis_id': self.analysis.pk,
+        })
+        self.assertEqual(response.status_code, 202)
+        data = response.json()
+        self.assertEqual(response['Location'], data['status_url'])
+
+        response = self.client.get(data['pdf_url'])
+        self.assertEqual(response.status_code, 202)
+        self.assertEqual(response['Retry-After'], '2')
+        self.assertFalse(self.client.get(data['status_url']).json()['ready'])
+
+        report_queue.process_next('teste')
+
+        self.assertTrue(self.client.get(data['status_url']).json()['ready'])
+        self.assertRedirects(
+            self.client.get(data['status_url'], {'redirect': 1}), data['pdf_url'], fetch_redirect_response=False
+        )
+        response = self.client.get(data['pdf_url'])
+        self.assertEqual(response['Content-Type'], 'application/pdf')
+        self.assertTrue(b''.join(response.streaming_content).startswith(b'%PDF'))
+
+        response = self.client.post('/qc/reports/generated/request/', {'template_id': self.template.pk})
+        self.assertEqual(response.status_code, 400)
+
+    def test_inline_rendering(self):
+        with override_settings(REPORT_RENDER_INLINE=True):
+            report = report_queue.request_render(self.template, self.user, spot_analysis=self.analysis)
+        self.assertEqual(report.render_status, 'READY')
+
+
+class ReportWorkerCommandTest(QualityDataMixin, TransactionTestCase):
+    """
+    Vários workers devem renderizar todos os laudos pendentes uma única vez
+    """
+
+    # Preserva os tipos de análise criados pelas migrações para os demais testes
+    serialized_rollback = True
+
+    def test_parallel_workers_drain_queue(self):
+        temp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(temp_dir.cleanup)
+        self.create_base_data(lines=1, products=1, properties=2)
+        user = User.objects.create_user('laudos')
+        template = ReportTemplate.objects.create(name='Padrão', template_type='SPOT')
+
+        with override_settings(MEDIA_ROOT=temp_dir.name, REPORT_RENDER_INLINE=False):
+            for _ in range(4):
+                sample = self.create_sample(self.lines[0], self.products[0], [5, 5])
+                report_queue.request_render(template, user, spot_analysis=sample.spotanalysis_set.first())
+
+            out = StringIO()
+            call_command('process_reports', '--once', '--workers', '2', '--interval', '0.1', stdout=out)
+
+        self.assertIn('4 laudos renderizados', out.getvalue())
+        self.assertEqual(set(GeneratedReport.objects.values_list('render_status', flat=True)), {'READY'})
+        self.assertEqual(len(os.listdir(os.path.join(temp_dir.name, 'reports'))), 4)
@@ -59,12 +59,17 @@ urlpatterns = [
     path('reports/', views.reports_list_view, name='reports_list'),
     path('reports/generate/', views_reports.generate_report, name='generate_report'),
     path('reports/download/', views_reports.download_report, name='download_report'),
+    path('reports/<int:pk>/pdf/', views_reports.quality_report_pdf, name='generate_report_pdf'),
+    path('reports/generated/request/', views_reports.request_generated_report, name='request_generated_report'),
+    path('reports/generated/<int:pk>/status/', views_reports.generated_report_status, name='generated_report_status'),
+    path('reports/generated/<int:pk>/pdf/', views_reports.generated_report_pdf, name='generated_report_pdf'),
     
     # Importação de dados
     path('import/', views_import.import_dashboard, name='import_dashboard'),
     path('import/template/<int:template_id>/download/', views_import.download_template, name='download_template'),
     path('import/upload/', views_import.upload_data, name='upload_data'),
     path('import/status/<int:session_id>/', views_import.import_status, name='import_status'),
+    path('import/status/<int:session_id>/progress/', views_import.import_progress, name='import_progress'),
     path('import/errors/<int:session_id>/download/', views_import.download_errors, name='download_errors'),
     path('import/template/create/', views_import.create_template, name='create_template'),
     
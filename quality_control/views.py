@@ -9,13 +9,15 @@ from django.views.decorators.csrf import csrf_exempt
 from django.utils.decorators import method_decorator
 from django.contrib.auth.decorators import login_required
 from django.contrib import messages
-from django.db.models import Count, Avg, Q, Max
+from django.db.models import Count, Avg, Q, Max, Sum
 from django.utils import timezone
 from datetime import datetime, timedelta
 import json
 
 from core.models import Plant, ProductionLine, Shift
-from .models import Product, Property, Specification, SpotAnalysis, SpotSample, CompositeSample, CompositeSampleResult, ChemicalAnalysis, AnalysisType, AnalysisTypeProperty
+from .models import Product, Property, Specification, SpotAnalysis, SpotSample, CompositeSample, CompositeSampleResult, ChemicalAnalysis, AnalysisType, AnalysisTypeProperty, ShiftQualityRollup
+from .rollups import rollup_totals, shift_sample_stats
+from .api_cache import cached_api_response
 
 
 @method_decorator(csrf_exempt, name='dispatch')
@@ -404,61 +406,31 @@ def current_shift_api(request):
 
 
 @csrf_exempt
+@cached_api_response('dashboard_data_api')
 def dashboard_data_api(request):
     """API para dados do dashboard"""
     
     # Dados dos últimos 30 dias
     thirty_days_ago = timezone.now() - timedelta(days=30)
     
-    # 1. Status das Amostras (Pontuais + Compostas) - CONTAR POR AMOSTRA, NÃO POR ANÁLISE
-    spot_status_data = SpotAnalysis.objects.filter(
-        spot_sample__sample_time__gte=thirty_days_ago
-    ).values('status').annotate(
-        count=Count('id')
-    ).order_by('-count')
-    
-    # Status das amostras compostas (contar amostras, não resultados individuais)
-    composite_status_data = CompositeSample.objects.filter(
-        date__gte=thirty_days_ago.date()
-    ).values('status').annotate(
-        count=Count('id')
-    ).order_by('-count')
+    # 1. Status das Amostras (Pontuais + Compostas) - lido do consolidado por turno
+    recent_rollups = ShiftQualityRollup.objects.filter(date__gte=thirty_days_ago.date())
+    recent_totals = rollup_totals(recent_rollups)
     
-    # Combinar dados de status
     all_status_data = {}
-    for item in spot_status_data:
-        status = item['status']
-        all_status_data[status] = all_status_data.get(status, 0) + item['count']
+    for status, suffix in [('APPROVED', 'approved'), ('ALERT', 'alert'), ('REJECTED', 'rejected')]:
+        count = recent_totals[f'spot_analyses_{suffix}'] + recent_totals[f'composite_samples_{suffix}']
+        if count:
+            all_status_data[status] = count
     
-    for item in composite_status_data:
-        status = item['status']
-        all_status_data[status] = all_status_data.get(status, 0) + item['count']
+    # 2. Reprovações por Linha de Produção (Pontuais + Compostas)
+    rejections_by_line = recent_rollups.values('production_line__name').annotate(
+        count=Sum('spot_analyses_rejected') + Sum('composite_samples_rejected')
+    ).filter(count__gt=0).order_by('-count')[:5]
     
-    # 2. Reprovações por Linha de Produção (Pontuais + Compostas) - CONTAR POR AMOSTRA
-    spot_rejections_by_line = SpotAnalysis.objects.filter(
-        spot_sample__sample_time__gte=thirty_days_ago,
-        status='REJECTED'
-    ).values('spot_sample__production_line__name').annotate(
-        count=Count('id')
-    ).order_by('-count')[:5]
-    
-    # Contar amostras compostas reprovadas, não resultados individuais
-    composite_rejections_by_line = CompositeSample.objects.filter(
-        date__gte=thirty_days_ago.date(),
-        status='REJECTED'
-    ).values('production_line__name').annotate(
-        count=Count('id')
-    ).order_by('-count')[:5]
-    
-    # Combinar reprovações por linha
     line_rejections = {}
-    for item in spot_rejections_by_line:
-        line_name = item['spot_sample__production_line__name']
-        line_rejections[line_name] = line_rejections.get(line_name, 0) + item['count']
-    
-    for item in composite_rejections_by_line:
-        line_name = item['spot_sample__production_line__name']
-        line_rejections[line_name] = line_rejections.get(line_name, 0) + item['count']
+    for item in rejections_by_line:
+        line_rejections[item['production_line__name']] = item['count']
     
     # 3. Motivos de Reprovação (por propriedade) - MANTER CONTAGEM POR PROPRIEDADE
     spot_rejection_reasons = SpotAnalysis.objects.filter(
@@ -529,6 +501,10 @@ def dashboard_data_api(request):
     
     final_averages.sort(key=lambda x: x['avg_value'], reverse=True)
     
+    # Totais gerais e do dia - lidos do consolidado por turno
+    all_totals = rollup_totals()
+    today_totals = rollup_totals(date=timezone.now().date())
+    
     return JsonResponse({
         'success': True,
         'rejection_status': [{'status': k, 'count': v} for k, v in all_status_data.items()],
@@ -536,21 +512,13 @@ def dashboard_data_api(request):
         'rejection_reasons': [{'property__name': k, 'count': v} for k, v in rejection_reasons.items()],
         'property_averages': final_averages[:5],
         'totals': {
-            'spot_analyses': SpotAnalysis.objects.count(),
-            'composite_samples': CompositeSample.objects.count(),
+            'spot_analyses': all_totals['spot_analyses_total'],
+            'composite_samples': all_totals['composite_samples_total'],
             # CONTAR AMOSTRAS REPROVADAS, NÃO ANÁLISES INDIVIDUAIS
-            'total_rejections': SpotAnalysis.objects.filter(status='REJECTED').count() + 
-                              CompositeSample.objects.filter(status='REJECTED').count(),
+            'total_rejections': all_totals['spot_analyses_rejected'] + all_totals['composite_samples_rejected'],
             'total_alerts': 0,
-            'total_approved': SpotAnalysis.objects.filter(status='APPROVED').count() + 
-                            CompositeSample.objects.filter(status='APPROVED').count(),
-            'today_rejections': SpotAnalysis.objects.filter(
-                spot_sample__sample_time__date=timezone.now().date(),
-                status='REJECTED'
-            ).count() + CompositeSample.objects.filter(
-                date=timezone.now().date(),
-                status='REJECTED'
-            ).count(),
+            'total_approved': all_totals['spot_analyses_approved'] + all_totals['composite_samples_approved'],
+            'today_rejections': today_totals['spot_analyses_rejected'] + today_totals['composite_samples_rejected'],
             'today_alerts': 0
         }
     })
@@ -686,25 +654,8 @@ def spot_dashboard_view(request):
             'products': products_data
         })
     
-    # Estatísticas gerais
-    total_samples_today = SpotSample.objects.filter(
-        date=timezone.now().date(),
-        shift=current_shift
-    ).count()
-    
-    approved_samples = SpotSample.objects.filter(
-        date=timezone.now().date(),
-        shift=current_shift
-    ).annotate(
-        has_rejected=Count('spotanalysis', filter=Q(spotanalysis__status='REJECTED'))
-    ).filter(has_rejected=0).count()
-    
-    rejected_samples = SpotSample.objects.filter(
-        date=timezone.now().date(),
-        shift=current_shift
-    ).annotate(
-        has_rejected=Count('spotanalysis', filter=Q(spotanalysis__status='REJECTED'))
-    ).filter(has_rejected__gt=0).count()
+    # Estatísticas gerais - lidas do consolidado por turno
+    stats = shift_sample_stats(timezone.now().date(), current_shift)
     
     context = {
         'lines_data': lines_data,
@@ -712,12 +663,7 @@ def spot_dashboard_view(request):
         'properties': properties,
         'current_shift': current_shift,
         'current_date': timezone.now().date(),
-        'stats': {
-            'total_samples': total_samples_today,
-            'approved_samples': approved_samples,
-            'rejected_samples': rejected_samples,
-            'approval_rate': (approved_samples / total_samples_today * 100) if total_samples_today > 0 else 0
-        }
+        'stats': stats
     }
     
     return render(request, 'quality_control/spot_dashboard.html', context)
@@ -868,25 +814,8 @@ def spot_dashboard_by_plant_view(request):
         # Se não há produção cadastrada, mostrar mensagem
         plants_data = []
     
-    # Estatísticas gerais
-    total_samples_today = SpotSample.objects.filter(
-        date=today,
-        shift=current_shift
-    ).count()
-    
-    approved_samples = SpotSample.objects.filter(
-        date=today,
-        shift=current_shift
-    ).annotate(
-        has_rejected=Count('spotanalysis', filter=Q(spotanalysis__status='REJECTED'))
-    ).filter(has_rejected=0).count()
-    
-    rejected_samples = SpotSample.objects.filter(
-        date=today,
-        shift=current_shift
-    ).annotate(
-        has_rejected=Count('spotanalysis', filter=Q(spotanalysis__status='REJECTED'))
-    ).filter(has_rejected__gt=0).count()
+    # Estatísticas gerais - lidas do consolidado por turno
+    stats = shift_sample_stats(today, current_shift)
     
     context = {
         'plants_data': plants_data,
@@ -894,12 +823,7 @@ def spot_dashboard_by_plant_view(request):
         'current_shift': current_shift,
         'current_date': today,
         'production': production,
-        'stats': {
-            'total_samples': total_samples_today,
-            'approved_samples': approved_samples,
-            'rejected_samples': rejected_samples,
-            'approval_rate': (approved_samples / total_samples_today * 100) if total_samples_today > 0 else 0
-        }
+        'stats': stats
     }
     
     return render(request, 'quality_control/spot_dashboard_by_plant.html', context)
@@ -1044,25 +968,8 @@ def spot_dashboard_by_line_view(request):
         # Se não há produção cadastrada, mostrar mensagem
         lines_data = []
     
-    # Estatísticas gerais
-    total_samples_today = SpotSample.objects.filter(
-        date=today,
-        shift=current_shift
-    ).count()
-    
-    approved_samples = SpotSample.objects.filter(
-        date=today,
-        shift=current_shift
-    ).annotate(
-        has_rejected=Count('spotanalysis', filter=Q(spotanalysis__status='REJECTED'))
-    ).filter(has_rejected=0).count()
-    
-    rejected_samples = SpotSample.objects.filter(
-        date=today,
-        shift=current_shift
-    ).annotate(
-        has_rejected=Count('spotanalysis', filter=Q(spotanalysis__status='REJECTED'))
-    ).filter(has_rejected__gt=0).count()
+    # Estatísticas gerais - lidas do consolidado por turno
+    stats = shift_sample_stats(today, current_shift)
     
     context = {
         'lines_data': lines_data,
@@ -1070,12 +977,7 @@ def spot_dashboard_by_line_view(request):
         'current_shift': current_shift,
         'current_date': today,
         'production': production,
-        'stats': {
-            'total_samples': total_samples_today,
-            'approved_samples': approved_samples,
-            'rejected_samples': rejected_samples,
-            'approval_rate': (approved_samples / total_samples_today * 100) if total_samples_today > 0 else 0
-        }
+        'stats': stats
     }
     
     return render(request, 'quality_control/spot_dashboard_by_line.html', context)
\ No newline at end of file
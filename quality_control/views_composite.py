@@ -13,7 +13,7 @@ from django.utils import timezone
 from datetime import datetime, time
 
 from core.models import ProductionLine, Shift
-from .models import Product, Property, CompositeSample, CompositeSampleResult, AnalysisType
+from .models import Product, Property, CompositeSample, CompositeSampleResult, AnalysisType, SpotSample
 
 @login_required
 def composite_sample_list(request):
@@ -95,40 +95,42 @@ def composite_sample_create(request):
             # Debug: imprimir propriedades encontradas
             print(f"DEBUG: Propriedades encontradas: {properties.count()}")
             
-            for property in properties:
-                value_key = f'property_{property.id}_value'
-                method_key = f'property_{property.id}_method'
-                
-                print(f"DEBUG: Verificando {value_key}: {request.POST.get(value_key, 'NÃO ENCONTRADO')}")
-                
-                if value_key in request.POST and request.POST[value_key]:
-                    try:
-                        value_str = request.POST[value_key].strip()
-                        if value_str:
-                            # Converter valor para Decimal
-                            value = Decimal(value_str.replace(',', '.'))
-                            
-                            result = CompositeSampleResult.objects.create(
-                                composite_sample=sample,
-                                property=property,
-                                value=value,
-                                unit=property.unit,
-                                test_method=request.POST.get(method_key, property.test_method or 'Método padrão')
-                            )
-                            print(f"DEBUG: Resultado criado para {property.identifier}:")
-                            print(f"  - Valor: {result.value}")
-                            print(f"  - Unidade: {result.unit}")
-                            print(f"  - Status: {result.status}")
-                            print(f"  - ID: {result.id}")
-                    except (ValueError, Decimal.InvalidOperation) as e:
-                        print(f"DEBUG: Erro ao converter valor para {property.identifier}: {e}")
-                        messages.warning(request, f'Valor inválido para {property.name}: {value_str}')
-                    except Exception as e:
-                        print(f"DEBUG: Erro ao criar resultado para {property.identifier}: {e}")
-                        messages.error(request, f'Erro ao salvar {property.name}: {str(e)}')
+            # Recalcular o status da amostra uma única vez, ao final
+            with SpotSample.deferred_status():
+                for property in properties:
+                    value_key = f'property_{property.id}_value'
+                    method_key = f'property_{property.id}_method'
+                    
+                    print(f"DEBUG: Verificando {value_key}: {request.POST.get(value_key, 'NÃO ENCONTRADO')}")
+                    
+                    if value_key in request.POST and request.POST[value_key]:
+                        try:
+                            value_str = request.POST[value_key].strip()
+                            if value_str:
+                                # Converter valor para Decimal
+                                value = Decimal(value_str.replace(',', '.'))
+                                
+                                result = CompositeSampleResult.objects.create(
+                                    composite_sample=sample,
+                                    property=property,
+                                    value=value,
+                                    unit=property.unit,
+                                    test_method=request.POST.get(method_key, property.test_method or 'Método padrão')
+                                )
+                                print(f"DEBUG: Resultado criado para {property.identifier}:")
+                                print(f"  - Valor: {result.value}")
+                                print(f"  - Unidade: {result.unit}")
+                                print(f"  - Status: {result.status}")
+                                print(f"  - ID: {result.id}")
+                        except (ValueError, Decimal.InvalidOperation) as e:
+                            print(f"DEBUG: Erro ao converter valor para {property.identifier}: {e}")
+                            messages.warning(request, f'Valor inválido para {property.name}: {value_str}')
+                        except Exception as e:
+                            print(f"DEBUG: Erro ao criar resultado para {property.identifier}: {e}")
+                            messages.error(request, f'Erro ao salvar {property.name}: {str(e)}')
             
-            # Atualizar o status geral da amostra composta
-            sample.update_status()
+                # Atualizar o status geral da amostra composta
+                sample.update_status()
             print(f"DEBUG: Status geral da amostra atualizado para: {sample.status}")
             
             messages.success(request, 'Amostra composta criada com sucesso!')
@@ -199,14 +201,15 @@ def composite_sample_edit(request, sample_id):
             
             # Atualizar resultados
             results = CompositeSampleResult.objects.filter(composite_sample=sample)
-            for result in results:
-                value_key = f'property_{result.property.id}_value'
-                method_key = f'property_{result.property.id}_method'
-                
-                if value_key in request.POST:
-                    result.value = request.POST[value_key] or 0
-                    result.test_method = request.POST.get(method_key, result.property.test_method)
-                    result.save()
+            with SpotSample.deferred_status():
+                for result in results:
+                    value_key = f'property_{result.property.id}_value'
+                    method_key = f'property_{result.property.id}_method'
+                    
+                    if value_key in request.POST:
+                        result.value = request.POST[value_key] or 0
+                        result.test_method = request.POST.get(method_key, result.property.test_method)
+                        result.save()
             
             messages.success(request, 'Amostra composta atualizada com sucesso!')
             return redirect('quality_control:composite_sample_detail', sample_id=sample.id)
@@ -2,16 +2,21 @@
 Views para geração de relatórios
 """
 
-from django.shortcuts import render, get_object_or_404
-from django.http import HttpResponse, JsonResponse
+from django.shortcuts import render, get_object_or_404, redirect
+from django.http import FileResponse, HttpResponse, JsonResponse
 from django.contrib.auth.decorators import login_required
+from django.urls import reverse
+from django.views.decorators.http import require_POST
 from django.utils import timezone
 from django.db.models import Count, Avg, Q
 from datetime import datetime, timedelta
 import json
 
-from .models import SpotAnalysis, CompositeSample, Product, Property, ProductionLine
+from .models import SpotAnalysis, CompositeSample, Product, Property, ProductionLine, QualityReport
 from .models_import import ImportTemplate, ImportSession
+from .models_report import GeneratedReport, ReportTemplate
+from .pdf_generator import cached_quality_report_pdf
+from .report_queue import render_progress, request_render
 
 
 @login_required
@@ -192,7 +197,75 @@ def download_report(request):
         return JsonResponse({'error': str(e)}, status=500)
 
 
+@login_required
+def quality_report_pdf(request, pk):
+    """
+    PDF do laudo de carregamento
+
+    Servido do cache em disco enquanto os dados do laudo não mudam; gerado só na primeira vez.
+    """
+    report = get_object_or_404(
+        QualityReport.objects.select_related('product', 'plant', 'created_by', 'approved_by'), pk=pk
+    )
+    return FileResponse(
+        open(cached_quality_report_pdf(report), 'rb'), as_attachment=True,
+        filename=f'laudo_{report.report_number}.pdf', content_type='application/pdf'
+    )
+
+
+def _generated_report_json(report, status=200):
+    data = render_progress(report)
+    data['status_url'] = reverse('quality_control:generated_report_status', args=[report.pk])
+    data['pdf_url'] = reverse('quality_control:generated_report_pdf', args=[report.pk])
+    response = JsonResponse(data, status=status)
+    if not data['finished']:
+        # Intervalo sugerido para a próxima consulta
+        response['Retry-After'] = '2'
+    return response
+
+
+@login_required
+@require_POST
+def request_generated_report(request):
+    """
+    Pede a renderização do laudo de uma amostra (processada pelo comando process_reports)
+
+    Responde 202 com a URL de status, consultada até o PDF ficar pronto.
+    """
+    template = get_object_or_404(ReportTemplate, pk=request.POST.get('template_id'), is_active=True)
+    spot_analysis_id = request.POST.get('spot_analysis_id')
+    composite_sample_id = request.POST.get('composite_sample_id')
+    if bool(spot_analysis_id) == bool(composite_sample_id):
+        return JsonResponse({'error': 'Informe spot_analysis_id ou composite_sample_id'}, status=400)
+
+    report = request_render(
+        template,
+        request.user,
+        spot_analysis=get_object_or_404(SpotAnalysis, pk=spot_analysis_id) if spot_analysis_id else None,
+        composite_sample=get_object_or_404(CompositeSample, pk=composite_sample_id) if composite_sample_id else None,
+        title=request.POST.get('title', ''),
+    )
+    response = _generated_report_json(report, status=200 if report.render_status == 'READY' else 202)
+    response['Location'] = reverse('quality_control:generated_report_status', args=[report.pk])
+    return response
 
 
+@login_required
+def generated_report_status(request, pk):
+    """Andamento da renderização em JSON; com ?redirect=1 redireciona para o PDF quando pronto"""
+    report = get_object_or_404(GeneratedReport, pk=pk)
+    if report.render_status == 'READY' and request.GET.get('redirect'):
+        return redirect('quality_control:generated_report_pdf', pk=pk)
+    return _generated_report_json(report)
 
 
+@login_required
+def generated_report_pdf(request, pk):
+    """PDF do laudo gerado; enquanto não fica pronto responde 202 com o andamento"""
+    report = get_object_or_404(GeneratedReport, pk=pk)
+    if report.render_status == 'READY' and report.pdf_file:
+        return FileResponse(
+            report.pdf_file.open('rb'), as_attachment=True,
+            filename=f'{report.report_number}.pdf', content_type='application/pdf'
+        )
+    return _generated_report_json(report, status=500 if report.render_status == 'FAILED' else 202)
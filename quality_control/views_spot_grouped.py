@@ -19,7 +19,7 @@ def spot_sample_create(request):
     """Criar nova amostra pontual com múltiplas análises"""
     if request.method == 'POST':
         try:
-            with transaction.atomic():
+            with transaction.atomic(), SpotSample.deferred_status():
                 # Obter dados básicos da amostra
                 date = request.POST.get('date')
                 product_id = request.POST.get('product')
@@ -181,7 +181,7 @@ def spot_sample_edit(request, sample_id):
     
     if request.method == 'POST':
         try:
-            with transaction.atomic():
+            with transaction.atomic(), SpotSample.deferred_status():
                 # Atualizar dados básicos da amostra
                 sample.observations = request.POST.get('observations', '')
                 sample.save()
@@ -69,6 +69,17 @@ DATABASES = {
     )
 }
 
+if DATABASES['default']['ENGINE'] == 'django.db.backends.sqlite3':
+    # Transações IMMEDIATE reservam a escrita no início, evitando o "database is
+    # locked" imediato quando várias conexões leem e depois gravam ao mesmo tempo
+    DATABASES['default'].setdefault('OPTIONS', {}).update({
+        'transaction_mode': 'IMMEDIATE',
+        'timeout': 20,
+    })
+    # Banco de testes em arquivo: o banco em memória compartilhado entre threads
+    # devolve "table is locked" em vez de aguardar, o que impede os testes de concorrência
+    DATABASES['default']['TEST'] = {'NAME': str(BASE_DIR / 'test_db.sqlite3')}
+
 # Password validation
 AUTH_PASSWORD_VALIDATORS = [
     {
@@ -168,3 +179,39 @@ LOGIN_URL = '/login-simples/'
 LOGIN_REDIRECT_URL = '/dashboard-simples/'
 LOGOUT_REDIRECT_URL = '/'
 
+
+# Cache das APIs de dashboard (segundos); invalidado a cada gravação nos dados de qualidade
+DASHBOARD_API_CACHE_TIMEOUT = int(os.environ.get('DASHBOARD_API_CACHE_TIMEOUT', 300))
+# Intervalo máximo (segundos) até um processo perceber gravações feitas por outro (workers)
+DASHBOARD_DATA_VERSION_TTL = float(os.environ.get('DASHBOARD_DATA_VERSION_TTL', 2))
+
+# Intervalo máximo (segundos) até um processo perceber especificações alteradas por outro
+SPECIFICATION_INDEX_TTL = float(os.environ.get('SPECIFICATION_INDEX_TTL', 5))
+
+# Importações de planilhas: por padrão processadas na própria requisição do upload.
+# Com IMPORT_INLINE=false são enfileiradas para o comando process_imports, que precisa
+# rodar com acesso ao mesmo MEDIA_ROOT do serviço web (ver DEPLOY_GUIDE.md)
+IMPORT_INLINE = os.environ.get('IMPORT_INLINE', 'true').lower() in ('1', 'true')
+# Sessões em processamento sem sinal do worker por este tempo (segundos) são marcadas como falha
+IMPORT_STALE_AFTER = int(os.environ.get('IMPORT_STALE_AFTER', 900))
+
+# Backup incremental (comandos backup_incremental e restore_backup)
+BACKUP_DIR = os.environ.get('BACKUP_DIR', str(BASE_DIR / 'backups'))
+# Margem (segundos) antes da marca d'água do segmento anterior relida no incremental,
+# para gravações que fazem commit depois do início do backup
+BACKUP_WATERMARK_OVERLAP = int(os.environ.get('BACKUP_WATERMARK_OVERLAP', 300))
+
+# PDFs de laudos em cache, endereçados pelo hash dos dados do laudo
+REPORT_PDF_CACHE_DIR = os.environ.get('REPORT_PDF_CACHE_DIR', str(MEDIA_ROOT / 'reports' / 'cache'))
+
+# Laudos gerados: por padrão renderizados na própria requisição.
+# Com REPORT_RENDER_INLINE=false são enfileirados para o comando process_reports, que precisa
+# gravar no mesmo MEDIA_ROOT lido pelo serviço web (ver DEPLOY_GUIDE.md)
+REPORT_RENDER_INLINE = os.environ.get('REPORT_RENDER_INLINE', 'true').lower() in ('1', 'true')
+# Laudos em renderização sem sinal do worker por este tempo (segundos) voltam para a fila
+REPORT_RENDER_STALE_AFTER = int(os.environ.get('REPORT_RENDER_STALE_AFTER', 600))
+
+# QR Codes renderizados, em cache em disco pelo hash do conteúdo
+QR_CACHE_DIR = os.environ.get('QR_CACHE_DIR', str(MEDIA_ROOT / 'qr_cache'))
+# Validade (segundos) das imagens de QR Code no cache do navegador; depois disso revalidam pelo ETag
+QR_CODE_MAX_AGE = int(os.environ.get('QR_CODE_MAX_AGE', 86400))